@@ -1,3 +1,4 @@
+import asyncio
 import logging
 
 class Agent:
@@ -6,14 +7,30 @@ class Agent:
         self.model = model
         self.logger = logging.getLogger(name)
 
-    def run(self, input_data):
+    def run(self, input_data, **kwargs):
         self.logger.info(f"Agent {self.name} starting with input: {input_data}")
-        result = self.execute(input_data)
+        result = self.execute(input_data, **kwargs)
+        self.logger.info(f"Agent {self.name} finished.")
+        return result
+
+    async def arun(self, input_data, **kwargs):
+        self.logger.info(f"Agent {self.name} starting with input: {input_data}")
+        result = await self.aexecute(input_data, **kwargs)
         self.logger.info(f"Agent {self.name} finished.")
         return result
 
     def execute(self, input_data):
         raise NotImplementedError("Subclasses must implement execute method")
+
+    async def aexecute(self, input_data, **kwargs):
+        """Async variant of execute; agents without native async I/O run execute in a thread"""
+        return await asyncio.to_thread(self.execute, input_data, **kwargs)
+
+    def _build_prompt(self, prompt, system_prompt=None):
+        # Combine system prompt and user prompt if system prompt provided
+        if system_prompt:
+            return f"{system_prompt}\n\n{prompt}"
+        return prompt
     
     def call_llm(self, prompt, system_prompt=None):
         """
@@ -30,14 +47,21 @@ class Agent:
             raise ValueError(f"Agent {self.name} does not have a model configured")
         
         try:
-            # Combine system prompt and user prompt if system prompt provided
-            full_prompt = prompt
-            if system_prompt:
-                full_prompt = f"{system_prompt}\n\n{prompt}"
-            
             # Generate response
-            response = self.model.generate_content(full_prompt)
+            response = self.model.generate_content(self._build_prompt(prompt, system_prompt))
+            return response.text
+        except Exception as e:
+            self.logger.error(f"Error calling LLM: {str(e)}")
+            raise
+
+    async def acall_llm(self, prompt, system_prompt=None):
+        """Async variant of call_llm"""
+        if self.model is None:
+            raise ValueError(f"Agent {self.name} does not have a model configured")
+
+        try:
+            response = await self.model.generate_content_async(self._build_prompt(prompt, system_prompt))
             return response.text
         except Exception as e:
             self.logger.error(f"Error calling LLM: {str(e)}")
-            raise
\ No newline at end of file
+            raise
@@ -1,36 +1,161 @@
+import json
+from collections import Counter
+
 from agents.base import Agent
+from tools.category_classifier import get_category_classifier
 from tools.scraper import CatalogueScraper
 
+LLM_MATCH_PROMPT = """You are given abbreviated product names from Albert Heijn (Dutch supermarket) receipts.
+For each name, give the full product name in plain words and its category.
+
+Receipt names (JSON array):
+{names}
+
+Return a JSON array with one object per receipt name: raw_name (exactly as given), product_name and category.
+The category must be one of: {categories}. Use "{fallback}" if none fits.
+"""
+
+
+def llm_match_schema(categories):
+    """Structured output schema for a match prompt, with the category limited to the taxonomy"""
+    return {
+        'type': 'ARRAY',
+        'items': {
+            'type': 'OBJECT',
+            'properties': {
+                'raw_name': {'type': 'STRING'},
+                'product_name': {'type': 'STRING'},
+                'category': {'type': 'STRING', 'enum': list(categories)},
+            },
+            'required': ['raw_name', 'product_name', 'category'],
+        },
+    }
+
+
+# Tiers in the order they are tried; "unmatched" counts items no tier resolved
+MATCH_TIERS = ("local", "remembered", "llm", "keyword", "unmatched")
+
+
 class CatalogueAgent(Agent):
-    def __init__(self, model=None):
+    def __init__(self, model=None, scraper=None):
         super().__init__(name="CatalogueMatcher", model=model)
-        self.scraper = CatalogueScraper()
+        self.scraper = scraper if scraper is not None else CatalogueScraper()
+        self.classifier = get_category_classifier()
+        # Categories the model may assign: the classifier's taxonomy, so budgets see the same names
+        self.llm_categories = [*self.classifier.categories, self.classifier.fallback]
+        self.stats = Counter()  # Items resolved per tier, plus unique names and LLM calls, since startup
+        self.last_stats = Counter()
+        self._llm_matches = {}  # raw_name -> match answered by the model, so it is asked once
 
     def execute(self, raw_items):
-        print(f"Matching {len(raw_items)} items against catalogue...")
-        matched_items = []
-        for item in raw_items:
-            # In a real agent, this would be a loop with self-correction
-            # "Search for BAP WIT" -> "Found Bananas" -> "Confirm match"
-            
-            match = self.scraper.find_product(item["raw_name"])
-            if match:
-                enhanced_item = {
-                    **item,
-                    "product_name": match["name"],
-                    "category": match["category"],
-                    "catalogue_price": match["price"],
-                    "is_bonus": match["is_bonus"]
-                }
-                matched_items.append(enhanced_item)
-            else:
-                # Fallback for unknown items
-                matched_items.append({
-                    **item,
-                    "product_name": item["raw_name"],
-                    "category": "Uncategorized",
-                    "catalogue_price": item["price"],
-                    "is_bonus": False
-                })
-        
-        return matched_items
+        return self.execute_many([raw_items])[0]
+
+    def execute_many(self, receipts):
+        """
+        Match the items of many receipts in one batch
+
+        Raw names are deduplicated within and across receipts. Each name is
+        resolved by the first tier that can: the local matcher (curated
+        entries and catalogue snapshot), earlier model answers, one
+        structured prompt to the model for all names still unknown, and
+        finally the keyword classifier, which gives a category but no product.
+
+        Args:
+            receipts: List of item lists (dicts with raw_name, price, quantity)
+
+        Returns:
+            List of matched item lists, one per receipt, in input order
+        """
+        names = list(dict.fromkeys(item["raw_name"] for items in receipts for item in items))
+        print(f"Matching {sum(map(len, receipts))} items ({len(names)} distinct) against catalogue...")
+        stats = Counter(unique_names=len(names))
+
+        # One batched lookup for every distinct name; receipt abbreviations
+        # such as "BAP WIT 2ST" still find their product
+        resolved = {}
+        for result in self.scraper.match_products(names):
+            if result["product"]:
+                resolved[result["raw_name"]] = ("local", result["product"], result["score"])
+
+        unknown = [name for name in names if name not in resolved]
+        asked = [name for name in unknown if name not in self._llm_matches]
+        if asked and self.model is not None:
+            stats["llm_calls"] += 1
+            self._llm_matches.update(self._match_with_llm(asked))
+        for name in unknown:
+            if name in self._llm_matches:
+                resolved[name] = ("llm" if name in asked else "remembered", self._llm_matches[name], None)
+
+        leftovers = [name for name in unknown if name not in resolved]
+        for name, category in zip(leftovers, self.classifier.classify_many(leftovers)):
+            if category != self.classifier.fallback:
+                resolved[name] = ("keyword", {"name": name, "category": category, "price": None,
+                                              "is_bonus": False}, None)
+
+        matched = []
+        for items in receipts:
+            matched_items = []
+            for item in items:
+                tier, match, score = resolved.get(item["raw_name"], ("unmatched", None, 0.0))
+                stats[tier] += 1
+                if match:
+                    matched_items.append({
+                        **item,
+                        "product_name": match["name"],
+                        "category": match["category"],
+                        "catalogue_price": match["price"] if match["price"] is not None else item["price"],
+                        "is_bonus": match["is_bonus"],
+                        "match_score": score,
+                        "match_tier": tier
+                    })
+                else:
+                    # Fallback for unknown items
+                    matched_items.append({
+                        **item,
+                        "product_name": item["raw_name"],
+                        "category": "Uncategorized",
+                        "catalogue_price": item["price"],
+                        "is_bonus": False,
+                        "match_score": score,
+                        "match_tier": tier
+                    })
+            matched.append(matched_items)
+
+        self.last_stats = stats
+        self.stats.update(stats)
+        print("Resolved per tier: " + ", ".join(f"{tier} {stats[tier]}" for tier in MATCH_TIERS))
+        return matched
+
+    def _match_with_llm(self, names):
+        """
+        Ask the model about every name in one structured prompt
+
+        Returns:
+            Dict of raw_name -> match (name, category, price None, is_bonus) for
+            the names the model answered; empty if the call fails
+        """
+        prompt = LLM_MATCH_PROMPT.format(names=json.dumps(names, ensure_ascii=False),
+                                         categories=", ".join(self.llm_categories),
+                                         fallback=self.classifier.fallback)
+        try:
+            response = self.model.generate_content(prompt, generation_config={
+                'response_mime_type': 'application/json',
+                'response_schema': llm_match_schema(self.llm_categories)})
+            answers = json.loads(response.text)
+        except Exception as e:
+            self.logger.error(f"LLM matching failed for {len(names)} names: {e}")
+            return {}
+
+        asked = set(names)
+        matches = {}
+        for answer in answers if isinstance(answers, list) else []:
+            if not isinstance(answer, dict) or answer.get("raw_name") not in asked:
+                continue
+            category = answer.get("category")
+            matches[answer["raw_name"]] = {
+                "name": answer.get("product_name") or answer["raw_name"],
+                "category": category if category in self.llm_categories else self.classifier.fallback,
+                "price": None,
+                "is_bonus": False,
+            }
+        return matches
@@ -1,22 +1,46 @@
+import threading
+
 from agents.base import Agent
-from tools.mcp_server import SpendingMemoryMCP
+from tools.mcp_server import SQLiteSpendingMemory, month_start
 from tools.budget_evaluator import BudgetEvaluator
+from tools.transaction_table import TransactionTable
 
 class FinanceAgent(Agent):
-    def __init__(self, model=None):
+    def __init__(self, model=None, memory=None):
+        """
+        Args:
+            model: Optional model for the agent
+            memory: Spending memory store (default: a SQLiteSpendingMemory, opened on first use)
+        """
         super().__init__(name="FinanceManager", model=model)
-        self.memory = SpendingMemoryMCP()
+        self._memory = memory
+        self._memory_lock = threading.Lock()
         self.evaluator = BudgetEvaluator()
 
+    @property
+    def memory(self):
+        """Spending memory; the default store is opened on first use, so building the agent touches no files"""
+        if self._memory is None:
+            with self._memory_lock:
+                if self._memory is None:
+                    self._memory = SQLiteSpendingMemory()
+        return self._memory
+
+    @memory.setter
+    def memory(self, memory):
+        self._memory = memory
+
     def execute(self, matched_items):
         print("Updating financial records...")
         
         # 1. Store transactions
         self.memory.add_transactions(matched_items)
         
-        # 2. Calculate totals
-        total_spend = sum(item['price'] for item in matched_items)
-        category_breakdown = self.memory.get_category_totals()
+        # 2. Calculate totals (the columnar table is what the UI displays)
+        table = TransactionTable.from_records(matched_items)
+        total_spend = float(table.price.sum())
+        # Budgets are monthly, so check them against month-to-date spend
+        category_breakdown = self.memory.totals(start=month_start())
         
         # 3. Check Budgets
         alerts = self.evaluator.check_budgets(category_breakdown)
@@ -25,5 +49,6 @@ class FinanceAgent(Agent):
             "total_spend": total_spend,
             "breakdown": category_breakdown,
             "alerts": alerts,
-            "transactions": matched_items
+            "transactions": matched_items,
+            "table": table
         }
@@ -36,11 +36,14 @@ class OrchestratorAgent(Agent):
         
         self.finance_data = None  # Store finance data for UI access
         self.matched_items = None  # Store matched items for UI access
+        self.receipt_cache_hit = None  # Whether the last receipt came from the receipt cache
 
-    def execute(self, receipt_file):
-        # 1. Parse Receipt
+    def execute(self, receipt_file, on_item=None):
+        # 1. Parse Receipt (on_item receives each item as soon as it is parsed)
         print("--- Step 1: Parsing Receipt ---")
-        items = self.receipt_agent.run(receipt_file)
+        receipt_result = self.receipt_agent.run(receipt_file, on_item=on_item)
+        self.receipt_cache_hit = receipt_result["cache_hit"]  # Store for UI
+        items = receipt_result["items"]
 
         # 2. Match with Catalogue
         print("--- Step 2: Matching Catalogue ---")
@@ -57,3 +60,73 @@ class OrchestratorAgent(Agent):
         summary = self.analyst_agent.run(budget_status)
 
         return summary
+
+    async def aexecute(self, receipt_file):
+        """
+        Async variant of execute
+
+        Receipt parsing awaits the async Gemini client, so many receipts can be
+        processed on one event loop. Matching, the finance update and the analysis
+        block on models and SQLite, so they run in worker threads.
+        """
+        print("--- Step 1: Parsing Receipt ---")
+        receipt_result = await self.receipt_agent.arun(receipt_file)
+        self.receipt_cache_hit = receipt_result["cache_hit"]
+        items = receipt_result["items"]
+
+        print("--- Step 2: Matching Catalogue ---")
+        matched_items = await self.catalogue_agent.arun(items)
+        self.matched_items = matched_items
+
+        print("--- Step 3: Finance Check ---")
+        budget_status = await self.finance_agent.arun(matched_items)
+        self.finance_data = budget_status
+
+        print("--- Step 4: Analysis ---")
+        summary = await self.analyst_agent.arun(budget_status)
+
+        return summary
+
+    def run_batch(self, receipt_files, max_workers=4):
+        """
+        Ingest many receipts at once (e.g. a monthly backfill)
+
+        Receipts are parsed concurrently, matched in one batch, and all transactions
+        are committed to the memory store in a single bulk write. A failing
+        receipt is reported in its own result and does not abort the batch.
+
+        Args:
+            receipt_files: Receipt file paths
+            max_workers: Threads used for the I/O-bound parsing step
+
+        Returns:
+            Dict with 'receipts' (per-receipt results in input order),
+            'finance' (budget status for the batch) and 'summary'
+        """
+        print(f"--- Step 1: Parsing {len(receipt_files)} Receipts ---")
+        receipts = self.receipt_agent.execute_many(receipt_files, max_workers=max_workers)
+
+        print("--- Step 2: Matching Catalogue ---")
+        for receipt in receipts:
+            receipt["matched_items"] = []
+        parsed = [receipt for receipt in receipts if receipt["error"] is None and receipt["items"]]
+        all_matched = []
+        try:
+            # One batch for all receipts, so a name repeated across receipts is resolved once
+            for receipt, matched in zip(parsed, self.catalogue_agent.execute_many([r["items"] for r in parsed])):
+                receipt["matched_items"] = matched
+                all_matched.extend(matched)
+        except Exception as e:
+            self.logger.error(f"Matching failed for the batch: {e}")
+            for receipt in parsed:
+                receipt["error"] = str(e)
+        self.matched_items = all_matched
+
+        print("--- Step 3: Finance Check ---")
+        budget_status = self.finance_agent.run(all_matched)
+        self.finance_data = budget_status
+
+        print("--- Step 4: Analysis ---")
+        summary = self.analyst_agent.run(budget_status)
+
+        return {"receipts": receipts, "finance": budget_status, "summary": summary}
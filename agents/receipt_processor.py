@@ -1,14 +1,128 @@
+import copy
 from agents.base import Agent
-from tools.parser import ReceiptParser
+from tools.parser import ReceiptParser, parse_receipt_date
+from tools.receipt_cache import get_receipt_cache
+
+def _dated(items, receipt_text):
+    """
+    Items stamped with the receipt's purchase date, when it is known, and that date
+
+    The date is read from the receipt text. Single-call parses have no text, so
+    there the date the model put on the items is used.
+    """
+    purchase_date = parse_receipt_date(receipt_text) or next(
+        (item["date"] for item in items if item.get("date")), None)
+    if purchase_date:
+        items = [{**item, "date": purchase_date} for item in items]
+    return items, purchase_date
+
 
 class ReceiptProcessingAgent(Agent):
-    def __init__(self, model=None):
+    def __init__(self, model=None, cache=None):
         super().__init__(name="ReceiptProcessor", model=model)
         self.parser = ReceiptParser()
+        self.cache = cache if cache is not None else get_receipt_cache()
+
+    def execute(self, file_path, on_item=None):
+        """
+        Args:
+            file_path: Receipt file
+            on_item: Optional callback invoked with each item as soon as it is parsed
+                     (the parser streams the model response)
 
-    def execute(self, file_path):
+        Returns:
+            Dict with 'items', 'cache_hit', 'cache_key', 'parse_stats', 'complete' and
+            'purchase_date' (ISO date read from the receipt text, or None); items carry
+            that date as 'date'
+        """
         # In a real scenario, this would call the LLM to verify extraction
         # For now, we delegate to the tool
         print(f"Processing file: {file_path}")
-        raw_items = self.parser.parse(file_path)
-        return raw_items
+
+        # Re-uploads of the same receipt are served from the cache
+        cache_key = self.cache.key_for_file(file_path, self.parser.cache_fingerprint())
+        cached = self.cache.get(cache_key) if cache_key else None
+        if cached is not None:
+            print(f"Receipt cache hit ({len(cached['items'])} items)")
+            if on_item:
+                for item in cached["items"]:
+                    on_item(item)
+            items, purchase_date = _dated(cached["items"], cached["receipt_text"])
+            return {"items": items, "cache_hit": True, "cache_key": cache_key, "parse_stats": None,
+                    "complete": True, "purchase_date": purchase_date}
+
+        if on_item:
+            raw_items = []
+            for item in self.parser.iter_items(file_path):
+                raw_items.append(item)
+                on_item(item)
+        else:
+            raw_items = self.parser.parse(file_path)
+        return self._store(cache_key, self.parser, raw_items)
+
+    async def aexecute(self, file_path):
+        """Async variant of execute; concurrent calls are safe on one agent"""
+        print(f"Processing file: {file_path}")
+
+        cache_key = self.cache.key_for_file(file_path, self.parser.cache_fingerprint())
+        cached = self.cache.get(cache_key) if cache_key else None
+        if cached is not None:
+            print(f"Receipt cache hit ({len(cached['items'])} items)")
+            items, purchase_date = _dated(cached["items"], cached["receipt_text"])
+            return {"items": items, "cache_hit": True, "cache_key": cache_key, "parse_stats": None,
+                    "complete": True, "purchase_date": purchase_date}
+
+        # Own parser copy so concurrent receipts don't share the last_* attributes
+        parser = copy.copy(self.parser)
+        raw_items = await parser.aparse(file_path)
+        return self._store(cache_key, parser, raw_items)
+
+    def _store(self, cache_key, parser, raw_items):
+        """Cache a fresh, complete parse and build the execute() result"""
+        if not parser.last_parse_complete:
+            print("Parse is incomplete, not caching it")
+        elif cache_key and raw_items:
+            self.cache.put(cache_key, parser.last_receipt_text, raw_items)
+        items, purchase_date = _dated(raw_items, parser.last_receipt_text)
+        return {
+            "items": items,
+            "cache_hit": False,
+            "cache_key": cache_key,
+            "parse_stats": parser.last_parse_stats,
+            "complete": parser.last_parse_complete,
+            "purchase_date": purchase_date,
+        }
+
+    def execute_many(self, file_paths, max_workers=4):
+        """
+        Process many receipts, serving cached ones directly and parsing the rest concurrently
+
+        Returns:
+            List of results in input order, each shaped like execute() plus 'file_path' and 'error'.
+            Items carry the receipt's purchase date as 'date' when the text has one.
+        """
+        print(f"Processing {len(file_paths)} files...")
+        fingerprint = self.parser.cache_fingerprint()
+        results = [None] * len(file_paths)
+        misses = []
+        for index, file_path in enumerate(file_paths):
+            cache_key = self.cache.key_for_file(file_path, fingerprint)
+            cached = self.cache.get(cache_key) if cache_key else None
+            if cached is not None:
+                items, purchase_date = _dated(cached["items"], cached["receipt_text"])
+                results[index] = {"file_path": file_path, "items": items, "cache_hit": True,
+                                  "cache_key": cache_key, "parse_stats": None, "complete": True, "error": None,
+                                  "purchase_date": purchase_date}
+            else:
+                misses.append((index, cache_key))
+
+        parsed = self.parser.parse_many([file_paths[index] for index, _ in misses], max_workers=max_workers)
+        for (index, cache_key), outcome in zip(misses, parsed):
+            if cache_key and outcome["items"] and outcome["complete"] and outcome["error"] is None:
+                self.cache.put(cache_key, outcome["receipt_text"], outcome["items"])
+            items, purchase_date = _dated(outcome["items"], outcome["receipt_text"])
+            results[index] = {"file_path": file_paths[index], "items": items, "cache_hit": False,
+                              "cache_key": cache_key, "parse_stats": outcome["parse_stats"],
+                              "complete": outcome["complete"], "error": outcome["error"],
+                              "purchase_date": purchase_date}
+        return results
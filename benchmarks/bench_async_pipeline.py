@@ -0,0 +1,118 @@
+"""
+Sequential sync parsing versus asyncio.gather over the async pipeline.
+
+Each receipt costs one stubbed vision call (plus the text parse when the fast
+path leaves lines over). The async run drives every receipt from a single event
+loop; the table reports wall time, peak concurrent model calls and the number
+of threads alive during the run, to show the concurrency comes from coroutines
+rather than a thread per call. A second table does the same for product searches.
+
+Usage:
+    python -m benchmarks.bench_async_pipeline
+"""
+import asyncio
+import contextlib
+import io
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import config.model_registry as model_registry
+from agents.receipt_processor import ReceiptProcessingAgent
+from benchmarks.stubs import stub_genai, render_receipt_image, load_receipt_texts
+from config.model_registry import ModelRegistry
+from tools.receipt_cache import ReceiptCache
+from tools.scraper import CatalogueScraper
+
+RECEIPTS = 32
+SEARCHES = 32
+MODEL_LATENCY = 0.2
+QUERIES = ('milk', 'bread', 'bananas', 'cheese', 'coffee', 'eggs', 'butter', 'apples')
+
+
+class ThreadWatcher:
+    """Samples threading.active_count() in the background"""
+
+    def __init__(self):
+        self.peak = threading.active_count()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._watch, daemon=True)
+
+    def _watch(self):
+        while not self._stop.wait(0.005):
+            self.peak = max(self.peak, threading.active_count())
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        # The watcher itself is not part of the workload
+        self.peak -= 1
+
+
+def run_receipts(paths, use_async):
+    with stub_genai(latency=MODEL_LATENCY) as stub:
+        model_registry._model_registry = ModelRegistry(max_concurrency=64)
+        with contextlib.redirect_stdout(io.StringIO()):
+            agent = ReceiptProcessingAgent(cache=ReceiptCache(':memory:'))
+            with ThreadWatcher() as threads:
+                started = time.perf_counter()
+                if use_async:
+                    async def parse_all():
+                        return await asyncio.gather(*(agent.arun(path) for path in paths))
+                    results = asyncio.run(parse_all())
+                else:
+                    results = [agent.run(path) for path in paths]
+                elapsed = time.perf_counter() - started
+    items = sum(len(r['items']) for r in results)
+    return elapsed, items, stub.generate_calls, stub.peak_in_flight, threads.peak
+
+
+def run_searches(queries, use_async):
+    with stub_genai(latency=MODEL_LATENCY, responder=lambda contents, **kw: '[]') as stub:
+        model_registry._model_registry = ModelRegistry(max_concurrency=64)
+        with contextlib.redirect_stdout(io.StringIO()):
+            scraper = CatalogueScraper(search_cache=False, catalogue=False)
+            # Keep the benchmark offline: no products come back from ah.nl
+            scraper.search_products_web_scrape = lambda query, max_results=10: []
+            with ThreadWatcher() as threads:
+                started = time.perf_counter()
+                if use_async:
+                    async def search_all():
+                        return await asyncio.gather(*(scraper.asearch_products_google(q) for q in queries))
+                    asyncio.run(search_all())
+                else:
+                    for query in queries:
+                        scraper.search_products_google(query)
+                elapsed = time.perf_counter() - started
+    return elapsed, stub.generate_calls, stub.peak_in_flight, threads.peak
+
+
+def main():
+    texts = list(load_receipt_texts().values())
+    with tempfile.TemporaryDirectory() as tmp:
+        # Distinct image sizes keep every receipt out of the receipt cache
+        paths = [str(render_receipt_image(texts[i % len(texts)], Path(tmp) / f'r{i}.png', size=(600, 900 + i)))
+                 for i in range(RECEIPTS)]
+
+        print(f"{RECEIPTS} receipts, {MODEL_LATENCY * 1000:.0f} ms per model call")
+        print(f"{'mode':>8}{'seconds':>10}{'receipts/s':>12}{'items':>8}{'calls':>7}{'peak calls':>12}{'threads':>9}")
+        for mode, use_async in (('sync', False), ('async', True)):
+            elapsed, items, calls, peak, threads = run_receipts(paths, use_async)
+            print(f"{mode:>8}{elapsed:>10.2f}{RECEIPTS / elapsed:>12.1f}{items:>8}{calls:>7}{peak:>12}{threads:>9}")
+
+    queries = [QUERIES[i % len(QUERIES)] for i in range(SEARCHES)]
+    print()
+    print(f"{SEARCHES} searches (translated locally, then enhanced), {MODEL_LATENCY * 1000:.0f} ms per model call")
+    print(f"{'mode':>8}{'seconds':>10}{'searches/s':>12}{'calls':>7}{'peak calls':>12}{'threads':>9}")
+    for mode, use_async in (('sync', False), ('async', True)):
+        elapsed, calls, peak, threads = run_searches(queries, use_async)
+        print(f"{mode:>8}{elapsed:>10.2f}{SEARCHES / elapsed:>12.1f}{calls:>7}{peak:>12}{threads:>9}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""
+Throughput of OrchestratorAgent.run_batch as the worker count grows.
+
+Every receipt costs one stubbed vision call; the shared rate limit is set to
+RATE_LIMIT requests per second, so throughput should grow with workers until
+it flattens at that limit. One corrupt file checks that errors stay isolated.
+
+Usage:
+    python -m benchmarks.bench_batch_ingestion
+"""
+import contextlib
+import io
+import tempfile
+import time
+from pathlib import Path
+
+import config.model_registry as model_registry
+from agents.orchestrator import OrchestratorAgent
+from benchmarks.stubs import stub_genai, render_receipt_image, load_receipt_texts
+from config.model_registry import ModelRegistry
+from tools.mcp_server import SQLiteSpendingMemory
+from tools.receipt_cache import ReceiptCache
+
+RECEIPTS = 48
+MODEL_LATENCY = 0.2
+RATE_LIMIT = 20
+WORKER_COUNTS = (1, 2, 4, 8, 16)
+
+
+def run(paths, workers):
+    with stub_genai(latency=MODEL_LATENCY) as stub:
+        model_registry._model_registry = ModelRegistry(requests_per_second=RATE_LIMIT, max_concurrency=16)
+        with contextlib.redirect_stdout(io.StringIO()):
+            orchestrator = OrchestratorAgent()
+            orchestrator.receipt_agent.cache = ReceiptCache(':memory:')
+            orchestrator.finance_agent.memory = SQLiteSpendingMemory(':memory:')
+            started = time.perf_counter()
+            result = orchestrator.run_batch(paths, max_workers=workers)
+            elapsed = time.perf_counter() - started
+        stored = orchestrator.finance_agent.memory.count_transactions()
+    errors = [r for r in result['receipts'] if r['error']]
+    in_order = [r['file_path'] for r in result['receipts']] == paths
+    return elapsed, errors, in_order, stored, stub.generate_calls
+
+
+def main():
+    texts = list(load_receipt_texts().values())
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = [str(render_receipt_image(texts[i % len(texts)], Path(tmp) / f'r{i}.png'))
+                 for i in range(RECEIPTS - 1)]
+        corrupt = Path(tmp) / 'corrupt.png'
+        corrupt.write_bytes(b'not an image')
+        paths.insert(RECEIPTS // 2, str(corrupt))
+
+        print(f"{'workers':>8}{'seconds':>10}{'receipts/s':>12}{'errors':>8}{'in order':>10}{'stored':>8}{'calls':>7}")
+        for workers in WORKER_COUNTS:
+            elapsed, errors, in_order, stored, calls = run(paths, workers)
+            print(f"{workers:>8}{elapsed:>10.2f}{len(paths) / elapsed:>12.1f}{len(errors):>8}"
+                  f"{str(in_order):>10}{stored:>8}{calls:>7}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""
+Catalogue matching of a batch of receipts: one model call per unknown item versus one per batch.
+
+The receipt fixtures are parsed with the stub parser and repeated to
+RECEIPTS receipts, so the same names recur within and across receipts as
+they do over a month of shopping. The catalogue snapshot is empty, so only
+the curated entries match locally and the rest go to the stubbed model,
+which answers after MODEL_LATENCY seconds. The per-item baseline asks the
+model about every unmatched item on its own; CatalogueAgent.execute_many
+deduplicates names and sends the leftovers in one structured prompt. A
+second batch shows remembered answers needing no call at all.
+
+Usage:
+    python -m benchmarks.bench_batch_matching
+"""
+import contextlib
+import io
+import time
+
+import google.generativeai as genai
+
+import tools.scraper as scraper_module
+from agents.catalogue_matcher import CatalogueAgent, MATCH_TIERS
+from benchmarks.stubs import load_receipt_texts, stub_genai, stub_parse_items
+from tools.catalogue_store import CatalogueStore
+
+RECEIPTS = 24
+MODEL_LATENCY = 0.2
+
+
+def make_agent():
+    scraper_module.get_catalogue_store = lambda: CatalogueStore(':memory:')
+    with contextlib.redirect_stdout(io.StringIO()):
+        return CatalogueAgent(model=genai.GenerativeModel('gemini-1.5-flash'))
+
+
+def per_item(agent, receipts):
+    """One local lookup and, when that fails, one model call per item"""
+    matched = 0
+    for items in receipts:
+        for item in items:
+            if agent.scraper.match_products([item['raw_name']])[0]['product'] or \
+                    agent._match_with_llm([item['raw_name']]):
+                matched += 1
+    return matched
+
+
+def main():
+    texts = list(load_receipt_texts().values())
+    receipts = [stub_parse_items(texts[i % len(texts)]) for i in range(RECEIPTS)]
+    items = sum(map(len, receipts))
+    names = len({item['raw_name'] for r in receipts for item in r})
+    print(f"{RECEIPTS} receipts, {items} items, {names} distinct names, {MODEL_LATENCY}s per model call")
+    print(f"{'mode':>16}{'seconds':>10}{'model calls':>13}{'matched':>9}  per tier")
+
+    saved = scraper_module.get_catalogue_store
+    try:
+        with stub_genai(latency=MODEL_LATENCY) as stub:
+            agent = make_agent()
+            calls = stub.generate_calls
+            started = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                matched = per_item(agent, receipts)
+            print(f"{'per item':>16}{time.perf_counter() - started:>10.2f}{stub.generate_calls - calls:>13}{matched:>9}")
+
+            agent = make_agent()
+            for label in ('batch', 'batch again'):
+                calls = stub.generate_calls
+                started = time.perf_counter()
+                with contextlib.redirect_stdout(io.StringIO()):
+                    results = agent.execute_many(receipts)
+                elapsed = time.perf_counter() - started
+                matched = sum(1 for r in results for item in r if item['match_tier'] != 'unmatched')
+                tiers = ', '.join(f"{tier} {agent.last_stats[tier]}" for tier in MATCH_TIERS)
+                print(f"{label:>16}{elapsed:>10.2f}{stub.generate_calls - calls:>13}{matched:>9}  {tiers}")
+    finally:
+        scraper_module.get_catalogue_store = saved
+
+
+if __name__ == '__main__':
+    main()
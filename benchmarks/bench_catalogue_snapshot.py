@@ -0,0 +1,94 @@
+"""
+Price Checker search latency against ah.nl versus the local catalogue snapshot.
+
+The ah.nl stand-in answers after PAGE_LATENCY. The snapshot is ingested from
+the same saved search pages, then searched with the stand-in running and
+again after it is shut down (offline). A second table times FTS searches on
+synthetic snapshots of growing size. The search cache is off throughout.
+
+Usage:
+    python -m benchmarks.bench_catalogue_snapshot
+"""
+import contextlib
+import io
+import random
+import statistics
+import time
+
+from benchmarks.stubs import serve_ah_search, load_ah_search_pages, stub_genai
+from tools.catalogue_store import CatalogueStore
+from tools.http_client import HttpClient, ResponseStore, build_session
+from tools.scraper import CatalogueScraper
+
+PAGE_LATENCY = 0.2
+MAX_RESULTS = 10
+QUERIES = ('melk', 'halfvolle melk', 'kaas', 'jong belegen', 'brood', 'appels', 'bier', 'koffie')
+SNAPSHOT_SIZES = (1_000, 10_000, 30_000)
+WORDS = ('ah', 'biologisch', 'halfvolle', 'volle', 'melk', 'kaas', 'jong', 'belegen', 'brood', 'volkoren',
+         'appels', 'elstar', 'bier', 'pilsener', 'koffie', 'bonen', 'yoghurt', 'griekse', 'pasta', 'rijst',
+         'tomaten', 'cherry', 'kip', 'filet', 'chips', 'paprika', 'sap', 'sinaasappel', 'thee', 'groene')
+UNITS = ('1 l', '500 g', '1 kg', '6 x 330 ml', '250 g', '4 st')
+
+
+def timed(scraper, repeats=3):
+    timings = []
+    for _ in range(repeats):
+        for query in QUERIES:
+            started = time.perf_counter()
+            scraper.search_products_google(query, max_results=MAX_RESULTS)
+            timings.append(time.perf_counter() - started)
+    return timings
+
+
+def synthetic_products(count, seed=7):
+    rng = random.Random(seed)
+    return [{
+        'name': ' '.join(rng.sample(WORDS, 3)) + f' {i}',
+        'unit': rng.choice(UNITS),
+        'category': 'Other',
+        'price_without_membership': round(rng.uniform(0.5, 15), 2),
+        'url': f'https://www.ah.nl/producten/product/wi{i}',
+    } for i in range(count)]
+
+
+def main():
+    pages = load_ah_search_pages()
+    snapshot = CatalogueStore(':memory:')
+    with contextlib.redirect_stdout(io.StringIO()):
+        ingested = snapshot.ingest_pages(pages.values())
+
+    rows = []
+    with stub_genai(responder=lambda contents, **kw: '[]'):
+        with serve_ah_search(latency=PAGE_LATENCY) as stand_in:
+            http = HttpClient(session=build_session(retries=0), store=ResponseStore(':memory:'))
+            with contextlib.redirect_stdout(io.StringIO()):
+                network = CatalogueScraper(http_client=http, search_cache=False, catalogue=False)
+                local = CatalogueScraper(http_client=http, search_cache=False, catalogue=snapshot)
+                rows.append(('ah.nl', timed(network), stand_in.requests))
+                before = stand_in.requests
+                rows.append(('snapshot', timed(local), stand_in.requests - before))
+        with contextlib.redirect_stdout(io.StringIO()):
+            rows.append(('offline', timed(local), 0))
+
+    print(f"{len(QUERIES)} queries x 3, {ingested} products in the snapshot, "
+          f"{PAGE_LATENCY * 1000:.0f} ms per ah.nl page")
+    print(f"{'source':<10}{'median ms':>12}{'max ms':>10}{'fetches':>9}")
+    for label, values, fetches in rows:
+        print(f"{label:<10}{statistics.median(values) * 1000:>12.3f}{max(values) * 1000:>10.3f}{fetches:>9}")
+
+    print(f"\n{'products':>10}{'ingest s':>10}{'median ms':>11}{'max ms':>9}")
+    for size in SNAPSHOT_SIZES:
+        store = CatalogueStore(':memory:')
+        started = time.perf_counter()
+        store.add_products(synthetic_products(size))
+        ingest = time.perf_counter() - started
+        timings = []
+        for query in QUERIES * 10:
+            started = time.perf_counter()
+            store.search(query, MAX_RESULTS)
+            timings.append(time.perf_counter() - started)
+        print(f"{size:>10}{ingest:>10.2f}{statistics.median(timings) * 1000:>11.3f}{max(timings) * 1000:>9.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""
+Category classification of 100k product names: one compiled trie regex versus keyword scans.
+
+Names are built from the brands, product words and variants of
+bench_fuzzy_matcher; one in MADE_UP_SHARE uses a made-up product word
+instead, standing in for products no keyword covers. The scan baseline is
+the old heuristic, an any(word in name) loop per category, over the same
+taxonomy file. It checks every keyword as a substring, so it disagrees
+where the classifier's whole-word and longest-keyword rules apply ("ijs" in
+"rijst", "appel" in "aardappelen", "ui" inside made-up words); the differs
+column counts those names. classify_many also skips repeated names.
+
+Usage:
+    python -m benchmarks.bench_category_classifier
+"""
+import random
+import time
+
+from benchmarks.bench_fuzzy_matcher import BRANDS, PRODUCTS, VARIANTS, made_up_words
+from tools.category_classifier import CategoryClassifier, load_taxonomy
+
+NAMES = 100_000
+MADE_UP_SHARE = 0.2
+
+
+def keyword_scan(taxonomy):
+    keywords = [(entry['category'], [k.lower() for k in entry.get('contains', []) + entry.get('words', [])])
+                for entry in taxonomy['categories']]
+
+    def categorize(name):
+        name_lower = name.lower()
+        for category, words in keywords:
+            if any(word in name_lower for word in words):
+                return category
+        return taxonomy.get('fallback', 'Other')
+    return categorize
+
+
+def timed(fn):
+    started = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - started
+
+
+def main():
+    rng = random.Random(7)
+    made_up = made_up_words(2_000, rng)
+    names = [' '.join(filter(None, (rng.choice(BRANDS),
+                                    rng.choice(made_up if rng.random() < MADE_UP_SHARE else PRODUCTS),
+                                    rng.choice(VARIANTS))))
+             for _ in range(NAMES)]
+    taxonomy = load_taxonomy()
+
+    classifier, build = timed(lambda: CategoryClassifier(taxonomy))
+    categorize = keyword_scan(taxonomy)
+    scanned, scan_s = timed(lambda: [categorize(name) for name in names])
+    single, single_s = timed(lambda: [classifier.classify(name) for name in names])
+    batch, batch_s = timed(lambda: classifier.classify_many(names))
+    assert single == batch
+
+    keywords = sum(len(e.get('contains', [])) + len(e.get('words', [])) for e in taxonomy['categories'])
+    print(f"{NAMES} names ({len(set(names))} distinct), {len(taxonomy['categories'])} categories, "
+          f"{keywords} keywords, compiled in {build * 1000:.1f} ms")
+    print(f"{'method':<16}{'seconds':>9}{'us/name':>9}{'speedup':>9}{'classified':>12}{'differs':>9}")
+    for label, result, seconds in (('keyword scan', scanned, scan_s), ('classify', single, single_s),
+                                   ('classify_many', batch, batch_s)):
+        classified = sum(1 for category in result if category != classifier.fallback)
+        differs = sum(1 for a, b in zip(result, scanned) if a != b)
+        print(f"{label:<16}{seconds:>9.3f}{seconds * 1e6 / NAMES:>9.2f}{scan_s / seconds:>8.1f}x"
+              f"{classified:>12}{differs:>9}")
+
+
+if __name__ == '__main__':
+    main()
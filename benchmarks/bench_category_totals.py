@@ -0,0 +1,74 @@
+"""
+Category totals at 1M transactions: re-summing every call versus running totals.
+
+Both stores are loaded with TRANSACTIONS items, then asked for all-time
+category totals as main.py does several times per rerun. "re-sum" is the
+work without running totals: a Python pass over the list, or a GROUP BY over
+the SQLite table. "running" reads the maintained totals. The last column is
+the time to add one more ITEMS_PER_RECEIPT-item receipt, with and without the
+SQLite triggers that keep the totals and rollups in step.
+
+Usage:
+    python -m benchmarks.bench_category_totals
+"""
+import contextlib
+import io
+import random
+import tempfile
+from pathlib import Path
+
+from benchmarks.bench_spending_memory import ITEMS_PER_RECEIPT, history, timed
+from tools.mcp_server import SpendingMemoryMCP, SQLiteSpendingMemory, UNCATEGORIZED
+
+TRANSACTIONS = 1_000_000
+LOAD_BATCH = 10_000
+QUERIES = 20
+RECEIPTS = 200
+
+
+def resum_list(store):
+    totals = {}
+    for t in store.transactions:
+        if t is not None:
+            cat = t.get('category', UNCATEGORIZED)
+            totals[cat] = totals.get(cat, 0.0) + t['price']
+    return totals
+
+
+def resum_sqlite(store):
+    return dict(store._conn.execute("SELECT category, SUM(price) FROM transactions GROUP BY category"))
+
+
+def add_receipts(store, receipts):
+    with contextlib.redirect_stdout(io.StringIO()):
+        _, seconds = timed(lambda: [store.add_transactions(items) for items in receipts])
+    return seconds / len(receipts)
+
+
+def main():
+    items = [item for receipt in history(random.Random(5), TRANSACTIONS) for item in receipt]
+    receipts = list(history(random.Random(6), RECEIPTS * ITEMS_PER_RECEIPT))
+
+    print(f"{TRANSACTIONS} transactions")
+    print(f"{'store':<16}{'re-sum ms':>11}{'running ms':>12}{'speedup':>9}{'add receipt ms':>16}")
+    with tempfile.TemporaryDirectory() as tmp:
+        stores = [('list', SpendingMemoryMCP(), resum_list),
+                  ('sqlite', SQLiteSpendingMemory(Path(tmp) / 'totals.sqlite3'), resum_sqlite),
+                  ('sqlite, no totals', SQLiteSpendingMemory(Path(tmp) / 'plain.sqlite3'), resum_sqlite)]
+        stores[2][1]._conn.executescript(''.join(f"DROP TRIGGER transactions_{name}; " for name in (
+            'ai', 'ad', 'au', 'rollups_ai', 'rollups_ad', 'rollups_au')))
+        for label, store, resum in stores:
+            add_receipts(store, [items[i:i + LOAD_BATCH] for i in range(0, len(items), LOAD_BATCH)])
+            add_s = add_receipts(store, receipts)
+            resummed, resum_s = timed(lambda: resum(store), QUERIES)
+            if label.endswith('no totals'):
+                print(f"{label:<16}{resum_s * 1000:>11.2f}{'-':>12}{'-':>9}{add_s * 1000:>16.2f}")
+                continue
+            running, running_s = timed(store.get_category_totals, QUERIES)
+            assert all(abs(running[c] - resummed[c]) < 1e-3 for c in resummed) and running.keys() == resummed.keys()
+            print(f"{label:<16}{resum_s * 1000:>11.2f}{running_s * 1000:>12.3f}{resum_s / running_s:>8.0f}x"
+                  f"{add_s * 1000:>16.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,37 @@
+"""
+Fast-path hit rate and LLM calls for AH text receipts.
+
+Parses every text fixture with the AH line grammar enabled and disabled and
+reports the per-receipt hit rate, LLM calls and latency.
+
+Usage:
+    python -m benchmarks.bench_fast_path
+"""
+import contextlib
+import io
+import time
+
+from benchmarks.stubs import stub_genai, RECEIPTS_DIR
+from tools.parser import ReceiptParser
+
+MODEL_LATENCY = 0.5
+
+
+def main():
+    paths = sorted(RECEIPTS_DIR.glob('*.txt'))
+    print(f"{'receipt':<18}{'hit rate':>10}{'fast ms':>10}{'fast calls':>12}{'llm ms':>10}{'llm calls':>11}")
+    for path in paths:
+        row = {}
+        for fast_path in (True, False):
+            with stub_genai(latency=MODEL_LATENCY) as stub, contextlib.redirect_stdout(io.StringIO()):
+                parser = ReceiptParser(fast_path=fast_path)
+                started = time.perf_counter()
+                parser.parse(str(path))
+                row[fast_path] = ((time.perf_counter() - started) * 1000, stub.generate_calls, parser.last_parse_stats)
+        stats = row[True][2]
+        print(f"{path.stem:<18}{stats['hit_rate']:>10.0%}{row[True][0]:>10.1f}{row[True][1]:>12}"
+              f"{row[False][0]:>10.1f}{row[False][1]:>11}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""
+Receipt-line matching cost as the catalogue grows, trigram index versus full scan.
+
+Synthetic catalogues of up to 30k product names are built from AH-style
+brand, product and variant words, plus made-up Dutch-sounding words so the
+vocabulary grows with the catalogue as a real one does. Receipt lines are
+abbreviated, upper-cased versions of catalogue names with pack sizes
+appended, as printed on the till roll. The full scan scores every product for every line; the index scores
+only candidates sharing one of the line's rarest trigrams. The index should
+find the same best match, so the found column should agree.
+
+Usage:
+    python -m benchmarks.bench_fuzzy_matcher
+"""
+import random
+import time
+
+from tools.fuzzy_matcher import FuzzyMatcher, RECEIPT_ABBREVIATIONS, normalize_name, trigrams
+
+CATALOGUE_SIZES = (1_000, 10_000, 30_000)
+RECEIPT_LINES = 500
+SCAN_LINES = 50  # The full scan is slow; it is timed on a sample and scaled
+BRANDS = ('AH', 'AH Biologisch', 'AH Excellent', 'Campina', 'Zaanlander', 'Melkan', 'Lays', 'Heineken',
+          'Hertog Jan', 'Douwe Egberts', 'Calvé', 'Unox', 'Hak', 'Bonduelle', 'Verkade', 'Jumbo')
+PRODUCTS = ('halfvolle melk', 'volle melk', 'karnemelk', 'jong belegen kaas', 'oude kaas', 'volkorenbrood',
+            'tijgerbrood', 'sperziebonen', 'kipfilet', 'rundergehakt', 'pindakaas', 'appelsap',
+            'sinaasappelsap', 'griekse yoghurt', 'roomboter', 'chips paprika', 'pilsener', 'filterkoffie',
+            'tomaten', 'komkommer', 'scharreleieren', 'aardappelen', 'spaghetti', 'rijst', 'chocolade')
+VARIANTS = ('', 'light', 'naturel', 'extra', 'mini', 'familie', 'voordeel', 'grof', 'fijn', 'gesneden',
+            'plakken', 'stuk', 'bak', 'fles', 'pak', 'zak', 'blik', 'pot', 'bio', 'original')
+SIZES = ('1L', '500G', '2ST', '6X30CL', '1KG', '250G', '48+', '')
+CONSONANTS = ('b', 'd', 'f', 'g', 'h', 'k', 'l', 'm', 'n', 'p', 'r', 's', 't', 'v', 'w', 'z', 'ch', 'st', 'kr', 'sl')
+VOWELS = ('a', 'e', 'i', 'o', 'u', 'aa', 'ee', 'oe', 'ij', 'ui', 'ou')
+ABBREVIATE = {full: short for short, full in RECEIPT_ABBREVIATIONS.items()}
+
+
+def made_up_words(count, rng):
+    words = set()
+    while len(words) < count:
+        words.add(''.join(rng.choice(CONSONANTS) + rng.choice(VOWELS) for _ in range(rng.randint(2, 3)))
+                  + rng.choice(CONSONANTS))
+    return sorted(words)
+
+
+def catalogue(size, rng):
+    products = list(PRODUCTS) + made_up_words(size // 4, rng)
+    brands = list(BRANDS) + [word.capitalize() for word in made_up_words(size // 40, rng)]
+    names = set()
+    while len(names) < size:
+        names.add(' '.join(filter(None, (rng.choice(brands), rng.choice(products), rng.choice(VARIANTS)))))
+    return sorted(names)
+
+
+def receipt_line(name, rng):
+    words = [ABBREVIATE.get(word, word) for word in name.lower().split()]
+    return ' '.join(words + [rng.choice(SIZES)]).upper().strip()
+
+
+def full_scan(names, lines, threshold):
+    grams = [trigrams(normalize_name(name)) for name in names]
+    found = 0
+    for line in lines:
+        q = trigrams(normalize_name(line))
+        best = max((2 * len(q & p) / (len(q) + len(p)) for p in grams), default=0.0)
+        found += best >= threshold
+    return found
+
+
+def main():
+    rng = random.Random(11)
+    print(f"{RECEIPT_LINES} receipt lines per catalogue, full scan timed on {SCAN_LINES} lines")
+    print(f"{'products':>10}{'build s':>9}{'index ms/line':>15}{'scan ms/line':>14}{'speedup':>9}"
+          f"{'matched':>9}{'sample index/scan':>19}")
+    for size in CATALOGUE_SIZES:
+        names = catalogue(size, rng)
+        lines = [receipt_line(rng.choice(names), rng) for _ in range(RECEIPT_LINES)]
+
+        started = time.perf_counter()
+        matcher = FuzzyMatcher((name, name) for name in names)
+        build = time.perf_counter() - started
+
+        started = time.perf_counter()
+        results = matcher.match_many(lines)
+        index_ms = (time.perf_counter() - started) * 1000 / len(lines)
+        found = sum(1 for r in results if r['product'] is not None)
+
+        started = time.perf_counter()
+        scan_found = full_scan(names, lines[:SCAN_LINES], matcher.threshold)
+        scan_ms = (time.perf_counter() - started) * 1000 / SCAN_LINES
+        index_sample = sum(1 for r in results[:SCAN_LINES] if r['product'] is not None)
+
+        print(f"{size:>10}{build:>9.2f}{index_ms:>15.3f}{scan_ms:>14.3f}{scan_ms / index_ms:>8.1f}x"
+              f"{found:>9}{f'{index_sample}/{scan_found}':>19}")
+
+if __name__ == '__main__':
+    main()
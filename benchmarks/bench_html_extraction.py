@@ -0,0 +1,67 @@
+"""
+Search result page extraction throughput and peak memory per parser backend.
+
+Every saved ah.nl search page is run through ProductExtractor ROUNDS times
+with each installed BeautifulSoup tree builder. Peak memory is the tracemalloc
+high-water mark while extracting one page, measured in a separate pass so
+tracing does not slow the timed one.
+
+Usage:
+    python -m benchmarks.bench_html_extraction
+"""
+import contextlib
+import importlib.util
+import io
+import time
+import tracemalloc
+
+from benchmarks.stubs import load_ah_search_pages
+from tools.ah_extractor import ProductExtractor
+
+ROUNDS = 10
+MAX_RESULTS = 20
+BACKENDS = (('html.parser', None), ('lxml', 'lxml'))
+
+
+def peak_memory(extractor, pages):
+    peaks = []
+    for html in pages:
+        tracemalloc.start()
+        extractor.extract(html, MAX_RESULTS)
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return max(peaks)
+
+
+def main():
+    pages = list(load_ah_search_pages().values())
+    page_bytes = sum(len(html) for html in pages)
+    print(f"{len(pages)} pages ({page_bytes / 1024:.0f} KB), {ROUNDS} rounds, max_results={MAX_RESULTS}")
+    print(f"{'parser':<14}{'pages/s':>10}{'ms/page':>10}{'products':>10}{'peak MB':>10}")
+
+    baseline = None
+    for parser, module in BACKENDS:
+        if module and importlib.util.find_spec(module) is None:
+            print(f"{parser:<14}{'not installed':>40}")
+            continue
+        extractor = ProductExtractor(parser)
+        with contextlib.redirect_stdout(io.StringIO()):
+            products = [extractor.extract(html, MAX_RESULTS) for html in pages]
+            started = time.perf_counter()
+            for _ in range(ROUNDS):
+                for html in pages:
+                    extractor.extract(html, MAX_RESULTS)
+            elapsed = time.perf_counter() - started
+            peak = peak_memory(extractor, pages)
+
+        rate = len(pages) * ROUNDS / elapsed
+        count = sum(len(p) for p in products)
+        print(f"{parser:<14}{rate:>10.1f}{1000 / rate:>10.2f}{count:>10}{peak / 1024 / 1024:>10.2f}")
+        if baseline is None:
+            baseline = products
+        elif products != baseline:
+            print(f"  warning: {parser} products differ from {BACKENDS[0][0]}")
+
+
+if __name__ == '__main__':
+    main()
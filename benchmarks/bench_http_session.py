@@ -0,0 +1,80 @@
+"""
+Fetch throughput and bytes on the wire for the AH search page fetch.
+
+A local HTTP/1.1 stand-in serves the saved ah.nl search pages with ETag and
+Last-Modified validators and gzip/brotli encoding. Each mode fetches every
+page ROUNDS times, from WORKERS threads:
+
+- bare: requests.get per search with the old headers (a new connection each time)
+- pooled: the shared keep-alive HttpClient session without the response store
+- revalidating: the pooled session with a warm response store, so unchanged
+  pages come back as 304s
+
+Usage:
+    python -m benchmarks.bench_http_session
+"""
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import requests
+
+from benchmarks.stubs import serve_ah_search
+from tools.http_client import HttpClient, ResponseStore, build_session
+
+ROUNDS = 50
+WORKERS = 4
+LEGACY_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept-Encoding': 'gzip, deflate, br',
+    'Connection': 'keep-alive',
+}
+
+
+def run(stand_in, fetch):
+    urls = [f'{stand_in.base_url}/zoeken?query={query}' for query in stand_in.pages] * ROUNDS
+    requests_before, bytes_before = stand_in.requests, stand_in.bytes_sent
+    connections_before = stand_in.connections
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=WORKERS) as pool:
+        sizes = list(pool.map(fetch, urls))
+    elapsed = time.perf_counter() - started
+    return {
+        'requests': stand_in.requests - requests_before,
+        'seconds': elapsed,
+        'connections': stand_in.connections - connections_before,
+        'bytes': stand_in.bytes_sent - bytes_before,
+        'decoded': sum(sizes),
+    }
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp, serve_ah_search() as stand_in:
+        def bare(url):
+            response = requests.get(url, headers=LEGACY_HEADERS, timeout=15)
+            response.raise_for_status()
+            return len(response.content)
+
+        pooled_client = HttpClient(session=build_session(), store=False)
+        store_client = HttpClient(session=build_session(), store=ResponseStore(Path(tmp) / 'responses.sqlite3'))
+        # Warm the store once so the timed run revalidates
+        for query in stand_in.pages:
+            store_client.get(f'{stand_in.base_url}/zoeken?query={query}')
+
+        modes = (
+            ('bare', bare),
+            ('pooled', lambda url: len(pooled_client.get(url).content)),
+            ('revalidating', lambda url: len(store_client.get(url).content)),
+        )
+
+        print(f"{'mode':<14}{'requests':>10}{'req/s':>10}{'conns':>8}{'wire KB':>10}{'decoded KB':>12}")
+        for label, fetch in modes:
+            stats = run(stand_in, fetch)
+            print(f"{label:<14}{stats['requests']:>10}{stats['requests'] / stats['seconds']:>10.0f}"
+                  f"{stats['connections']:>8}{stats['bytes'] / 1024:>10.0f}{stats['decoded'] / 1024:>12.0f}")
+        print(f"304 responses: {stand_in.not_modified}, store: {store_client.store.stats()}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+"""
+Bytes sent, end-to-end latency and OCR agreement with and without image preprocessing.
+
+Each receipt fixture is rendered as a 12 MP phone photo: receipt paper on a
+noisy table, stored sideways with an EXIF orientation tag. The stub model
+charges upload time per byte and models OCR legibility from the glyph height
+that reaches it; below MIN_LEGIBLE_PX characters start dropping out.
+
+Usage:
+    python -m benchmarks.bench_image_preprocessing
+"""
+import contextlib
+import difflib
+import io
+import os
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from PIL import Image, ImageDraw, ImageFont
+from PIL.Image import Exif
+
+from benchmarks.stubs import stub_genai, load_receipt_texts
+from tools.parser import ReceiptParser
+
+PHOTO_SIZE = (4000, 3000)
+FONT_PX = 44
+MIN_LEGIBLE_PX = 12
+UPLOAD_BYTES_PER_SECOND = 1_000_000
+MODEL_LATENCY = 0.3
+
+
+def render_photo(text, path):
+    """Receipt on a noisy background, saved rotated with EXIF orientation 6 like a phone camera"""
+    background = Image.effect_noise(PHOTO_SIZE, 60).point(lambda v: v // 3 + 40)
+    photo = Image.merge('RGB', (background, background.point(lambda v: v * 0.9), background.point(lambda v: v * 0.7)))
+    font = ImageFont.load_default(size=FONT_PX)
+    lines = text.splitlines()
+    paper = Image.new('RGB', (1500, int(FONT_PX * 1.3 * len(lines)) + 200), (245, 243, 238))
+    draw = ImageDraw.Draw(paper)
+    for i, line in enumerate(lines):
+        draw.text((60, 100 + i * int(FONT_PX * 1.3)), line, fill='black', font=font)
+    photo.paste(paper, ((PHOTO_SIZE[0] - paper.width) // 2, (PHOTO_SIZE[1] - paper.height) // 2))
+    photo = photo.rotate(90, expand=True)  # stored sideways, EXIF says rotate back
+    exif = Exif()
+    exif[0x0112] = 6
+    photo.save(path, format='JPEG', quality=95, exif=exif)
+    return path
+
+
+def degrade(text, glyph_px):
+    """Drop characters when the glyphs are too small to read"""
+    if glyph_px >= MIN_LEGIBLE_PX:
+        return text
+    keep_every = max(1, int(MIN_LEGIBLE_PX / max(glyph_px, 1)) + 1)
+    return ''.join(c for i, c in enumerate(text) if c == '\n' or i % keep_every)
+
+
+def run(preprocess, photos, texts):
+    state = {}
+
+    def responder(contents, **kwargs):
+        part = contents[1]
+        sent = len(part['data']) if isinstance(part, dict) else os.path.getsize(part.filename)
+        state['sent'] = sent
+        time.sleep(sent / UPLOAD_BYTES_PER_SECOND)
+        stats = state['parser'].last_image_stats
+        scale = stats['scale'] if stats else 1.0
+        return degrade(texts[state['name']], FONT_PX * scale)
+
+    results = []
+    with stub_genai(latency=MODEL_LATENCY, responder=responder):
+        parser = ReceiptParser(fast_path=True, preprocessor=None if preprocess else False)
+        state['parser'] = parser
+        for name, path in photos.items():
+            state['name'] = name
+            with contextlib.redirect_stdout(io.StringIO()):
+                started = time.perf_counter()
+                parser.parse(str(path))
+                elapsed = time.perf_counter() - started
+            agreement = difflib.SequenceMatcher(None, parser.last_receipt_text or '', texts[name]).ratio()
+            results.append((state['sent'], elapsed, agreement))
+    return results
+
+
+def main():
+    texts = load_receipt_texts()
+    with tempfile.TemporaryDirectory() as tmp:
+        photos = {name: render_photo(text, Path(tmp) / f'{name}.jpg') for name, text in texts.items()}
+        runs = {'original': run(False, photos, texts), 'preprocessed': run(True, photos, texts)}
+
+    print(f"{'mode':<14}{'median KB sent':>16}{'median ms':>12}{'min OCR agreement':>20}")
+    for mode, results in runs.items():
+        sent = statistics.median(r[0] for r in results) / 1024
+        latency = statistics.median(r[1] for r in results) * 1000
+        agreement = min(r[2] for r in results)
+        print(f"{mode:<14}{sent:>16.0f}{latency:>12.0f}{agreement:>20.1%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+"""
+Count model discovery calls across 100 sequential image receipts.
+
+Compares the shared model registry against a cold registry that rediscovers on
+every receipt (what the per-call ``genai.list_models()`` lookups used to cost).
+One of the preferred models is dead, to show the fallback loop stops probing it.
+
+Usage:
+    python -m benchmarks.bench_model_discovery
+"""
+import contextlib
+import io
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.stubs import stub_genai, render_receipt_image, load_receipt_texts
+from config.model_registry import get_model_registry
+from tools.parser import ReceiptParser
+
+RECEIPTS = 100
+DISCOVERY_LATENCY = 0.005
+
+
+def run(cold):
+    texts = list(load_receipt_texts().values())
+    with tempfile.TemporaryDirectory() as tmp, stub_genai(
+            ['gemini-1.5-flash', 'gemini-1.5-pro'],
+            latency=DISCOVERY_LATENCY,
+            failing_models={'gemini-1.5-flash'}) as stub:
+        paths = [render_receipt_image(text, Path(tmp) / f'receipt_{i}.png') for i, text in enumerate(texts)]
+        started = time.perf_counter()
+        items = 0
+        with contextlib.redirect_stdout(io.StringIO()):
+            for i in range(RECEIPTS):
+                if cold:
+                    get_model_registry().invalidate()
+                items += len(ReceiptParser().parse(str(paths[i % len(paths)])))
+        elapsed = time.perf_counter() - started
+        return {
+            'discovery_calls': stub.discovery_calls,
+            'generate_calls': stub.generate_calls,
+            'models_built': stub.models_built,
+            'items': items,
+            'seconds': elapsed,
+        }
+
+
+def main():
+    results = {'per-receipt discovery': run(cold=True), 'shared registry': run(cold=False)}
+    print()
+    print(f"{'mode':<24}{'discovery':>10}{'generate':>10}{'handles':>10}{'items':>8}{'seconds':>10}")
+    for mode, r in results.items():
+        print(f"{mode:<24}{r['discovery_calls']:>10}{r['generate_calls']:>10}"
+              f"{r['models_built']:>10}{r['items']:>8}{r['seconds']:>10.3f}")
+
+
+if __name__ == '__main__':
+    main()
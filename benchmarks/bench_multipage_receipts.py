@@ -0,0 +1,108 @@
+"""
+Latency and item counts for multi-page receipts.
+
+A long receipt is split into TIFF pages of LINES_PER_PAGE lines, each page
+repeating the last OVERLAP_LINES lines of the previous one (as when a long
+receipt is photographed in parts). The stub answers after MODEL_LATENCY plus
+CHUNK_LATENCY per 64 characters of output, so long prompts are slow to answer.
+
+"sequential" reads pages one by one and parses the text in a single prompt;
+"parallel" OCRs pages concurrently and parses token-bounded chunks concurrently.
+The items column should match the receipt's item lines (no page-boundary duplicates).
+
+Usage:
+    python -m benchmarks.bench_multipage_receipts
+"""
+import contextlib
+import hashlib
+import io
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from PIL import Image, ImageDraw
+
+from benchmarks.stubs import stub_genai, default_responder, load_receipt_texts, stub_parse_items
+from tools.parser import ReceiptParser, CHARS_PER_TOKEN
+
+LINES_PER_PAGE = 30
+OVERLAP_LINES = 2
+PAGE_COUNTS = (1, 2, 4, 8)
+MODEL_LATENCY = 0.3
+CHUNK_LATENCY = 0.02
+CHUNK_TOKENS = 400
+
+
+def item_lines(count):
+    """Distinct AH item lines taken from the fixtures"""
+    base = []
+    for text in load_receipt_texts().values():
+        base.extend(line for line in text.splitlines() if stub_parse_items(line))
+    return [f"{base[i % len(base)].rsplit(' ', 1)[0]} {1 + i // 100},{i % 100:02d}" for i in range(count)]
+
+
+def render_pages(lines, path):
+    """Write the pages as a multi-frame TIFF; returns {pixel hash: page text} for the stub OCR"""
+    pages, texts = [], {}
+    step = LINES_PER_PAGE - OVERLAP_LINES
+    for start in range(0, max(1, len(lines) - OVERLAP_LINES), step):
+        page_lines = lines[start:start + LINES_PER_PAGE]
+        image = Image.new('L', (500, 40 + 18 * len(page_lines)), 255)
+        draw = ImageDraw.Draw(image)
+        for i, line in enumerate(page_lines):
+            draw.text((20, 20 + 18 * i), line, fill=0)
+        pages.append(image)
+        texts[hashlib.sha1(image.tobytes()).hexdigest()] = '\n'.join(page_lines)
+    pages[0].save(path, save_all=True, append_images=pages[1:], compression='tiff_lzw')
+    return texts, len(pages)
+
+
+class PageResponder:
+    """Stub OCR that recognises the rendered pages; tracks the largest prompt"""
+
+    def __init__(self, texts):
+        self.texts = texts
+        self.max_prompt_tokens = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, contents, **kwargs):
+        if isinstance(contents, (list, tuple)):
+            for part in contents:
+                if isinstance(part, Image.Image):
+                    return self.texts.get(hashlib.sha1(part.tobytes()).hexdigest(), '')
+        with self._lock:
+            self.max_prompt_tokens = max(self.max_prompt_tokens, len(contents) // CHARS_PER_TOKEN)
+        return default_responder(contents, **kwargs)
+
+
+def run(path, texts, parallel):
+    responder = PageResponder(texts)
+    with stub_genai(latency=MODEL_LATENCY, chunk_latency=CHUNK_LATENCY, responder=responder) as stub, \
+            contextlib.redirect_stdout(io.StringIO()):
+        parser = ReceiptParser(fast_path=False, preprocessor=False,
+                               parse_chunk_tokens=CHUNK_TOKENS if parallel else 10 ** 6,
+                               page_workers=8 if parallel else 1)
+        parser.registry.available_models()  # Keep model discovery out of the timings
+        started = time.perf_counter()
+        items = parser.parse(str(path))
+        elapsed = time.perf_counter() - started
+    return elapsed, items, stub.generate_calls, responder.max_prompt_tokens
+
+
+def main():
+    print(f"{LINES_PER_PAGE} lines per page, {OVERLAP_LINES} repeated on the next page")
+    print(f"{'pages':>6}{'mode':>12}{'seconds':>10}{'items':>7}{'expected':>10}{'calls':>7}{'max prompt tok':>16}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for page_count in PAGE_COUNTS:
+            lines = item_lines(page_count * (LINES_PER_PAGE - OVERLAP_LINES) + OVERLAP_LINES)
+            path = Path(tmp) / f'receipt_{page_count}.tiff'
+            texts, rendered = render_pages(lines, path)
+            for mode, parallel in (('sequential', False), ('parallel', True)):
+                elapsed, items, calls, max_tokens = run(path, texts, parallel)
+                print(f"{rendered:>6}{mode:>12}{elapsed:>10.2f}{len(items):>7}{len(lines):>10}"
+                      f"{calls:>7}{max_tokens:>16}")
+
+
+if __name__ == '__main__':
+    main()
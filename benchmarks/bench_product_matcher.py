@@ -0,0 +1,72 @@
+"""
+Embedding product matching: one matrix multiply per receipt versus one line at a time.
+
+Uses the synthetic catalogues and abbreviated receipt lines of
+bench_fuzzy_matcher. Each receipt of RECEIPT_LINES lines is matched once
+with ProductMatcher.match_many (a single (lines x products) matmul) and once
+by calling match() per line, which is what a per-item loop costs. The
+trigram FuzzyMatcher is timed on the same lines for reference, and the
+found columns show how many lines each accepts at its default threshold.
+Finally the vectors are saved and loaded back memory-mapped.
+
+Usage:
+    python -m benchmarks.bench_product_matcher
+"""
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.bench_fuzzy_matcher import catalogue, receipt_line
+from tools.fuzzy_matcher import FuzzyMatcher
+from tools.product_matcher import ProductMatcher
+
+CATALOGUE_SIZES = (1_000, 10_000, 30_000)
+RECEIPT_LINES = 40
+RECEIPTS = 5
+
+
+def timed(fn):
+    started = time.perf_counter()
+    result = fn()
+    return result, (time.perf_counter() - started) * 1000
+
+
+def main():
+    rng = random.Random(11)
+    print(f"{RECEIPTS} receipts of {RECEIPT_LINES} lines per catalogue")
+    print(f"{'products':>10}{'build s':>9}{'batch ms/rcpt':>15}{'loop ms/rcpt':>14}{'speedup':>9}"
+          f"{'trigram ms/rcpt':>17}{'found emb/tri':>15}{'save ms':>9}{'mmap load ms':>14}")
+    for size in CATALOGUE_SIZES:
+        names = catalogue(size, rng)
+        receipts = [[receipt_line(rng.choice(names), rng) for _ in range(RECEIPT_LINES)] for _ in range(RECEIPTS)]
+
+        matcher, build = timed(lambda: ProductMatcher((name, name) for name in names))
+        fuzzy = FuzzyMatcher((name, name) for name in names)
+        matcher.match_many(receipts[0])  # Warm the embedder's n-gram memo
+
+        batch_ms = loop_ms = trigram_ms = 0.0
+        found = trigram_found = 0
+        for lines in receipts:
+            results, ms = timed(lambda: matcher.match_many(lines))
+            batch_ms += ms
+            found += sum(1 for r in results if r['product'] is not None)
+            loop_ms += timed(lambda: [matcher.match(line) for line in lines])[1]
+            results, ms = timed(lambda: fuzzy.match_many(lines))
+            trigram_ms += ms
+            trigram_found += sum(1 for r in results if r['product'] is not None)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / 'vectors'
+            save_ms = timed(lambda: matcher.save(path))[1]
+            loaded, load_ms = timed(lambda: ProductMatcher.load(path))
+            loaded.match_many(receipts[0])
+            del loaded  # Release the memory map before the directory goes
+
+        print(f"{size:>10}{build / 1000:>9.2f}{batch_ms / RECEIPTS:>15.2f}{loop_ms / RECEIPTS:>14.2f}"
+              f"{loop_ms / batch_ms:>8.1f}x{trigram_ms / RECEIPTS:>17.2f}"
+              f"{f'{found}/{trigram_found}':>15}{save_ms:>9.1f}{load_ms:>14.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+"""
+Compare first upload (cache miss) and re-upload (cache hit) latency.
+
+The stub model sleeps to stand in for the Gemini vision and parse round-trips.
+
+Usage:
+    python -m benchmarks.bench_receipt_cache
+"""
+import contextlib
+import io
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from agents.receipt_processor import ReceiptProcessingAgent
+from benchmarks.stubs import stub_genai, render_receipt_image, load_receipt_texts
+from tools.receipt_cache import ReceiptCache
+
+MODEL_LATENCY = 0.5
+UPLOADS_PER_RECEIPT = 5
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp, stub_genai(latency=MODEL_LATENCY) as stub:
+        cache = ReceiptCache(Path(tmp) / 'cache.sqlite3')
+        agent = ReceiptProcessingAgent(cache=cache)
+        paths = [render_receipt_image(text, Path(tmp) / f'{name}.png')
+                 for name, text in load_receipt_texts().items()]
+
+        timings = {True: [], False: []}
+        with contextlib.redirect_stdout(io.StringIO()):
+            for _ in range(UPLOADS_PER_RECEIPT):
+                for path in paths:
+                    started = time.perf_counter()
+                    result = agent.execute(str(path))
+                    timings[result['cache_hit']].append(time.perf_counter() - started)
+
+    print(f"{'':<8}{'count':>8}{'median ms':>12}{'max ms':>10}")
+    for label, hit in (('miss', False), ('hit', True)):
+        values = timings[hit]
+        print(f"{label:<8}{len(values):>8}{statistics.median(values) * 1000:>12.2f}{max(values) * 1000:>10.2f}")
+    print(f"model calls: {stub.generate_calls} for {len(paths) * UPLOADS_PER_RECEIPT} uploads")
+    print(f"cache: {cache.stats()}")
+
+
+if __name__ == '__main__':
+    main()
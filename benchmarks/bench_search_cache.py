@@ -0,0 +1,82 @@
+"""
+Price Checker search latency with and without the search cache.
+
+Searches run against the local ah.nl stand-in; the stub model answers the
+translation and enhancement prompts after MODEL_LATENCY. Each query is searched
+cold (miss), again on the same scraper (memory tier), on a new cache over the
+same file (disk tier, as after a restart) and after expiry (stale entry served
+while a background refresh runs). The Dutch queries need no translation.
+
+Usage:
+    python -m benchmarks.bench_search_cache
+"""
+import contextlib
+import io
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.stubs import serve_ah_search, stub_genai
+from tools.http_client import HttpClient, ResponseStore, build_session
+from tools.scraper import CatalogueScraper
+from tools.search_cache import SearchCache
+
+MODEL_LATENCY = 0.3
+MAX_RESULTS = 20
+REPEATS = 20
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def timed(scraper, queries, repeats=1):
+    timings = []
+    for _ in range(repeats):
+        for query in queries:
+            started = time.perf_counter()
+            scraper.search_products_google(query, max_results=MAX_RESULTS)
+            timings.append(time.perf_counter() - started)
+    return timings
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp, serve_ah_search() as stand_in, \
+            stub_genai(latency=MODEL_LATENCY, responder=lambda contents, **kw: '[]') as stub:
+        queries = list(stand_in.pages)
+        path = Path(tmp) / 'search.sqlite3'
+        clock = FakeClock()
+        http = HttpClient(session=build_session(), store=ResponseStore(':memory:'))
+
+        def scraper_with(cache):
+            return CatalogueScraper(http_client=http, search_cache=cache, catalogue=False)
+
+        rows = []
+        with contextlib.redirect_stdout(io.StringIO()):
+            rows.append(('uncached', timed(scraper_with(False), queries)))
+            cached = scraper_with(SearchCache(path, clock=clock))
+            rows.append(('miss', timed(cached, queries)))
+            rows.append(('memory hit', timed(cached, queries, REPEATS)))
+            rows.append(('disk hit', timed(scraper_with(SearchCache(path, clock=clock)), queries)))
+            clock.now += cached.search_cache.scrape_ttl + 1
+            calls_before = stub.generate_calls
+            fetches_before = stand_in.requests
+            rows.append(('stale hit', timed(cached, queries)))
+            time.sleep(MODEL_LATENCY * 4)  # Let the background refreshes finish
+
+    print(f"{len(queries)} queries, max_results={MAX_RESULTS}, {MODEL_LATENCY * 1000:.0f} ms per model call")
+    print(f"{'':<12}{'count':>8}{'median ms':>12}{'max ms':>10}")
+    for label, values in rows:
+        print(f"{label:<12}{len(values):>8}{statistics.median(values) * 1000:>12.3f}{max(values) * 1000:>10.3f}")
+    print(f"background refreshes: {stand_in.requests - fetches_before} page fetches, "
+          f"{stub.generate_calls - calls_before} model calls")
+    print(f"cache: {cached.search_cache.stats()}")
+
+
+if __name__ == '__main__':
+    main()
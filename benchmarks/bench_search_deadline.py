@@ -0,0 +1,72 @@
+"""
+Price Checker search latency with and without a deadline, when ah.nl is sometimes slow.
+
+The local ah.nl stand-in answers most searches in 100-300 ms, but one in
+SLOW_SHARE takes 1.5-4 s, as the real site does under load. Gemini (stubbed)
+answers after MODEL_LATENCY. Sequential mode scrapes, then asks Gemini for
+the missing places; deadline mode starts both together and returns what is
+ready after DEADLINE_MS. Caches are off, every search is a new query, and
+translation is skipped, so only the scrape and top-up are timed. The
+products column is the mean number of products returned.
+
+Usage:
+    python -m benchmarks.bench_search_deadline
+"""
+import contextlib
+import io
+import random
+import statistics
+import time
+
+from benchmarks.stubs import load_ah_search_pages, serve_ah_search, stub_genai
+from tools.http_client import HttpClient, ResponseStore, build_session
+from tools.scraper import CatalogueScraper
+
+SEARCHES = 40
+MAX_RESULTS = 20
+MODEL_LATENCY = 0.6
+SLOW_SHARE = 0.2
+DEADLINE_MS = 1000
+
+
+def page_latencies(rng):
+    return [rng.uniform(1.5, 4.0) if rng.random() < SLOW_SHARE else rng.uniform(0.1, 0.3)
+            for _ in range(SEARCHES)]
+
+
+def run(stand_in, queries, latencies, deadline_ms):
+    client = HttpClient(session=build_session(), store=ResponseStore(':memory:'))
+    with contextlib.redirect_stdout(io.StringIO()):
+        scraper = CatalogueScraper(http_client=client, search_cache=False, translation_cache=False,
+                                   catalogue=False)
+    times, counts = [], []
+    for query, latency in zip(queries, latencies):
+        stand_in.latency = latency
+        with contextlib.redirect_stdout(io.StringIO()):
+            started = time.perf_counter()
+            deadline = time.monotonic() + deadline_ms / 1000 if deadline_ms else None
+            products = scraper._search_translated(query, MAX_RESULTS, deadline)
+            times.append(time.perf_counter() - started)
+        counts.append(len(products))
+    return times, counts
+
+
+def main():
+    saved = list(load_ah_search_pages().values())
+    latencies = page_latencies(random.Random(5))
+    print(f"{SEARCHES} searches, {SLOW_SHARE:.0%} with a slow ah.nl, Gemini {MODEL_LATENCY * 1000:.0f} ms, "
+          f"{MAX_RESULTS} results wanted")
+    print(f"{'mode':<18}{'p50 ms':>9}{'p95 ms':>9}{'max ms':>9}{'products':>10}")
+    with stub_genai(latency=MODEL_LATENCY):
+        for label, deadline_ms in (('sequential', None), (f'deadline {DEADLINE_MS} ms', DEADLINE_MS)):
+            queries = [f'{label[:3]}{i}' for i in range(SEARCHES)]
+            pages = {query: saved[i % len(saved)] for i, query in enumerate(queries)}
+            with serve_ah_search(pages) as stand_in:
+                times, counts = run(stand_in, queries, latencies, deadline_ms)
+            ms = sorted(t * 1000 for t in times)
+            print(f"{label:<18}{statistics.median(ms):>9.0f}{ms[int(0.95 * (len(ms) - 1))]:>9.0f}{ms[-1]:>9.0f}"
+                  f"{statistics.mean(counts):>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
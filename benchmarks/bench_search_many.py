@@ -0,0 +1,70 @@
+"""
+A 30-item shopping list searched one by one versus with search_many.
+
+The local ah.nl stand-in answers every search after PAGE_LATENCY, standing in
+for the network round-trip. Each Dutch query is served one of the saved search
+pages. Caches are off so every distinct search is fetched. The list repeats a
+few items, and some English items translate to the same Dutch search, so
+coalescing saves fetches too.
+
+Usage:
+    python -m benchmarks.bench_search_many
+"""
+import contextlib
+import io
+import time
+
+from benchmarks.stubs import serve_ah_search, load_ah_search_pages
+from tools import grocery_lexicon
+from tools.http_client import HttpClient, ResponseStore, build_session
+from tools.scraper import CatalogueScraper
+
+PAGE_LATENCY = 0.15
+MAX_RESULTS = 10
+SHOPPING_LIST = (
+    'milk', 'semi skimmed milk', 'bread', 'brown bread', 'bananas', 'apples', 'eggs', 'cheese',
+    'butter', 'yogurt', 'chicken breast', 'minced meat', 'salmon', 'tomatoes', 'cucumber',
+    'potatoes', 'onions', 'rice', 'pasta', 'peanut butter', 'coffee', 'tea', 'orange juice',
+    'beer', 'toilet paper', 'dish soap', 'milk', 'bananas', 'whipped cream', 'whipping cream',
+)
+WORKER_COUNTS = (4, 8, 16)
+
+
+def run(stand_in, search, max_per_host=8):
+    client = HttpClient(session=build_session(), store=ResponseStore(':memory:'), max_per_host=max_per_host)
+    requests_before = stand_in.requests
+    with contextlib.redirect_stdout(io.StringIO()):
+        scraper = CatalogueScraper(http_client=client, search_cache=False, catalogue=False)
+        started = time.perf_counter()
+        results = search(scraper)
+        elapsed = time.perf_counter() - started
+    found = sum(1 for products in results.values() if products)
+    return elapsed, stand_in.requests - requests_before, found
+
+
+def main():
+    saved = list(load_ah_search_pages().values())
+    dutch = sorted({grocery_lexicon.translate_to_dutch(item) for item in SHOPPING_LIST})
+    pages = {query: saved[i % len(saved)] for i, query in enumerate(dutch)}
+
+    with serve_ah_search(pages, latency=PAGE_LATENCY) as stand_in:
+        print(f"{len(SHOPPING_LIST)} items ({len(set(SHOPPING_LIST))} distinct, {len(dutch)} distinct Dutch searches), "
+              f"{PAGE_LATENCY * 1000:.0f} ms per page")
+        print(f"{'mode':<22}{'seconds':>9}{'fetches':>9}{'queries found':>15}")
+
+        def serial(scraper):
+            return {item: scraper.search_products_google(item, MAX_RESULTS) for item in SHOPPING_LIST}
+
+        elapsed, fetches, found = run(stand_in, serial)
+        print(f"{'serial':<22}{elapsed:>9.2f}{fetches:>9}{found:>15}")
+        for workers in WORKER_COUNTS:
+            elapsed, fetches, found = run(
+                stand_in, lambda scraper: scraper.search_many(SHOPPING_LIST, MAX_RESULTS, max_workers=workers))
+            print(f"{f'search_many x{workers}':<22}{elapsed:>9.2f}{fetches:>9}{found:>15}")
+        elapsed, fetches, found = run(
+            stand_in, lambda scraper: scraper.search_many(SHOPPING_LIST, MAX_RESULTS, max_workers=16), max_per_host=4)
+        print(f"{'x16, 4 per host':<22}{elapsed:>9.2f}{fetches:>9}{found:>15}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""
+A/B benchmark: two-step (OCR + parse) vs single-call structured extraction.
+
+Runs every receipt fixture as an image through ReceiptParser in both modes
+against the stub model and reports latency, model calls per receipt and how
+closely the extracted items agree between the modes.
+
+Usage:
+    python -m benchmarks.bench_single_call_extraction
+"""
+import contextlib
+import io
+import statistics
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+
+from benchmarks.stubs import stub_genai, render_receipt_image, load_receipt_texts
+from tools.parser import ReceiptParser, TWO_STEP_MODE, SINGLE_CALL_MODE
+
+MODEL_LATENCY = 0.4
+
+
+def item_keys(items):
+    return Counter((item['raw_name'], round(float(item['price']), 2), item['quantity']) for item in items)
+
+
+def agreement(a, b):
+    """Share of items both modes extracted identically (multiset Jaccard)"""
+    ka, kb = item_keys(a), item_keys(b)
+    union = sum((ka | kb).values())
+    return sum((ka & kb).values()) / union if union else 1.0
+
+
+def run_mode(mode, paths):
+    with stub_genai(latency=MODEL_LATENCY) as stub:
+        parser = ReceiptParser(mode=mode)
+        latencies, results = [], {}
+        with contextlib.redirect_stdout(io.StringIO()):
+            for name, path in paths.items():
+                started = time.perf_counter()
+                results[name] = parser.parse(str(path))
+                latencies.append(time.perf_counter() - started)
+        return results, latencies, stub.generate_calls
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = {name: render_receipt_image(text, Path(tmp) / f'{name}.png')
+                 for name, text in load_receipt_texts().items()}
+        runs = {mode: run_mode(mode, paths) for mode in (TWO_STEP_MODE, SINGLE_CALL_MODE)}
+
+    print(f"{'mode':<14}{'median ms':>12}{'calls/receipt':>15}{'items':>8}")
+    for mode, (results, latencies, calls) in runs.items():
+        items = sum(len(r) for r in results.values())
+        print(f"{mode:<14}{statistics.median(latencies) * 1000:>12.1f}{calls / len(paths):>15.1f}{items:>8}")
+
+    two_step, single = runs[TWO_STEP_MODE][0], runs[SINGLE_CALL_MODE][0]
+    print()
+    print(f"{'receipt':<20}{'agreement':>10}")
+    for name in paths:
+        print(f"{name:<20}{agreement(two_step[name], single[name]):>10.0%}")
+
+
+if __name__ == '__main__':
+    main()
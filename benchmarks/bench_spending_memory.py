@@ -0,0 +1,76 @@
+"""
+Spending totals over years of household history: in-memory list versus SQLite.
+
+TRANSACTIONS items spread over YEARS years are stored one receipt at a time,
+as FinanceAgent does. Then both stores are asked for all-time category totals
+and month-to-date totals, and the SQLite file is reopened as after a restart
+(the list store starts empty again).
+
+Usage:
+    python -m benchmarks.bench_spending_memory
+"""
+import contextlib
+import io
+import random
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+from tools.category_classifier import get_category_classifier
+from tools.mcp_server import SpendingMemoryMCP, SQLiteSpendingMemory
+
+TRANSACTIONS = 200_000
+YEARS = 10
+ITEMS_PER_RECEIPT = 25
+QUERIES = 20
+
+
+def history(rng, transactions=TRANSACTIONS):
+    """Receipts of ITEMS_PER_RECEIPT items, oldest first, evenly spread over YEARS years"""
+    categories = get_category_classifier().categories + ['Uncategorized']
+    receipts = transactions // ITEMS_PER_RECEIPT
+    first = date.today() - timedelta(days=365 * YEARS)
+    for n in range(receipts):
+        day = (first + timedelta(days=365 * YEARS * n // receipts)).isoformat()
+        yield [{"raw_name": f"ITEM {rng.randrange(5000)}", "category": rng.choice(categories),
+                "price": round(rng.uniform(0.5, 15), 2), "quantity": 1, "date": day}
+               for _ in range(ITEMS_PER_RECEIPT)]
+
+
+def timed(fn, repeat=1):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return result, (time.perf_counter() - started) / repeat
+
+
+def measure(store, receipts, month_start):
+    with contextlib.redirect_stdout(io.StringIO()):
+        _, add_s = timed(lambda: [store.add_transactions(items) for items in receipts])
+    totals, all_s = timed(store.get_category_totals, QUERIES)
+    month, month_s = timed(lambda: store.get_category_totals(start=month_start), QUERIES)
+    return add_s, all_s, month_s, totals, month
+
+
+def main():
+    receipts = list(history(random.Random(3)))
+    month_start = date.today().replace(day=1).isoformat()
+
+    print(f"{TRANSACTIONS} transactions over {YEARS} years, {len(receipts)} receipts")
+    print(f"{'store':<10}{'store s':>9}{'all-time ms':>13}{'month ms':>10}{'reopen ms':>11}")
+    list_add, list_all, list_month, list_totals, list_mtd = measure(SpendingMemoryMCP(), receipts, month_start)
+    print(f"{'list':<10}{list_add:>9.2f}{list_all * 1000:>13.2f}{list_month * 1000:>10.2f}{'-':>11}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / 'spending.sqlite3'
+        add_s, all_s, month_s, totals, mtd = measure(SQLiteSpendingMemory(path), receipts, month_start)
+        reopened, reopen_s = timed(lambda: SQLiteSpendingMemory(path).get_category_totals())
+        print(f"{'sqlite':<10}{add_s:>9.2f}{all_s * 1000:>13.2f}{month_s * 1000:>10.2f}{reopen_s * 1000:>11.2f}")
+
+    same = all(abs(totals[c] - list_totals[c]) < 1e-6 for c in list_totals) and reopened.keys() == totals.keys()
+    print(f"totals agree: {same and mtd.keys() == list_mtd.keys()}")
+
+
+if __name__ == '__main__':
+    main()
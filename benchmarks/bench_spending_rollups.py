@@ -0,0 +1,84 @@
+"""
+Budget and history queries at 1M transactions: scanning rows versus rollup buckets.
+
+TRANSACTIONS items spread over YEARS years are loaded into the SQLite spending
+memory. Each query is answered twice: "rows" aggregates the matching
+transactions over the (date, category) index, as before rollups existed, and
+"rollups" is SQLiteSpendingMemory.totals(), which reads the day, week and month
+buckets. The last line is the cost of storing one more receipt, including the
+triggers that maintain the buckets.
+
+Usage:
+    python -m benchmarks.bench_spending_rollups
+"""
+import contextlib
+import io
+import random
+import tempfile
+from datetime import date, timedelta
+from pathlib import Path
+
+from benchmarks.bench_spending_memory import ITEMS_PER_RECEIPT, YEARS, history, timed
+from tools.mcp_server import SQLiteSpendingMemory, month_start
+
+TRANSACTIONS = 1_000_000
+LOAD_BATCH = 10_000
+QUERIES = 20
+RECEIPTS = 200
+
+
+def by_rows(store, start, end, bucket=None):
+    if bucket is None:
+        return dict(store._conn.execute(
+            "SELECT category, SUM(price) FROM transactions WHERE date BETWEEN ? AND ? GROUP BY category",
+            (start, end)))
+    series = {}
+    for key, category, total in store._conn.execute(
+            f"SELECT {bucket}, category, SUM(price) FROM transactions WHERE date BETWEEN ? AND ? "
+            f"GROUP BY 1, 2", (start, end)):
+        series.setdefault(key, {})[category] = total
+    return series
+
+
+def main():
+    today = date.today()
+    year_ago = (today - timedelta(days=365)).isoformat()
+    queries = [
+        ('month to date', lambda s: by_rows(s, month_start(), today.isoformat()),
+         lambda s: s.totals(start=month_start())),
+        ('last 365 days', lambda s: by_rows(s, year_ago, today.isoformat()),
+         lambda s: s.totals(start=year_ago, end=today.isoformat())),
+        ('12 months, monthly', lambda s: by_rows(s, month_start(year_ago), today.isoformat(),
+                                                 "date(date, 'start of month')"),
+         lambda s: s.totals(start=year_ago, granularity='month')),
+        (f'{YEARS} years, weekly', lambda s: by_rows(s, '0001-01-01', '9999-12-31',
+                                                    "date(date, '-6 days', 'weekday 1')"),
+         lambda s: s.totals(granularity='week')),
+    ]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SQLiteSpendingMemory(Path(tmp) / 'spending.sqlite3')
+        items = [item for receipt in history(random.Random(5), TRANSACTIONS) for item in receipt]
+        with contextlib.redirect_stdout(io.StringIO()):
+            for i in range(0, len(items), LOAD_BATCH):
+                store.add_transactions(items[i:i + LOAD_BATCH])
+            receipts = list(history(random.Random(6), RECEIPTS * ITEMS_PER_RECEIPT))
+            _, add_s = timed(lambda: [store.add_transactions(receipt) for receipt in receipts])
+
+        print(f"{store.count_transactions()} transactions over {YEARS} years")
+        print(f"{'query':<22}{'rows ms':>10}{'rollups ms':>12}{'speedup':>9}{'agree':>7}")
+        for label, rows, rollups in queries:
+            expected, rows_s = timed(lambda: rows(store), QUERIES)
+            result, rollups_s = timed(lambda: rollups(store), QUERIES)
+            if expected and isinstance(next(iter(expected.values())), dict):
+                agree = expected.keys() == result.keys() and all(
+                    abs(expected[k][c] - result[k][c]) < 1e-6 for k in expected for c in expected[k])
+            else:
+                agree = expected.keys() == result.keys() and all(abs(expected[c] - result[c]) < 1e-6 for c in expected)
+            print(f"{label:<22}{rows_s * 1000:>10.2f}{rollups_s * 1000:>12.3f}{rows_s / rollups_s:>8.0f}x"
+                  f"{str(agree):>7}")
+        print(f"store one {ITEMS_PER_RECEIPT}-item receipt: {add_s / RECEIPTS * 1000:.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""
+App startup cost: import, OrchestratorAgent() construction and the first Streamlit frame.
+
+Each measurement runs in a fresh interpreter so imports are cold. Model
+discovery is stubbed with DISCOVERY_LATENCY per call, standing in for the
+list_models round-trip. Constructing agents should make no discovery call;
+the model is picked on the first call that needs one, which the last column
+times (construction followed by that first use is what every construction
+used to cost). The first frame is the full main.py script run by Streamlit's
+AppTest, which builds the orchestrator and the Price Checker scraper.
+
+Usage:
+    python -m benchmarks.bench_startup
+"""
+import json
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+MAIN_SCRIPT = Path(__file__).resolve().parent.parent / 'main.py'
+DISCOVERY_LATENCY = 0.5
+RUNS = 3
+
+
+def child():
+    """Measure one cold start and print the timings as JSON"""
+    started = time.perf_counter()
+    from agents.orchestrator import OrchestratorAgent
+    imported = time.perf_counter()
+
+    from benchmarks.stubs import stub_genai
+    from streamlit.testing.v1 import AppTest
+
+    result = {'import_s': imported - started}
+    with stub_genai(latency=DISCOVERY_LATENCY) as stub:
+        started = time.perf_counter()
+        orchestrator = OrchestratorAgent()
+        result['construct_s'] = time.perf_counter() - started
+        result['construct_discoveries'] = stub.discovery_calls
+        started = time.perf_counter()
+        orchestrator.catalogue_agent.scraper._working_model
+        result['first_use_s'] = time.perf_counter() - started
+
+    with stub_genai(latency=DISCOVERY_LATENCY) as stub:
+        started = time.perf_counter()
+        app = AppTest.from_file(str(MAIN_SCRIPT), default_timeout=120).run()
+        result['frame_s'] = time.perf_counter() - started
+        result['frame_discoveries'] = stub.discovery_calls
+        result['frame_errors'] = len(app.exception)
+    print(json.dumps(result))
+
+
+def main():
+    print(f"{RUNS} cold starts, {DISCOVERY_LATENCY * 1000:.0f} ms per discovery call")
+    print(f"{'import ms':>10}{'construct ms':>14}{'discoveries':>13}{'first frame ms':>16}{'discoveries':>13}"
+          f"{'errors':>8}{'first model use ms':>20}")
+    for _ in range(RUNS):
+        output = subprocess.run([sys.executable, '-m', 'benchmarks.bench_startup', '--child'],
+                                capture_output=True, text=True, check=True).stdout
+        r = json.loads(output.strip().splitlines()[-1])
+        print(f"{r['import_s'] * 1000:>10.0f}{r['construct_s'] * 1000:>14.1f}{r['construct_discoveries']:>13}"
+              f"{r['frame_s'] * 1000:>16.0f}{r['frame_discoveries']:>13}{r['frame_errors']:>8}"
+              f"{r['first_use_s'] * 1000:>20.0f}")
+
+
+if __name__ == '__main__':
+    if '--child' in sys.argv:
+        child()
+    else:
+        main()
@@ -0,0 +1,77 @@
+"""
+Time-to-first-item of streamed receipt parsing versus waiting for the full response.
+
+A 60-line receipt is built from the fixtures and parsed with the fast path off,
+so every line goes through the (stubbed) model. The stub answers after
+FIRST_CHUNK_LATENCY and then emits the JSON in CHUNK_CHARS pieces every
+CHUNK_LATENCY; a non-streamed call returns only after the last piece.
+
+Usage:
+    python -m benchmarks.bench_streaming_parse
+"""
+import contextlib
+import io
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.stubs import stub_genai, load_receipt_texts, stub_parse_items
+from tools.parser import ReceiptParser, parse_ah_receipt_lines
+
+RECEIPT_LINES = 60
+FIRST_CHUNK_LATENCY = 0.4
+CHUNK_CHARS = 64
+CHUNK_LATENCY = 0.05
+
+
+def build_receipt():
+    """AH receipt with RECEIPT_LINES item lines taken from the fixtures"""
+    lines = []
+    for text in load_receipt_texts().values():
+        lines.extend(line for line in text.splitlines() if stub_parse_items(line))
+    lines = (lines * (RECEIPT_LINES // len(lines) + 1))[:RECEIPT_LINES]
+    return "ALBERT HEIJN\n" + "\n".join(lines) + "\nTOTAAL 0,00\n"
+
+
+def run(path, fast_path, streaming):
+    with stub_genai(latency=FIRST_CHUNK_LATENCY, chunk_chars=CHUNK_CHARS, chunk_latency=CHUNK_LATENCY), \
+            contextlib.redirect_stdout(io.StringIO()):
+        parser = ReceiptParser(fast_path=fast_path)
+        parser.registry.available_models()  # Keep model discovery out of the timings
+        started = time.perf_counter()
+        if streaming:
+            first = None
+            items = []
+            for item in parser.iter_items(str(path)):
+                if first is None:
+                    first = time.perf_counter() - started
+                items.append(item)
+        else:
+            items = parser.parse(str(path))
+            first = time.perf_counter() - started
+        total = time.perf_counter() - started
+    return first, total, items
+
+
+def main():
+    receipt = build_receipt()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / 'receipt.txt'
+        path.write_text(receipt)
+        print(f"{RECEIPT_LINES}-line receipt, {FIRST_CHUNK_LATENCY * 1000:.0f} ms to first chunk, "
+              f"{CHUNK_CHARS} chars every {CHUNK_LATENCY * 1000:.0f} ms")
+        print(f"{'mode':<24}{'first item ms':>15}{'total ms':>10}{'items':>7}{'same items':>12}")
+        baseline = None
+        for label, fast_path, streaming in (('parse()', False, False),
+                                            ('iter_items()', False, True),
+                                            ('iter_items() + fast', True, True)):
+            first, total, items = run(path, fast_path, streaming)
+            if baseline is None:
+                baseline = items
+            same = sorted(i['raw_name'] for i in items) == sorted(i['raw_name'] for i in baseline)
+            print(f"{label:<24}{first * 1000:>15.1f}{total * 1000:>10.1f}{len(items):>7}{str(same):>12}")
+        print(f"fast path covers {parse_ah_receipt_lines(receipt)['fast_path_lines']} of {RECEIPT_LINES} lines")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""
+Memory and analytics for 1M transactions: a list of dicts versus the columnar TransactionTable.
+
+The dicts are shaped like matched receipt items (CatalogueAgent's output
+plus a purchase date). Memory is measured with tracemalloc while building
+each representation from the same source data; the copied dicts share their
+strings with the source, so their figure is a lower bound. The queries mirror the app:
+month-to-date totals per category, a monthly series, filtering one category
+for a date range, and the DataFrame main.py displays. The table is also
+written to and read back from Parquet.
+
+Usage:
+    python -m benchmarks.bench_transaction_table
+"""
+import gc
+import io
+import random
+import tracemalloc
+from datetime import date
+
+import pandas as pd
+
+from benchmarks.bench_spending_memory import history, timed
+from tools.mcp_server import month_start
+from tools.transaction_table import TransactionTable
+
+TRANSACTIONS = 1_000_000
+QUERIES = 5
+
+
+def matched_items(rng):
+    """Receipt items as CatalogueAgent returns them, with match fields and a purchase date"""
+    for receipt in history(rng, TRANSACTIONS):
+        for item in receipt:
+            price = item['price']
+            yield {**item, 'product_name': item['raw_name'].title(), 'catalogue_price': price,
+                   'is_bonus': price < 1, 'match_score': round(rng.random(), 3), 'match_tier': 'local'}
+
+
+def measured(build):
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, size
+
+
+def main():
+    source = list(matched_items(random.Random(9)))
+    records, records_bytes = measured(lambda: [dict(item) for item in source])
+    table, table_bytes = measured(lambda: TransactionTable.from_records(source))
+    del source
+
+    mtd, year_start = month_start(), date(date.today().year - 1, 1, 1).isoformat()
+
+    def group_records():
+        totals = {}
+        for t in records:
+            if t['date'] >= mtd:
+                totals[t['category']] = totals.get(t['category'], 0.0) + t['price']
+        return totals
+
+    def monthly_records():
+        series = {}
+        for t in records:
+            series[t['date'][:7]] = series.get(t['date'][:7], 0.0) + t['price']
+        return series
+
+    queries = [
+        ('month-to-date totals', group_records, lambda: table.filter(start=mtd).group_by()),
+        ('monthly series', monthly_records, lambda: table.group_by('month')),
+        ('filter Dairy, 2 years', lambda: [t for t in records if t['category'] == 'Dairy' and t['date'] >= year_start],
+         lambda: table.filter('Dairy', start=year_start)),
+        ('DataFrame', lambda: pd.DataFrame(records), table.to_pandas),
+    ]
+
+    print(f"{len(table)} transactions")
+    print(f"memory: dicts {records_bytes / len(table):.0f} B/transaction, "
+          f"table {table_bytes / len(table):.0f} B/transaction ({records_bytes / table_bytes:.0f}x smaller)")
+    print(f"{'query':<24}{'dicts ms':>10}{'table ms':>10}{'speedup':>9}")
+    for label, on_records, on_table in queries:
+        _, records_s = timed(on_records, QUERIES)
+        _, table_s = timed(on_table, QUERIES)
+        print(f"{label:<24}{records_s * 1000:>10.1f}{table_s * 1000:>10.2f}{records_s / table_s:>8.0f}x")
+
+    buffer = io.BytesIO()
+    _, write_s = timed(lambda: table.write_parquet(buffer))
+    size = buffer.tell()
+    buffer.seek(0)
+    restored, read_s = timed(lambda: TransactionTable.read_parquet(buffer))
+    assert len(restored) == len(table)
+    print(f"parquet: {size / 1e6:.1f} MB, write {write_s * 1000:.0f} ms, read {read_s * 1000:.0f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""
+Query translation cost: one model call per query versus lexicon, memo and batch.
+
+A list of typical Price Checker queries is translated three ways with a stub
+model that answers after MODEL_LATENCY:
+
+- llm: every English query goes to the model, as before the lexicon
+- cold: lexicon first, then the model for the rest (memo empty)
+- warm: the same queries again, now answered by the lexicon and the memo
+
+A final row translates the lexicon misses with translate_many in one call.
+
+Usage:
+    python -m benchmarks.bench_translation
+"""
+import contextlib
+import io
+import json
+import re
+import statistics
+import time
+
+from benchmarks.stubs import stub_genai
+from tools import grocery_lexicon
+from tools.scraper import CatalogueScraper
+from tools.translation_cache import TranslationCache
+
+MODEL_LATENCY = 0.3
+QUERIES = (
+    'milk', 'semi skimmed milk', 'whole milk', 'bread', 'brown bread', 'bananas', 'apples', 'eggs',
+    'cheese', 'young cheese', 'butter', 'yogurt', 'greek yogurt', 'chicken breast', 'minced meat',
+    'salmon', 'tomatoes', 'cucumber', 'potatoes', 'onions', 'rice', 'pasta', 'peanut butter',
+    'coffee', 'tea', 'orange juice', 'sparkling water', 'beer', 'red wine', 'toilet paper',
+    'organic milk', 'frozen pizza', 'ice cream', 'olive oil', 'chocolate sprinkles', 'dish soap',
+    'halfvolle melk', 'pindakaas', 'kipfilet',
+    'pumpkin soup', 'gingerbread', 'frozen spinach pie', 'blue cheese dressing',
+)
+
+
+def stub_translator(contents, **kwargs):
+    """Answer single and batch translation prompts with a marked-up 'translation'"""
+    batch = re.search(r'English: (\[.*\])\nDutch:', contents, re.S)
+    if batch:
+        return json.dumps([f'nl {query}' for query in json.loads(batch.group(1))])
+    single = re.search(r'English: "(.*)"\nDutch:', contents)
+    return f'nl {single.group(1)}' if single else ''
+
+
+def timed(translate, queries):
+    timings = []
+    for query in queries:
+        started = time.perf_counter()
+        translate(query)
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def main():
+    english = [q for q in QUERIES if grocery_lexicon.has_english_words(q)]
+    covered = [q for q in QUERIES if grocery_lexicon.translate_to_dutch(q) is not None]
+    misses = [q for q in QUERIES if q not in covered]
+
+    rows = []
+    with stub_genai(latency=MODEL_LATENCY, responder=stub_translator) as stub, \
+            contextlib.redirect_stdout(io.StringIO()):
+        scraper = CatalogueScraper(search_cache=False, translation_cache=TranslationCache(':memory:'), catalogue=False)
+
+        def llm_only(query):
+            if grocery_lexicon.has_english_words(query):
+                return scraper._read_translation(query, scraper._generate_content(scraper._translation_prompt(query)))
+            return query
+
+        calls = stub.generate_calls
+        rows.append(('llm', timed(llm_only, QUERIES), stub.generate_calls - calls))
+        scraper.translation_cache.clear()
+        for label in ('cold', 'warm'):
+            calls = stub.generate_calls
+            rows.append((label, timed(scraper._translate_to_dutch, QUERIES), stub.generate_calls - calls))
+
+        scraper.translation_cache.clear()
+        calls = stub.generate_calls
+        started = time.perf_counter()
+        batch = scraper.translate_many(QUERIES)
+        batch_elapsed = time.perf_counter() - started
+        batch_calls = stub.generate_calls - calls
+
+    print(f"{len(QUERIES)} queries ({len(english)} with English words), "
+          f"lexicon covers {len(covered)}, {MODEL_LATENCY * 1000:.0f} ms per model call")
+    print(f"{'mode':<8}{'model calls':>12}{'total ms':>10}{'median us':>11}")
+    for label, values, calls in rows:
+        print(f"{label:<8}{calls:>12}{sum(values) * 1000:>10.1f}{statistics.median(values) * 1e6:>11.1f}")
+    print(f"{'batch':<8}{batch_calls:>12}{batch_elapsed * 1000:>10.1f}{'':>11}")
+    print(f"lexicon misses: {misses}")
+    print(f"batch sample: {dict(zip(QUERIES[-4:], batch[-4:]))}")
+
+
+if __name__ == '__main__':
+    main()
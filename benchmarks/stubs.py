@@ -0,0 +1,320 @@
+"""
+Local stand-ins for the Gemini SDK used by the benchmarks.
+
+The stub model "reads" receipt images by returning the text embedded in the
+PNG's metadata when the image was rendered, and "parses" receipt text with a
+small regex, so benchmarks can exercise the real parser code paths offline.
+"""
+import asyncio
+import gzip
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import urlsplit, parse_qs
+
+from PIL import Image, ImageDraw
+from PIL.PngImagePlugin import PngInfo
+
+import google.generativeai as genai
+import config.model_registry as model_registry
+
+try:
+    import brotli
+except ImportError:  # The stand-in then serves gzip only
+    brotli = None
+
+FIXTURES_DIR = Path(__file__).parent / 'fixtures'
+RECEIPTS_DIR = FIXTURES_DIR / 'receipts'
+AH_SEARCH_DIR = FIXTURES_DIR / 'ah_search'
+
+_LINE_RE = re.compile(r'^\s*(?:(\d+)\s+)?(.+?)\s+(?:\d+,\d{2}\s+)?(-?\d+,\d{2})\s*$')
+_SKIP_WORDS = ('TOTAAL', 'SUBTOTAAL', 'PINNEN', 'BONUSKAART', 'STATIEGELD')
+
+
+def load_receipt_texts():
+    """Return {fixture name: receipt text} for every text fixture"""
+    return {p.stem: p.read_text(encoding='utf-8') for p in sorted(RECEIPTS_DIR.glob('*.txt'))}
+
+
+def load_ah_search_pages():
+    """Return {query: saved ah.nl search page bytes} for every search fixture"""
+    return {p.stem: p.read_bytes() for p in sorted(AH_SEARCH_DIR.glob('*.html'))}
+
+
+def render_receipt_image(text, path, size=(600, 900)):
+    """Draw receipt text on a white canvas and embed the text for the stub OCR"""
+    image = Image.new('RGB', size, 'white')
+    draw = ImageDraw.Draw(image)
+    for i, line in enumerate(text.splitlines()):
+        draw.text((20, 20 + i * 18), line, fill='black')
+    meta = PngInfo()
+    meta.add_text('receipt_text', text)
+    image.save(path, pnginfo=meta)
+    return path
+
+
+def stub_parse_items(receipt_text):
+    """Cheap deterministic 'LLM' receipt parse used by the stub model"""
+    items = []
+    for line in receipt_text.splitlines():
+        match = _LINE_RE.match(line)
+        if not match:
+            continue
+        quantity, name, price = match.groups()
+        name = name.strip()
+        if any(word in name.upper() for word in _SKIP_WORDS) or name.upper().startswith('BONUS'):
+            continue
+        items.append({
+            'raw_name': name,
+            'price': float(price.replace(',', '.')),
+            'quantity': int(quantity) if quantity else 1,
+        })
+    return items
+
+
+def default_responder(contents, generation_config=None, **kwargs):
+    """Answer OCR requests from the image metadata, parse requests with a regex and match requests by name"""
+    structured = bool(generation_config and generation_config.get('response_schema'))
+    if isinstance(contents, (list, tuple)):
+        for part in contents:
+            if isinstance(part, Image.Image):
+                text = part.info.get('receipt_text', '')
+                return json.dumps(stub_parse_items(text)) if structured else text
+        contents = '\n'.join(str(part) for part in contents)
+    match = re.search(r'Receipt text:\n(.*?)\n\nFor each item', contents, re.S)
+    if match:
+        return json.dumps(stub_parse_items(match.group(1)))
+    match = re.search(r'Receipt names \(JSON array\):\n(.*?)\n', contents)
+    if match:
+        return json.dumps([{'raw_name': name, 'product_name': name.title(), 'category': 'Other'}
+                           for name in json.loads(match.group(1))])
+    return ''
+
+
+class StubResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class StubModelInfo:
+    def __init__(self, name):
+        self.name = name
+        self.supported_generation_methods = ['generateContent']
+
+
+class StubGenai:
+    """Counts discovery and generate calls made through the patched SDK"""
+
+    def __init__(self, model_names, latency=0.0, responder=default_responder, failing_models=(),
+                 chunk_chars=64, chunk_latency=0.0):
+        self.model_names = list(model_names)
+        self.latency = latency
+        # Streamed responses (stream=True) arrive in chunk_chars pieces, chunk_latency apart
+        self.chunk_chars = chunk_chars
+        self.chunk_latency = chunk_latency
+        self.responder = responder
+        self.failing_models = set(failing_models)
+        self.discovery_calls = 0
+        self.generate_calls = 0
+        self.models_built = 0
+        self.in_flight = 0  # Generate calls currently waiting on the stub
+        self.peak_in_flight = 0
+        self._lock = threading.Lock()
+
+    def list_models(self, **kwargs):
+        with self._lock:
+            self.discovery_calls += 1
+        time.sleep(self.latency)
+        return [StubModelInfo(f'models/{name}') for name in self.model_names]
+
+    def chunks(self, text):
+        """Number of chunks a streamed response of this text is split into"""
+        return max(1, -(-len(text) // self.chunk_chars))
+
+    def model_class(self):
+        stub = self
+
+        class StubGenerativeModel:
+            def __init__(self, model_name='gemini-1.5-flash', generation_config=None, **kwargs):
+                with stub._lock:
+                    stub.models_built += 1
+                self.model_name = model_name
+                self.generation_config = generation_config
+
+            def generate_content(self, contents, stream=False, **kwargs):
+                if stream:
+                    return self._stream(contents, **kwargs)
+                with stub._lock:
+                    stub.generate_calls += 1
+                    stub.in_flight += 1
+                    stub.peak_in_flight = max(stub.peak_in_flight, stub.in_flight)
+                try:
+                    time.sleep(stub.latency)
+                    if self.model_name in stub.failing_models:
+                        raise RuntimeError(f'404 model {self.model_name} is not found')
+                    text = stub.responder(contents, **kwargs)
+                    # A non-streamed response arrives once the whole text is generated
+                    time.sleep(stub.chunk_latency * max(0, stub.chunks(text) - 1))
+                finally:
+                    with stub._lock:
+                        stub.in_flight -= 1
+                return StubResponse(text)
+
+            def _stream(self, contents, **kwargs):
+                with stub._lock:
+                    stub.generate_calls += 1
+                time.sleep(stub.latency)
+                if self.model_name in stub.failing_models:
+                    raise RuntimeError(f'404 model {self.model_name} is not found')
+                text = stub.responder(contents, **kwargs)
+                for start in range(0, len(text), stub.chunk_chars):
+                    if start:
+                        time.sleep(stub.chunk_latency)
+                    yield StubResponse(text[start:start + stub.chunk_chars])
+
+            async def generate_content_async(self, contents, **kwargs):
+                with stub._lock:
+                    stub.generate_calls += 1
+                    stub.in_flight += 1
+                    stub.peak_in_flight = max(stub.peak_in_flight, stub.in_flight)
+                try:
+                    await asyncio.sleep(stub.latency)
+                finally:
+                    with stub._lock:
+                        stub.in_flight -= 1
+                if self.model_name in stub.failing_models:
+                    raise RuntimeError(f'404 model {self.model_name} is not found')
+                return StubResponse(stub.responder(contents, **kwargs))
+
+        return StubGenerativeModel
+
+
+@contextmanager
+def stub_genai(model_names=('gemini-1.5-flash', 'gemini-1.5-pro'), **kwargs):
+    """Patch the Gemini SDK with a StubGenai and reset the process-wide registry"""
+    stub = StubGenai(model_names, **kwargs)
+    saved = (genai.list_models, genai.GenerativeModel, model_registry._model_registry)
+    os.environ.setdefault('GOOGLE_API_KEY', 'benchmark-stub-key')
+    genai.list_models = stub.list_models
+    genai.GenerativeModel = stub.model_class()
+    model_registry._model_registry = None
+    try:
+        yield stub
+    finally:
+        genai.list_models, genai.GenerativeModel, model_registry._model_registry = saved
+
+
+class AhStandIn:
+    """Counts requests and bytes served by the local ah.nl stand-in"""
+
+    def __init__(self, pages, latency=0.0, validators=True, compress=True):
+        self.pages = pages
+        self.latency = latency
+        self.validators = validators
+        self.compress = compress
+        self.last_modified = formatdate(time.time() - 3600, usegmt=True)
+        self.requests = 0
+        self.not_modified = 0
+        self.connections = 0
+        self.bytes_sent = 0
+        self._encoded = {}
+        self._lock = threading.Lock()
+
+    def encoded(self, query, encoding):
+        """Page body in the given content encoding, compressed once like a CDN would"""
+        key = (query, encoding)
+        if key not in self._encoded:
+            body = self.pages[query]
+            self._encoded[key] = brotli.compress(body) if encoding == 'br' else gzip.compress(body)
+        return self._encoded[key]
+
+    def etag(self, query):
+        return '"%s"' % hashlib.sha1(self.pages[query]).hexdigest()[:16]
+
+    def handler_class(self):
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'  # Keep-alive, like the real site
+            disable_nagle_algorithm = True  # Headers and body go out in separate writes
+
+            def setup(self):
+                super().setup()
+                with stand_in._lock:
+                    stand_in.connections += 1
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                with stand_in._lock:
+                    stand_in.requests += 1
+                time.sleep(stand_in.latency)
+                url = urlsplit(self.path)
+                query = parse_qs(url.query).get('query', [''])[0]
+                if url.path != '/zoeken' or query not in stand_in.pages:
+                    return self._send(404, b'', {})
+
+                headers = {'Content-Type': 'text/html; charset=utf-8'}
+                if stand_in.validators:
+                    etag = stand_in.etag(query)
+                    headers.update({'ETag': etag, 'Last-Modified': stand_in.last_modified})
+                    if self.headers.get('If-None-Match') == etag:
+                        with stand_in._lock:
+                            stand_in.not_modified += 1
+                        return self._send(304, b'', headers)
+
+                body = stand_in.pages[query]
+                accepted = self.headers.get('Accept-Encoding', '')
+                if stand_in.compress and 'br' in accepted and brotli is not None:
+                    body, headers['Content-Encoding'] = stand_in.encoded(query, 'br'), 'br'
+                elif stand_in.compress and 'gzip' in accepted:
+                    body, headers['Content-Encoding'] = stand_in.encoded(query, 'gzip'), 'gzip'
+                self._send(200, body, headers)
+
+            def _send(self, status, body, headers):
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                if status != 304:
+                    self.wfile.write(body)
+                with stand_in._lock:
+                    stand_in.bytes_sent += len(body)
+
+        return Handler
+
+
+@contextmanager
+def serve_ah_search(pages=None, **kwargs):
+    """
+    Serve saved ah.nl search pages on localhost and point the scraper at them
+
+    /zoeken?query=<name> returns fixtures/ah_search/<name>.html, with ETag and
+    Last-Modified validators and gzip/brotli encoding when the client asks for it.
+    """
+    stand_in = AhStandIn(pages if pages is not None else load_ah_search_pages(), **kwargs)
+    server = ThreadingHTTPServer(('127.0.0.1', 0), stand_in.handler_class())
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    stand_in.base_url = f'http://127.0.0.1:{server.server_address[1]}'
+    saved = os.environ.get('AH_BASE_URL')
+    os.environ['AH_BASE_URL'] = stand_in.base_url
+    try:
+        yield stand_in
+    finally:
+        if saved is None:
+            os.environ.pop('AH_BASE_URL', None)
+        else:
+            os.environ['AH_BASE_URL'] = saved
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,473 @@
+"""
+Model Registry Module
+Process-wide Gemini model discovery, health tracking and model handles
+"""
+import os
+import asyncio
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, asynccontextmanager
+import google.generativeai as genai
+
+
+# Preference lists used by the tools when choosing a model
+VISION_MODEL_PREFERENCES = ['gemini-1.5-flash', 'gemini-pro', 'gemini-1.5-pro', 'gemini-pro-vision']
+TEXT_MODEL_PREFERENCES = ['gemini-pro-latest', 'gemini-pro', 'gemini-1.5-flash', 'gemini-1.5-pro']
+SCRAPER_MODEL_PREFERENCES = ['gemini-1.5-flash', 'gemini-pro', 'gemini-1.5-pro', 'gemini-pro-latest']
+
+
+def clean_model_name(model_name):
+    """Strip the 'models/' prefix returned by discovery (GenerativeModel expects the bare name)"""
+    if model_name and model_name.startswith('models/'):
+        return model_name[len('models/'):]
+    return model_name
+
+
+class ModelHealth:
+    """Recent success/failure record for a single model"""
+
+    def __init__(self):
+        self.successes = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.last_success = None
+        self.last_failure = None
+        self.last_error = None
+
+    def to_dict(self):
+        return {
+            'successes': self.successes,
+            'failures': self.failures,
+            'consecutive_failures': self.consecutive_failures,
+            'last_error': self.last_error,
+        }
+
+
+class TokenBucket:
+    """Thread-safe token-bucket rate limiter"""
+
+    def __init__(self, rate, capacity=None, clock=time.monotonic, sleep=time.sleep):
+        """
+        Args:
+            rate: Tokens added per second
+            capacity: Burst size (default: one second worth of tokens, at least 1)
+        """
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self._tokens = self.capacity
+        self._clock = clock
+        self._sleep = sleep
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _take(self):
+        """Take a token if one is available; returns how long to wait otherwise"""
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0
+            return (1 - self._tokens) / self.rate
+
+    def acquire(self):
+        """Block until a token is available and take it"""
+        while True:
+            wait = self._take()
+            if not wait:
+                return
+            self._sleep(wait)
+
+    async def aacquire(self):
+        """Wait for a token without blocking the event loop"""
+        while True:
+            wait = self._take()
+            if not wait:
+                return
+            await asyncio.sleep(wait)
+
+
+class _SlotWaiter:
+    """A thread or coroutine queued for a ModelSlots slot"""
+
+    def __init__(self, loop=None):
+        self.granted = False
+        self.loop = loop
+        if loop is None:
+            self.event = threading.Event()
+        else:
+            self.future = loop.create_future()
+
+    def wake(self):
+        """Hand the slot over; returns False if a coroutine's loop is already closed"""
+        if self.loop is None:
+            self.event.set()
+            return True
+        try:
+            self.loop.call_soon_threadsafe(self._resolve)
+        except RuntimeError:
+            return False
+        return True
+
+    def _resolve(self):
+        if not self.future.done():
+            self.future.set_result(None)
+
+
+class ModelSlots:
+    """
+    Counting semaphore shared by threads and coroutines
+
+    A freed slot is handed to the longest waiting caller. Coroutines wait on a
+    future resolved through their own loop, so neither side polls and waiting
+    coroutines take no threads.
+    """
+
+    def __init__(self, value):
+        self._initial = value
+        self._value = value
+        self._waiters = deque()
+        self._lock = threading.Lock()
+
+    def _try_acquire(self, waiter=None):
+        """Take a free slot, or queue the waiter; returns True if a slot was taken"""
+        with self._lock:
+            if self._value > 0 and not self._waiters:
+                self._value -= 1
+                return True
+            if waiter is not None:
+                self._waiters.append(waiter)
+            return False
+
+    def acquire(self, blocking=True):
+        if self._try_acquire():
+            return True
+        if not blocking:
+            return False
+        waiter = _SlotWaiter()
+        if not self._try_acquire(waiter):
+            waiter.event.wait()
+        return True
+
+    async def aacquire(self):
+        """Wait for a slot without blocking the event loop"""
+        if self._try_acquire():
+            return
+        waiter = _SlotWaiter(asyncio.get_running_loop())
+        if self._try_acquire(waiter):
+            return
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            with self._lock:
+                granted = waiter.granted
+                if not granted:
+                    self._waiters.remove(waiter)
+            if granted:
+                # The slot was handed over just as the wait was cancelled
+                self.release()
+            raise
+
+    def release(self):
+        with self._lock:
+            while self._waiters:
+                waiter = self._waiters.popleft()
+                waiter.granted = True
+                if waiter.wake():
+                    return
+            if self._value >= self._initial:
+                raise ValueError("ModelSlots released too many times")
+            self._value += 1
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+class ModelRegistry:
+    """
+    Shared registry of Gemini models.
+
+    Runs ``genai.list_models()`` once and caches the result for ``ttl`` seconds,
+    keeps per-model health so fallback loops skip models that keep failing, and
+    hands back cached ``GenerativeModel`` handles, including one shared working
+    model per task. ``throttle()`` applies the
+    per-model concurrency cap and the shared request rate limit.
+    """
+
+    def __init__(self, ttl=None, failure_threshold=2, cooldown=300.0, clock=time.monotonic,
+                 max_concurrency=None, requests_per_second=None, failure_ttl=None):
+        """
+        Args:
+            ttl: Seconds a discovery result stays valid (default: GEMINI_DISCOVERY_TTL or 1 hour)
+            failure_ttl: Seconds before a failed discovery is retried
+                         (default: GEMINI_DISCOVERY_FAILURE_TTL or 30)
+            failure_threshold: Consecutive failures after which a model is considered dead
+            cooldown: Seconds a dead model is skipped before it may be probed again
+            clock: Time source, overridable for tests
+            max_concurrency: In-flight calls allowed per model (default: GEMINI_MAX_CONCURRENCY or 8)
+            requests_per_second: Shared call rate limit, 0 for none (default: GEMINI_RPS or 0)
+        """
+        if ttl is None:
+            ttl = float(os.getenv('GEMINI_DISCOVERY_TTL', '3600'))
+        if failure_ttl is None:
+            failure_ttl = float(os.getenv('GEMINI_DISCOVERY_FAILURE_TTL', '30'))
+        if max_concurrency is None:
+            max_concurrency = int(os.getenv('GEMINI_MAX_CONCURRENCY', '8'))
+        if requests_per_second is None:
+            requests_per_second = float(os.getenv('GEMINI_RPS', '0'))
+        self.max_concurrency = max_concurrency
+        self._rate_limiter = TokenBucket(requests_per_second) if requests_per_second > 0 else None
+        self._slots = {}
+        self.ttl = ttl
+        self.failure_ttl = failure_ttl
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self._clock = clock
+        self._lock = threading.RLock()
+        # Serialises discovery without holding _lock across the network call
+        self._discovery_lock = threading.Lock()
+        self._available = None
+        self._discovered_at = None
+        self._discovery_failed = False
+        self._health = {}
+        self._handles = {}
+        self._working = {}
+        self.discovery_count = 0
+
+    def _discover(self):
+        """Call the API once and return the names of models supporting generateContent, or None on error"""
+        self.discovery_count += 1
+        try:
+            available = []
+            for model in genai.list_models():
+                if 'generateContent' in model.supported_generation_methods:
+                    available.append(clean_model_name(model.name))
+            return available
+        except Exception as e:
+            print(f"Error listing models: {e}")
+            return None
+
+    def available_models(self, refresh=False):
+        """
+        Get the discovered model names, running discovery only when the cache expired
+
+        A failed discovery is not cached for the full TTL: the last good list (if
+        any) is kept and discovery is retried after failure_ttl seconds.
+
+        Args:
+            refresh: Force a new discovery call
+
+        Returns:
+            List of model names without the 'models/' prefix
+        """
+        with self._discovery_lock:
+            with self._lock:
+                now = self._clock()
+                ttl = self.failure_ttl if self._discovery_failed else self.ttl
+                expired = self._discovered_at is None or now - self._discovered_at >= ttl
+            if refresh or expired:
+                # Callers that only need health or handles are not held up by the network call
+                available = self._discover()
+                with self._lock:
+                    self._discovery_failed = available is None
+                    if available is not None:
+                        self._available = available
+                    self._discovered_at = now
+            with self._lock:
+                return list(self._available or [])
+
+    def invalidate(self):
+        """Drop the cached discovery result so the next lookup rediscovers"""
+        with self._lock:
+            self._available = None
+            self._discovered_at = None
+            self._discovery_failed = False
+
+    def _get_health(self, model_name):
+        name = clean_model_name(model_name)
+        if name not in self._health:
+            self._health[name] = ModelHealth()
+        return self._health[name]
+
+    def record_success(self, model_name):
+        """Mark a successful call on a model"""
+        with self._lock:
+            health = self._get_health(model_name)
+            health.successes += 1
+            health.consecutive_failures = 0
+            health.last_success = self._clock()
+
+    def record_failure(self, model_name, error=None):
+        """Mark a failed call on a model"""
+        with self._lock:
+            health = self._get_health(model_name)
+            health.failures += 1
+            health.consecutive_failures += 1
+            health.last_failure = self._clock()
+            health.last_error = str(error)[:200] if error is not None else None
+
+    def is_healthy(self, model_name):
+        """A model is healthy unless it failed repeatedly within the cooldown window"""
+        with self._lock:
+            health = self._health.get(clean_model_name(model_name))
+            if health is None or health.consecutive_failures < self.failure_threshold:
+                return True
+            return self._clock() - health.last_failure >= self.cooldown
+
+    def health(self):
+        """Snapshot of per-model health, keyed by model name"""
+        with self._lock:
+            return {name: h.to_dict() for name, h in self._health.items()}
+
+    def candidates(self, preferred_models):
+        """
+        Order the models to try for a task
+
+        Preferred models that are available come first, then any other available
+        model. If discovery returned nothing the preferred names are tried as-is.
+        Models known to be dead are left out unless nothing healthy remains.
+
+        Args:
+            preferred_models: Substrings of model names in order of preference
+
+        Returns:
+            List of model names to try
+        """
+        available = self.available_models()
+        if available:
+            ordered = []
+            for pref in preferred_models:
+                for avail in available:
+                    if pref in avail.lower():
+                        if avail not in ordered:
+                            ordered.append(avail)
+                        break
+            for avail in available:
+                if avail not in ordered:
+                    ordered.append(avail)
+        else:
+            ordered = list(preferred_models)
+
+        healthy = [name for name in ordered if self.is_healthy(name)]
+        return healthy or ordered
+
+    def get_model(self, model_name, generation_config=None):
+        """
+        Get a cached GenerativeModel handle
+
+        Args:
+            model_name: Model name, with or without the 'models/' prefix
+            generation_config: Optional generation config dict
+
+        Returns:
+            GenerativeModel instance shared by all callers with the same arguments
+        """
+        name = clean_model_name(model_name)
+        key = (name, tuple(sorted((generation_config or {}).items())))
+        with self._lock:
+            model = self._handles.get(key)
+            if model is None:
+                if generation_config:
+                    model = genai.GenerativeModel(model_name=name, generation_config=generation_config)
+                else:
+                    model = genai.GenerativeModel(name)
+                self._handles[key] = model
+            return model
+
+    @contextmanager
+    def throttle(self, model_name):
+        """Wait for the rate limiter and a free concurrency slot before calling a model"""
+        if self._rate_limiter is not None:
+            self._rate_limiter.acquire()
+        with self._slot(model_name):
+            yield
+
+    @asynccontextmanager
+    async def athrottle(self, model_name):
+        """
+        Async variant of throttle()
+
+        Shares the rate limiter and concurrency slots with sync callers, so the
+        caps hold when threads and coroutines call the same model.
+        """
+        if self._rate_limiter is not None:
+            await self._rate_limiter.aacquire()
+        slot = self._slot(model_name)
+        await slot.aacquire()
+        try:
+            yield
+        finally:
+            slot.release()
+
+    def _slot(self, model_name):
+        """Per-model semaphore capping in-flight calls, shared by threads and coroutines"""
+        name = clean_model_name(model_name) or 'default'
+        with self._lock:
+            slot = self._slots.get(name)
+            if slot is None:
+                slot = self._slots[name] = ModelSlots(self.max_concurrency)
+        return slot
+
+    def get_working_model(self, preferred_models):
+        """
+        Get a handle to the best healthy model for a task
+
+        Returns:
+            Tuple of (model_name, GenerativeModel), or (None, None) if nothing can be built
+        """
+        for name in self.candidates(preferred_models):
+            try:
+                return name, self.get_model(name)
+            except Exception as e:
+                print(f"Failed to use model {name}: {e}")
+                self.record_failure(name, e)
+        return None, None
+
+    def shared_working_model(self, preferred_models):
+        """
+        Working model for a task, picked on first use and shared by every caller
+
+        The first call runs discovery (once, even when many threads ask at the
+        same time); later calls reuse the pick for as long as the model stays
+        healthy, then pick again. The pick is made outside the registry lock, so
+        discovery does not hold up callers that only need health or handles.
+
+        Returns:
+            Tuple of (model_name, GenerativeModel), or (None, None) if nothing can be built
+        """
+        key = tuple(preferred_models)
+        with self._lock:
+            picked = self._working.get(key)
+            if picked is not None and self.is_healthy(picked[0]):
+                return picked
+        picked = self.get_working_model(preferred_models)
+        if picked[1] is None:
+            return picked
+        with self._lock:
+            # Another caller may have picked while this one was discovering; keep the first pick
+            current = self._working.get(key)
+            if current is not None and self.is_healthy(current[0]):
+                return current
+            self._working[key] = picked
+            return picked
+
+
+# Global instance
+_model_registry = None
+_model_registry_lock = threading.Lock()
+
+
+def get_model_registry():
+    """Get or create the global model registry instance"""
+    global _model_registry
+    if _model_registry is None:
+        with _model_registry_lock:
+            if _model_registry is None:
+                _model_registry = ModelRegistry()
+    return _model_registry
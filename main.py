@@ -4,12 +4,18 @@ import os
 import streamlit as st
 import pandas as pd
 import altair as alt
-from datetime import datetime
+from datetime import datetime, timedelta
 import tempfile
+import io
 
 # Add the project root to the python path so imports work correctly
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
+from tools.mcp_server import month_start
+
+# Latency budget of a Price Checker search; a slow ah.nl returns what is ready by then
+PRICE_CHECKER_DEADLINE_MS = int(os.getenv('PRICE_CHECKER_DEADLINE_MS', '3000'))
+
 # Initialize LLM configuration on startup
 try:
     from config.llm_config import get_llm_config
@@ -72,9 +78,18 @@ def process_receipt(uploaded_file):
             tmp_file.write(uploaded_file.getvalue())
             tmp_path = tmp_file.name
 
+        # Show items as the parser streams them in
+        streamed_items = []
+        items_placeholder = st.empty()
+
+        def show_item(item):
+            streamed_items.append(item)
+            items_placeholder.dataframe(pd.DataFrame(streamed_items),
+                                        use_container_width=True, hide_index=True)
+
         # Run the orchestrator
         with st.spinner("Processing receipt through agent system (this may take a moment)..."):
-            result = st.session_state.orchestrator.run(tmp_path)
+            result = st.session_state.orchestrator.run(tmp_path, on_item=show_item)
 
             # Get finance data from orchestrator (stored during execution)
             finance_data = st.session_state.orchestrator.finance_data
@@ -82,10 +97,9 @@ def process_receipt(uploaded_file):
             st.session_state.finance_data = finance_data
             st.session_state.processing_result = result
 
-            # Update monthly totals from memory (cumulative)
+            # Update monthly totals from memory (month to date, read from the rollups)
             if finance_data:
-                # Get cumulative totals from memory
-                memory_totals = st.session_state.orchestrator.finance_agent.memory.get_category_totals()
+                memory_totals = st.session_state.orchestrator.finance_agent.memory.totals(start=month_start())
                 st.session_state.monthly_totals = memory_totals
 
         # Clean up temp file
@@ -108,6 +122,13 @@ def get_remaining_budget(category, spent, budget):
     return remaining, percentage
 
 
+def history_parquet(memory):
+    """All stored transactions as Parquet file bytes."""
+    buffer = io.BytesIO()
+    memory.table().write_parquet(buffer)
+    return buffer.getvalue()
+
+
 def update_budgets():
     """Update budgets in the finance agent and evaluator."""
     st.session_state.orchestrator.finance_agent.evaluator.budgets = st.session_state.budgets.copy()
@@ -126,13 +147,15 @@ with st.sidebar:
     st.header("📄 Upload Receipt")
     uploaded_file = st.file_uploader(
         "Choose a receipt file",
-        type=['jpg', 'jpeg', 'png', 'txt', 'pdf'],
-        help="Upload an image or text file of your AH receipt"
+        type=['jpg', 'jpeg', 'png', 'txt', 'pdf', 'tif', 'tiff'],
+        help="Upload an image, PDF or text file of your AH receipt"
     )
 
     if uploaded_file is not None:
         if st.button("Process Receipt", type="primary"):
             if process_receipt(uploaded_file):
+                if st.session_state.orchestrator.receipt_cache_hit:
+                    st.toast("Receipt loaded from cache")
                 st.success("Receipt processed successfully!")
                 st.rerun()
 
@@ -144,7 +167,7 @@ with st.sidebar:
 
     # Get current monthly totals (prefer memory totals, fallback to finance_data)
     if hasattr(st.session_state, 'orchestrator') and st.session_state.orchestrator:
-        current_totals = st.session_state.orchestrator.finance_agent.memory.get_category_totals()
+        current_totals = st.session_state.orchestrator.finance_agent.memory.totals(start=month_start())
     elif st.session_state.monthly_totals:
         current_totals = st.session_state.monthly_totals.copy()
     elif st.session_state.finance_data and st.session_state.finance_data.get('breakdown'):
@@ -279,7 +302,7 @@ AH TOMATEN 500G 1.99
             # Transactions table
             if finance_data.get('transactions'):
                 st.subheader("📋 Receipt Items")
-                transactions_df = pd.DataFrame(finance_data['transactions'])
+                transactions_df = finance_data['table'].to_pandas()
 
                 # Select and rename columns for display
                 display_cols = []
@@ -342,6 +365,31 @@ AH TOMATEN 500G 1.99
                     st.dataframe(
                         breakdown_df, use_container_width=True, hide_index=True)
 
+            # Spending history over the last year, one rollup bucket per month
+            history = st.session_state.orchestrator.finance_agent.memory.totals(
+                start=month_start(datetime.now() - timedelta(days=335)), granularity='month')
+            if len(history) > 1:
+                st.subheader("📈 Monthly Spending")
+                history_df = pd.DataFrame([
+                    {'Month': month[:7], 'Category': category, 'Amount (€)': amount}
+                    for month, totals in history.items() for category, amount in totals.items()
+                ])
+                chart = alt.Chart(history_df).mark_bar().encode(
+                    x=alt.X('Month', title='Month'),
+                    y=alt.Y('Amount (€)', title='Amount (€)'),
+                    color=alt.Color('Category')
+                ).properties(height=300)
+                st.altair_chart(chart, use_container_width=True)
+
+            # Full history as a Parquet file, built only when the button is clicked
+            memory = st.session_state.orchestrator.finance_agent.memory
+            st.download_button(
+                "⬇️ Export Spending History (Parquet)",
+                data=lambda: history_parquet(memory),
+                file_name=f"spending_{datetime.now():%Y%m%d}.parquet",
+                mime="application/vnd.apache.parquet"
+            )
+
             # Alerts
             if finance_data.get('alerts'):
                 st.subheader("⚠️ Budget Alerts")
@@ -360,9 +408,9 @@ AH TOMATEN 500G 1.99
             st.markdown("---")
             st.subheader("🛍️ Purchase Planning Assistant")
 
-            # Get current spending and budgets (use cumulative totals from memory)
+            # Get current spending and budgets (use month-to-date totals from memory)
             if hasattr(st.session_state, 'orchestrator') and st.session_state.orchestrator:
-                current_totals = st.session_state.orchestrator.finance_agent.memory.get_category_totals()
+                current_totals = st.session_state.orchestrator.finance_agent.memory.totals(start=month_start())
             else:
                 current_totals = finance_data.get('breakdown', {})
             budgets = st.session_state.budgets
@@ -516,7 +564,8 @@ with tab2:
                 # Search using Google Search via Gemini
                 products = st.session_state.price_checker_scraper.search_products_google(
                     search_query,
-                    max_results=max_results
+                    max_results=max_results,
+                    deadline_ms=PRICE_CHECKER_DEADLINE_MS
                 )
 
                 if products:
@@ -0,0 +1,26 @@
+"""
+Shared fixtures: keep every test away from the working tree's .cache
+"""
+import pytest
+
+import tools.catalogue_store as catalogue_store
+import tools.http_client as http_client
+import tools.receipt_cache as receipt_cache
+import tools.search_cache as search_cache
+import tools.translation_cache as translation_cache
+
+# Path overrides of the SQLite stores that default to .cache/
+STORE_PATH_VARS = ('CATALOGUE_PATH', 'SEARCH_CACHE_PATH', 'TRANSLATION_CACHE_PATH', 'RECEIPT_CACHE_PATH',
+                   'AH_RESPONSE_STORE_PATH', 'SPENDING_MEMORY_PATH')
+
+
+@pytest.fixture(autouse=True)
+def isolated_stores(monkeypatch):
+    """Default stores are throwaway in-memory databases, and each test gets fresh shared instances"""
+    for var in STORE_PATH_VARS:
+        monkeypatch.setenv(var, ':memory:')
+    monkeypatch.setattr(catalogue_store, '_catalogue_store', None)
+    monkeypatch.setattr(http_client, '_http_client', None)
+    monkeypatch.setattr(receipt_cache, '_receipt_cache', None)
+    monkeypatch.setattr(search_cache, '_search_cache', None)
+    monkeypatch.setattr(translation_cache, '_translation_cache', None)
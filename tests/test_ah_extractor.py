@@ -0,0 +1,35 @@
+"""
+Test suite for the ah.nl search page extractor
+"""
+import importlib.util
+
+import pytest
+
+from benchmarks.stubs import load_ah_search_pages
+from tools.ah_extractor import ProductExtractor, absolute_url
+
+
+def test_extractor_reads_products_from_search_page():
+    """Names, split-span prices, links and bonus flags come out of a saved page"""
+    products = ProductExtractor("html.parser").extract(load_ah_search_pages()["melk"], max_results=3)
+
+    assert len(products) == 3
+    first = products[0]
+    assert first["name"] == "AH Halfvolle melk"
+    assert first["price_without_membership"] == 1.19, "Price should come from the whole price-amount container"
+    assert first["url"] == "https://www.ah.nl/producten/product/wi435243/ah-halfvolle-melk"
+    assert first["image_url"].startswith("https://static.ah.nl/")
+    assert first["is_bonus"] and first["category"] == "Dairy"
+
+
+def test_extractor_helpers():
+    assert absolute_url("/producten/x") == "https://www.ah.nl/producten/x"
+    assert absolute_url("//static.ah.nl/a.jpg") == "https://static.ah.nl/a.jpg"
+    assert absolute_url("https://example.com/") == "https://example.com/"
+
+
+@pytest.mark.skipif(importlib.util.find_spec("lxml") is None, reason="lxml not installed")
+def test_lxml_backend_matches_html_parser():
+    """Both tree builders extract the same products"""
+    for html in load_ah_search_pages().values():
+        assert ProductExtractor("lxml").extract(html, 20) == ProductExtractor("html.parser").extract(html, 20)
@@ -2,6 +2,7 @@
 Test suite for catalogue extraction functionality
 """
 from agents.catalogue_matcher import CatalogueAgent
+from tools.catalogue_store import CatalogueStore
 from tools.scraper import CatalogueScraper
 import sys
 import os
@@ -11,9 +12,14 @@ sys.path.insert(0, os.path.abspath(
     os.path.join(os.path.dirname(__file__), '..')))
 
 
+def empty_scraper():
+    """Scraper over an empty snapshot, so only the curated entries can match"""
+    return CatalogueScraper(catalogue=CatalogueStore(":memory:"))
+
+
 def test_catalogue_scraper_find_product():
     """Test that CatalogueScraper can find products in mock catalogue"""
-    scraper = CatalogueScraper()
+    scraper = empty_scraper()
 
     # Test exact match
     result = scraper.find_product("BAP WIT")
@@ -36,7 +42,7 @@ def test_catalogue_scraper_find_product():
 
 def test_catalogue_agent_matching():
     """Test that CatalogueAgent can match receipt items to catalogue"""
-    agent = CatalogueAgent()
+    agent = CatalogueAgent(scraper=empty_scraper())
 
     # Test with known items
     raw_items = [
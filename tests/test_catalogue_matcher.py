@@ -0,0 +1,103 @@
+"""
+Test suite for batched catalogue matching in CatalogueAgent
+"""
+import json
+import re
+
+from agents.catalogue_matcher import CatalogueAgent
+from tools.catalogue_store import CatalogueStore
+import tools.scraper as scraper_module
+
+
+def no_llm_config():
+    raise ValueError("GOOGLE_API_KEY not set")
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeModel:
+    """Answers match prompts by title-casing names; records the names asked per call"""
+
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.calls = []
+        self.configs = []
+
+    def generate_content(self, prompt, generation_config=None):
+        names = json.loads(re.search(r'Receipt names \(JSON array\):\n(.*?)\n', prompt).group(1))
+        self.calls.append(names)
+        self.configs.append(generation_config)
+        if self.fail:
+            raise RuntimeError("429 quota exceeded")
+        answers = [{"raw_name": name, "product_name": name.title(), "category": "Snacks"} for name in names]
+        answers.append({"raw_name": "NOT ASKED", "product_name": "x", "category": "Snacks"})
+        return FakeResponse(json.dumps(answers))
+
+
+def make_agent(monkeypatch, model=None):
+    monkeypatch.setattr(scraper_module, "get_llm_config", no_llm_config)
+    monkeypatch.setattr(scraper_module, "get_catalogue_store", lambda: CatalogueStore(":memory:"))
+    return CatalogueAgent(model=model)
+
+
+RECEIPTS = [
+    [{"raw_name": "BAP WIT", "price": 1.79, "quantity": 1},
+     {"raw_name": "LAYS PAPRIKA", "price": 2.29, "quantity": 1},
+     {"raw_name": "LAYS PAPRIKA", "price": 2.29, "quantity": 1}],
+    [{"raw_name": "LAYS PAPRIKA", "price": 2.29, "quantity": 1},
+     {"raw_name": "TUC CRACKERS", "price": 1.49, "quantity": 1}],
+]
+
+
+def test_leftovers_go_to_the_model_in_one_deduplicated_call(monkeypatch):
+    """Names repeated within and across receipts are asked about once, in one prompt"""
+    model = FakeModel()
+    agent = make_agent(monkeypatch, model)
+    matched = agent.execute_many(RECEIPTS)
+
+    assert model.calls == [["LAYS PAPRIKA", "TUC CRACKERS"]]
+    assert [len(items) for items in matched] == [3, 2]
+    assert [item["match_tier"] for item in matched[0]] == ["local", "llm", "llm"]
+    assert matched[0][1]["product_name"] == "Lays Paprika" and matched[0][1]["category"] == "Snacks"
+    assert matched[0][1]["catalogue_price"] == 2.29
+    assert agent.last_stats["local"] == 1 and agent.last_stats["llm"] == 4
+    assert agent.last_stats["unique_names"] == 3 and agent.last_stats["llm_calls"] == 1
+
+    # Answers are remembered, so the next batch needs no call
+    again = agent.execute([{"raw_name": "TUC CRACKERS", "price": 1.49, "quantity": 1}])
+    assert len(model.calls) == 1 and again[0]["match_tier"] == "remembered"
+    assert agent.stats["llm"] == 4 and agent.stats["remembered"] == 1
+
+
+def test_failed_model_call_falls_back_to_keywords(monkeypatch):
+    """A failing model call is not fatal; leftovers get a keyword category and are asked again next time"""
+    model = FakeModel(fail=True)
+    agent = make_agent(monkeypatch, model)
+    matched = agent.execute_many(RECEIPTS + [[{"raw_name": "ONBEKEND", "price": 1.0, "quantity": 1}]])
+
+    assert [item["category"] for item in matched[1]] == ["Snacks", "Snacks"]
+    assert matched[1][0]["product_name"] == "LAYS PAPRIKA" and matched[1][0]["match_tier"] == "keyword"
+    assert matched[2][0]["category"] == "Uncategorized"
+    assert agent.last_stats["keyword"] == 4 and agent.last_stats["unmatched"] == 1
+    agent.execute_many(RECEIPTS)
+    assert len(model.calls) == 2
+
+
+def test_without_a_model_unknowns_stay_local(monkeypatch):
+    """No model configured: unknown names are classified by keyword without any call"""
+    agent = make_agent(monkeypatch)
+    matched = agent.execute(RECEIPTS[0] + [{"raw_name": "ONBEKEND", "price": 1.0, "quantity": 1}])
+    assert [item["match_tier"] for item in matched] == ["local", "keyword", "keyword", "unmatched"]
+    assert agent.last_stats["llm_calls"] == 0
+
+
+def test_prompt_offers_the_classifier_taxonomy(monkeypatch):
+    """The model is asked for the same categories the classifier and budgets use"""
+    model = FakeModel()
+    agent = make_agent(monkeypatch, model)
+    agent.execute(RECEIPTS[1])
+    enum = model.configs[0]["response_schema"]["items"]["properties"]["category"]["enum"]
+    assert {"Alcohol", "Snacks", "Fruit", "Dairy", "Vegetables", "Other"} <= set(enum)
@@ -0,0 +1,80 @@
+"""
+Test suite for the local catalogue snapshot
+"""
+from benchmarks.stubs import serve_ah_search, load_ah_search_pages
+from tools.catalogue_store import CatalogueStore, fts_query
+from tools.http_client import HttpClient, ResponseStore, build_session
+from tools.scraper import CatalogueScraper
+import tools.scraper as scraper_module
+
+
+def no_llm_config():
+    raise ValueError("GOOGLE_API_KEY not set")
+
+
+def test_ingested_pages_are_searchable(tmp_path):
+    """Saved pages are ingested once per product and found by word prefixes"""
+    store = CatalogueStore(tmp_path / "catalogue.sqlite3")
+    pages = load_ah_search_pages()
+    written = store.ingest_pages(pages.values())
+    assert written > 50
+    store.ingest_pages(pages.values())
+    assert store.stats()["products"] == written, "Re-ingesting should update, not duplicate"
+
+    products = {p["name"]: p for p in store.search("halfv melk", limit=5)}
+    assert products["AH Halfvolle melk"]["price_without_membership"] == 1.19
+    assert all("halfvolle" in name.lower() for name in products)
+    assert store.search("Heineken")[0]["category"] == store.find("heineken pilsener")["category"]
+    assert "AH Tijgerbrood wit heel" in [p["name"] for p in store.search("brood", limit=20)], \
+        "Words inside Dutch compounds should be found"
+    assert store.search("onbekend product") == []
+    assert store.search("  ") == [] and fts_query('melk "1l"') == '"melk"* "1l"*'
+
+    assert CatalogueStore(tmp_path / "catalogue.sqlite3").stats()["products"] == written, \
+        "The snapshot should survive reopening"
+
+
+def test_scraper_searches_snapshot_before_the_network(monkeypatch):
+    """Snapshot hits never reach ah.nl; scraped misses are added to the snapshot"""
+    monkeypatch.setattr(scraper_module, "get_llm_config", no_llm_config)
+    pages = load_ah_search_pages()
+    store = CatalogueStore(":memory:")
+    store.ingest_pages([pages["melk"]])
+
+    with serve_ah_search({"kaas": pages["kaas"]}) as stand_in:
+        client = HttpClient(session=build_session(retries=0), store=ResponseStore(":memory:"))
+        scraper = CatalogueScraper(http_client=client, search_cache=False, catalogue=store)
+
+        assert len(scraper.search_products_google("halfvolle melk", max_results=3)) == 3
+        assert stand_in.requests == 0, "A snapshot hit should not fetch"
+
+        assert len(scraper.search_products_google("kaas", max_results=5)) == 5
+        assert stand_in.requests == 1
+        assert store.search("kaas"), "Scraped products should be added to the snapshot"
+
+    assert scraper.find_product("BAP WIT")["name"] == "Bananas White (Fairtrade)"
+    match = scraper.find_product("AH VOLLE MELK")
+    assert match == {"name": "AH Volle melk", "category": "Dairy", "price": 1.29, "is_bonus": False}
+    assert scraper.find_product("NONEXISTENT") is None
+
+
+def test_scraper_opens_shared_stores_on_first_use(monkeypatch):
+    """Building a scraper opens no cache or snapshot; the shared ones are acquired when needed"""
+    opened = []
+
+    def shared(name, value):
+        def get():
+            opened.append(name)
+            return value
+        return get
+
+    store = CatalogueStore(":memory:")
+    monkeypatch.setattr(scraper_module, "get_search_cache", shared("search", False))
+    monkeypatch.setattr(scraper_module, "get_translation_cache", shared("translation", False))
+    monkeypatch.setattr(scraper_module, "get_catalogue_store", shared("catalogue", store))
+    scraper = CatalogueScraper()
+    assert opened == []
+
+    assert scraper.catalogue is store and scraper.catalogue is store
+    assert opened == ["catalogue"], "The shared snapshot should be acquired once"
+    assert CatalogueScraper(catalogue=False).catalogue is None
@@ -0,0 +1,49 @@
+"""
+Test suite for the compiled keyword category classifier
+"""
+import pytest
+
+from tools.budget_evaluator import BudgetEvaluator
+from tools.category_classifier import CategoryClassifier, get_category_classifier
+
+
+def test_bundled_taxonomy_classifies_common_products():
+    classifier = get_category_classifier()
+    assert classifier.classify("Hertog Jan Pilsener bier") == "Alcohol"
+    assert classifier.classify("Lay's Naturel chips") == "Snacks"
+    assert classifier.classify("AH Tijgerbrood") == "Bakery", "Keywords match inside compounds"
+    assert classifier.classify("AH Halfvolle melk") == "Dairy"
+    assert classifier.classify("AH Afwasmiddel") == "Household"
+    assert classifier.classify("Cadeaukaart") == "Other"
+    assert classifier.classify("") == "Other"
+
+
+def test_budget_categories_are_in_the_taxonomy():
+    """Everything BudgetEvaluator budgets for can be produced by the classifier"""
+    assert set(BudgetEvaluator().budgets) <= set(get_category_classifier().categories)
+
+
+def test_longest_keyword_whole_words_and_priority():
+    classifier = CategoryClassifier({"fallback": "Other", "categories": [
+        {"category": "Alcohol", "contains": ["bier"], "words": ["gin"]},
+        {"category": "Snacks", "contains": ["pinda"]},
+        {"category": "Pantry", "contains": ["pindakaas"]},
+        {"category": "Vegetables", "contains": ["aubergine"]},
+    ]})
+    assert classifier.classify("Pindakaas") == "Pantry", "The longest keyword at a position wins"
+    assert classifier.classify("Gezouten pinda's") == "Snacks"
+    assert classifier.classify("Aubergine") == "Vegetables", "Whole-word keywords don't match inside words"
+    assert classifier.classify("Gin tonic") == "Alcohol"
+    assert classifier.classify("Pindakaas met bier") == "Alcohol", "The category listed first wins"
+
+
+def test_classify_many_keeps_order_and_matches_classify():
+    classifier = get_category_classifier()
+    names = ["AH Bananen", "Heineken", "AH Bananen", "Onbekend", "AH Kipfilet"]
+    assert classifier.classify_many(names) == [classifier.classify(name) for name in names]
+
+
+def test_keyword_in_two_categories_is_rejected():
+    with pytest.raises(ValueError):
+        CategoryClassifier({"categories": [{"category": "A", "contains": ["melk"]},
+                                           {"category": "B", "words": ["melk"]}]})
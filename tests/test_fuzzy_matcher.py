@@ -0,0 +1,76 @@
+"""
+Test suite for the fuzzy receipt-abbreviation matcher
+"""
+import random
+
+from agents.catalogue_matcher import CatalogueAgent
+from tools.catalogue_store import CatalogueStore
+from tools.fuzzy_matcher import FuzzyMatcher, normalize_name, trigrams
+import tools.scraper as scraper_module
+
+
+def no_llm_config():
+    raise ValueError("GOOGLE_API_KEY not set")
+
+
+PRODUCTS = ["AH Halfvolle melk", "AH Biologisch Halfvolle melk", "AH Volle melk", "AH Volkorenbrood heel",
+            "AH Jong belegen kaas 48+ plakken", "Hertog Jan Pilsener", "AH Elstar appels"]
+
+
+def test_receipt_names_are_normalized():
+    """Sizes, counts and fat classes are dropped and abbreviations expanded"""
+    assert normalize_name("2 AH HALFV MLK 1L") == "ah halfvolle melk"
+    assert normalize_name("HERTOG JAN 6X30CL") == "hertog jan"
+    assert normalize_name("AH KAAS JONG 48+") == "ah kaas jong"
+    assert normalize_name("BAP WIT 2ST") == "bap wit"
+    assert normalize_name("1234") == ""
+
+
+def test_match_many_ranks_thresholds_and_deduplicates():
+    """Each name gets its best product and score, in order; weak matches are rejected"""
+    matcher = FuzzyMatcher(((name, name) for name in PRODUCTS), threshold=0.5)
+    results = matcher.match_many(["AH HALFV MELK", "AH BIO HALFV MLK", "ONBEKEND ARTIKEL", "AH HALFV MELK"])
+
+    assert [r["product"] for r in results] == [
+        "AH Halfvolle melk", "AH Biologisch Halfvolle melk", None, "AH Halfvolle melk"]
+    assert results[0]["score"] == 1.0 and results[0] == results[3]
+    assert results[0] is not results[3], "Repeated names should get their own dicts"
+    assert results[2]["score"] < 0.5
+    assert matcher.match("ONBEKEND ARTIKEL", threshold=0.0)["product"] is not None
+    assert matcher.match_many(["AH HALFV MELK"], threshold=1.01)[0]["product"] is None
+
+
+def test_index_pruning_matches_a_full_scan():
+    """Candidates from the rarest trigrams give the same best score as scoring every product"""
+    rng = random.Random(3)
+    words = ["melk", "kaas", "jong", "belegen", "halfvolle", "brood", "wit", "bruin", "appels", "sap", "bio"]
+    names = [" ".join(rng.sample(words, 3)) for _ in range(500)]
+    matcher = FuzzyMatcher((name, name) for name in names)
+    for _ in range(100):
+        query = " ".join(rng.sample(words, rng.randint(1, 4)))
+        q = trigrams(normalize_name(query))
+        best = max(2 * len(q & p) / (len(q) + len(p)) for p in (trigrams(normalize_name(n)) for n in names))
+        for threshold in (0.3, 0.6, 0.9):
+            result = matcher.match(query, threshold)
+            if best >= threshold:
+                assert result["score"] == round(best, 4)
+            else:
+                assert result["product"] is None
+
+
+def test_catalogue_agent_matches_abbreviated_receipt_lines(monkeypatch):
+    """Receipt lines that differ from the catalogue names are still matched"""
+    monkeypatch.setattr(scraper_module, "get_llm_config", no_llm_config)
+    monkeypatch.setattr(scraper_module, "get_catalogue_store", lambda: CatalogueStore(":memory:"))
+    agent = CatalogueAgent()
+    agent.scraper.catalogue.add_products([{"name": name, "category": "Dairy", "price_without_membership": 1.19}
+                                          for name in PRODUCTS[:3]])
+
+    matched = agent.execute([
+        {"raw_name": "BAP WIT 2ST", "price": 3.58, "quantity": 2},
+        {"raw_name": "AH HALFV MELK", "price": 1.19, "quantity": 1},
+        {"raw_name": "ONBEKEND", "price": 2.50, "quantity": 1},
+    ])
+    assert [item["product_name"] for item in matched] == ["Bananas White (Fairtrade)", "AH Halfvolle melk", "ONBEKEND"]
+    assert [item["category"] for item in matched] == ["Fruit", "Dairy", "Uncategorized"]
+    assert matched[1]["match_score"] == 1.0
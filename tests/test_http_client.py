@@ -0,0 +1,43 @@
+"""
+Test suite for the pooled, revalidating HTTP client
+"""
+from benchmarks.stubs import serve_ah_search, load_ah_search_pages
+from tools.http_client import HttpClient, ResponseStore, build_session
+from tools.scraper import CatalogueScraper
+
+
+def test_http_client_revalidates_stored_pages(tmp_path):
+    """A page seen before comes back from the store after a bodiless 304"""
+    pages = load_ah_search_pages()
+    with serve_ah_search() as stand_in:
+        client = HttpClient(session=build_session(retries=0), store=ResponseStore(tmp_path / "responses.sqlite3"))
+        url = f"{stand_in.base_url}/zoeken?query=melk"
+
+        first = client.get(url)
+        assert not first.revalidated
+        assert first.content == pages["melk"], "Compressed body should be decoded"
+        assert 0 < first.wire_bytes < len(pages["melk"]), "Body should be compressed on the wire"
+
+        second = client.get(url)
+        assert second.revalidated, "Unchanged page should be revalidated"
+        assert second.content == pages["melk"]
+        assert second.wire_bytes == 0
+        assert stand_in.not_modified == 1
+        assert stand_in.connections == 1, "Requests should reuse one keep-alive connection"
+        assert client.stats() == {"requests": 2, "revalidated": 1, "wire_bytes": first.wire_bytes}
+
+
+def test_scraper_uses_pooled_client(tmp_path):
+    """search_products_web_scrape reads products through the injected client"""
+    with serve_ah_search() as stand_in:
+        client = HttpClient(session=build_session(retries=0), store=ResponseStore(":memory:"))
+        scraper = CatalogueScraper(http_client=client, catalogue=False)
+        assert scraper.base_url == stand_in.base_url
+
+        products = scraper.search_products_web_scrape("melk", max_results=5)
+        assert len(products) == 5
+        assert all("melk" in p["name"].lower() for p in products)
+
+        assert scraper.search_products_web_scrape("melk", max_results=5) == products
+        assert client.stats()["revalidated"] == 1
+        assert scraper.search_products_web_scrape("onbekend") == [], "404 should return no products"
@@ -0,0 +1,63 @@
+"""
+Test suite for receipt image preprocessing
+"""
+import io
+import os
+
+from PIL import Image
+
+from tools.parser import ImagePreprocessor
+
+
+def noisy_image(width, height):
+    """Random noise, which JPEG cannot compress well"""
+    return Image.frombytes("L", (width, height), os.urandom(width * height))
+
+
+def test_exif_rotation_is_applied(tmp_path):
+    """A photo tagged as rotated is turned upright before it is sent"""
+    path = tmp_path / "rotated.jpg"
+    exif = Image.Exif()
+    exif[0x0112] = 6  # Rotate 90 degrees clockwise to display
+    Image.new("L", (120, 200), 255).save(path, exif=exif)
+
+    result = ImagePreprocessor(crop=False).process(str(path))
+    assert result["stats"]["skipped"] is False, "Rotated images must not take the skip path"
+    assert result["stats"]["size"] == (200, 120)
+    assert Image.open(io.BytesIO(result["part"]["data"])).size == (200, 120)
+
+
+def test_output_fits_target_bytes_and_long_edge(tmp_path):
+    """Large photos are downscaled and re-encoded under both limits"""
+    path = tmp_path / "large.png"
+    noisy_image(1600, 1200).save(path)
+    preprocessor = ImagePreprocessor(max_long_edge=800, target_bytes=60 * 1024, crop=False)
+
+    result = preprocessor.process(str(path))
+    assert max(result["stats"]["size"]) <= 800
+    assert result["stats"]["sent_bytes"] == len(result["part"]["data"]) <= 60 * 1024
+    assert result["part"]["mime_type"] == "image/jpeg"
+    assert max(Image.open(io.BytesIO(result["part"]["data"])).size) <= 800
+
+
+def test_receipt_box_is_found_on_synthetic_photo():
+    """The bright paper on a dark background is cropped, with no margin"""
+    image = Image.new("L", (400, 400), 30)
+    image.paste(255, (100, 50, 300, 350))
+
+    box = ImagePreprocessor(crop_margin=0)._receipt_box(image)
+    assert box is not None
+    assert all(abs(found - expected) <= 4 for found, expected in zip(box, (100, 50, 300, 350)))
+    assert ImagePreprocessor()._receipt_box(Image.new("L", (400, 400), 255)) is None, \
+        "A uniform image has no receipt to crop to"
+
+
+def test_small_upright_image_is_sent_as_is(tmp_path):
+    """Images already within the limits skip re-encoding"""
+    path = tmp_path / "small.png"
+    Image.new("L", (300, 500), 255).save(path)
+
+    result = ImagePreprocessor(max_long_edge=1024, target_bytes=100 * 1024).process(str(path))
+    assert result["stats"]["skipped"] is True
+    assert result["stats"]["sent_bytes"] == result["stats"]["original_bytes"] == path.stat().st_size
+    assert isinstance(result["part"], Image.Image) and result["part"].size == (300, 500)
@@ -0,0 +1,245 @@
+"""
+Test suite for the shared model registry
+"""
+from config.model_registry import ModelRegistry
+import config.model_registry as model_registry
+
+
+class FakeModelInfo:
+    def __init__(self, name):
+        self.name = name
+        self.supported_generation_methods = ['generateContent']
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_discovery_is_cached_until_ttl(monkeypatch):
+    """Discovery runs once per TTL window and strips the 'models/' prefix"""
+    calls = []
+
+    def fake_list_models():
+        calls.append(1)
+        return [FakeModelInfo('models/gemini-1.5-flash'), FakeModelInfo('models/gemini-1.5-pro')]
+
+    monkeypatch.setattr(model_registry.genai, 'list_models', fake_list_models)
+    clock = FakeClock()
+    registry = ModelRegistry(ttl=60, clock=clock)
+
+    for _ in range(10):
+        assert registry.available_models() == ['gemini-1.5-flash', 'gemini-1.5-pro']
+    assert len(calls) == 1, "Discovery should be cached"
+
+    clock.now = 61
+    registry.available_models()
+    assert len(calls) == 2, "Discovery should rerun after the TTL"
+
+
+def test_failed_discovery_is_retried_soon_and_keeps_last_list(monkeypatch):
+    """A discovery error is not cached for the full TTL and does not wipe the known models"""
+    responses = [[FakeModelInfo('models/gemini-1.5-flash')], RuntimeError('network down'),
+                 RuntimeError('network down'), [FakeModelInfo('models/gemini-1.5-pro')]]
+
+    def fake_list_models():
+        response = responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    monkeypatch.setattr(model_registry.genai, 'list_models', fake_list_models)
+    clock = FakeClock()
+    registry = ModelRegistry(ttl=3600, failure_ttl=30, clock=clock)
+
+    assert registry.available_models() == ['gemini-1.5-flash']
+    clock.now = 3600
+    assert registry.available_models() == ['gemini-1.5-flash'], "Last good list should survive a failure"
+    clock.now = 3629
+    registry.available_models()
+    assert len(responses) == 2, "Failure should be cached for failure_ttl only"
+    clock.now = 3630
+    assert registry.available_models() == ['gemini-1.5-flash']
+    clock.now = 3660
+    assert registry.available_models() == ['gemini-1.5-pro'], "Discovery should recover after the failure TTL"
+
+    empty = ModelRegistry(failure_ttl=30, clock=FakeClock())
+    monkeypatch.setattr(model_registry.genai, 'list_models', lambda: (_ for _ in ()).throw(RuntimeError('down')))
+    assert empty.available_models() == []
+
+
+def test_dead_models_are_skipped_until_cooldown(monkeypatch):
+    """Models that keep failing drop out of the candidate list"""
+    monkeypatch.setattr(model_registry.genai, 'list_models', lambda: [
+        FakeModelInfo('models/gemini-1.5-flash'), FakeModelInfo('models/gemini-1.5-pro')])
+    clock = FakeClock()
+    registry = ModelRegistry(ttl=60, failure_threshold=2, cooldown=30, clock=clock)
+
+    assert registry.candidates(['gemini-1.5-flash'])[0] == 'gemini-1.5-flash'
+    registry.record_failure('models/gemini-1.5-flash', '404')
+    assert registry.candidates(['gemini-1.5-flash'])[0] == 'gemini-1.5-flash', "One failure is tolerated"
+    registry.record_failure('gemini-1.5-flash', '404')
+    assert registry.candidates(['gemini-1.5-flash']) == ['gemini-1.5-pro']
+
+    clock.now = 31
+    assert registry.candidates(['gemini-1.5-flash'])[0] == 'gemini-1.5-flash', "Cooldown should expire"
+
+    registry.record_success('gemini-1.5-flash')
+    assert registry.health()['gemini-1.5-flash']['consecutive_failures'] == 0
+
+
+def test_model_handles_are_shared(monkeypatch):
+    """The same handle is returned for the same model and config"""
+    monkeypatch.setattr(model_registry.genai, 'list_models', lambda: [])
+    registry = ModelRegistry()
+    assert registry.get_model('models/gemini-1.5-flash') is registry.get_model('gemini-1.5-flash')
+    assert registry.candidates(['gemini-1.5-flash', 'gemini-pro']) == ['gemini-1.5-flash', 'gemini-pro']
+
+
+def test_token_bucket_limits_rate():
+    """After the burst is spent, callers wait one interval per token"""
+    clock = FakeClock()
+    waits = []
+
+    def fake_sleep(seconds):
+        waits.append(seconds)
+        clock.now += seconds
+
+    bucket = model_registry.TokenBucket(rate=10, capacity=2, clock=clock, sleep=fake_sleep)
+    for _ in range(4):
+        bucket.acquire()
+
+    assert len(waits) == 2, "Only calls beyond the burst should wait"
+    assert abs(clock.now - 0.2) < 1e-9, "Two extra tokens at 10/s should take 0.2s"
+
+
+def test_async_throttle_shares_concurrency_slots(monkeypatch):
+    """Coroutines never exceed the per-model cap, and the slot is shared with sync callers"""
+    import asyncio
+
+    monkeypatch.setattr(model_registry.genai, 'list_models', lambda: [])
+    registry = ModelRegistry(max_concurrency=2)
+    active = []
+    peak = []
+
+    async def call():
+        async with registry.athrottle('gemini-1.5-flash'):
+            active.append(1)
+            peak.append(len(active))
+            await asyncio.sleep(0.01)
+            active.pop()
+
+    async def main():
+        await asyncio.gather(*(call() for _ in range(6)))
+
+    asyncio.run(main())
+    assert max(peak) == 2, "At most max_concurrency calls should run at once"
+    with registry.throttle('models/gemini-1.5-flash'):
+        pass  # Every async slot was released
+
+
+def test_shared_working_model_is_picked_once_and_replaced_when_dead(monkeypatch):
+    """Every caller gets the same pick until that model starts failing"""
+    calls = []
+
+    def fake_list_models():
+        calls.append(1)
+        return [FakeModelInfo('models/gemini-1.5-flash'), FakeModelInfo('models/gemini-1.5-pro')]
+
+    monkeypatch.setattr(model_registry.genai, 'list_models', fake_list_models)
+    monkeypatch.setattr(model_registry.genai, 'GenerativeModel', lambda name, **kwargs: ('model', name))
+    registry = ModelRegistry(failure_threshold=1)
+    assert not calls, "Building the registry should not discover"
+
+    picks = [registry.shared_working_model(['gemini-1.5-flash']) for _ in range(5)]
+    assert picks == [('gemini-1.5-flash', ('model', 'gemini-1.5-flash'))] * 5
+    assert len(calls) == 1
+    registry.record_failure('gemini-1.5-flash', '404')
+    assert registry.shared_working_model(['gemini-1.5-flash'])[0] == 'gemini-1.5-pro'
+
+
+def test_scrapers_build_without_discovery_and_share_the_model(monkeypatch):
+    """Constructing scrapers and agents does no model I/O; the first use discovers once for all"""
+    import tools.scraper as scraper_module
+    from agents.catalogue_matcher import CatalogueAgent
+    from tools.catalogue_store import CatalogueStore
+
+    calls = []
+
+    def fake_list_models():
+        calls.append(1)
+        return [FakeModelInfo('models/gemini-1.5-flash')]
+
+    monkeypatch.setattr(model_registry.genai, 'list_models', fake_list_models)
+    monkeypatch.setattr(model_registry.genai, 'GenerativeModel', lambda name, **kwargs: object())
+    monkeypatch.setattr(model_registry, '_model_registry', ModelRegistry())
+    monkeypatch.setattr(scraper_module, 'get_llm_config', lambda: object())
+    monkeypatch.setattr(scraper_module, 'get_catalogue_store', lambda: CatalogueStore(':memory:'))
+
+    scrapers = [scraper_module.CatalogueScraper(search_cache=False) for _ in range(3)]
+    scrapers.append(CatalogueAgent().scraper)
+    assert not calls
+
+    models = {id(scraper._working_model) for scraper in scrapers}
+    assert len(models) == 1 and len(calls) == 1
+    assert scrapers[0]._working_model_name == 'gemini-1.5-flash'
+
+
+def test_model_slots_hand_over_between_threads_and_coroutines():
+    """A coroutine waits for a slot a thread holds without polling; a cancelled wait gives its slot back"""
+    import asyncio
+    import threading
+
+    slots = model_registry.ModelSlots(1)
+    slots.acquire()
+
+    async def main():
+        waiting = asyncio.ensure_future(slots.aacquire())
+        await asyncio.sleep(0.01)
+        assert not waiting.done()
+        threading.Timer(0.02, slots.release).start()
+        await asyncio.wait_for(waiting, 1)
+
+        cancelled = asyncio.ensure_future(slots.aacquire())
+        await asyncio.sleep(0.01)
+        cancelled.cancel()
+        slots.release()
+        await asyncio.sleep(0.01)
+
+    asyncio.run(main())
+    assert slots.acquire(blocking=False), "Neither the handed-over nor the cancelled wait should leak a slot"
+    slots.release()
+
+
+def test_shared_working_model_discovers_outside_the_registry_lock(monkeypatch):
+    """Health calls go through while discovery is running, and concurrent callers still discover once"""
+    import threading
+
+    started, finish = threading.Event(), threading.Event()
+    calls = []
+
+    def slow_list_models():
+        calls.append(1)
+        started.set()
+        finish.wait(2)
+        return [FakeModelInfo('models/gemini-1.5-flash')]
+
+    monkeypatch.setattr(model_registry.genai, 'list_models', slow_list_models)
+    monkeypatch.setattr(model_registry.genai, 'GenerativeModel', lambda name, **kwargs: ('model', name))
+    registry = ModelRegistry()
+    picks = []
+    threads = [threading.Thread(target=lambda: picks.append(registry.shared_working_model(['gemini-1.5-flash'])))
+               for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    assert started.wait(2)
+
+    registry.record_success('gemini-1.5-pro')  # Would block if discovery held the registry lock
+    finish.set()
+    for thread in threads:
+        thread.join(2)
+    assert len(calls) == 1
+    assert picks == [('gemini-1.5-flash', ('model', 'gemini-1.5-flash'))] * 4
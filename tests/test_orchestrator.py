@@ -0,0 +1,51 @@
+"""
+Test suite for the async orchestrator pipeline
+"""
+import asyncio
+import threading
+
+from agents.base import Agent
+from agents.orchestrator import OrchestratorAgent
+
+
+class ThreadRecordingAgent(Agent):
+    """Agent whose execute records the thread it ran on and passes its input through"""
+
+    def __init__(self, name, threads):
+        super().__init__(name=name)
+        self.threads = threads
+
+    def execute(self, input_data, suffix=None):
+        self.threads[self.name] = threading.get_ident()
+        return input_data if suffix is None else input_data + suffix
+
+
+class FakeReceiptAgent(Agent):
+    async def aexecute(self, file_path):
+        return {"items": [file_path], "cache_hit": False}
+
+
+def test_aexecute_runs_blocking_steps_off_the_event_loop():
+    """Matching, finance and analysis run in worker threads, so one receipt does not stall the loop"""
+    threads = {}
+    orchestrator = OrchestratorAgent.__new__(OrchestratorAgent)
+    Agent.__init__(orchestrator, name="Orchestrator")
+    orchestrator.receipt_agent = FakeReceiptAgent(name="ReceiptProcessor")
+    orchestrator.catalogue_agent = ThreadRecordingAgent("CatalogueMatcher", threads)
+    orchestrator.finance_agent = ThreadRecordingAgent("FinanceManager", threads)
+    orchestrator.analyst_agent = ThreadRecordingAgent("Analyst", threads)
+
+    async def run():
+        return threading.get_ident(), await orchestrator.aexecute("receipt.jpg")
+
+    loop_thread, summary = asyncio.run(run())
+    assert summary == ["receipt.jpg"]
+    assert orchestrator.matched_items == ["receipt.jpg"] and orchestrator.finance_data == ["receipt.jpg"]
+    assert set(threads) == {"CatalogueMatcher", "FinanceManager", "Analyst"}
+    assert loop_thread not in threads.values()
+
+
+def test_arun_passes_keyword_arguments_like_run():
+    threads = {}
+    agent = ThreadRecordingAgent("Echo", threads)
+    assert asyncio.run(agent.arun("melk", suffix="!")) == agent.run("melk", suffix="!") == "melk!"
@@ -0,0 +1,95 @@
+"""
+Test suite for the embedding product matcher
+"""
+import numpy as np
+import pytest
+
+from agents.catalogue_matcher import CatalogueAgent
+from tools.catalogue_store import CatalogueStore
+from tools.product_matcher import HashingEmbedder, ProductMatcher
+import tools.scraper as scraper_module
+
+
+def no_llm_config():
+    raise ValueError("GOOGLE_API_KEY not set")
+
+
+PRODUCTS = ["AH Halfvolle melk", "AH Biologisch Halfvolle melk", "AH Volle melk", "AH Volkorenbrood heel",
+            "AH Jong belegen kaas 48+ plakken", "Hertog Jan Pilsener", "AH Elstar appels"]
+
+
+def test_hashing_embedder_gives_stable_unit_vectors():
+    """Vectors are float32 unit rows, identical across instances, zero for names without words"""
+    vectors = HashingEmbedder().embed(["AH HALFV MELK 1L", "ah halfvolle melk", "1234"])
+    assert vectors.dtype == np.float32 and vectors.shape == (3, HashingEmbedder().dim)
+    assert np.allclose(np.linalg.norm(vectors[:2], axis=1), 1.0)
+    assert np.array_equal(vectors[0], vectors[1]), "Sizes and abbreviations should be normalized away"
+    assert not vectors[2].any()
+    assert np.array_equal(HashingEmbedder().embed(["Hertog Jan"]), HashingEmbedder().embed(["Hertog Jan"]))
+
+
+def test_match_many_ranks_thresholds_and_deduplicates():
+    """Each name gets its best product, score and top-k candidates, in order"""
+    matcher = ProductMatcher(((name, name) for name in PRODUCTS), threshold=0.6)
+    results = matcher.match_many(["AH HALFV MELK", "AH BIO HALFV MLK", "ONBEKEND ARTIKEL", "AH HALFV MELK"], k=3)
+
+    assert [r["product"] for r in results] == [
+        "AH Halfvolle melk", "AH Biologisch Halfvolle melk", None, "AH Halfvolle melk"]
+    assert results[0]["score"] == pytest.approx(1.0, abs=1e-4) and results[0] == results[3]
+    assert results[0] is not results[3], "Repeated names should get their own dicts"
+    assert [score for _, score in results[1]["candidates"]] == sorted(
+        (score for _, score in results[1]["candidates"]), reverse=True)
+    assert len(results[1]["candidates"]) == 3
+    assert results[2]["score"] < 0.6
+    assert matcher.match("ONBEKEND ARTIKEL", threshold=-1.0)["product"] is not None
+
+
+def test_top_k_matches_a_full_sort():
+    """Chunked argpartition top-k agrees with sorting every score"""
+    names = [f"product {a} {b}" for a in ("melk", "kaas", "brood", "sap") for b in range(40)]
+    matcher = ProductMatcher((name, name) for name in names)
+    queries = ["MELK 7", "KAAS", "BROOD 33", "SAP 1"]
+    indices, scores = matcher.top_k(queries, k=5)
+    full = matcher.embedder.embed(queries) @ matcher.vectors.T
+    for row, expected in zip(scores, full):
+        assert np.allclose(row, np.sort(expected)[::-1][:5], atol=1e-6)
+    assert np.allclose(np.take_along_axis(full, indices, axis=1), scores)
+
+
+def test_save_and_memory_mapped_load(tmp_path):
+    """A saved matcher loads with its vectors memory-mapped and matches the same"""
+    products = [{"name": name, "category": "Dairy"} for name in PRODUCTS]
+    matcher = ProductMatcher((p["name"], p) for p in products)
+    matcher.save(tmp_path / "vectors")
+
+    loaded = ProductMatcher.load(tmp_path / "vectors")
+    assert isinstance(loaded.vectors, np.memmap)
+    assert loaded.match_many(["AH HALFV MELK", "HERTOG JAN 6X30CL"]) == matcher.match_many(
+        ["AH HALFV MELK", "HERTOG JAN 6X30CL"])
+    with pytest.raises(ValueError):
+        ProductMatcher.load(tmp_path / "vectors", embedder=HashingEmbedder(dim=256))
+
+
+def test_catalogue_agent_uses_the_embedding_matcher(monkeypatch):
+    """CATALOGUE_MATCHER=embedding matches a receipt against the snapshot in one batch"""
+    monkeypatch.setattr(scraper_module, "get_llm_config", no_llm_config)
+    monkeypatch.setattr(scraper_module, "get_catalogue_store", lambda: CatalogueStore(":memory:"))
+    monkeypatch.setenv("CATALOGUE_MATCHER", "embedding")
+    agent = CatalogueAgent()
+    agent.scraper.catalogue.add_products([{"name": name, "category": "Dairy", "price_without_membership": 1.19}
+                                          for name in PRODUCTS[:3]])
+
+    matched = agent.execute([
+        {"raw_name": "BAP WIT 2ST", "price": 3.58, "quantity": 2},
+        {"raw_name": "AH HALFV MELK", "price": 1.19, "quantity": 1},
+        {"raw_name": "ONBEKEND", "price": 2.50, "quantity": 1},
+    ])
+    assert isinstance(agent.scraper._product_matcher(), ProductMatcher)
+    assert [item["product_name"] for item in matched] == ["Bananas White (Fairtrade)", "AH Halfvolle melk", "ONBEKEND"]
+    assert [item["category"] for item in matched] == ["Fruit", "Dairy", "Uncategorized"]
+
+
+def test_unknown_matcher_is_rejected(monkeypatch):
+    monkeypatch.setattr(scraper_module, "get_llm_config", no_llm_config)
+    with pytest.raises(ValueError):
+        scraper_module.CatalogueScraper(catalogue=False, search_cache=False, matcher="neural")
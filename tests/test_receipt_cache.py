@@ -0,0 +1,41 @@
+"""
+Test suite for the content-addressed receipt cache
+"""
+from tools.receipt_cache import ReceiptCache
+
+
+def test_receipt_cache_round_trip(tmp_path):
+    """Cached OCR text and items come back for the same bytes and fingerprint"""
+    cache = ReceiptCache(tmp_path / "cache.sqlite3")
+    key = ReceiptCache.make_key(b"BAP WIT 1,79", "fp-1")
+    items = [{"raw_name": "BAP WIT", "price": 1.79, "quantity": 1}]
+
+    assert cache.get(key) is None, "Empty cache should miss"
+    cache.put(key, "BAP WIT 1,79", items)
+
+    cached = cache.get(key)
+    assert cached["items"] == items
+    assert cached["receipt_text"] == "BAP WIT 1,79"
+    assert ReceiptCache.make_key(b"BAP WIT 1,79", "fp-2") != key, "Fingerprint should be part of the key"
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+    # Survives reopening
+    assert ReceiptCache(tmp_path / "cache.sqlite3").get(key)["items"] == items
+
+    cache.invalidate(key)
+    assert cache.get(key) is None, "Invalidated entry should miss"
+
+
+def test_receipt_cache_evicts_least_recently_used(tmp_path):
+    """Older entries are evicted once the size budget is exceeded"""
+    cache = ReceiptCache(tmp_path / "cache.sqlite3", max_bytes=200)
+    items = [{"raw_name": "X" * 40, "price": 1.0, "quantity": 1}]
+
+    cache.put("a", "", items)
+    cache.put("b", "", items)
+    assert cache.get("a") is not None  # "a" becomes most recently used
+    cache.put("c", "", items)
+
+    assert cache.get("b") is None, "Least recently used entry should be evicted"
+    assert cache.get("a") is not None
+    assert cache.get("c") is not None
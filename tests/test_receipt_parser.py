@@ -0,0 +1,303 @@
+"""
+Test suite for the local Albert Heijn receipt grammar
+"""
+import time
+
+from tools.parser import parse_ah_receipt_lines, parse_receipt_date, iter_json_array_items
+import tools.parser as parser_module
+
+
+class FakeLLMConfig:
+    """Stands in for LLMConfig without configuring the real SDK or the global config"""
+    model_name = "gemini-1.5-flash"
+
+
+RECEIPT = """ALBERT HEIJN
+AANTAL OMSCHRIJVING PRIJS BEDRAG
+BONUSKAART xx0421
+BAP WIT 1,79
+2 AH HALFV MELK 1,19 2,38
+AH KAAS JONG 48+ 4,29
+BONUS AH KAAS JONG -0,86
+AH TROSTOMATEN
+ 0,652 KG x 3,49 EUR/KG 2,28
+TOTAAL 9,88
+PINNEN 9,88
+"""
+
+
+def test_ah_grammar_extracts_items_totals_and_discounts():
+    """Item lines, quantities, totals and discounts are parsed locally"""
+    result = parse_ah_receipt_lines(RECEIPT)
+
+    names = [item["raw_name"] for item in result["items"]]
+    assert names == ["BAP WIT", "AH HALFV MELK", "AH KAAS JONG 48+"]
+    assert result["items"][0]["price"] == 1.79
+    assert result["items"][1]["quantity"] == 2, "Quantity prefix should be read"
+    assert result["items"][1]["price"] == 2.38, "Price should be the line amount"
+    assert result["items"][2]["discount"] == 0.86, "Discount should attach to the previous item"
+    assert result["discounts"] == [{"description": "BONUS AH KAAS JONG", "amount": 0.86}]
+    assert result["totals"] == {"totaal": 9.88}
+
+
+def test_ah_grammar_forwards_low_confidence_lines():
+    """Weighed goods are left for the LLM together with their name line"""
+    result = parse_ah_receipt_lines(RECEIPT)
+
+    assert result["unparsed_lines"] == ["AH TROSTOMATEN", "0,652 KG x 3,49 EUR/KG 2,28"]
+    assert result["candidate_lines"] == 6
+    assert result["fast_path_lines"] == 5
+
+
+def test_purchase_date_is_read_day_first():
+    """Dutch day-first and ISO dates are found; amounts and impossible dates are not"""
+    assert parse_receipt_date(RECEIPT + "12-10-2025 14:21 POS 3\n") == "2025-10-12"
+    assert parse_receipt_date("DATUM 3/1/26") == "2026-01-03"
+    assert parse_receipt_date("31-02-2026\n2026-02-28") == "2026-02-28"
+    assert parse_receipt_date(RECEIPT) is None
+
+
+def test_discount_after_forwarded_item_goes_to_the_llm():
+    """A discount below a line the fast path rejected is not attached to an earlier item"""
+    result = parse_ah_receipt_lines("LITER MELK 1,19\nBANANEN\n1,234 KG x 1,99 2,46\nBONUS BAP WIT -0,50\n")
+
+    assert result["items"] == [{"raw_name": "LITER MELK", "price": 1.19, "quantity": 1, "confidence": 1.0}]
+    assert result["discounts"] == []
+    assert result["unparsed_lines"] == ["BANANEN", "1,234 KG x 1,99 2,46", "BONUS BAP WIT -0,50"]
+
+
+def test_leading_number_needs_an_x_or_a_matching_unit_price():
+    """A leading number is a quantity only when the line confirms it; otherwise the LLM reads the line"""
+    result = parse_ah_receipt_lines("500 GR GEHAKT 4,99\n2x AH HALFV MELK 2,38\n3 AH YOGHURT 1,00 2,50\n")
+
+    assert result["items"] == [{"raw_name": "AH HALFV MELK", "price": 2.38, "quantity": 2, "confidence": 1.0}]
+    assert result["unparsed_lines"] == ["500 GR GEHAKT 4,99", "3 AH YOGHURT 1,00 2,50"]
+
+
+def test_ah_grammar_ignores_non_receipt_text():
+    """Free text yields no items so the whole receipt goes to the LLM"""
+    result = parse_ah_receipt_lines("Thanks for shopping with us\nSee you soon")
+    assert result["items"] == []
+    assert result["candidate_lines"] == 0
+
+
+def test_aparse_reads_text_receipt_locally(tmp_path, monkeypatch):
+    """The async pipeline parses an AH text receipt via the fast path without calling a model"""
+    import asyncio
+    from tools.parser import ReceiptParser
+
+    monkeypatch.setattr(parser_module, "get_llm_config", FakeLLMConfig)
+    receipt = "BAP WIT 1,79\n2 AH HALFV MELK 1,19 2,38\nBONUS AH HALFV MELK -0,38\nTOTAAL 3,79\n"
+    path = tmp_path / "receipt.txt"
+    path.write_text(receipt)
+    parser = ReceiptParser(fast_path=True)
+
+    items = asyncio.run(parser.aparse(str(path)))
+    assert items == [{"raw_name": "BAP WIT", "price": 1.79, "quantity": 1},
+                     {"raw_name": "AH HALFV MELK", "price": 2.0, "quantity": 2}], \
+        "Fast-path items should have the LLM item schema, with the discount taken off the price"
+    assert parser.last_receipt_text == receipt
+    assert parser.last_parse_stats["hit_rate"] == 1.0
+
+
+def test_json_array_items_are_yielded_across_chunk_boundaries():
+    """Objects are yielded once closed, whatever the chunking, and braces in strings are ignored"""
+    response = '```json\n[{"raw_name": "AH {MIX} \\"X\\"", "price": 1.5}, "skip {", {"raw_name": "BAP WIT", "price": 1.79}]\n```'
+    expected = [{"raw_name": 'AH {MIX} "X"', "price": 1.5}, {"raw_name": "BAP WIT", "price": 1.79}]
+    for size in (1, 2, 5, len(response)):
+        chunks = [response[i:i + size] for i in range(0, len(response), size)]
+        assert list(iter_json_array_items(chunks)) == expected
+
+    # The first object is available before the array is complete
+    items = iter_json_array_items(iter(['[{"raw_name": "A", "price": 1}', ', {"raw_']))
+    assert next(items) == {"raw_name": "A", "price": 1}
+
+
+def test_json_array_starts_at_the_first_bracket_before_an_object():
+    """Brackets in text before the array do not end the parse early"""
+    response = 'Found [2 items] on the receipt:\n```json\n[\n  {"raw_name": "BAP WIT", "price": 1.79}]\n```'
+    for size in (1, 3, len(response)):
+        chunks = [response[i:i + size] for i in range(0, len(response), size)]
+        assert list(iter_json_array_items(chunks)) == [{"raw_name": "BAP WIT", "price": 1.79}]
+
+
+def test_streamed_items_release_the_model_slot_before_the_consumer_is_done(monkeypatch):
+    """The throttle slot is freed once the response is drained, not when the last item is consumed"""
+    class StreamingModel:
+        def generate_content(self, contents, stream=False, **kwargs):
+            return [FakeResponse('[{"raw_name": "BAP WIT", "price": 1.79}, '),
+                    FakeResponse('{"raw_name": "AH KAAS", "price": 4.29}]')]
+
+    parser, _ = make_parser(monkeypatch, lambda *args: "[]")
+    parser.registry.max_concurrency = 1
+    parser.registry.get_model = lambda name, generation_config=None: StreamingModel()
+
+    items = parser._stream_items(["gemini-1.5-flash"], "prompt")
+    assert next(items)["raw_name"] == "BAP WIT"
+    slot = parser.registry._slot("gemini-1.5-flash")
+    for _ in range(100):  # The worker thread releases the slot right after the stream ends
+        if slot.acquire(blocking=False):
+            break
+        time.sleep(0.01)
+    else:
+        raise AssertionError("The slot should be free while the consumer still holds items")
+    slot.release()
+    assert [item["raw_name"] for item in items] == ["AH KAAS"]
+
+
+def test_page_overlap_is_merged_once():
+    """Lines repeated at a page boundary are kept once; other repeats are left alone"""
+    from tools.parser import merge_page_texts
+
+    pages = [
+        "ALBERT HEIJN\nBAP WIT 1,79\nAH HALFV MELK 1,19",
+        "BAP WIT  1.79\nAH HALFV  MELK 1.19\nAH KAAS JONG 48+ 4,29\nBAP WIT 1,79",
+        "BAP WIT 1,79\nTOTAAL 10,85",
+    ]
+    merged = merge_page_texts(pages).splitlines()
+    assert merged == ["ALBERT HEIJN", "BAP WIT 1,79", "AH HALFV MELK 1,19",
+                      "AH KAAS JONG 48+ 4,29", "BAP WIT 1,79", "BAP WIT 1,79", "TOTAAL 10,85"], \
+        "A single repeated line is a second purchase, not an overlap"
+
+
+def test_long_text_is_split_on_line_boundaries():
+    """Chunks stay within the token budget and together hold every line"""
+    from tools.parser import split_receipt_text, CHARS_PER_TOKEN
+
+    text = "\n".join(f"ITEM {i:03d} 1,00" for i in range(200))
+    chunks = split_receipt_text(text, max_tokens=100)
+    assert len(chunks) > 1
+    assert all(len(chunk) <= 100 * CHARS_PER_TOKEN for chunk in chunks)
+    assert "\n".join(chunks) == text
+
+
+def test_pdf_and_tiff_are_split_into_pages(tmp_path):
+    """Scanned PDFs and multi-frame TIFFs yield one image page per page"""
+    from PIL import Image
+    from tools.parser import load_receipt_pages
+
+    frames = [Image.new("L", (200, 300), color) for color in (255, 200, 150)]
+    for name in ("receipt.tiff", "receipt.pdf"):
+        path = tmp_path / name
+        frames[0].save(path, save_all=True, append_images=frames[1:])
+        pages = load_receipt_pages(str(path))
+        assert len(pages) == 3, name
+        assert all(page["image"] is not None and page["text"] is None for page in pages)
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeModel:
+    """Answers generate_content with whatever the test's responder returns for the prompt"""
+
+    def __init__(self, name, respond, calls):
+        self.name = name
+        self.respond = respond
+        self.calls = calls
+
+    def generate_content(self, contents, **kwargs):
+        self.calls.append((self.name, 'generation_config' in kwargs))
+        return FakeResponse(self.respond(self.name, contents, kwargs))
+
+
+def make_parser(monkeypatch, respond, **kwargs):
+    """ReceiptParser whose registry serves FakeModels, plus the list of calls made"""
+    from config.model_registry import ModelRegistry
+    from tools.parser import ReceiptParser
+
+    monkeypatch.setattr(parser_module, "get_llm_config", FakeLLMConfig)
+    parser = ReceiptParser(preprocessor=False, **kwargs)
+    calls = []
+    parser.registry = ModelRegistry(ttl=3600)
+    parser.registry.available_models = lambda refresh=False: ["gemini-1.5-flash", "gemini-1.5-pro"]
+    parser.registry.get_model = lambda name, generation_config=None: FakeModel(name, respond, calls)
+    return parser, calls
+
+
+def test_structured_items_are_validated_and_normalised(monkeypatch):
+    """Malformed items or a missing price reject the output; quantities are normalised"""
+    parser, _ = make_parser(monkeypatch, lambda *args: "[]")
+
+    assert parser._validate_items([
+        {"raw_name": "  BAP WIT ", "price": "1.79"},
+        {"raw_name": "AH HALFV MELK", "price": 2.38, "quantity": "2.0"},
+        {"raw_name": "TROSTOMATEN", "price": 2.28, "quantity": 0.652},
+        {"raw_name": "KAAS", "price": 4.29, "quantity": None},
+    ]) == [
+        {"raw_name": "BAP WIT", "price": 1.79, "quantity": 1},
+        {"raw_name": "AH HALFV MELK", "price": 2.38, "quantity": 2},
+        {"raw_name": "TROSTOMATEN", "price": 2.28, "quantity": 0.652},
+        {"raw_name": "KAAS", "price": 4.29, "quantity": 1},
+    ]
+    assert parser._validate_items([{"raw_name": "BAP WIT"}]) is None, "Missing price"
+    assert parser._validate_items([{"raw_name": "BAP WIT", "price": "gratis"}]) is None
+    assert parser._validate_items([{"raw_name": " ", "price": 1.0}]) is None, "Blank name"
+    assert parser._validate_items([{"raw_name": "BAP WIT", "price": 1.0, "quantity": "een"}]) is None
+    assert parser._validate_items(["BAP WIT 1,79"]) is None
+    assert parser._validate_items({"raw_name": "BAP WIT", "price": 1.79}) is None
+
+
+def test_single_call_falls_back_to_ocr_when_every_structured_output_is_invalid(tmp_path, monkeypatch):
+    """Each model's bad structured output is rejected, then the two-step path reads the receipt"""
+    from PIL import Image
+    from tools.parser import SINGLE_CALL_MODE
+
+    def respond(name, contents, kwargs):
+        if kwargs.get("generation_config"):
+            # One model drops the price, the other returns something that is not a list
+            return '[{"raw_name": "BAP WIT"}]' if name == "gemini-1.5-flash" else '{"items": []}'
+        return "BAP WIT 1,79\n2 AH HALFV MELK 1,19 2,38\nTOTAAL 4,17"
+
+    parser, calls = make_parser(monkeypatch, respond, mode=SINGLE_CALL_MODE, fast_path=True)
+    path = tmp_path / "receipt.png"
+    Image.new("L", (60, 80), 255).save(path)
+
+    items = parser.parse(str(path))
+    assert [item["raw_name"] for item in items] == ["BAP WIT", "AH HALFV MELK"]
+    assert calls[:2] == [("gemini-1.5-flash", True), ("gemini-1.5-pro", True)], \
+        "Every model should be tried for the single call"
+    assert calls[2:] == [("gemini-1.5-flash", False)], "One OCR call, then the fast path parses the text"
+    assert parser.last_receipt_text.startswith("BAP WIT")
+
+
+def test_single_call_empty_list_is_an_answer_and_items_carry_the_date(tmp_path, monkeypatch):
+    """[] from the structured call is not retried via OCR; the model's purchase date is kept on the items"""
+    from PIL import Image
+    from agents.receipt_processor import _dated
+    from tools.parser import SINGLE_CALL_MODE
+
+    answers = {"receipt.png": "[]",
+               "dated.png": '[{"raw_name": "BAP WIT", "price": 1.79, "quantity": 1, "date": "2026-10-12"}]'}
+    current = {}
+    parser, calls = make_parser(monkeypatch, lambda *args: answers[current["name"]], mode=SINGLE_CALL_MODE)
+    for name in answers:
+        Image.new("L", (60, 80), 255).save(tmp_path / name)
+
+    current["name"] = "receipt.png"
+    assert parser.parse(str(tmp_path / "receipt.png")) == []
+    assert calls == [("gemini-1.5-flash", True)], "An empty receipt should not fall back to OCR"
+
+    current["name"] = "dated.png"
+    items = parser.parse(str(tmp_path / "dated.png"))
+    assert items == [{"raw_name": "BAP WIT", "price": 1.79, "quantity": 1, "date": "2026-10-12"}]
+    assert parser.last_receipt_text is None
+    assert _dated(items, parser.last_receipt_text)[1] == "2026-10-12"
+
+
+def test_chunk_no_model_can_parse_marks_the_parse_incomplete(monkeypatch):
+    """Missing chunks are reported and the items of the other chunks keep their order"""
+    def respond(name, contents, kwargs):
+        if "ITEM 1 " in contents:
+            return "not json"
+        name = contents.strip().splitlines()[-1].rsplit(" ", 1)[0]
+        return f'[{{"raw_name": "{name}", "price": 1.0}}]'
+
+    monkeypatch.setattr(parser_module, "PARSE_PROMPT", "{receipt_text}")
+    parser, _ = make_parser(monkeypatch, respond, fast_path=False, parse_chunk_tokens=1)
+
+    items = parser._parse_receipt_text_with_llm("\n".join(f"ITEM {i} 1,00" for i in range(3)))
+    assert [item["raw_name"] for item in items] == ["ITEM 0", "ITEM 2"]
+    assert parser.last_parse_complete is False
@@ -0,0 +1,96 @@
+"""
+Test suite for the receipt processing agent
+"""
+import time
+
+from agents.receipt_processor import ReceiptProcessingAgent
+from config.model_registry import ModelRegistry
+from tools.receipt_cache import ReceiptCache
+import tools.parser as parser_module
+
+
+class FakeLLMConfig:
+    """Stands in for LLMConfig without configuring the real SDK or the global config"""
+    model_name = "gemini-1.5-flash"
+
+
+def write_receipts(tmp_path, count):
+    paths = []
+    for i in range(count):
+        path = tmp_path / f"receipt_{i}.txt"
+        path.write_text(f"ITEM {i} 1,{i:02d}\nTOTAAL 1,{i:02d}\n")
+        paths.append(str(path))
+    return paths
+
+
+def test_execute_many_keeps_order_survives_failures_and_mixes_cache_hits(tmp_path, monkeypatch):
+    """Results follow the input order, one failure stays local, and only misses are parsed"""
+    monkeypatch.setattr(parser_module, "get_llm_config", FakeLLMConfig)
+    agent = ReceiptProcessingAgent(cache=ReceiptCache(tmp_path / "cache.sqlite3"))
+    paths = write_receipts(tmp_path, 6)
+
+    # Warm the cache with receipts 1 and 4
+    for index in (1, 4):
+        assert agent.execute(paths[index])["cache_hit"] is False
+
+    parse = agent.parser.parse
+    parsed = []
+
+    def slow_or_failing_parse(file_path):
+        parsed.append(file_path)
+        if file_path == paths[3]:
+            raise RuntimeError("model unavailable")
+        # Earlier receipts finish last, so completion order differs from input order
+        time.sleep(0.02 * (len(paths) - paths.index(file_path)))
+        return parse(file_path)
+
+    agent.parser.parse = slow_or_failing_parse
+    results = agent.execute_many(paths, max_workers=4)
+
+    assert [result["file_path"] for result in results] == paths
+    assert [result["cache_hit"] for result in results] == [False, True, False, False, True, False]
+    assert sorted(parsed) == sorted(paths[i] for i in (0, 2, 3, 5)), "Cache hits should not be parsed"
+    for i, result in enumerate(results):
+        if i == 3:
+            assert result["items"] == [] and "model unavailable" in result["error"]
+        else:
+            assert result["error"] is None
+            assert [item["raw_name"] for item in result["items"]] == [f"ITEM {i}"]
+
+    # Successful misses are now cached, the failed receipt is not
+    agent.parser.parse = parse
+    again = agent.execute_many(paths)
+    assert [result["cache_hit"] for result in again] == [True, True, True, False, True, True]
+
+
+class FakeChunk:
+    def __init__(self, text):
+        self.text = text
+
+
+class BrokenStreamModel:
+    """Streams the first item of a JSON array, then drops the connection"""
+
+    def generate_content(self, contents, stream=False, **kwargs):
+        def chunks():
+            yield FakeChunk('[{"raw_name": "BAP WIT", "price": 1.79}, ')
+            raise ConnectionError("stream reset")
+        return chunks()
+
+
+def test_stream_that_breaks_off_is_not_cached(tmp_path, monkeypatch):
+    """Items streamed before a failure reach on_item, but the partial list is not cached"""
+    monkeypatch.setattr(parser_module, "get_llm_config", FakeLLMConfig)
+    agent = ReceiptProcessingAgent(cache=ReceiptCache(tmp_path / "cache.sqlite3"))
+    agent.parser.fast_path = False
+    agent.parser.registry = ModelRegistry()
+    agent.parser.registry.candidates = lambda preferred: ["gemini-1.5-flash", "gemini-1.5-pro"]
+    agent.parser.registry.get_model = lambda name, generation_config=None: BrokenStreamModel()
+    path = tmp_path / "receipt.txt"
+    path.write_text("BAP WIT 1,79\nAH HALFV MELK 1,19\n")
+
+    shown = []
+    result = agent.execute(str(path), on_item=shown.append)
+    assert shown == result["items"] == [{"raw_name": "BAP WIT", "price": 1.79, "quantity": 1}]
+    assert result["complete"] is False
+    assert agent.cache.get(result["cache_key"]) is None, "A truncated item list must not be cached"
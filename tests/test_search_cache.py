@@ -0,0 +1,89 @@
+"""
+Test suite for the Price Checker search cache
+"""
+from tools.search_cache import SearchCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_search_cache_tiers_and_ttls(tmp_path):
+    """Entries survive reopening, expire on their parts' TTLs and are served stale for a while"""
+    clock = FakeClock()
+    cache = SearchCache(tmp_path / "search.sqlite3", scrape_ttl=100, llm_ttl=10, stale_ttl=50, clock=clock)
+    scraped = [{"name": "AH Halfvolle melk", "price_without_membership": 1.19}]
+    enhanced = [{"name": "Campina Halfvolle melk", "price_without_membership": 1.49}]
+
+    key = SearchCache.make_key("  Halfvolle   MELK ", 20)
+    assert key == SearchCache.make_key("halfvolle melk", 20), "Queries should be normalized"
+    assert key != SearchCache.make_key("halfvolle melk", 10), "max_results should be part of the key"
+    assert cache.get(key) is None
+
+    cache.put(key, scraped)
+    cache.put(SearchCache.make_key("melk", 20), scraped, enhanced)
+    assert cache.get(key) == {"scraped": scraped, "enhanced": [], "stale": False}
+
+    # Reopened cache reads from the disk tier
+    reopened = SearchCache(tmp_path / "search.sqlite3", scrape_ttl=100, llm_ttl=10, stale_ttl=50, clock=clock)
+    assert reopened.get(key)["scraped"] == scraped
+
+    clock.now = 11
+    assert not cache.get(key)["stale"], "Scraped-only entry uses the scrape TTL"
+    assert cache.get(SearchCache.make_key("melk", 20))["stale"], "Entry with LLM products uses the LLM TTL"
+
+    clock.now = 61
+    melk = cache.get(SearchCache.make_key("melk", 20))
+    assert melk == {"scraped": scraped, "enhanced": [], "stale": True}, \
+        "LLM products past their stale window are dropped while the scraped ones are still served"
+
+    clock.now = 120
+    assert cache.get(key)["stale"]
+    assert cache.begin_refresh(key)
+    assert not cache.begin_refresh(key), "Only one refresh should run per key"
+    cache.end_refresh(key)
+
+    clock.now = 151
+    assert cache.get(key) is None, "Entry past the stale window should miss"
+
+
+def test_search_cache_memory_tier_is_lru():
+    """The in-memory tier keeps the most recently used entries"""
+    cache = SearchCache(":memory:", memory_entries=2)
+    for query in ("melk", "brood", "kaas"):
+        cache.put(SearchCache.make_key(query, 10), [{"name": query}])
+
+    assert cache.stats()["memory_entries"] == 2
+    assert cache.get(SearchCache.make_key("melk", 10))["scraped"] == [{"name": "melk"}], \
+        "Evicted memory entries should still come from disk"
+
+
+def test_search_cache_put_keeps_its_own_copies():
+    """Mutating the products after put() does not change what the memory tier serves"""
+    cache = SearchCache(":memory:")
+    scraped = [{"name": "AH Halfvolle melk", "price_without_membership": 1.19}]
+    key = SearchCache.make_key("melk", 10)
+
+    cache.put(key, scraped)
+    scraped[0]["price_without_membership"] = 0.0
+    scraped.append({"name": "Extra"})
+    assert cache.get(key)["scraped"] == [{"name": "AH Halfvolle melk", "price_without_membership": 1.19}]
+
+
+def test_search_cache_llm_only_entries_use_the_llm_ttl(tmp_path):
+    """Suggestions without scraped products live on the LLM TTL, on disk too"""
+    clock = FakeClock()
+    cache = SearchCache(tmp_path / "search.sqlite3", scrape_ttl=100, llm_ttl=10, stale_ttl=50, clock=clock)
+    enhanced = [{"name": "Campina Halfvolle melk", "price_without_membership": 1.49}]
+    key = SearchCache.make_key("melk", 10)
+    cache.put(key, [], enhanced)
+
+    reopened = SearchCache(tmp_path / "search.sqlite3", scrape_ttl=100, llm_ttl=10, stale_ttl=50, clock=clock)
+    clock.now = 11
+    assert reopened.get(key) == {"scraped": [], "enhanced": enhanced, "stale": True}
+    clock.now = 61
+    assert reopened.get(key) is None
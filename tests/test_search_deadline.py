@@ -0,0 +1,97 @@
+"""
+Test suite for deadline-bound Price Checker searches
+"""
+import threading
+import time
+
+from tools.scraper import CatalogueScraper
+from tools.search_cache import SearchCache
+import tools.scraper as scraper_module
+
+
+def no_llm_config():
+    raise ValueError("GOOGLE_API_KEY not set")
+
+
+def product(name):
+    return {"name": name, "price_without_membership": 1.0, "url": f"/{name}"}
+
+
+def make_scraper(monkeypatch, scrape_seconds, scraped, enhance_seconds=0.0, enhanced=()):
+    """Scraper whose ah.nl fetch and Gemini top-up take the given times"""
+    monkeypatch.setattr(scraper_module, "get_llm_config", no_llm_config)
+    scraper = CatalogueScraper(search_cache=SearchCache(":memory:"), translation_cache=False, catalogue=False)
+    scraper._working_model = object()
+    scraper.scrape_done = threading.Event()
+    scraper.enhance_calls = []
+
+    def scrape(query, max_results):
+        time.sleep(scrape_seconds)
+        scraper.scrape_done.set()
+        return [product(name) for name in scraped]
+
+    def enhance(existing, query, needed):
+        scraper.enhance_calls.append(needed)
+        time.sleep(enhance_seconds)
+        return [product(name) for name in enhanced]
+
+    scraper._scrape_products = scrape
+    scraper._enhance_products_with_gemini = enhance
+    return scraper
+
+
+def test_late_scrape_returns_suggestions_and_is_cached(monkeypatch):
+    """A slow ah.nl does not hold the search past its deadline; the late scrape is cached"""
+    scraper = make_scraper(monkeypatch, scrape_seconds=0.5, scraped=["melk a", "melk b"],
+                           enhanced=["melk b", "melk c"])
+    started = time.monotonic()
+    products = scraper.search_products_google("melk", max_results=3, deadline_ms=150)
+    assert time.monotonic() - started < 0.4
+    assert [p["name"] for p in products] == ["melk b", "melk c"]
+
+    assert scraper.scrape_done.wait(2)
+    for _ in range(100):  # The store runs right after the scrape finishes
+        if scraper.search_cache.get(SearchCache.make_key("melk", 3)):
+            break
+        time.sleep(0.01)
+    # Scraped products come first, suggestions only fill the remaining place once
+    cached = scraper.search_products_google("melk", max_results=3, deadline_ms=150)
+    assert [p["name"] for p in cached] == ["melk a", "melk b", "melk c"]
+    assert len(scraper.enhance_calls) == 1
+
+
+def test_results_merge_when_both_arrive_in_time(monkeypatch):
+    """Scraped products come first and suggestions with the same name are dropped"""
+    scraper = make_scraper(monkeypatch, scrape_seconds=0.05, scraped=["kaas a"],
+                           enhance_seconds=0.1, enhanced=["Kaas A", "kaas b", "kaas c"])
+    products = scraper.search_products_google("kaas", max_results=3, deadline_ms=1000)
+    assert [p["name"] for p in products] == ["kaas a", "kaas b", "kaas c"]
+
+
+def test_full_scrape_does_not_wait_for_gemini(monkeypatch):
+    """Once the scrape fills max_results the search returns without the suggestions"""
+    scraper = make_scraper(monkeypatch, scrape_seconds=0.02, scraped=["brood a", "brood b"],
+                           enhance_seconds=1.0, enhanced=["brood c"])
+    started = time.monotonic()
+    products = scraper.search_products_google("brood", max_results=2, deadline_ms=2000)
+    assert time.monotonic() - started < 0.5
+    assert [p["name"] for p in products] == ["brood a", "brood b"]
+
+
+def test_without_deadline_the_search_is_sequential(monkeypatch):
+    """No deadline: Gemini is only asked after a short scrape, for the missing places"""
+    scraper = make_scraper(monkeypatch, scrape_seconds=0.0, scraped=["sap a"], enhanced=["sap b"])
+    products = scraper.search_products_google("sap", max_results=3)
+    assert [p["name"] for p in products] == ["sap a", "sap b"]
+    assert scraper.enhance_calls == [2]
+
+
+def test_empty_scrape_is_cached_but_fetch_error_is_not(monkeypatch):
+    """Suggestions for a search ah.nl has nothing for are cached; a failed fetch leaves the cache alone"""
+    scraper = make_scraper(monkeypatch, scrape_seconds=0.0, scraped=[], enhanced=["thee a"])
+    assert [p["name"] for p in scraper.search_products_google("thee", max_results=2)] == ["thee a"]
+    assert scraper.search_cache.get(SearchCache.make_key("thee", 2))["enhanced"] == [product("thee a")]
+
+    scraper._scrape_products = lambda query, max_results: None
+    assert [p["name"] for p in scraper.search_products_google("koffie", max_results=2)] == ["thee a"]
+    assert scraper.search_cache.get(SearchCache.make_key("koffie", 2)) is None
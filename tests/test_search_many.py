@@ -0,0 +1,72 @@
+"""
+Test suite for concurrent multi-query search
+"""
+import asyncio
+import threading
+import time
+
+from benchmarks.stubs import serve_ah_search, load_ah_search_pages
+from tools.http_client import HttpClient, ResponseStore, build_session
+from tools.scraper import CatalogueScraper, InFlightSearches
+import tools.scraper as scraper_module
+
+
+def no_llm_config():
+    raise ValueError("GOOGLE_API_KEY not set")
+
+
+def test_in_flight_searches_are_coalesced():
+    """Callers asking for the same key while it runs share one search"""
+    in_flight = InFlightSearches()
+    calls = []
+
+    def slow_search():
+        calls.append(1)
+        time.sleep(0.1)
+        return ["result"]
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(in_flight.run("melk", slow_search)))
+               for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == [["result"]] * 5
+    assert len(calls) == 1
+    assert in_flight.run("melk", lambda: ["again"]) == ["again"], "Finished keys should run again"
+
+
+def test_async_searches_share_in_flight_runs():
+    """Coroutines waiting on the same key share one search"""
+    in_flight = InFlightSearches()
+    calls = []
+
+    async def slow_search():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return ["result"]
+
+    async def main():
+        return await asyncio.gather(*(in_flight.arun("melk", slow_search) for _ in range(5)))
+
+    assert asyncio.run(main()) == [["result"]] * 5
+    assert len(calls) == 1
+
+
+def test_search_many_returns_results_keyed_by_query(monkeypatch):
+    """Duplicates and queries with the same Dutch search are fetched once"""
+    monkeypatch.setattr(scraper_module, "get_llm_config", no_llm_config)
+    pages = load_ah_search_pages()
+    with serve_ah_search({"melk": pages["melk"], "kaas": pages["kaas"]}, latency=0.05) as stand_in:
+        client = HttpClient(session=build_session(retries=0), store=ResponseStore(":memory:"), max_per_host=2)
+        scraper = CatalogueScraper(http_client=client, search_cache=False, catalogue=False)
+
+        results = scraper.search_many(["milk", "kaas", "melk", "milk", "onbekend"], max_results=5)
+
+    assert list(results) == ["milk", "kaas", "melk", "onbekend"]
+    assert results["milk"] == results["melk"] and len(results["milk"]) == 5
+    assert results["milk"] is not results["melk"], "Each query should get its own list"
+    assert len(results["kaas"]) == 5 and results["onbekend"] == []
+    assert stand_in.requests == 3, "milk and melk should share one fetch"
@@ -0,0 +1,165 @@
+"""
+Test suite for the spending memory stores
+"""
+import sqlite3
+from datetime import date, timedelta
+
+import pytest
+
+import agents.finance_manager as finance_manager
+from tools.mcp_server import (ROLLUP_BUCKETS, SpendingMemoryMCP, SQLiteSpendingMemory, bucket_start,
+                              month_start, range_segments)
+
+STORES = [SpendingMemoryMCP, lambda: SQLiteSpendingMemory(":memory:")]
+
+ITEMS = [
+    {"raw_name": "BAP WIT", "product_name": "AH Bapao wit", "category": "Bakery", "price": 1.79,
+     "quantity": 1, "date": "2026-09-28"},
+    {"raw_name": "HEINEKEN", "product_name": "Heineken Pils", "category": "Alcohol", "price": 12.49,
+     "quantity": 1, "is_bonus": True, "date": "2026-10-02"},
+    {"raw_name": "ROSE", "category": "Alcohol", "price": 5.99, "quantity": 1, "date": "2026-10-05"},
+    {"raw_name": "ONBEKEND", "price": 1.00, "quantity": 2, "date": "2026-10-05"},
+]
+
+
+@pytest.mark.parametrize("make_store", STORES)
+def test_stores_agree_on_totals(make_store):
+    """Both stores sum prices per category, overall and within a date range"""
+    store = make_store()
+    store.add_transactions(ITEMS[:2])
+    store.add_transactions(ITEMS[2:])
+
+    assert store.count_transactions() == 4
+    assert store.get_category_totals() == pytest.approx({"Bakery": 1.79, "Alcohol": 18.48, "Uncategorized": 1.00})
+    assert store.get_category_totals(start="2026-10-01") == pytest.approx({"Alcohol": 18.48, "Uncategorized": 1.00})
+    assert store.get_category_totals(end="2026-10-02") == pytest.approx({"Bakery": 1.79, "Alcohol": 12.49})
+    assert store.get_budget_for_category("Alcohol") == 30.0
+    assert store.get_budget_for_category("Bakery") == 100.0
+
+
+def test_sqlite_memory_survives_reopening(tmp_path):
+    """Transactions written by one store are there after a restart"""
+    SQLiteSpendingMemory(tmp_path / "spending.sqlite3").add_transactions(ITEMS)
+    reopened = SQLiteSpendingMemory(tmp_path / "spending.sqlite3")
+    assert reopened.count_transactions() == 4
+    assert reopened.get_category_totals()["Alcohol"] == pytest.approx(18.48)
+
+
+@pytest.mark.parametrize("make_store", STORES)
+def test_deletes_and_corrections_update_running_totals(make_store):
+    """Removing or correcting a transaction applies the reverse delta to its category"""
+    store = make_store()
+    ids = store.add_transactions(ITEMS)
+    assert len(set(ids)) == 4
+
+    assert store.correct_transaction(ids[3], category="Snacks", price=2.00)
+    assert store.get_category_totals() == pytest.approx({"Bakery": 1.79, "Alcohol": 18.48, "Snacks": 2.00})
+
+    assert store.delete_transactions([ids[1], ids[1], ids[0]]) == 2
+    assert store.get_category_totals() == pytest.approx({"Alcohol": 5.99, "Snacks": 2.00})
+    assert store.count_transactions() == 2
+    assert store.delete_transactions([ids[0]]) == 0
+    assert not store.correct_transaction(ids[0], price=1.0)
+    with pytest.raises(ValueError):
+        store.correct_transaction(ids[2], raw_name="X")
+
+    # Running totals match summing the rows from scratch
+    assert store.get_category_totals() == pytest.approx(store.get_category_totals(start="2000-01-01"))
+
+
+def test_sqlite_totals_are_built_for_older_stores(tmp_path):
+    """A store written before running totals existed gets them summed on open"""
+    path = tmp_path / "spending.sqlite3"
+    SQLiteSpendingMemory(path).add_transactions(ITEMS)
+    conn = sqlite3.connect(path)
+    conn.execute("DROP TABLE category_totals")
+    conn.commit()
+    conn.close()
+    assert SQLiteSpendingMemory(path).get_category_totals()["Alcohol"] == pytest.approx(18.48)
+
+
+@pytest.mark.parametrize("make_store", STORES)
+def test_range_totals_and_series_come_from_rollups(make_store):
+    """Totals over any range, and per day, week or month, match summing the transactions"""
+    store = make_store()
+    ids = store.add_transactions(ITEMS + [
+        {"raw_name": "KAAS", "category": "Dairy", "price": 4.50, "quantity": 1, "date": date(2026, 8, 31)},
+        {"raw_name": "MELK", "category": "Dairy", "price": 1.10, "quantity": 1, "date": "2026-10-31"},
+    ])
+
+    assert store.totals(start="2026-09-01", end="2026-10-31") == pytest.approx(
+        {"Bakery": 1.79, "Alcohol": 18.48, "Uncategorized": 1.00, "Dairy": 1.10})
+    assert store.totals(start="2026-09-28", end="2026-10-04") == pytest.approx({"Bakery": 1.79, "Alcohol": 12.49})
+    assert store.totals("Alcohol", start="2026-10-03") == pytest.approx(5.99)
+    assert store.totals("Fish", start="2026-10-03") == 0.0
+    assert store.totals("Dairy") == pytest.approx(5.60)
+
+    months = store.totals(granularity="month")
+    assert list(months) == ["2026-08-01", "2026-09-01", "2026-10-01"]
+    assert months["2026-10-01"] == pytest.approx({"Alcohol": 18.48, "Uncategorized": 1.00, "Dairy": 1.10})
+    # Weeks start on Monday; a range end inside a week still includes that whole week
+    assert store.totals("Alcohol", end="2026-09-29", granularity="week") == pytest.approx({"2026-09-28": 12.49})
+    days = store.totals(start="2026-10-05", end="2026-10-05", granularity="day")
+    assert list(days) == ["2026-10-05"] and days["2026-10-05"] == pytest.approx({"Alcohol": 5.99, "Uncategorized": 1.00})
+
+    # Moving a purchase to another month moves it between buckets
+    store.correct_transaction(ids[1], date="2026-09-30")
+    assert store.totals(start="2026-09-01", end="2026-09-30") == pytest.approx({"Bakery": 1.79, "Alcohol": 12.49})
+    store.delete_transactions([ids[0]])
+    assert store.totals(granularity="month")["2026-09-01"] == pytest.approx({"Alcohol": 12.49})
+    with pytest.raises(ValueError):
+        store.totals(granularity="year")
+
+
+def test_range_segments_use_whole_months():
+    """A range splits into loose days at the edges and whole months in between"""
+    assert range_segments(date(2026, 1, 15), date(2026, 4, 10)) == [
+        ("day", "2026-01-15", "2026-01-31"), ("month", "2026-02-01", "2026-03-01"), ("day", "2026-04-01", "2026-04-10")]
+    assert range_segments(date(2026, 2, 1), date(2026, 2, 28)) == [("month", "2026-02-01", "2026-02-01")]
+    assert range_segments(date(2026, 2, 3), date(2026, 2, 9)) == [("day", "2026-02-03", "2026-02-09")]
+    assert month_start(date(2026, 10, 16)) == "2026-10-01"
+
+
+def test_sqlite_and_python_buckets_agree():
+    """The SQL bucket expressions put every date in the same bucket as bucket_start"""
+    conn = sqlite3.connect(":memory:")
+    day = date(2024, 12, 20)
+    for _ in range(30):
+        for granularity, bucket in ROLLUP_BUCKETS.items():
+            sql = conn.execute(f"SELECT {bucket.format(d='?')}", (day.isoformat(),)).fetchone()[0]
+            assert sql == bucket_start(day, granularity).isoformat()
+        day += timedelta(days=1)
+
+
+def test_failed_sqlite_write_is_rolled_back():
+    """A write the database rejects leaves no transaction open, so later writes still work"""
+    store = SQLiteSpendingMemory(":memory:")
+    ids = store.add_transactions(ITEMS)
+    with pytest.raises(sqlite3.IntegrityError):
+        store.correct_transaction(ids[0], quantity=None)
+    assert store.add_transactions(ITEMS[:1])
+    assert store.delete_transactions(ids[:1]) == 1
+    assert store.count_transactions() == 4
+
+
+@pytest.mark.parametrize("make_store", STORES)
+def test_missing_price_and_category_count_alike(make_store):
+    """An explicit None price or category gets the same defaults in both stores"""
+    store = make_store()
+    store.add_transactions([{"raw_name": "X", "category": None, "price": 1.50, "date": "2026-10-01"},
+                            {"raw_name": "Y", "category": "Fruit", "price": None, "date": "2026-10-01"}])
+    assert store.get_category_totals() == pytest.approx({"Uncategorized": 1.50, "Fruit": 0.0})
+    assert store.totals(start="2026-10-01") == pytest.approx({"Uncategorized": 1.50, "Fruit": 0.0})
+
+
+def test_finance_agent_opens_memory_on_first_use(monkeypatch):
+    """Building the agent opens no database; the default store is created once, when first needed"""
+    opened = []
+    monkeypatch.setattr(finance_manager, "SQLiteSpendingMemory",
+                        lambda: opened.append(1) or SQLiteSpendingMemory(":memory:"))
+    agent = finance_manager.FinanceAgent()
+    assert opened == []
+
+    agent.execute([dict(ITEMS[1])])
+    assert agent.memory.count_transactions() == 1
+    assert opened == [1]
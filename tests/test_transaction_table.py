@@ -0,0 +1,74 @@
+"""
+Test suite for the columnar transaction table
+"""
+import io
+
+import numpy as np
+import pytest
+
+from tools.mcp_server import SpendingMemoryMCP, SQLiteSpendingMemory
+from tools.transaction_table import TransactionTable
+
+ITEMS = [
+    {"raw_name": "BAP WIT", "product_name": "AH Bapao wit", "category": "Bakery", "price": 1.79,
+     "quantity": 1, "date": "2026-09-28"},
+    {"raw_name": "HEINEKEN", "product_name": "Heineken Pils", "category": "Alcohol", "price": 12.49,
+     "quantity": 2, "is_bonus": True, "date": "2026-10-02"},
+    {"raw_name": "ROSE", "category": "Alcohol", "price": 5.99, "quantity": 1, "date": "2026-10-05"},
+    {"raw_name": "BAP WIT", "product_name": "AH Bapao wit", "category": "Bakery", "price": 1.79,
+     "quantity": 1, "date": "2026-10-05"},
+]
+
+
+def test_group_by_and_filter_match_the_records():
+    """Vectorized group-bys and filters give what summing the dicts gives"""
+    table = TransactionTable(capacity=1)  # Grows while appending
+    table.append(ITEMS[:1])
+    table.append(ITEMS[1:])
+
+    assert len(table) == 4 and len(table.names) == 5
+    assert table.group_by() == pytest.approx({"Bakery": 3.58, "Alcohol": 18.48})
+    assert table.group_by("product_name", None) == {"AH Bapao wit": 2, "Heineken Pils": 1, "ROSE": 1}
+    assert table.group_by("week") == pytest.approx({"2026-09-28": 14.28, "2026-10-05": 7.78})
+    assert table.group_by("month", "quantity") == {"2026-09-01": 1, "2026-10-01": 4}
+
+    october = table.filter(start="2026-10-01", end="2026-10-31")
+    assert [r["raw_name"] for r in october.to_records()] == ["HEINEKEN", "ROSE", "BAP WIT"]
+    assert table.filter("Alcohol", end="2026-10-04").to_records()[0]["is_bonus"] is True
+    assert len(table.filter("Fish")) == 0
+    with pytest.raises(ValueError):
+        table.group_by("year")
+
+
+def test_pandas_and_arrow_share_the_arrays():
+    """Numeric columns are handed over without copying; names stay dictionary-encoded"""
+    table = TransactionTable.from_records(ITEMS)
+    df = table.to_pandas()
+    assert np.shares_memory(df["price"].to_numpy(), table.price)
+    assert list(df["category"]) == ["Bakery", "Alcohol", "Alcohol", "Bakery"]
+    assert str(df["date"].iloc[1].date()) == "2026-10-02"
+
+    arrow = table.to_arrow()
+    assert np.shares_memory(arrow.column("price").chunk(0).to_numpy(), table.price)
+    assert arrow.column("product_name").type.index_type.bit_width == 32
+    assert arrow.column("date").to_pylist()[0].isoformat() == "2026-09-28"
+
+
+def test_parquet_round_trip():
+    """A table written to Parquet reads back with the same transactions"""
+    table = TransactionTable.from_records(ITEMS)
+    buffer = io.BytesIO()
+    table.write_parquet(buffer)
+    buffer.seek(0)
+    restored = TransactionTable.read_parquet(buffer)
+    assert restored.to_records() == table.to_records()
+    assert len(TransactionTable.from_arrow(table.to_arrow().slice(0, 0))) == 0
+
+
+@pytest.mark.parametrize("make_store", [SpendingMemoryMCP, lambda: SQLiteSpendingMemory(":memory:")])
+def test_spending_memory_exports_a_table(make_store):
+    """Both stores hand out their history, or a date range of it, as a table"""
+    store = make_store()
+    store.add_transactions(ITEMS)
+    assert store.table().group_by() == pytest.approx(store.get_category_totals())
+    assert store.table(start="2026-10-03").group_by() == pytest.approx({"Alcohol": 5.99, "Bakery": 1.79})
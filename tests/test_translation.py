@@ -0,0 +1,60 @@
+"""
+Test suite for the grocery lexicon, translation memo and batch translation
+"""
+from tools import grocery_lexicon
+from tools.scraper import CatalogueScraper
+import tools.scraper as scraper_module
+from tools.translation_cache import TranslationCache
+
+
+def no_llm_config():
+    raise ValueError("GOOGLE_API_KEY not set")
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+def test_lexicon_translates_covered_queries():
+    """Phrases win over words, Dutch words and quantities pass through, unknown words miss"""
+    assert grocery_lexicon.translate_to_dutch("Peanut Butter") == "pindakaas"
+    assert grocery_lexicon.translate_to_dutch("organic semi-skimmed milk 1L") == "biologisch halfvolle melk 1l"
+    assert grocery_lexicon.translate_to_dutch("halfvolle melk") == "halfvolle melk"
+    assert grocery_lexicon.translate_to_dutch("pumpkin soup") is None
+    assert grocery_lexicon.translate_to_english("kipfilet") == "chicken breast"
+
+    assert grocery_lexicon.has_english_words("frozen spinach pie")
+    assert not grocery_lexicon.has_english_words("pindakaas crunchy")
+
+
+def test_translation_memo_round_trip(tmp_path):
+    """Stored translations survive reopening"""
+    cache = TranslationCache(tmp_path / "translations.sqlite3")
+    assert cache.get("Pumpkin Soup") is None
+    cache.put("pumpkin  soup", "pompoensoep")
+
+    assert TranslationCache(tmp_path / "translations.sqlite3").get("Pumpkin Soup") == "pompoensoep"
+
+
+def test_translate_many_uses_one_model_call(monkeypatch):
+    """Lexicon and memo hits stay local; the rest share one prompt"""
+    monkeypatch.setattr(scraper_module, "get_llm_config", no_llm_config)
+    scraper = CatalogueScraper(search_cache=False, translation_cache=TranslationCache(":memory:"), catalogue=False)
+    scraper.translation_cache.put("blue cheese dressing", "blauwe kaas dressing")
+    prompts = []
+
+    def fake_generate(prompt):
+        prompts.append(prompt)
+        return FakeResponse('```json\n["pompoensoep", "diepvries spinazietaart"]\n```')
+
+    scraper._working_model = object()
+    scraper._generate_content = fake_generate
+
+    result = scraper.translate_many(
+        ["milk", "pumpkin soup", "blue cheese dressing", "frozen spinach pie", "pumpkin soup", "pindakaas"])
+    assert result == ["melk", "pompoensoep", "blauwe kaas dressing", "diepvries spinazietaart",
+                      "pompoensoep", "pindakaas"]
+    assert len(prompts) == 1
+    assert scraper._translate_to_dutch("Pumpkin Soup") == "pompoensoep", "Batch answers should be memoized"
+    assert len(prompts) == 1
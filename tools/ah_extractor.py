@@ -0,0 +1,190 @@
+"""
+Product extraction for ah.nl search result pages.
+
+Selectors and patterns are compiled once at import, each product element's
+text is read once, and pages are parsed with lxml when it is installed
+(html.parser otherwise, or whatever AH_HTML_PARSER names).
+"""
+import importlib.util
+import os
+import re
+
+from bs4 import BeautifulSoup
+
+from tools.category_classifier import get_category_classifier
+
+# lxml is only needed as a BeautifulSoup tree builder, so probe for it without importing
+DEFAULT_PARSER = 'lxml' if importlib.util.find_spec('lxml') is not None else 'html.parser'
+
+AH_BASE_URL = 'https://www.ah.nl'
+
+# Product containers, tried in order; the first selector with matches wins
+PRODUCT_SELECTORS = (
+    ('article', {'class': re.compile(r'product|card', re.I)}),
+    ('div', {'data-testid': re.compile(r'product', re.I)}),
+    ('div', {'class': re.compile(r'product-tile|product-card|product-item', re.I)}),
+    ('li', {'class': re.compile(r'product', re.I)}),
+)
+FALLBACK_TEXT_RE = re.compile(r'€|\d+[,.]\d{2}', re.I)
+
+NAME_SELECTORS = (
+    ('h3', {}),
+    ('h2', {}),
+    ('a', {'class': re.compile(r'link|title|name', re.I)}),
+    ('span', {'class': re.compile(r'title|name|product-name', re.I)}),
+)
+
+# AH renders a price as integer/dot/fraction spans inside one price-amount
+# container; reading the container first gets "1.19" rather than the "1" span
+PRICE_SELECTORS = (
+    (None, {'data-testhook': re.compile(r'^price-amount$')}),
+    ('span', {'class': re.compile(r'price|amount', re.I)}),
+    ('div', {'class': re.compile(r'price', re.I)}),
+    ('span', {'data-testid': re.compile(r'price', re.I)}),
+)
+PRICE_RE = re.compile(r'€?\s*(\d+[,.]?\d*)')
+TEXT_PRICE_RE = re.compile(r'€?\s*(\d+[,.]?\d{2})')
+
+BONUS_RE = re.compile(r'bonus|actie|korting|aanbieding', re.I)
+BONUS_TEXT_RE = re.compile(r'(bonus|actie|korting|aanbieding)[\s:]*([^\n]*)', re.I)
+UNIT_RE = re.compile(r'(\d+[.,]?\d*\s*(kg|g|L|l|ml|st|stuks?|x))', re.I)
+
+
+def absolute_url(url):
+    """Resolve a scheme-relative or site-relative ah.nl link"""
+    if not url or url.startswith('http'):
+        return url
+    if url.startswith('//'):
+        return 'https:' + url
+    if url.startswith('/'):
+        return f"{AH_BASE_URL}{url}"
+    return f"{AH_BASE_URL}/{url}"
+
+
+class ProductExtractor:
+    """Turns an ah.nl search result page into product dicts"""
+
+    def __init__(self, parser=None, classifier=None):
+        """
+        Args:
+            parser: BeautifulSoup tree builder (default: AH_HTML_PARSER, else lxml if installed,
+                    else html.parser)
+            classifier: CategoryClassifier for product categories (default: the shared classifier)
+        """
+        self.parser = parser or os.getenv('AH_HTML_PARSER') or DEFAULT_PARSER
+        self.classifier = classifier or get_category_classifier()
+
+    def extract(self, html, max_results=10):
+        """
+        Extract up to max_results products from a search result page
+
+        Returns:
+            List of product dicts (name, image_url, prices, discount_offer, url, category,
+            is_bonus, unit)
+        """
+        soup = BeautifulSoup(html, self.parser)
+        product_elements = self._find_product_elements(soup, max_results)
+        print(f"Processing {len(product_elements)} potential product elements")
+
+        products = []
+        for element in product_elements:
+            try:
+                product = self.extract_product(element)
+            except Exception as e:
+                print(f"Error processing product element: {e}")
+                continue
+            if product is None:
+                continue
+            products.append(product)
+            if len(products) >= max_results:
+                break
+        return products
+
+    def _find_product_elements(self, soup, max_results):
+        # Get more than needed; some elements turn out not to be products
+        limit = max_results * 2
+        for tag, attrs in PRODUCT_SELECTORS:
+            found = soup.find_all(tag, attrs)
+            if found:
+                print(f"Found {len(found)} elements using {tag} selector")
+                return found[:limit]
+
+        # Fallback: search for any element with product-related text
+        return soup.find_all(['div', 'article', 'li'], string=FALLBACK_TEXT_RE, limit=limit)
+
+    def extract_product(self, element):
+        """Product dict for one element, or None if it has no name or price"""
+        name = ""
+        for tag, attrs in NAME_SELECTORS:
+            name_elem = element.find(tag, attrs)
+            if name_elem:
+                name = name_elem.get_text(strip=True)
+                if name and len(name) > 3:
+                    break
+        if not name:
+            return None
+
+        element_text = element.get_text()
+
+        price = None
+        for tag, attrs in PRICE_SELECTORS:
+            price_elem = element.find(tag, attrs)
+            if price_elem:
+                # Extract price (look for euro amounts)
+                price_match = PRICE_RE.search(price_elem.get_text(strip=True))
+                if price_match:
+                    price = float(price_match.group(1).replace(',', '.'))
+                    break
+        if price is None:
+            price_match = TEXT_PRICE_RE.search(element_text)
+            if price_match:
+                price = float(price_match.group(1).replace(',', '.'))
+        if price is None:
+            return None
+
+        link_elem = element.find('a', href=True)
+        product_url = absolute_url(link_elem.get('href', '')) if link_elem else ""
+        if not product_url:
+            # Also try to find URL in data attributes
+            product_url = absolute_url(
+                element.get('href', '') or element.get('data-href', '') or element.get('data-url', ''))
+
+        image_url = ""
+        img_elem = element.find('img')
+        if img_elem:
+            image_url = absolute_url(
+                img_elem.get('src', '') or img_elem.get('data-src', '') or img_elem.get('data-lazy-src', ''))
+
+        discount_offer = ""
+        is_bonus = False
+        if BONUS_RE.search(element_text):
+            is_bonus = True
+            bonus_match = BONUS_TEXT_RE.search(element_text)
+            discount_offer = bonus_match.group(0)[:50] if bonus_match else "BONUS"
+
+        unit_match = UNIT_RE.search(element_text)
+        unit = unit_match.group(1) if unit_match else ""
+
+        return {
+            "name": name,
+            "image_url": image_url,
+            "price_without_membership": price,
+            "price_with_membership": price,  # Default to same if not found
+            "discount_offer": discount_offer,
+            "url": product_url,
+            "category": self.classifier.classify(name),
+            "is_bonus": is_bonus,
+            "unit": unit
+        }
+
+
+# Global instance
+_product_extractor = None
+
+
+def get_product_extractor():
+    """Get or create the global product extractor"""
+    global _product_extractor
+    if _product_extractor is None:
+        _product_extractor = ProductExtractor()
+    return _product_extractor
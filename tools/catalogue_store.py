@@ -0,0 +1,296 @@
+"""
+Local snapshot of the ah.nl product catalogue.
+
+Products extracted from crawled (or saved) category and search pages are kept
+in SQLite with an FTS5 index over name, brand, unit and category, plus a
+trigram index over names so a word inside a Dutch compound ("brood" in
+"tijgerbrood") is found too. Product lookups and Price Checker searches are
+answered from the snapshot in milliseconds, and keep working offline; live
+scrapes add to it as they happen.
+
+Ingest saved pages with:
+    python -m tools.catalogue_store page.html [directory ...]
+"""
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from pathlib import Path
+
+from tools.ah_extractor import get_product_extractor
+
+
+DEFAULT_CATALOGUE_PATH = Path(__file__).resolve().parent.parent / '.cache' / 'catalogue.sqlite3'
+# Products read from one page during ingest; category pages hold far more than a search
+INGEST_MAX_RESULTS = 1000
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+PRODUCT_COLUMNS = ('name', 'brand', 'unit', 'category', 'price_without_membership',
+                   'price_with_membership', 'is_bonus', 'discount_offer', 'url', 'image_url')
+
+
+def product_key(product):
+    """Identity of a product across pages: its URL, else its name and unit"""
+    if product.get('url'):
+        return product['url']
+    return f"{product.get('name', '').strip().lower()}\x00{product.get('unit', '').strip().lower()}"
+
+
+def brand_of(name):
+    """Brand of an ah.nl product name, which the site puts first (e.g. 'AH', 'Heineken')"""
+    words = (name or '').split()
+    return words[0] if words else ''
+
+
+def fts_query(query):
+    """FTS5 query matching every word of a free-text query as a prefix"""
+    return ' '.join(f'"{token}"*' for token in TOKEN_RE.findall((query or '').lower()))
+
+
+def substring_query(query):
+    """Trigram FTS5 query matching every word of 3+ characters anywhere in the name"""
+    return ' '.join(f'"{token}"' for token in TOKEN_RE.findall((query or '').lower()) if len(token) >= 3)
+
+
+class CatalogueStore:
+    """SQLite product table with an FTS5 index, searched before going to ah.nl"""
+
+    def __init__(self, path=None):
+        """
+        Args:
+            path: SQLite file (default: CATALOGUE_PATH or .cache/catalogue.sqlite3),
+                  or ':memory:' for a throwaway snapshot
+        """
+        self.path = str(path or os.getenv('CATALOGUE_PATH', DEFAULT_CATALOGUE_PATH))
+        self.hits = 0
+        self.misses = 0
+        self.version = 0  # Bumped on every write, so derived indexes know when to rebuild
+        self._lock = threading.Lock()
+
+        if self.path != ':memory:':
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS products (
+                id INTEGER PRIMARY KEY,
+                key TEXT NOT NULL UNIQUE,
+                name TEXT NOT NULL,
+                brand TEXT NOT NULL,
+                unit TEXT NOT NULL,
+                category TEXT NOT NULL,
+                price_without_membership REAL NOT NULL,
+                price_with_membership REAL NOT NULL,
+                is_bonus INTEGER NOT NULL,
+                discount_offer TEXT NOT NULL,
+                url TEXT NOT NULL,
+                image_url TEXT NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(
+                name, brand, unit, category,
+                content='products', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+            );
+            -- Keep the external-content index in step with the table
+            CREATE TRIGGER IF NOT EXISTS products_ai AFTER INSERT ON products BEGIN
+                INSERT INTO products_fts (rowid, name, brand, unit, category)
+                VALUES (new.id, new.name, new.brand, new.unit, new.category);
+            END;
+            CREATE TRIGGER IF NOT EXISTS products_ad AFTER DELETE ON products BEGIN
+                INSERT INTO products_fts (products_fts, rowid, name, brand, unit, category)
+                VALUES ('delete', old.id, old.name, old.brand, old.unit, old.category);
+            END;
+            CREATE TRIGGER IF NOT EXISTS products_au AFTER UPDATE ON products BEGIN
+                INSERT INTO products_fts (products_fts, rowid, name, brand, unit, category)
+                VALUES ('delete', old.id, old.name, old.brand, old.unit, old.category);
+                INSERT INTO products_fts (rowid, name, brand, unit, category)
+                VALUES (new.id, new.name, new.brand, new.unit, new.category);
+            END;
+        """)
+        self._conn.commit()
+        self.substring_search = self._create_substring_index()
+
+    def _create_substring_index(self):
+        """Trigram index over names; False if this SQLite build has no trigram tokenizer"""
+        try:
+            self._conn.executescript("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS products_trigram USING fts5(
+                    name, content='products', content_rowid='id', tokenize='trigram'
+                );
+                CREATE TRIGGER IF NOT EXISTS products_trigram_ai AFTER INSERT ON products BEGIN
+                    INSERT INTO products_trigram (rowid, name) VALUES (new.id, new.name);
+                END;
+                CREATE TRIGGER IF NOT EXISTS products_trigram_ad AFTER DELETE ON products BEGIN
+                    INSERT INTO products_trigram (products_trigram, rowid, name) VALUES ('delete', old.id, old.name);
+                END;
+                CREATE TRIGGER IF NOT EXISTS products_trigram_au AFTER UPDATE ON products BEGIN
+                    INSERT INTO products_trigram (products_trigram, rowid, name) VALUES ('delete', old.id, old.name);
+                    INSERT INTO products_trigram (rowid, name) VALUES (new.id, new.name);
+                END;
+            """)
+            self._conn.commit()
+            return True
+        except sqlite3.OperationalError as e:
+            print(f"Catalogue substring search unavailable: {e}")
+            return False
+
+    def add_products(self, products):
+        """
+        Insert or update products (dicts shaped like ProductExtractor output)
+
+        Returns:
+            Number of products written
+        """
+        now = time.time()
+        rows = []
+        for product in products:
+            name = (product.get('name') or '').strip()
+            if not name:
+                continue
+            price = float(product.get('price_without_membership') or 0.0)
+            rows.append((
+                product_key(product), name, product.get('brand') or brand_of(name),
+                product.get('unit') or '', product.get('category') or 'Other', price,
+                float(product.get('price_with_membership') or price), int(bool(product.get('is_bonus'))),
+                product.get('discount_offer') or '', product.get('url') or '', product.get('image_url') or '',
+                now,
+            ))
+        if not rows:
+            return 0
+        columns = ', '.join(PRODUCT_COLUMNS)
+        updates = ', '.join(f"{column} = excluded.{column}" for column in PRODUCT_COLUMNS)
+        with self._lock:
+            self._conn.executemany(
+                f"INSERT INTO products (key, {columns}, updated_at) VALUES ({', '.join('?' * 12)}) "
+                f"ON CONFLICT(key) DO UPDATE SET {updates}, updated_at = excluded.updated_at",
+                rows)
+            self._conn.commit()
+            self.version += 1
+        return len(rows)
+
+    def ingest_pages(self, pages, extractor=None):
+        """
+        Extract products from ah.nl category or search pages and add them to the snapshot
+
+        Args:
+            pages: Iterable of page HTML (str or bytes)
+            extractor: ProductExtractor to use (default: the shared extractor)
+
+        Returns:
+            Number of products written
+        """
+        extractor = extractor or get_product_extractor()
+        count = 0
+        for html in pages:
+            count += self.add_products(extractor.extract(html, INGEST_MAX_RESULTS))
+        return count
+
+    def ingest_paths(self, paths, extractor=None):
+        """Ingest saved .html pages; directories are searched recursively"""
+        files = []
+        for path in map(Path, paths):
+            files.extend(sorted(path.rglob('*.html')) if path.is_dir() else [path])
+        return self.ingest_pages((f.read_bytes() for f in files), extractor)
+
+    def search(self, query, limit=10):
+        """
+        Full-text search of the snapshot
+
+        Products where every word of the query prefix-matches a word of the
+        name, brand, unit or category come first; names containing every word
+        (e.g. inside a compound) fill the remaining places.
+
+        Returns:
+            Product dicts shaped like ProductExtractor output, best match first
+            (empty if nothing matches)
+        """
+        match = fts_query(query)
+        if not match:
+            return []
+        columns = ', '.join(f"p.{column}" for column in PRODUCT_COLUMNS if column != 'brand')
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT p.id, {columns} FROM products_fts JOIN products p ON p.id = products_fts.rowid "
+                # Name matches weigh most, then brand, unit and category
+                "WHERE products_fts MATCH ? ORDER BY bm25(products_fts, 10.0, 4.0, 1.0, 2.0) LIMIT ?",
+                (match, int(limit))).fetchall()
+            substring = substring_query(query) if self.substring_search else ''
+            if len(rows) < limit and substring:
+                seen = {row[0] for row in rows}
+                more = self._conn.execute(
+                    f"SELECT p.id, {columns} FROM products_trigram "
+                    "JOIN products p ON p.id = products_trigram.rowid "
+                    "WHERE products_trigram MATCH ? ORDER BY rank LIMIT ?",
+                    (substring, int(limit) + len(seen))).fetchall()
+                rows += [row for row in more if row[0] not in seen][:limit - len(rows)]
+            if rows:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return [self._row_to_product(row[1:]) for row in rows]
+
+    def iter_products(self):
+        """Every product in the snapshot, in insertion order"""
+        columns = ', '.join(column for column in PRODUCT_COLUMNS if column != 'brand')
+        with self._lock:
+            rows = self._conn.execute(f"SELECT {columns} FROM products ORDER BY id").fetchall()
+        return (self._row_to_product(row) for row in rows)
+
+    def find(self, name):
+        """Best snapshot match for a product name, or None"""
+        products = self.search(name, limit=1)
+        return products[0] if products else None
+
+    @staticmethod
+    def _row_to_product(row):
+        name, unit, category, price, member_price, is_bonus, discount_offer, url, image_url = row
+        return {
+            "name": name,
+            "image_url": image_url,
+            "price_without_membership": price,
+            "price_with_membership": member_price,
+            "discount_offer": discount_offer,
+            "url": url,
+            "category": category,
+            "is_bonus": bool(is_bonus),
+            "unit": unit,
+        }
+
+    def clear(self):
+        """Remove every product"""
+        with self._lock:
+            self._conn.execute("DELETE FROM products")
+            self._conn.commit()
+            self.version += 1
+
+    def stats(self):
+        """Product count and hit/miss counters"""
+        with self._lock:
+            count = self._conn.execute("SELECT COUNT(*) FROM products").fetchone()[0]
+            return {'products': count, 'hits': self.hits, 'misses': self.misses}
+
+
+# Global instance
+_catalogue_store = None
+_catalogue_store_lock = threading.Lock()
+
+
+def get_catalogue_store():
+    """Get or create the global catalogue snapshot"""
+    global _catalogue_store
+    if _catalogue_store is None:
+        with _catalogue_store_lock:
+            if _catalogue_store is None:
+                _catalogue_store = CatalogueStore()
+    return _catalogue_store
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        sys.exit("Usage: python -m tools.catalogue_store PAGE.html|DIRECTORY ...")
+    store = get_catalogue_store()
+    written = store.ingest_paths(sys.argv[1:])
+    print(f"Ingested {written} products; snapshot now holds {store.stats()['products']}")
@@ -0,0 +1,121 @@
+"""
+Keyword category classifier for grocery product names.
+
+The taxonomy (config/categories.json) lists categories in priority order,
+each with keywords matched anywhere in a name ("contains", so "brood" finds
+"tijgerbrood") and keywords matched as whole words only ("words", so "gin"
+does not fire on "aubergine"). Its categories line up with the ones
+BudgetEvaluator budgets against (Alcohol, Snacks, Fruit, ...).
+
+All keywords are compiled into one regex shaped as a character trie, so a
+name is scanned once and each position only tries the keywords starting
+with its character. At any position the longest keyword wins ("pindakaas"
+before "pinda"); of all keywords found, the category listed first wins.
+"""
+import json
+import os
+import re
+import threading
+from pathlib import Path
+
+
+DEFAULT_TAXONOMY_PATH = Path(__file__).resolve().parent.parent / 'config' / 'categories.json'
+
+# Trie node markers for where a keyword ends; edges are single characters, so they cannot clash
+_CONTAINS_END = ''
+_WORD_END = 'word end'
+
+
+def load_taxonomy(path=None):
+    """Read a taxonomy file (default: CATEGORY_TAXONOMY_PATH or config/categories.json)"""
+    path = path or os.getenv('CATEGORY_TAXONOMY_PATH', DEFAULT_TAXONOMY_PATH)
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _trie_pattern(keywords):
+    """Regex matching any keyword, longest first; keywords are (text, whole_word) pairs"""
+    trie = {}
+    for text, whole_word in keywords:
+        node = trie
+        for char in text:
+            node = node.setdefault(char, {})
+        node[_WORD_END if whole_word else _CONTAINS_END] = True
+
+    def build(node):
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if len(char) == 1]
+        # Ending here is the last alternative, so longer keywords are tried first
+        if _CONTAINS_END in node:
+            branches.append('')
+        elif _WORD_END in node:
+            branches.append(r'\b')
+        if len(branches) == 1:
+            return branches[0]
+        return '(?:' + '|'.join(branches) + ')'
+
+    return build(trie)
+
+
+class CategoryClassifier:
+    """Single-pass keyword classifier over a priority-ordered taxonomy"""
+
+    def __init__(self, taxonomy=None):
+        """
+        Args:
+            taxonomy: Dict with 'categories' (list of {'category', 'contains', 'words'} in
+                      priority order) and 'fallback' (default: load_taxonomy())
+        """
+        taxonomy = taxonomy or load_taxonomy()
+        self.fallback = taxonomy.get('fallback', 'Other')
+        self.categories = [entry['category'] for entry in taxonomy['categories']]
+        self._keywords = {}  # keyword -> priority (index into categories)
+        contains, words = [], []
+        for priority, entry in enumerate(taxonomy['categories']):
+            for whole_word, keywords in ((False, entry.get('contains', ())), (True, entry.get('words', ()))):
+                for keyword in keywords:
+                    keyword = keyword.lower()
+                    if self._keywords.setdefault(keyword, priority) != priority:
+                        raise ValueError(f"Keyword {keyword!r} is listed under two categories")
+                    (words if whole_word else contains).append((keyword, whole_word))
+        alternatives = []
+        if words:
+            alternatives.append(r'\b' + _trie_pattern(words))
+        if contains:
+            alternatives.append(_trie_pattern(contains))
+        self._pattern = re.compile('|'.join(alternatives) or r'(?!)')
+
+    def classify(self, name):
+        """Category of one product name, or the fallback category if no keyword occurs in it"""
+        best = len(self.categories)
+        for match in self._pattern.finditer((name or '').lower()):
+            priority = self._keywords[match.group()]
+            if priority < best:
+                best = priority
+                if not best:
+                    break
+        return self.categories[best] if best < len(self.categories) else self.fallback
+
+    def classify_many(self, names):
+        """
+        Categories of many names, in input order; repeated names are classified once
+
+        Returns:
+            List of category names
+        """
+        seen = {}
+        return [seen[name] if name in seen else seen.setdefault(name, self.classify(name)) for name in names]
+
+
+# Global instance
+_category_classifier = None
+_category_classifier_lock = threading.Lock()
+
+
+def get_category_classifier():
+    """Get or create the global classifier over the bundled taxonomy"""
+    global _category_classifier
+    if _category_classifier is None:
+        with _category_classifier_lock:
+            if _category_classifier is None:
+                _category_classifier = CategoryClassifier()
+    return _category_classifier
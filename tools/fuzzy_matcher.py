@@ -0,0 +1,152 @@
+"""
+Fuzzy matching of Albert Heijn receipt lines to catalogue products.
+
+Receipt names are abbreviated and carry pack sizes ("AH HALFV MELK",
+"BAP WIT 2ST"). They are normalized (sizes dropped, common abbreviations
+expanded) and ranked against product names by trigram Dice similarity.
+
+An inverted index maps each trigram to the products containing it. A
+product with Dice similarity of at least t must contain one of the query's
+|q| - ceil(t|q| / (2 - t)) + 1 rarest trigrams, so postings are probed
+rarest first and each new product is scored as it turns up. Every better
+score found raises t and shortens the list of postings still to probe; a
+near-exact match usually ends the lookup after the first short posting.
+Lookup cost therefore follows how selective the query is rather than the
+catalogue size.
+"""
+import math
+import os
+import re
+
+
+DEFAULT_THRESHOLD = 0.5
+
+# Abbreviations printed on AH receipts -> the word used in product names
+RECEIPT_ABBREVIATIONS = {
+    'halfv': 'halfvolle',
+    'hv': 'halfvolle',
+    'mlk': 'melk',
+    'bio': 'biologisch',
+    'vk': 'volkoren',
+    'volk': 'volkoren',
+    'ital': 'italiaanse',
+    'aardapp': 'aardappelen',
+    'kaasbl': 'kaasblokjes',
+    'yogh': 'yoghurt',
+    'grks': 'grieks',
+    'sinaas': 'sinaasappel',
+    'tom': 'tomaten',
+    'komk': 'komkommer',
+    'sperz': 'sperziebonen',
+    'rundergeh': 'rundergehakt',
+    'kipfil': 'kipfilet',
+    'scharr': 'scharrel',
+    'pind': 'pinda',
+}
+
+# Pack sizes, counts and fat classes ("500G", "2ST", "6X30CL", "48+") say nothing about the product
+SIZE_RE = re.compile(
+    r'\b\d+(?:[.,]\d+)?\s*(?:x\s*\d+(?:[.,]\d+)?\s*)?(?:st|stuks?|g|gr|gram|kg|l|cl|ml|ltr|x)?(?=\s|$|\+)\+?',
+    re.I)
+WORD_RE = re.compile(r'[^\W\d_]+', re.UNICODE)
+
+
+def normalize_name(raw_name):
+    """Lowercase words of a receipt or product name with sizes removed and abbreviations expanded"""
+    text = SIZE_RE.sub(' ', (raw_name or '').lower())
+    return ' '.join(RECEIPT_ABBREVIATIONS.get(word, word) for word in WORD_RE.findall(text))
+
+
+def trigrams(text):
+    """Set of word trigrams, each word padded as in pg_trgm ("  melk " -> "  m", " me", ...)"""
+    grams = set()
+    for word in text.split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def prefix_length(size, threshold):
+    """How many of a query's rarest trigrams a product with Dice >= threshold must include one of"""
+    # Dice = 2s / (|q| + |p|) >= t with s <= |p| needs s >= t|q| / (2 - t)
+    min_shared = max(1, math.ceil(threshold * size / (2 - threshold) - 1e-9))
+    return size - min_shared + 1
+
+
+class FuzzyMatcher:
+    """Trigram inverted index over product names with batched, thresholded lookup"""
+
+    def __init__(self, entries=(), threshold=None):
+        """
+        Args:
+            entries: Iterable of (name, product) pairs; product is returned on a match
+            threshold: Lowest Dice similarity accepted as a match
+                       (default: FUZZY_MATCH_THRESHOLD or 0.5)
+        """
+        self.threshold = threshold if threshold is not None else float(
+            os.getenv('FUZZY_MATCH_THRESHOLD', DEFAULT_THRESHOLD))
+        self._products = []
+        self._grams = []
+        self._postings = {}
+        for name, product in entries:
+            self.add(name, product)
+
+    def __len__(self):
+        return len(self._products)
+
+    def add(self, name, product):
+        """Index one product under a name"""
+        grams = trigrams(normalize_name(name))
+        if not grams:
+            return
+        index = len(self._products)
+        self._products.append(product)
+        self._grams.append(grams)
+        for gram in grams:
+            self._postings.setdefault(gram, []).append(index)
+
+    def match(self, raw_name, threshold=None):
+        """
+        Best match for one name
+
+        Returns:
+            Dict with 'raw_name', 'normalized', 'product' (None below the threshold)
+            and 'score' (similarity of the best product seen, 0.0 if none)
+        """
+        threshold = self.threshold if threshold is None else threshold
+        normalized = normalize_name(raw_name)
+        grams = trigrams(normalized)
+        best, best_score = None, 0.0
+        if grams:
+            postings = sorted((self._postings.get(gram, ()) for gram in grams), key=len)
+            seen = set()
+            probed = 0
+            while probed < prefix_length(len(grams), max(threshold, best_score)):
+                for index in postings[probed]:
+                    if index in seen:
+                        continue
+                    seen.add(index)
+                    candidate = self._grams[index]
+                    score = 2 * len(grams & candidate) / (len(grams) + len(candidate))
+                    # Ties go to the product indexed first (curated entries are added first)
+                    if score > best_score or (score == best_score and best is not None and index < best):
+                        best, best_score = index, score
+                probed += 1
+        product = self._products[best] if best is not None and best_score >= threshold else None
+        return {'raw_name': raw_name, 'normalized': normalized, 'product': product,
+                'score': round(best_score, 4)}
+
+    def match_many(self, raw_names, threshold=None):
+        """
+        Match a batch of names; repeated names are looked up once
+
+        Returns:
+            One match dict per name, in input order (see match())
+        """
+        results = {}
+        matches = []
+        for raw_name in raw_names:
+            if raw_name not in results:
+                results[raw_name] = self.match(raw_name, threshold)
+            matches.append(dict(results[raw_name]))
+        return matches
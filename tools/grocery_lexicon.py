@@ -0,0 +1,367 @@
+"""
+Bundled English <-> Dutch grocery lexicon.
+
+Covers the product names and categories people type into the Price Checker,
+so common queries are translated locally. A query is only translated when
+every word is known (English entry, Dutch word or quantity); anything else
+returns None and goes to the translation cache or the LLM.
+"""
+import re
+
+
+# English phrase -> Dutch, as searched on ah.nl. Multi-word phrases win over
+# their parts ("peanut butter" is pindakaas, not pinda boter).
+EN_TO_NL = {
+    # Dairy and eggs
+    'milk': 'melk',
+    'whole milk': 'volle melk',
+    'semi skimmed milk': 'halfvolle melk',
+    'semi-skimmed milk': 'halfvolle melk',
+    'skimmed milk': 'magere melk',
+    'buttermilk': 'karnemelk',
+    'chocolate milk': 'chocolademelk',
+    'oat milk': 'havermelk',
+    'almond milk': 'amandelmelk',
+    'soy milk': 'sojamelk',
+    'coconut milk': 'kokosmelk',
+    'cheese': 'kaas',
+    'cream cheese': 'roomkaas',
+    'cottage cheese': 'hüttenkäse',
+    'goat cheese': 'geitenkaas',
+    'grated cheese': 'geraspte kaas',
+    'yogurt': 'yoghurt',
+    'yoghurt': 'yoghurt',
+    'greek yogurt': 'griekse yoghurt',
+    'quark': 'kwark',
+    'custard': 'vla',
+    'butter': 'boter',
+    'margarine': 'margarine',
+    'cream': 'room',
+    'whipped cream': 'slagroom',
+    'whipping cream': 'slagroom',
+    'sour cream': 'zure room',
+    'cooking cream': 'kookroom',
+    'egg': 'ei',
+    'eggs': 'eieren',
+    # Bakery
+    'bread': 'brood',
+    'white bread': 'wit brood',
+    'brown bread': 'bruin brood',
+    'whole wheat bread': 'volkorenbrood',
+    'wholemeal bread': 'volkorenbrood',
+    'rolls': 'bolletjes',
+    'bread rolls': 'bolletjes',
+    'bagel': 'bagel',
+    'bagels': 'bagels',
+    'croissant': 'croissant',
+    'croissants': 'croissants',
+    'raisin buns': 'krentenbollen',
+    'wraps': 'wraps',
+    'tortillas': 'tortilla',
+    'crackers': 'crackers',
+    'rusks': 'beschuit',
+    'cake': 'cake',
+    'cookies': 'koekjes',
+    'biscuits': 'koekjes',
+    'pastry': 'gebak',
+    # Fruit
+    'fruit': 'fruit',
+    'apple': 'appel',
+    'apples': 'appels',
+    'banana': 'banaan',
+    'bananas': 'bananen',
+    'orange': 'sinaasappel',
+    'oranges': 'sinaasappels',
+    'pear': 'peer',
+    'pears': 'peren',
+    'grapes': 'druiven',
+    'strawberries': 'aardbeien',
+    'raspberries': 'frambozen',
+    'blueberries': 'blauwe bessen',
+    'cherries': 'kersen',
+    'lemon': 'citroen',
+    'lemons': 'citroenen',
+    'lime': 'limoen',
+    'limes': 'limoenen',
+    'mango': 'mango',
+    'pineapple': 'ananas',
+    'melon': 'meloen',
+    'watermelon': 'watermeloen',
+    'kiwi': 'kiwi',
+    'avocado': 'avocado',
+    'avocados': "avocado's",
+    'peach': 'perzik',
+    'peaches': 'perziken',
+    'plums': 'pruimen',
+    'mandarins': 'mandarijnen',
+    'raisins': 'rozijnen',
+    # Vegetables
+    'vegetables': 'groente',
+    'potato': 'aardappel',
+    'potatoes': 'aardappelen',
+    'sweet potato': 'zoete aardappel',
+    'sweet potatoes': 'zoete aardappelen',
+    'tomato': 'tomaat',
+    'tomatoes': 'tomaten',
+    'cherry tomatoes': 'cherrytomaten',
+    'cucumber': 'komkommer',
+    'lettuce': 'sla',
+    'salad': 'salade',
+    'carrot': 'wortel',
+    'carrots': 'wortels',
+    'onion': 'ui',
+    'onions': 'uien',
+    'red onion': 'rode ui',
+    'spring onion': 'bosui',
+    'spring onions': 'bosuitjes',
+    'garlic': 'knoflook',
+    'bell pepper': 'paprika',
+    'peppers': 'paprika',
+    'chili pepper': 'rode peper',
+    'mushrooms': 'champignons',
+    'spinach': 'spinazie',
+    'broccoli': 'broccoli',
+    'cauliflower': 'bloemkool',
+    'cabbage': 'kool',
+    'red cabbage': 'rode kool',
+    'brussels sprouts': 'spruitjes',
+    'green beans': 'sperziebonen',
+    'beans': 'bonen',
+    'peas': 'erwten',
+    'corn': 'mais',
+    'leek': 'prei',
+    'zucchini': 'courgette',
+    'courgette': 'courgette',
+    'eggplant': 'aubergine',
+    'aubergine': 'aubergine',
+    'asparagus': 'asperges',
+    'beetroot': 'rode biet',
+    'celery': 'selderij',
+    'ginger': 'gember',
+    'herbs': 'kruiden',
+    'basil': 'basilicum',
+    'parsley': 'peterselie',
+    # Meat, fish and vegetarian
+    'meat': 'vlees',
+    'chicken': 'kip',
+    'chicken breast': 'kipfilet',
+    'chicken fillet': 'kipfilet',
+    'chicken thighs': 'kippendijen',
+    'beef': 'rundvlees',
+    'ground beef': 'rundergehakt',
+    'minced meat': 'gehakt',
+    'mince': 'gehakt',
+    'pork': 'varkensvlees',
+    'steak': 'biefstuk',
+    'bacon': 'spekjes',
+    'ham': 'ham',
+    'sausage': 'worst',
+    'sausages': 'worstjes',
+    'smoked sausage': 'rookworst',
+    'salami': 'salami',
+    'meatballs': 'gehaktballen',
+    'fish': 'vis',
+    'salmon': 'zalm',
+    'tuna': 'tonijn',
+    'shrimp': 'garnalen',
+    'prawns': 'garnalen',
+    'cod': 'kabeljauw',
+    'herring': 'haring',
+    'tofu': 'tofu',
+    'vegetarian': 'vegetarisch',
+    'vegan': 'vegan',
+    # Pantry
+    'rice': 'rijst',
+    'pasta': 'pasta',
+    'spaghetti': 'spaghetti',
+    'noodles': 'noedels',
+    'flour': 'bloem',
+    'sugar': 'suiker',
+    'brown sugar': 'bruine suiker',
+    'salt': 'zout',
+    'pepper': 'peper',
+    'black pepper': 'zwarte peper',
+    'oil': 'olie',
+    'olive oil': 'olijfolie',
+    'sunflower oil': 'zonnebloemolie',
+    'vinegar': 'azijn',
+    'honey': 'honing',
+    'jam': 'jam',
+    'peanut butter': 'pindakaas',
+    'chocolate spread': 'chocoladepasta',
+    'chocolate sprinkles': 'hagelslag',
+    'sprinkles': 'hagelslag',
+    'cereal': 'ontbijtgranen',
+    'oats': 'havermout',
+    'oatmeal': 'havermout',
+    'muesli': 'muesli',
+    'granola': 'granola',
+    'soup': 'soep',
+    'tomato sauce': 'tomatensaus',
+    'pasta sauce': 'pastasaus',
+    'soy sauce': 'sojasaus',
+    'ketchup': 'ketchup',
+    'mayonnaise': 'mayonaise',
+    'mustard': 'mosterd',
+    'spices': 'kruiden',
+    'baking powder': 'bakpoeder',
+    'yeast': 'gist',
+    'nuts': 'noten',
+    'peanuts': 'pinda',
+    'almonds': 'amandelen',
+    'chips': 'chips',
+    'crisps': 'chips',
+    'popcorn': 'popcorn',
+    'chocolate': 'chocolade',
+    'candy': 'snoep',
+    'sweets': 'snoep',
+    'licorice': 'drop',
+    'liquorice': 'drop',
+    'canned tomatoes': 'tomatenblokjes',
+    'chickpeas': 'kikkererwten',
+    'lentils': 'linzen',
+    # Frozen
+    'frozen': 'diepvries',
+    'frozen pizza': 'diepvriespizza',
+    'pizza': 'pizza',
+    'ice cream': 'ijs',
+    'fries': 'friet',
+    'french fries': 'friet',
+    # Beverages
+    'water': 'water',
+    'sparkling water': 'bruisend water',
+    'mineral water': 'mineraalwater',
+    'juice': 'sap',
+    'orange juice': 'sinaasappelsap',
+    'apple juice': 'appelsap',
+    'coffee': 'koffie',
+    'coffee beans': 'koffiebonen',
+    'tea': 'thee',
+    'green tea': 'groene thee',
+    'soda': 'frisdrank',
+    'soft drinks': 'frisdrank',
+    'cola': 'cola',
+    'lemonade': 'limonade',
+    'beer': 'bier',
+    'wine': 'wijn',
+    'red wine': 'rode wijn',
+    'white wine': 'witte wijn',
+    'rose wine': 'rosé',
+    'sparkling wine': 'mousserende wijn',
+    # Household and personal care
+    'toilet paper': 'toiletpapier',
+    'paper towels': 'keukenpapier',
+    'kitchen roll': 'keukenpapier',
+    'tissues': 'tissues',
+    'dish soap': 'afwasmiddel',
+    'washing up liquid': 'afwasmiddel',
+    'dishwasher tablets': 'vaatwastabletten',
+    'laundry detergent': 'wasmiddel',
+    'detergent': 'wasmiddel',
+    'fabric softener': 'wasverzachter',
+    'soap': 'zeep',
+    'shampoo': 'shampoo',
+    'toothpaste': 'tandpasta',
+    'deodorant': 'deodorant',
+    'diapers': 'luiers',
+    'nappies': 'luiers',
+    'trash bags': 'afvalzakken',
+    'bin bags': 'afvalzakken',
+    'cat food': 'kattenvoer',
+    'dog food': 'hondenvoer',
+    # Modifiers
+    'organic': 'biologisch',
+    'fresh': 'verse',
+    'light': 'light',
+    'low fat': 'halfvolle',
+    'sugar free': 'suikervrij',
+    'lactose free': 'lactosevrij',
+    'gluten free': 'glutenvrij',
+    'whole': 'volle',
+    'red': 'rode',
+    'green': 'groene',
+    'white': 'witte',
+    'brown': 'bruin',
+    'sliced': 'gesneden',
+    'smoked': 'gerookte',
+    'young': 'jonge',
+    'old': 'oude',
+    'mature': 'belegen',
+    'and': 'en',
+    'with': 'met',
+}
+
+# Dutch words that pass through unchanged (everything the English side maps to,
+# plus common AH search words not reached from English)
+NL_WORDS = frozenset(
+    word for phrase in EN_TO_NL.values() for word in phrase.split()
+) | frozenset([
+    'ah', 'bio', 'halfvol', 'vol', 'mager', 'jong', 'belegen', 'oud', 'komijnekaas', 'zuivel',
+    'scharreleieren', 'bolletje', 'krentenbol', 'roerbak', 'kipfilet', 'vers', 'zak', 'pak',
+])
+
+# Dutch phrase -> English; the first English phrase listed for a Dutch one wins
+NL_TO_EN = {}
+for _en, _nl in EN_TO_NL.items():
+    NL_TO_EN.setdefault(_nl, _en)
+
+_QUANTITY_RE = re.compile(r"^\d+(?:[.,]\d+)?(?:x|st|stuks|g|gr|kg|ml|cl|l|liter|%)?$")
+_WORD_RE = re.compile(r"[^\W_]+(?:['-][^\W_]+)*", re.UNICODE)
+_MAX_PHRASE_WORDS = max(len(phrase.split()) for phrase in list(EN_TO_NL) + list(NL_TO_EN))
+
+
+def tokenize(query):
+    """Lowercase words of a query, punctuation dropped"""
+    return _WORD_RE.findall((query or '').lower())
+
+
+def _translate_words(words, lexicon, passthrough):
+    """Greedy longest-phrase translation; None when a word is not covered"""
+    out = []
+    i = 0
+    while i < len(words):
+        for size in range(min(_MAX_PHRASE_WORDS, len(words) - i), 0, -1):
+            phrase = ' '.join(words[i:i + size])
+            if phrase in lexicon:
+                out.append(lexicon[phrase])
+                i += size
+                break
+        else:
+            word = words[i]
+            if word not in passthrough and not _QUANTITY_RE.match(word):
+                return None
+            out.append(word)
+            i += 1
+    return ' '.join(out)
+
+
+def translate_to_dutch(query):
+    """
+    Translate an English grocery query to Dutch using the lexicon only
+
+    Returns:
+        The Dutch query, or None if any word is not covered by the lexicon
+    """
+    words = tokenize(query)
+    if not words:
+        return None
+    return _translate_words(words, EN_TO_NL, NL_WORDS)
+
+
+def translate_to_english(query):
+    """Translate a Dutch grocery query to English using the lexicon only, or None"""
+    words = tokenize(query)
+    if not words:
+        return None
+    return _translate_words(words, NL_TO_EN, frozenset(EN_TO_NL))
+
+
+def has_english_words(query):
+    """True if any word or phrase of the query is an English lexicon entry that is not also Dutch"""
+    words = tokenize(query)
+    for size in range(1, _MAX_PHRASE_WORDS + 1):
+        for i in range(len(words) - size + 1):
+            phrase = ' '.join(words[i:i + size])
+            if phrase in EN_TO_NL and phrase not in NL_WORDS:
+                return True
+    return False
@@ -0,0 +1,262 @@
+"""
+Pooled HTTP client for the AH scraper.
+
+One long-lived requests.Session keeps connections alive between searches,
+retries transient failures with backoff, and revalidates pages it has seen
+before with ETag / If-Modified-Since against a local SQLite response store,
+so unchanged pages come back as a bodiless 304.
+"""
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.request import ACCEPT_ENCODING
+from urllib3.util.retry import Retry
+
+
+DEFAULT_STORE_PATH = Path(__file__).resolve().parent.parent / '.cache' / 'ah_responses.sqlite3'
+DEFAULT_STORE_MAX_BYTES = 32 * 1024 * 1024
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+def build_session(pool_connections=None, pool_maxsize=None, retries=None, backoff_factor=None):
+    """
+    Create a requests.Session with a tuned connection pool and retries
+
+    Args:
+        pool_connections: Hosts kept in the pool (default: AH_HTTP_POOL_CONNECTIONS or 4)
+        pool_maxsize: Connections kept per host, i.e. concurrent requests to one host
+                      without opening extra sockets (default: AH_HTTP_POOL_MAXSIZE or 16)
+        retries: Retries for connection errors and 429/5xx responses (default: AH_HTTP_RETRIES or 3)
+        backoff_factor: Retry n waits backoff_factor * 2**(n - 1) seconds (default: AH_HTTP_BACKOFF or 0.5)
+    """
+    pool_connections = pool_connections or int(os.getenv('AH_HTTP_POOL_CONNECTIONS', '4'))
+    pool_maxsize = pool_maxsize or int(os.getenv('AH_HTTP_POOL_MAXSIZE', '16'))
+    retries = retries if retries is not None else int(os.getenv('AH_HTTP_RETRIES', '3'))
+    if backoff_factor is None:
+        backoff_factor = float(os.getenv('AH_HTTP_BACKOFF', '0.5'))
+
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset(['GET', 'HEAD']),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=retry)
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    # Only advertise encodings urllib3 can decode (br needs the brotli package)
+    session.headers['Accept-Encoding'] = ACCEPT_ENCODING
+    return session
+
+
+class ResponseStore:
+    """SQLite store of validated responses (body plus ETag/Last-Modified) with LRU eviction"""
+
+    def __init__(self, path=None, max_bytes=None):
+        """
+        Args:
+            path: SQLite file (default: AH_RESPONSE_STORE_PATH or .cache/ah_responses.sqlite3),
+                  or ':memory:' for a throwaway store
+            max_bytes: Total body size kept before the least recently used entries are evicted
+        """
+        self.path = str(path or os.getenv('AH_RESPONSE_STORE_PATH', DEFAULT_STORE_PATH))
+        if max_bytes is None:
+            max_bytes = int(os.getenv('AH_RESPONSE_STORE_MAX_BYTES', DEFAULT_STORE_MAX_BYTES))
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+        if self.path != ':memory:':
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        # Lookups write last_access on every hit; a lost write only costs a refetch
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                url TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                content_type TEXT,
+                body BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                stored_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_last_access ON responses (last_access)")
+        self._conn.commit()
+
+    def get(self, url):
+        """
+        Look up a stored response
+
+        Returns:
+            Dict with 'etag', 'last_modified', 'content_type', 'body' and 'stored_at', or None
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT etag, last_modified, content_type, body, stored_at FROM responses WHERE url = ?",
+                (url,)).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE responses SET last_access = ? WHERE url = ?", (time.time(), url))
+            self._conn.commit()
+        return {'etag': row[0], 'last_modified': row[1], 'content_type': row[2], 'body': row[3],
+                'stored_at': row[4]}
+
+    def put(self, url, body, etag=None, last_modified=None, content_type=None):
+        """Store a response body with its validators"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses "
+                "(url, etag, last_modified, content_type, body, size, stored_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (url, etag, last_modified, content_type, body, len(body), now, now))
+            self._evict()
+            self._conn.commit()
+
+    def touch(self, url):
+        """Mark a stored response as freshly revalidated"""
+        with self._lock:
+            self._conn.execute("UPDATE responses SET stored_at = ? WHERE url = ?", (time.time(), url))
+            self._conn.commit()
+
+    def _evict(self):
+        """Drop least recently used entries until the store fits in max_bytes"""
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self._conn.execute("SELECT url, size FROM responses ORDER BY last_access ASC").fetchall()
+        evicted = []
+        for url, size in rows:
+            if total <= self.max_bytes:
+                break
+            evicted.append((url,))
+            total -= size
+        self._conn.executemany("DELETE FROM responses WHERE url = ?", evicted)
+
+    def clear(self):
+        """Remove every entry"""
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+
+    def stats(self):
+        """Entry count and stored body size"""
+        with self._lock:
+            count, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        return {'entries': count, 'bytes': size}
+
+
+class FetchResult:
+    """Body of a fetched page and how it was obtained"""
+
+    def __init__(self, url, status_code, content, content_type=None, revalidated=False, wire_bytes=0):
+        self.url = url
+        self.status_code = status_code
+        self.content = content
+        self.content_type = content_type
+        self.revalidated = revalidated  # Served from the store after a 304
+        self.wire_bytes = wire_bytes  # Body bytes received, before decompression
+
+
+class HttpClient:
+    """Conditional GETs over a shared pooled session"""
+
+    def __init__(self, session=None, store=None, max_per_host=None):
+        """
+        Args:
+            session: requests.Session to use (default: build_session())
+            store: ResponseStore for revalidation; pass False to disable (default: ResponseStore())
+            max_per_host: Requests in flight to one host at a time, however many threads
+                          are searching (default: AH_HTTP_MAX_PER_HOST or 8)
+        """
+        self.session = session or build_session()
+        if store is None:
+            store = ResponseStore()
+        self.store = store or None
+        self.max_per_host = max_per_host or int(os.getenv('AH_HTTP_MAX_PER_HOST', '8'))
+        self._host_slots = {}
+        self.requests = 0
+        self.revalidated = 0
+        self.wire_bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, url, headers=None, timeout=15):
+        """
+        GET a page, revalidating a stored copy when there is one
+
+        Raises:
+            requests.exceptions.RequestException on network errors and error statuses
+        """
+        request_headers = dict(headers or {})
+        # The session picks an Accept-Encoding it can actually decode
+        request_headers.pop('Accept-Encoding', None)
+        stored = self.store.get(url) if self.store else None
+        if stored:
+            if stored['etag']:
+                request_headers['If-None-Match'] = stored['etag']
+            if stored['last_modified']:
+                request_headers['If-Modified-Since'] = stored['last_modified']
+
+        with self._host_slot(urlsplit(url).netloc):
+            response = self.session.get(url, headers=request_headers, timeout=timeout)
+            content = response.content
+        wire_bytes = response.raw.tell() if response.raw is not None else len(content)
+
+        with self._lock:
+            self.requests += 1
+            self.wire_bytes += wire_bytes
+
+        if response.status_code == 304 and stored:
+            with self._lock:
+                self.revalidated += 1
+            self.store.touch(url)
+            return FetchResult(url, 200, stored['body'], stored['content_type'], revalidated=True,
+                               wire_bytes=wire_bytes)
+
+        response.raise_for_status()
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        content_type = response.headers.get('Content-Type')
+        if self.store and (etag or last_modified):
+            self.store.put(url, content, etag, last_modified, content_type)
+        return FetchResult(url, response.status_code, content, content_type, wire_bytes=wire_bytes)
+
+    def _host_slot(self, host):
+        with self._lock:
+            slot = self._host_slots.get(host)
+            if slot is None:
+                slot = self._host_slots[host] = threading.BoundedSemaphore(self.max_per_host)
+        return slot
+
+    def stats(self):
+        """Request, revalidation and byte counters"""
+        with self._lock:
+            return {'requests': self.requests, 'revalidated': self.revalidated, 'wire_bytes': self.wire_bytes}
+
+
+# Global instance
+_http_client = None
+_http_client_lock = threading.Lock()
+
+
+def get_http_client():
+    """Get or create the global HTTP client (one connection pool per process)"""
+    global _http_client
+    if _http_client is None:
+        with _http_client_lock:
+            if _http_client is None:
+                _http_client = HttpClient()
+    return _http_client
@@ -1,27 +1,495 @@
-class SpendingMemoryMCP:
+"""
+Spending memory: the transactions stored per receipt and the budgets they are checked against.
+
+SpendingMemoryMCP keeps transactions in a list, for tests and throwaway
+runs. SQLiteSpendingMemory has the same interface but persists them in
+SQLite, so history survives restarts; date-range totals are aggregated in SQL
+over an index on (date, category).
+
+Both keep running totals per category that every add, delete and correction
+updates by its delta, so the all-time totals the UI and FinanceAgent ask for
+on every rerun cost O(categories) rather than a pass over all transactions.
+The same deltas maintain day, week and month rollups per category, so
+totals() answers a date range from a few buckets: whole months plus the
+loose days at either edge, however many transactions fall inside.
+"""
+import bisect
+import calendar
+import contextlib
+import os
+import sqlite3
+import threading
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+
+DEFAULT_SPENDING_PATH = Path(__file__).resolve().parent.parent / '.cache' / 'spending.sqlite3'
+DEFAULT_BUDGETS = {
+    "Fruit": 20.0,
+    "Dairy": 15.0,
+    "Vegetables": 25.0,
+    "Alcohol": 30.0,
+    "Snacks": 10.0
+}
+DEFAULT_BUDGET = 100.0
+UNCATEGORIZED = 'Uncategorized'
+CORRECTABLE_FIELDS = {'category', 'price', 'product_name', 'quantity', 'is_bonus', 'date'}
+
+
+GRANULARITIES = ('day', 'week', 'month')
+# SQL for the bucket a date falls in: the day itself, its ISO week's Monday, its month's first day
+ROLLUP_BUCKETS = {
+    'day': "{d}",
+    'week': "date({d}, '-6 days', 'weekday 1')",
+    'month': "date({d}, 'start of month')",
+}
+
+
+def as_date(value):
+    """A date from a date, datetime or ISO string"""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+
+def transaction_date(item):
+    """Purchase date of an item as an ISO string (YYYY-MM-DD); today if the item has none"""
+    value = item.get('date')
+    return as_date(value).isoformat() if value else date.today().isoformat()
+
+
+def bucket_start(day, granularity):
+    """First day of the day, week (Monday) or month bucket a date falls in"""
+    day = as_date(day)
+    if granularity == 'week':
+        return day - timedelta(days=day.weekday())
+    if granularity == 'month':
+        return day.replace(day=1)
+    if granularity == 'day':
+        return day
+    raise ValueError(f"Unknown granularity {granularity!r}; expected one of {', '.join(GRANULARITIES)}")
+
+
+def month_start(day=None):
+    """First day of the month of a date (default: today), as an ISO string, for month-to-date totals"""
+    return bucket_start(day or date.today(), 'month').isoformat()
+
+
+def range_segments(start, end):
+    """
+    Split a date range into whole months and the loose days at either edge
+
+    Returns:
+        List of (granularity, first bucket, last bucket) with ISO dates, together covering [start, end]
+    """
+    first_month = start if start.day == 1 else (start.replace(day=1) + timedelta(days=32)).replace(day=1)
+    month_end = end.replace(day=calendar.monthrange(end.year, end.month)[1])
+    last_month = end.replace(day=1) if end == month_end else (end.replace(day=1) - timedelta(days=1)).replace(day=1)
+    if first_month > last_month:
+        return [('day', start.isoformat(), end.isoformat())]
+    segments = []
+    if start < first_month:
+        segments.append(('day', start.isoformat(), (first_month - timedelta(days=1)).isoformat()))
+    segments.append(('month', first_month.isoformat(), last_month.isoformat()))
+    if end != month_end:
+        segments.append(('day', end.replace(day=1).isoformat(), end.isoformat()))
+    return segments
+
+
+def check_corrections(changes):
+    """Raise ValueError for fields a correction may not change"""
+    unknown = set(changes) - CORRECTABLE_FIELDS
+    if unknown:
+        raise ValueError(f"Cannot correct {', '.join(sorted(unknown))}")
+
+
+class _RollupTotals:
+    """Range and time-series queries shared by both stores, answered from their rollup buckets"""
+
+    def totals(self, category=None, start=None, end=None, granularity=None):
+        """
+        Spend over a date range, in total or per day, week or month
+
+        Args:
+            category: Only this category, or None for all of them
+            start: First purchase date included (date or ISO string), or None for no lower bound
+            end: Last purchase date included (date or ISO string), or None for no upper bound
+            granularity: None for one total over the range; 'day', 'week' or 'month' for a series.
+                         A series counts whole buckets, so a week or month that start or end
+                         falls in is included in full
+
+        Returns:
+            Without granularity: dict of category -> total, or the total of the given category.
+            With granularity: dict of bucket start (ISO date) -> that, for buckets with spend
+        """
+        if granularity is None:
+            if start is None and end is None:
+                totals = self.get_category_totals()
+            else:
+                totals = {}
+                for segment in range_segments(as_date(start or date.min), as_date(end or date.max)):
+                    for cat, total in self._rollup_sums(*segment, category).items():
+                        totals[cat] = totals.get(cat, 0.0) + total
+            return totals.get(category, 0.0) if category is not None else totals
+
+        first = bucket_start(start or date.min, granularity).isoformat()
+        last = bucket_start(end or date.max, granularity).isoformat()
+        series = self._rollup_series(granularity, first, last, category)
+        if category is not None:
+            return {bucket: totals.get(category, 0.0) for bucket, totals in series.items()}
+        return series
+
+    def get_budget_for_category(self, category):
+        return self.budgets.get(category, DEFAULT_BUDGET)
+
+
+class SpendingMemoryMCP(_RollupTotals):
+    """In-memory transaction list; contents are lost when the process exits"""
+
     def __init__(self):
-        # Simulating a persistent store
-        self.transactions = []
-        self.budgets = {
-            "Fruit": 20.0,
-            "Dairy": 15.0,
-            "Vegetables": 25.0,
-            "Alcohol": 30.0,
-            "Snacks": 10.0
-        }
+        self.transactions = []  # Transaction id -> item; None where one was deleted
+        self.budgets = dict(DEFAULT_BUDGETS)
+        self._totals = {}  # category -> [total, count]
+        self._rollups = {g: {} for g in GRANULARITIES}  # granularity -> bucket -> category -> [total, count]
+        self._buckets = {g: [] for g in GRANULARITIES}  # granularity -> sorted buckets, for range lookups
+
+    def _apply(self, item, sign):
+        """Add an item's price to its totals and rollups (sign 1), or take it out again (sign -1)"""
+        # Same defaults as the SQLite store, so an explicit None counts the same in both
+        cat = item.get('category') or UNCATEGORIZED
+        price = sign * (item.get('price') or 0.0)
+        self._add(self._totals, cat, price, sign)
+        for granularity in GRANULARITIES:
+            bucket = bucket_start(item['date'], granularity).isoformat()
+            rollup = self._rollups[granularity]
+            if bucket not in rollup:
+                rollup[bucket] = {}
+                bisect.insort(self._buckets[granularity], bucket)
+            self._add(rollup[bucket], cat, price, sign)
+            if not rollup[bucket]:
+                del rollup[bucket]
+                self._buckets[granularity].remove(bucket)
+
+    @staticmethod
+    def _add(totals, cat, price, count):
+        entry = totals.setdefault(cat, [0.0, 0])
+        entry[0] += price
+        entry[1] += count
+        if not entry[1]:
+            del totals[cat]
+
+    def _rollup_series(self, granularity, first, last, category=None):
+        buckets = self._buckets[granularity]
+        series = {}
+        for bucket in buckets[bisect.bisect_left(buckets, first):bisect.bisect_right(buckets, last)]:
+            totals = {cat: entry[0] for cat, entry in self._rollups[granularity][bucket].items()
+                      if category is None or cat == category}
+            if totals:
+                series[bucket] = totals
+        return series
+
+    def _rollup_sums(self, granularity, first, last, category=None):
+        sums = {}
+        for totals in self._rollup_series(granularity, first, last, category).values():
+            for cat, total in totals.items():
+                sums[cat] = sums.get(cat, 0.0) + total
+        return sums
 
     def add_transactions(self, items):
+        """
+        Store matched receipt items
+
+        Returns:
+            Transaction ids of the items, for delete_transactions and correct_transaction
+        """
         print(f"Stored {len(items)} transactions in Memory Bank.")
-        self.transactions.extend(items)
+        first = len(self.transactions)
+        # Undated items are pinned to today, so a later delete takes them out of the same buckets
+        self.transactions.extend({**item, 'date': transaction_date(item)} for item in items)
+        for item in self.transactions[first:]:
+            self._apply(item, 1)
+        return list(range(first, len(self.transactions)))
 
-    def get_category_totals(self):
-        # Aggregate spend by category
-        totals = {}
-        for t in self.transactions:
-            cat = t.get('category', 'Uncategorized')
-            price = t.get('price', 0.0)
-            totals[cat] = totals.get(cat, 0.0) + price
-        return totals
+    def delete_transactions(self, transaction_ids):
+        """Remove transactions, taking their prices out of the totals; returns how many were removed"""
+        removed = 0
+        for transaction_id in set(transaction_ids):
+            if 0 <= transaction_id < len(self.transactions) and self.transactions[transaction_id] is not None:
+                self._apply(self.transactions[transaction_id], -1)
+                self.transactions[transaction_id] = None
+                removed += 1
+        return removed
 
-    def get_budget_for_category(self, category):
-        return self.budgets.get(category, 100.0) # Default budget
+    def correct_transaction(self, transaction_id, **changes):
+        """
+        Change fields of a stored transaction, e.g. a wrongly matched category or price
+
+        Returns:
+            True if the transaction exists
+        """
+        check_corrections(changes)
+        if not 0 <= transaction_id < len(self.transactions) or self.transactions[transaction_id] is None:
+            return False
+        if 'date' in changes:
+            changes['date'] = transaction_date(changes)
+        self._apply(self.transactions[transaction_id], -1)
+        self.transactions[transaction_id] = {**self.transactions[transaction_id], **changes}
+        self._apply(self.transactions[transaction_id], 1)
+        return True
+
+    def count_transactions(self):
+        return sum(entry[1] for entry in self._totals.values())
+
+    def table(self, start=None, end=None):
+        """Stored transactions, optionally within a purchase date range, as a columnar TransactionTable"""
+        from tools.transaction_table import TransactionTable
+        start = as_date(start).isoformat() if start else None
+        end = as_date(end).isoformat() if end else None
+        return TransactionTable.from_records([
+            t for t in self.transactions
+            if t is not None and (start is None or t['date'] >= start) and (end is None or t['date'] <= end)])
+
+    def get_category_totals(self, start=None, end=None):
+        """
+        Aggregate spend by category
+
+        Args:
+            start: First purchase date included (ISO string), or None for no lower bound
+            end: Last purchase date included (ISO string), or None for no upper bound
+
+        Returns:
+            Dict of category -> summed price
+        """
+        if start or end:
+            return self.totals(start=start, end=end)
+        return {cat: entry[0] for cat, entry in self._totals.items()}
+
+
+def _rollup_statements(row, sign):
+    """Trigger statements adding a transaction row ('new') to its rollups, or taking one ('old') out"""
+    statements = []
+    for granularity, bucket in ROLLUP_BUCKETS.items():
+        bucket = bucket.format(d=f'{row}.date')
+        if sign > 0:
+            statements.append(
+                f"INSERT INTO spending_rollups (granularity, bucket, category, total, count) "
+                f"VALUES ('{granularity}', {bucket}, {row}.category, {row}.price, 1) "
+                f"ON CONFLICT (granularity, bucket, category) "
+                f"DO UPDATE SET total = total + excluded.total, count = count + 1;")
+        else:
+            match = f"granularity = '{granularity}' AND bucket = {bucket} AND category = {row}.category"
+            statements.append(f"UPDATE spending_rollups SET total = total - {row}.price, count = count - 1 "
+                              f"WHERE {match};")
+            statements.append(f"DELETE FROM spending_rollups WHERE {match} AND count = 0;")
+    return '\n                '.join(statements)
+
+
+class SQLiteSpendingMemory(_RollupTotals):
+    """SpendingMemoryMCP persisted in SQLite, with totals computed by the database"""
+
+    def __init__(self, path=None):
+        """
+        Args:
+            path: SQLite file (default: SPENDING_MEMORY_PATH or .cache/spending.sqlite3),
+                  or ':memory:' for a throwaway store
+        """
+        self.path = str(path or os.getenv('SPENDING_MEMORY_PATH', DEFAULT_SPENDING_PATH))
+        self.budgets = dict(DEFAULT_BUDGETS)
+        self._lock = threading.Lock()
+
+        if self.path != ':memory:':
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS transactions (
+                id INTEGER PRIMARY KEY,
+                date TEXT NOT NULL,
+                category TEXT NOT NULL,
+                raw_name TEXT NOT NULL,
+                product_name TEXT NOT NULL,
+                price REAL NOT NULL,
+                quantity REAL NOT NULL,
+                is_bonus INTEGER NOT NULL,
+                added_at REAL NOT NULL
+            );
+            -- Transactions by date, for listing a range without touching the table
+            CREATE INDEX IF NOT EXISTS idx_transactions_date_category
+                ON transactions (date, category, price);
+            CREATE INDEX IF NOT EXISTS idx_transactions_category
+                ON transactions (category, price);
+            -- Running totals, kept in step by triggers so every writer updates them
+            CREATE TABLE IF NOT EXISTS category_totals (
+                category TEXT PRIMARY KEY,
+                total REAL NOT NULL,
+                count INTEGER NOT NULL
+            );
+            CREATE TRIGGER IF NOT EXISTS transactions_ai AFTER INSERT ON transactions BEGIN
+                INSERT INTO category_totals (category, total, count) VALUES (new.category, new.price, 1)
+                ON CONFLICT (category) DO UPDATE SET total = total + new.price, count = count + 1;
+            END;
+            CREATE TRIGGER IF NOT EXISTS transactions_ad AFTER DELETE ON transactions BEGIN
+                UPDATE category_totals SET total = total - old.price, count = count - 1
+                WHERE category = old.category;
+                DELETE FROM category_totals WHERE category = old.category AND count = 0;
+            END;
+            CREATE TRIGGER IF NOT EXISTS transactions_au AFTER UPDATE OF category, price ON transactions BEGIN
+                UPDATE category_totals SET total = total - old.price, count = count - 1
+                WHERE category = old.category;
+                DELETE FROM category_totals WHERE category = old.category AND count = 0;
+                INSERT INTO category_totals (category, total, count) VALUES (new.category, new.price, 1)
+                ON CONFLICT (category) DO UPDATE SET total = total + new.price, count = count + 1;
+            END;
+            -- Day, week and month buckets per category, maintained the same way
+            CREATE TABLE IF NOT EXISTS spending_rollups (
+                granularity TEXT NOT NULL,
+                bucket TEXT NOT NULL,
+                category TEXT NOT NULL,
+                total REAL NOT NULL,
+                count INTEGER NOT NULL,
+                PRIMARY KEY (granularity, bucket, category)
+            ) WITHOUT ROWID;
+            CREATE TRIGGER IF NOT EXISTS transactions_rollups_ai AFTER INSERT ON transactions BEGIN
+                {add_new}
+            END;
+            CREATE TRIGGER IF NOT EXISTS transactions_rollups_ad AFTER DELETE ON transactions BEGIN
+                {remove_old}
+            END;
+            CREATE TRIGGER IF NOT EXISTS transactions_rollups_au
+            AFTER UPDATE OF category, price, date ON transactions BEGIN
+                {remove_old}
+                {add_new}
+            END;
+        """.replace('{add_new}', _rollup_statements('new', 1)).replace('{remove_old}', _rollup_statements('old', -1)))
+        # Stores written before the totals or rollup tables existed are summed once
+        if not self._conn.execute("SELECT 1 FROM category_totals LIMIT 1").fetchone():
+            self._conn.execute("INSERT INTO category_totals (category, total, count) "
+                               "SELECT category, SUM(price), COUNT(*) FROM transactions GROUP BY category")
+        if not self._conn.execute("SELECT 1 FROM spending_rollups LIMIT 1").fetchone():
+            for granularity, bucket in ROLLUP_BUCKETS.items():
+                self._conn.execute(
+                    f"INSERT INTO spending_rollups (granularity, bucket, category, total, count) "
+                    f"SELECT ?, {bucket.format(d='date')}, category, SUM(price), COUNT(*) "
+                    f"FROM transactions GROUP BY 2, 3", (granularity,))
+        self._conn.commit()
+
+    @contextlib.contextmanager
+    def _write(self):
+        """Hold the lock for a write and commit it, or roll it back so a failure leaves no transaction open"""
+        with self._lock:
+            try:
+                yield
+                self._conn.commit()
+            except BaseException:
+                self._conn.rollback()
+                raise
+
+    def add_transactions(self, items):
+        """
+        Store matched receipt items in one transaction
+
+        Returns:
+            Transaction ids of the items, for delete_transactions and correct_transaction
+        """
+        now = time.time()
+        rows = [(transaction_date(item),
+                 item.get('category') or UNCATEGORIZED,
+                 item.get('raw_name') or '',
+                 item.get('product_name') or item.get('raw_name') or '',
+                 float(item.get('price') or 0.0),
+                 float(item.get('quantity') or 1),
+                 int(bool(item.get('is_bonus'))),
+                 now)
+                for item in items]
+        with self._write():
+            # Take the write lock first, so no other connection inserts between here and reading the ids
+            self._conn.execute("BEGIN IMMEDIATE")
+            last_id = self._conn.execute("SELECT COALESCE(MAX(id), 0) FROM transactions").fetchone()[0]
+            self._conn.executemany(
+                "INSERT INTO transactions (date, category, raw_name, product_name, price, quantity, "
+                "is_bonus, added_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            ids = [row[0] for row in self._conn.execute(
+                "SELECT id FROM transactions WHERE id > ? ORDER BY id", (last_id,))]
+        print(f"Stored {len(items)} transactions in Memory Bank.")
+        return ids
+
+    def delete_transactions(self, transaction_ids):
+        """Remove transactions, taking their prices out of the totals; returns how many were removed"""
+        with self._write():
+            removed = self._conn.executemany(
+                "DELETE FROM transactions WHERE id = ?", [(i,) for i in set(transaction_ids)]).rowcount
+        return removed
+
+    def correct_transaction(self, transaction_id, **changes):
+        """
+        Change fields of a stored transaction, e.g. a wrongly matched category or price
+
+        Args:
+            transaction_id: Id returned by add_transactions
+            **changes: New values for category, price, product_name, quantity, is_bonus or date
+
+        Returns:
+            True if the transaction exists
+        """
+        check_corrections(changes)
+        if 'date' in changes:
+            changes['date'] = transaction_date(changes)
+        assignments = ', '.join(f"{field} = ?" for field in changes) or 'id = id'
+        with self._write():
+            updated = self._conn.execute(f"UPDATE transactions SET {assignments} WHERE id = ?",
+                                         (*changes.values(), transaction_id)).rowcount
+        return bool(updated)
+
+    def count_transactions(self):
+        with self._lock:
+            return self._conn.execute("SELECT COALESCE(SUM(count), 0) FROM category_totals").fetchone()[0]
+
+    def table(self, start=None, end=None):
+        """Stored transactions, optionally within a purchase date range, as a columnar TransactionTable"""
+        from tools.transaction_table import COLUMNS, TransactionTable
+        start = as_date(start).isoformat() if start else '0001-01-01'
+        end = as_date(end).isoformat() if end else '9999-12-31'
+        with self._lock:
+            rows = self._conn.execute(f"SELECT {', '.join(COLUMNS)} FROM transactions "
+                                      f"WHERE date BETWEEN ? AND ? ORDER BY id", (start, end)).fetchall()
+        return TransactionTable.from_rows(rows)
+
+    def get_category_totals(self, start=None, end=None):
+        """
+        Aggregate spend by category
+
+        Args:
+            start: First purchase date included (ISO string), or None for no lower bound
+            end: Last purchase date included (ISO string), or None for no upper bound
+
+        Returns:
+            Dict of category -> summed price
+        """
+        if start or end:
+            return self.totals(start=start, end=end)
+        with self._lock:
+            return dict(self._conn.execute("SELECT category, total FROM category_totals").fetchall())
+
+    def _rollup_query(self, columns, granularity, first, last, category, group_by=''):
+        query = (f"SELECT {columns} FROM spending_rollups "
+                 f"WHERE granularity = ? AND bucket BETWEEN ? AND ?")
+        params = [granularity, first, last]
+        if category is not None:
+            query += " AND category = ?"
+            params.append(category)
+        with self._lock:
+            return self._conn.execute(query + group_by, params).fetchall()
+
+    def _rollup_series(self, granularity, first, last, category=None):
+        series = {}
+        for bucket, cat, total in self._rollup_query("bucket, category, total", granularity, first, last, category):
+            series.setdefault(bucket, {})[cat] = total
+        return series
+
+    def _rollup_sums(self, granularity, first, last, category=None):
+        return dict(self._rollup_query("category, SUM(total)", granularity, first, last, category,
+                                       " GROUP BY category"))
@@ -1,23 +1,603 @@
+import io
 import os
+import copy
+import asyncio
+import re
 import json
+import hashlib
+import queue
+import threading
+from datetime import date
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 from config.llm_config import get_llm_config
-import google.generativeai as genai
-from PIL import Image
+from config.model_registry import get_model_registry, VISION_MODEL_PREFERENCES, TEXT_MODEL_PREFERENCES
+from PIL import Image, ImageFilter, ImageOps, ImageSequence
+
+
+# Bump when the parsing logic changes in a way that invalidates cached results
+PARSER_VERSION = "3"
+
+OCR_PROMPT = """Extract all text from this receipt image. Return the raw text exactly as it appears, preserving line breaks and structure."""
+
+PARSE_PROMPT = """You are a receipt parser. Extract all items from this receipt text and return them as a JSON array.
+
+Receipt text:
+{receipt_text}
+
+For each item, extract:
+- raw_name: The product name as it appears on the receipt (keep abbreviations like "BAP WIT", "AH BIO MLK")
+- price: The price as a number (float)
+- quantity: The quantity as a number (default to 1 if not specified)
+
+Return ONLY a valid JSON array, no other text. Example format:
+[
+    {{"raw_name": "BAP WIT", "price": 1.79, "quantity": 1}},
+    {{"raw_name": "AH BIO MLK", "price": 1.35, "quantity": 1}}
+]
+
+If you cannot find any items, return an empty array [].
+"""
+
+EXTRACT_ITEMS_PROMPT = """You are a receipt parser. Read this Albert Heijn receipt image and list every purchased item.
+
+For each item, return:
+- raw_name: The product name as it appears on the receipt (keep abbreviations like "BAP WIT", "AH BIO MLK")
+- price: The price as a number (float)
+- quantity: The quantity as a number (default to 1 if not specified)
+- date: The purchase date printed on the receipt as YYYY-MM-DD, the same on every item (leave it out if there is none)
+
+Skip totals, payment lines and loyalty card lines. If you cannot find any items, return an empty array.
+"""
+
+# Structured output schema for the single-call image-to-JSON mode
+RECEIPT_ITEMS_SCHEMA = {
+    'type': 'ARRAY',
+    'items': {
+        'type': 'OBJECT',
+        'properties': {
+            'raw_name': {'type': 'STRING'},
+            'price': {'type': 'NUMBER'},
+            'quantity': {'type': 'NUMBER'},
+            # Single-call parses have no receipt text to read the purchase date from
+            'date': {'type': 'STRING'},
+        },
+        'required': ['raw_name', 'price', 'quantity'],
+    },
+}
+
+STRUCTURED_GENERATION_CONFIG = {
+    'response_mime_type': 'application/json',
+    'response_schema': RECEIPT_ITEMS_SCHEMA,
+}
+
+# Image receipts: OCR then parse the text (two LLM calls), or one structured call
+TWO_STEP_MODE = "two_step"
+SINGLE_CALL_MODE = "single_call"
+
+
+# Albert Heijn receipt line grammar, used as a local fast path before the LLM.
+# Item lines look like "[QTY] NAME [UNIT PRICE] AMOUNT", e.g. "BAP WIT 1,79"
+# or "2 AH HALFV MELK 1,19 2,38". A leading number is only trusted as the
+# quantity with an x marker or a unit price that agrees with the amount, since
+# it may be part of the name ("500 GR GEHAKT 4,99").
+_AH_AMOUNT = r'-?\d{1,4}[.,]\d{2}'
+AH_ITEM_LINE = re.compile(
+    rf'^\s*(?:(?P<quantity>\d{{1,3}})\s*(?P<times>[xX])?\s+)?(?P<name>\S.*?)'
+    rf'(?:\s+(?P<unit_price>{_AH_AMOUNT}))?\s+(?P<amount>{_AH_AMOUNT})\s*(?:EUR)?\s*$')
+AH_TOTAL_LINE = re.compile(
+    rf'^\s*(?P<label>SUBTOTAAL|TOTAAL|TE BETALEN)\b.*?(?P<amount>{_AH_AMOUNT})\s*$', re.I)
+AH_DISCOUNT_NAME = re.compile(r'^(BONUS|KORTING|ACTIE|AH PREMIUM|PERSOONLIJKE BONUS|\d+\s*\+\s*\d+\s+GRATIS)\b', re.I)
+AH_SKIP_LINE = re.compile(
+    r'^\s*(PINNEN|BETAALD|CONTANT|WISSELGELD|BTW|BONUSKAART|AIRMILES|AIR MILES|KOOPZEGELS|'
+    r'BONUS BOX|UW VOORDEEL|WAARVAN|BEDRAG|AANTAL|TOTAAL KORTING|SPAARACTIE|TERMINAL|KAART)\b', re.I)
+_AH_LETTERS = re.compile(r'[A-Za-z]{2,}')
+_AH_STRAY_AMOUNT = re.compile(_AH_AMOUNT)
+
+# Lines scoring below this are forwarded to the LLM
+FAST_PATH_MIN_CONFIDENCE = 0.8
+
+
+def _ah_amount(text):
+    return float(text.replace(',', '.'))
+
+
+def _score_item_line(name, quantity, unit_price, amount, marked=False):
+    """Confidence that an item line was read correctly (0-1); marked means the quantity had an x"""
+    confidence = 1.0
+    if not _AH_LETTERS.search(name):
+        confidence = min(confidence, 0.3)  # e.g. weighed goods "1,234 KG x 1,99"
+    if _AH_STRAY_AMOUNT.search(name):
+        confidence = min(confidence, 0.6)  # price-like text left inside the name
+    if unit_price is not None:
+        if quantity is None or abs(quantity * unit_price - amount) > 0.011:
+            confidence = min(confidence, 0.5)
+    elif quantity is not None and not marked:
+        confidence = min(confidence, 0.5)  # Nothing confirms the leading number is a quantity
+    if amount == 0 or amount > 100:
+        confidence = min(confidence, 0.6)
+    return confidence
+
+
+def _as_receipt_item(item):
+    """A fast-path item in the LLM item schema: raw_name, quantity and the price paid after discounts"""
+    return {'raw_name': item['raw_name'], 'price': round(item['price'] - item.get('discount', 0.0), 2),
+            'quantity': item['quantity']}
+
+
+def parse_ah_receipt_lines(receipt_text, min_confidence=FAST_PATH_MIN_CONFIDENCE):
+    """
+    Parse an Albert Heijn receipt locally with the compiled line grammar
+
+    Args:
+        receipt_text: Raw receipt text
+        min_confidence: Item lines scoring below this are left for the LLM
+
+    Returns:
+        Dict with 'items', 'discounts', 'totals', 'unparsed_lines' (for the LLM),
+        'candidate_lines' (lines carrying an amount) and 'fast_path_lines'
+    """
+    items, discounts, totals, unparsed = [], [], {}, []
+    candidate_lines = 0
+    previous_line = None
+    # Discounts belong to the line just above them; only attach one when that
+    # line was accepted here, otherwise the LLM sees both
+    previous_was_item = False
+
+    for line in receipt_text.splitlines():
+        stripped = line.strip()
+        if not stripped:
+            continue
+        if AH_SKIP_LINE.match(stripped):
+            previous_line = None
+            previous_was_item = False
+            continue
+
+        total = AH_TOTAL_LINE.match(stripped)
+        if total:
+            candidate_lines += 1
+            totals[total.group('label').lower().replace(' ', '_')] = _ah_amount(total.group('amount'))
+            previous_line = None
+            previous_was_item = False
+            continue
+
+        match = AH_ITEM_LINE.match(stripped)
+        if not match:
+            # Lines without an amount are headers or the first half of a two-line item
+            previous_line = stripped
+            previous_was_item = False
+            continue
+
+        candidate_lines += 1
+        name = match.group('name').strip()
+        amount = _ah_amount(match.group('amount'))
+        quantity = int(match.group('quantity')) if match.group('quantity') else None
+        unit_price = _ah_amount(match.group('unit_price')) if match.group('unit_price') else None
+        if unit_price is not None and quantity is None and unit_price > 0:
+            ratio = amount / unit_price
+            if abs(ratio - round(ratio)) < 0.01:
+                quantity = int(round(ratio))
+
+        if amount < 0 or AH_DISCOUNT_NAME.match(name):
+            if amount < 0 and previous_was_item:
+                discount = {'description': name, 'amount': -amount}
+                discounts.append(discount)
+                items[-1]['discount'] = round(items[-1].get('discount', 0.0) + discount['amount'], 2)
+            else:
+                unparsed.extend([l for l in (previous_line, stripped) if l])
+            previous_line = None
+            previous_was_item = False
+            continue
+
+        confidence = _score_item_line(name, quantity, unit_price, amount, marked=bool(match.group('times')))
+        previous_was_item = confidence >= min_confidence
+        if not previous_was_item:
+            unparsed.extend([l for l in (previous_line, stripped) if l])
+        else:
+            items.append({
+                'raw_name': name,
+                'price': amount,
+                'quantity': quantity or 1,
+                'confidence': confidence,
+            })
+        previous_line = None
+
+    forwarded = len([l for l in unparsed if AH_ITEM_LINE.match(l)])
+    return {
+        'items': items,
+        'discounts': discounts,
+        'totals': totals,
+        'unparsed_lines': unparsed,
+        'candidate_lines': candidate_lines,
+        'fast_path_lines': candidate_lines - forwarded,
+    }
+
+
+# Purchase date printed on the receipt, Dutch day-first ("12-10-2025", "12/10/25") or ISO
+AH_DATE = re.compile(r'(?<![\d.,/-])(?:(?P<year>\d{4})-(?P<month>\d{2})-(?P<day>\d{2})|'
+                     r'(?P<d>\d{1,2})[-/.](?P<m>\d{1,2})[-/.](?P<y>\d{4}|\d{2}))(?![\d.,/-])')
+
+
+def parse_receipt_date(receipt_text):
+    """
+    Purchase date of a receipt
+
+    Returns:
+        ISO date string (YYYY-MM-DD) of the first valid date in the text, or None
+    """
+    for match in AH_DATE.finditer(receipt_text or ''):
+        if match.group('year'):
+            year, month, day = match.group('year', 'month', 'day')
+        else:
+            day, month, year = match.group('d', 'm', 'y')
+            year = f"20{year}" if len(year) == 2 else year
+        try:
+            return date(int(year), int(month), int(day)).isoformat()
+        except ValueError:
+            continue
+    return None
+
+
+# Multi-page documents: PDFs and multi-frame TIFFs are split into pages
+DOCUMENT_EXTENSIONS = {'.pdf', '.tif', '.tiff'}
+# PDF pages are rendered for OCR at this many pixels per point (200 dpi)
+PDF_RENDER_SCALE = 200 / 72
+# Pages whose embedded text layer has fewer characters than this are OCR'd instead
+PDF_MIN_TEXT_CHARS = 20
+# Rough size of a token, used to keep parse prompts under the chunk budget
+CHARS_PER_TOKEN = 4
+# Shortest run of lines treated as a page overlap; a single repeated line is
+# more likely a second purchase of the same item than a duplicate
+MIN_PAGE_OVERLAP_LINES = 2
+
+
+def load_receipt_pages(file_path, render_scale=PDF_RENDER_SCALE):
+    """
+    Split a PDF or multi-frame TIFF into pages
+
+    PDF pages that carry a text layer are returned as text and never rendered;
+    other pages are returned as images for OCR. PDF support needs pypdfium2.
+
+    Returns:
+        List of dicts with 'text' (str or None) and 'image' (PIL image or None)
+    """
+    if Path(file_path).suffix.lower() != '.pdf':
+        with Image.open(file_path) as document:
+            return [{'text': None, 'image': frame.copy()} for frame in ImageSequence.Iterator(document)]
+
+    try:
+        import pypdfium2 as pdfium
+    except ImportError:
+        raise ImportError("PDF receipts need pypdfium2: pip install pypdfium2")
+
+    pages = []
+    document = pdfium.PdfDocument(file_path)
+    try:
+        for page in document:
+            text = page.get_textpage().get_text_range().replace('\r\n', '\n')
+            if len(text.strip()) >= PDF_MIN_TEXT_CHARS:
+                pages.append({'text': text, 'image': None})
+            else:
+                pages.append({'text': None, 'image': page.render(scale=render_scale).to_pil()})
+    finally:
+        document.close()
+    return pages
+
+
+def _overlap_key(line):
+    """Line normalised for comparing OCR output of overlapping pages"""
+    return re.sub(r'\s+', ' ', line).strip().upper().replace('.', ',')
+
+
+def merge_page_texts(page_texts):
+    """
+    Join page texts, dropping lines repeated across page boundaries
+
+    When consecutive pages overlap (e.g. a long receipt photographed in parts),
+    the longest run of at least MIN_PAGE_OVERLAP_LINES lines ending one page
+    that also starts the next page is kept only once, so the items on those
+    lines are not parsed twice.
+    """
+    merged = []
+    for text in page_texts:
+        lines = [line for line in (text or '').splitlines() if line.strip()]
+        previous = [_overlap_key(line) for line in merged[-len(lines):]] if lines else []
+        current = [_overlap_key(line) for line in lines]
+        overlap = 0
+        for size in range(min(len(previous), len(current)), MIN_PAGE_OVERLAP_LINES - 1, -1):
+            if previous[-size:] == current[:size]:
+                overlap = size
+                break
+        merged.extend(lines[overlap:])
+    return '\n'.join(merged)
+
+
+def split_receipt_text(receipt_text, max_tokens):
+    """
+    Split receipt text on line boundaries into chunks of at most max_tokens (estimated)
+
+    A single line longer than the budget becomes a chunk of its own.
+    """
+    max_chars = max(1, max_tokens * CHARS_PER_TOKEN)
+    chunks, current, size = [], [], 0
+    for line in receipt_text.splitlines():
+        if current and size + len(line) + 1 > max_chars:
+            chunks.append('\n'.join(current))
+            current, size = [], 0
+        current.append(line)
+        size += len(line) + 1
+    if current:
+        chunks.append('\n'.join(current))
+    return chunks
+
+
+def iter_json_array_items(chunks):
+    """
+    Incrementally parse a JSON array streamed in text chunks
+
+    Yields each top-level object as soon as its closing brace arrives. The
+    array starts at the first [ followed by {, so text before it (a markdown
+    code fence, or brackets in a preamble like "[2 items]") is skipped, as are
+    elements that are not objects or fail to parse.
+
+    Args:
+        chunks: Iterable of text fragments, e.g. from a streamed model response
+    """
+    depth = 0  # 0 before the array, 1 between elements, >1 inside an element
+    started = False  # Whether the array's first object has opened, i.e. the [ was not preamble
+    in_string = escaped = False
+    pending = []  # Fragments of the element being read, from earlier chunks
+    start = 0
+    for chunk in chunks:
+        if depth > 1:
+            start = 0
+        for i, char in enumerate(chunk):
+            if in_string:
+                if escaped:
+                    escaped = False
+                elif char == '\\':
+                    escaped = True
+                elif char == '"':
+                    in_string = False
+            elif depth > 1:
+                if char == '"':
+                    in_string = True
+                elif char in '{[':
+                    depth += 1
+                elif char in '}]':
+                    depth -= 1
+                    if depth == 1:
+                        pending.append(chunk[start:i + 1])
+                        text = ''.join(pending)
+                        pending = []
+                        try:
+                            value = json.loads(text)
+                        except ValueError:
+                            continue
+                        if isinstance(value, dict):
+                            yield value
+            elif depth == 1 and not started:
+                if char == '{':
+                    started = True
+                    depth = 2
+                    start = i
+                elif not char.isspace():
+                    # The [ belonged to the preamble; this may open the real array
+                    depth = 1 if char == '[' else 0
+            elif depth == 1:
+                if char == '"':
+                    in_string = True
+                elif char in '{[':
+                    depth = 2
+                    start = i
+                elif char == ']':
+                    return
+            elif char == '[':
+                depth = 1
+        if depth > 1:
+            pending.append(chunk[start:])
+
+
+def _iter_response_text(response):
+    """Text of each chunk of a streamed generate_content response"""
+    for chunk in response:
+        try:
+            text = chunk.text
+        except ValueError:
+            # Chunks without text parts (e.g. the final finish-reason chunk)
+            continue
+        if text:
+            yield text
+
+
+class ImagePreprocessor:
+    """
+    Shrinks receipt photos before they are sent to the vision model.
+
+    Applies EXIF rotation, crops to the bright receipt paper, converts to
+    grayscale, caps the long edge and re-encodes as JPEG under a byte budget.
+    """
+
+    def __init__(self, max_long_edge=None, target_bytes=None, grayscale=True, crop=True,
+                 min_quality=40, max_quality=90, crop_margin=0.02):
+        """
+        Args:
+            max_long_edge: Longest side in pixels (default: RECEIPT_IMAGE_MAX_EDGE or 2048)
+            target_bytes: Upper bound for the encoded image (default: RECEIPT_IMAGE_TARGET_BYTES or 500 KB)
+            grayscale: Drop colour information
+            crop: Crop to the receipt's bounding box
+            min_quality: Lowest JPEG quality tried before downscaling further
+            max_quality: JPEG quality tried first
+            crop_margin: Margin kept around the detected receipt, as a fraction of the image size
+        """
+        self.max_long_edge = max_long_edge or int(os.getenv('RECEIPT_IMAGE_MAX_EDGE', '2048'))
+        self.target_bytes = target_bytes or int(os.getenv('RECEIPT_IMAGE_TARGET_BYTES', str(500 * 1024)))
+        self.grayscale = grayscale
+        self.crop = crop
+        self.min_quality = min_quality
+        self.max_quality = max_quality
+        self.crop_margin = crop_margin
+
+    def config_key(self):
+        """String describing the settings, used in the parser cache fingerprint"""
+        return (f"{self.max_long_edge}:{self.target_bytes}:{self.grayscale}:{self.crop}:"
+                f"{self.min_quality}:{self.max_quality}:{self.crop_margin}")
+
+    def _receipt_box(self, image):
+        """Bounding box of the bright receipt paper, or None if it cannot be told apart"""
+        probe = image.convert('L')
+        probe.thumbnail((512, 512))
+        probe = ImageOps.autocontrast(probe).filter(ImageFilter.MedianFilter(5))
+        low, high = probe.getextrema()
+        threshold = (low + high) // 2
+        box = probe.point(lambda v: 255 if v > threshold else 0).getbbox()
+        if not box:
+            return None
+        area = (box[2] - box[0]) * (box[3] - box[1])
+        if area < 0.1 * probe.width * probe.height or area > 0.95 * probe.width * probe.height:
+            return None
+
+        scale_x = image.width / probe.width
+        scale_y = image.height / probe.height
+        margin_x = int(image.width * self.crop_margin)
+        margin_y = int(image.height * self.crop_margin)
+        return (
+            max(0, int(box[0] * scale_x) - margin_x),
+            max(0, int(box[1] * scale_y) - margin_y),
+            min(image.width, int(box[2] * scale_x) + margin_x),
+            min(image.height, int(box[3] * scale_y) + margin_y),
+        )
+
+    def _encode(self, image):
+        """JPEG-encode at the highest quality that fits target_bytes, downscaling if needed"""
+        while True:
+            low, high, best = self.min_quality, self.max_quality, None
+            while low <= high:
+                quality = (low + high) // 2
+                buffer = io.BytesIO()
+                image.save(buffer, format='JPEG', quality=quality, optimize=True)
+                if buffer.tell() <= self.target_bytes:
+                    best = buffer.getvalue()
+                    low = quality + 1
+                else:
+                    high = quality - 1
+            if best is not None or max(image.size) <= 256:
+                return image, best if best is not None else buffer.getvalue()
+            image = image.resize((int(image.width * 0.8), int(image.height * 0.8)), Image.LANCZOS)
+
+    def process(self, file_path):
+        """
+        Prepare a receipt image for upload
+
+        Returns:
+            Dict with 'part' (content part for generate_content) and 'stats'
+            (original and sent byte counts, sent size, crop box and scale)
+        """
+        original_bytes = os.path.getsize(file_path)
+        image = Image.open(file_path)
+        orientation = image.getexif().get(0x0112, 1)
+
+        # Small, upright images are sent as they are
+        if (original_bytes <= self.target_bytes and max(image.size) <= self.max_long_edge
+                and orientation == 1):
+            return {
+                'part': image,
+                'stats': {'original_bytes': original_bytes, 'sent_bytes': original_bytes,
+                          'size': image.size, 'crop_box': None, 'scale': 1.0, 'skipped': True},
+            }
+
+        return self.process_image(image, original_bytes)
+
+    def process_image(self, image, original_bytes=None):
+        """
+        Prepare an in-memory image, e.g. a page split from a PDF or TIFF
+
+        Returns:
+            Same shape as process(); the image is always re-encoded
+        """
+        image = ImageOps.exif_transpose(image)
+        crop_box = self._receipt_box(image) if self.crop else None
+        if crop_box:
+            image = image.crop(crop_box)
+        cropped_width = image.width
+        image = image.convert('L') if self.grayscale else image.convert('RGB')
+        if max(image.size) > self.max_long_edge:
+            image.thumbnail((self.max_long_edge, self.max_long_edge), Image.LANCZOS)
+        image, data = self._encode(image)
+
+        return {
+            'part': {'mime_type': 'image/jpeg', 'data': data},
+            'stats': {'original_bytes': original_bytes, 'sent_bytes': len(data), 'size': image.size,
+                      'crop_box': crop_box, 'scale': image.width / cropped_width, 'skipped': False},
+        }
 
 
 class ReceiptParser:
-    def __init__(self):
-        """Initialize the parser with LLM configuration"""
+    def __init__(self, mode=None, fast_path=None, preprocessor=None, parse_chunk_tokens=None,
+                 page_workers=None):
+        """
+        Initialize the parser with LLM configuration
+
+        Args:
+            mode: How image receipts are read, TWO_STEP_MODE or SINGLE_CALL_MODE
+                  (default: RECEIPT_PARSER_MODE env var or two-step)
+            fast_path: Parse AH line layouts locally and only send leftovers to the LLM
+                       (default: RECEIPT_FAST_PATH env var or enabled)
+            preprocessor: ImagePreprocessor applied to image receipts; pass False to
+                          upload the original file (default: ImagePreprocessor())
+            parse_chunk_tokens: Longest receipt text (in estimated tokens) sent in one parse
+                                prompt; longer text is parsed in chunks
+                                (default: RECEIPT_PARSE_CHUNK_TOKENS env var or 1500)
+            page_workers: Pages OCR'd and chunks parsed concurrently
+                          (default: RECEIPT_PAGE_WORKERS env var or 4)
+        """
+        if fast_path is None:
+            fast_path = os.getenv('RECEIPT_FAST_PATH', '1').lower() not in ('0', 'false', 'no')
+        self.fast_path = fast_path
+        if preprocessor is None:
+            preprocessor = ImagePreprocessor()
+        self.preprocessor = preprocessor or None
+        self.mode = mode or os.getenv('RECEIPT_PARSER_MODE', TWO_STEP_MODE)
+        if self.mode not in (TWO_STEP_MODE, SINGLE_CALL_MODE):
+            raise ValueError(f"Unknown receipt parser mode: {self.mode}")
+        self.parse_chunk_tokens = parse_chunk_tokens or int(os.getenv('RECEIPT_PARSE_CHUNK_TOKENS', '1500'))
+        self.page_workers = page_workers or int(os.getenv('RECEIPT_PAGE_WORKERS', '4'))
         self.llm_config = get_llm_config()
+        self.registry = get_model_registry()
         self.model = None  # Will be set to an available model
         self._working_model_name = None  # Cache the working model name
+        self.last_receipt_text = None  # Text extracted by the last parse() call
+        self.last_parse_stats = None  # Fast-path statistics of the last text parse
+        self.last_image_stats = None  # Preprocessing statistics of the last image
+        self.last_parse_complete = True  # False if the last parse lost items to a failed model call
+
+    def cache_fingerprint(self):
+        """Hash of everything besides the file bytes that determines the parse result"""
+        parts = [
+            PARSER_VERSION,
+            self.mode,
+            str(self.fast_path),
+            self.preprocessor.config_key() if self.preprocessor else 'original',
+            OCR_PROMPT,
+            PARSE_PROMPT,
+            EXTRACT_ITEMS_PROMPT,
+            json.dumps(RECEIPT_ITEMS_SCHEMA, sort_keys=True),
+            self.llm_config.model_name,
+            ','.join(VISION_MODEL_PREFERENCES),
+            ','.join(TEXT_MODEL_PREFERENCES),
+            str(self.parse_chunk_tokens),
+        ]
+        return hashlib.sha256('\x00'.join(parts).encode('utf-8')).hexdigest()
 
     def _is_image_file(self, file_path):
         """Check if file is an image based on extension"""
         image_extensions = {'.jpg', '.jpeg', '.png', '.gif', '.bmp', '.webp'}
         return Path(file_path).suffix.lower() in image_extensions
 
+    def _is_document_file(self, file_path):
+        """Check if file is a PDF or (possibly multi-frame) TIFF that is split into pages"""
+        return Path(file_path).suffix.lower() in DOCUMENT_EXTENSIONS
+
     def _read_text_file(self, file_path):
         """Read text from a text file"""
         try:
@@ -28,219 +608,606 @@ class ReceiptParser:
             return None
 
     def _get_available_models(self):
-        """List available models from the API"""
-        try:
-            models = genai.list_models()
-            available = []
-            for model in models:
-                # Check if model supports generateContent (needed for vision)
-                if 'generateContent' in model.supported_generation_methods:
-                    available.append(model.name)
-            return available
-        except Exception as e:
-            print(f"Error listing models: {e}")
-            return []
-    
-    def _extract_text_from_image(self, file_path):
-        """Extract text from image using Gemini Vision API"""
-        prompt = """Extract all text from this receipt image. Return the raw text exactly as it appears, preserving line breaks and structure."""
-        image = Image.open(file_path)
+        """List available models (discovery is cached by the shared model registry)"""
+        return self.registry.available_models()
 
-        # First, try to get available models
-        available_models = self._get_available_models()
-        if available_models:
-            print(f"Found {len(available_models)} available models")
-            # Try models in order of preference
-            preferred_models = ['gemini-1.5-flash', 'gemini-pro', 'gemini-1.5-pro', 'gemini-pro-vision']
-            model_names_to_try = []
-            
-            # Add preferred models that are available
-            for pref in preferred_models:
-                # Check if any available model contains this name
-                for avail in available_models:
-                    if pref in avail.lower():
-                        model_names_to_try.append(avail)
-                        break
-            
-            # Add any other available models
-            for avail in available_models:
-                if avail not in model_names_to_try:
-                    model_names_to_try.append(avail)
-        else:
-            # Fallback to trying common model names
-            model_names_to_try = ['gemini-1.5-flash', 'gemini-pro', 'gemini-1.5-pro', 'gemini-pro-vision']
+    def _prepare_image(self, file_path):
+        """Preprocess the image once; the result is reused for every model attempt"""
+        if self.preprocessor:
+            try:
+                prepared = self.preprocessor.process(file_path)
+                self.last_image_stats = prepared['stats']
+                print(f"Prepared image: {prepared['stats']['original_bytes']} -> "
+                      f"{prepared['stats']['sent_bytes']} bytes")
+                return prepared['part']
+            except Exception as e:
+                print(f"Image preprocessing failed, sending original: {e}")
+        return Image.open(file_path)
+
+    def _try_models(self, model_names, contents, read, generation_config=None):
+        """
+        Call each model in turn until one gives a usable response
+
+        Args:
+            model_names: Models to try, in order
+            contents: Content passed to generate_content
+            read: Turns a response into a result, or None if the response is unusable
+            generation_config: Optional per-call generation config
 
-        # Try each model
-        for model_name in model_names_to_try:
+        Returns:
+            Tuple of (model_name, result), or (None, None) if every model failed
+        """
+        kwargs = {'generation_config': generation_config} if generation_config else {}
+        for model_name in model_names:
             try:
-                # Handle model name format - GenerativeModel expects name without 'models/' prefix
-                clean_model_name = model_name
-                if model_name.startswith('models/'):
-                    clean_model_name = model_name.replace('models/', '')
-                
-                print(f"Trying model: {clean_model_name}")
-                vision_model = genai.GenerativeModel(clean_model_name)
-                response = vision_model.generate_content([prompt, image])
-
-                if response and response.text:
-                    print(f"Successfully extracted text using {clean_model_name}")
-                    # Cache the working model name for text parsing
-                    self._working_model_name = model_name
-                    return response.text
+                print(f"Trying model: {model_name}")
+                model = self.registry.get_model(model_name)
+                with self.registry.throttle(model_name):
+                    response = model.generate_content(contents, **kwargs)
+                result = read(response)
+                if result is not None:
+                    self.registry.record_success(model_name)
+                    return model_name, result
+                self.registry.record_failure(model_name, "unusable response")
             except Exception as e:
                 print(f"Model {model_name} failed: {str(e)[:100]}")  # Truncate long errors
-                continue
+                self.registry.record_failure(model_name, e)
+        return None, None
 
-        # If all models failed, try using the configured model from llm_config
-        try:
-            vision_model = self.llm_config.get_model()
-            response = vision_model.generate_content([prompt, image])
-            if response and response.text:
-                print("Successfully extracted text using configured model")
-                return response.text
-        except Exception as e:
-            print(f"Configured model also failed: {e}")
+    async def _atry_models(self, model_names, contents, read, generation_config=None):
+        """Async variant of _try_models using the SDK's async generate"""
+        kwargs = {'generation_config': generation_config} if generation_config else {}
+        for model_name in model_names:
+            try:
+                print(f"Trying model: {model_name}")
+                model = self.registry.get_model(model_name)
+                async with self.registry.athrottle(model_name):
+                    response = await model.generate_content_async(contents, **kwargs)
+                result = read(response)
+                if result is not None:
+                    self.registry.record_success(model_name)
+                    return model_name, result
+                self.registry.record_failure(model_name, "unusable response")
+            except Exception as e:
+                print(f"Model {model_name} failed: {str(e)[:100]}")
+                self.registry.record_failure(model_name, e)
+        return None, None
+
+    def _vision_model_names(self):
+        """Vision models in order of preference, with the configured model as last resort"""
+        model_names = self.registry.candidates(VISION_MODEL_PREFERENCES)
+        if self.llm_config.model_name not in model_names:
+            model_names.append(self.llm_config.model_name)
+        return model_names
+
+    def _text_model_names(self):
+        """Text models, starting with the one that did the OCR if it is still healthy"""
+        model_names = []
+        if self._working_model_name and self.registry.is_healthy(self._working_model_name):
+            model_names.append(self._working_model_name)
+        for model_name in self.registry.candidates(TEXT_MODEL_PREFERENCES):
+            if model_name not in model_names:
+                model_names.append(model_name)
+        return model_names
+
+    def _read_ocr_response(self, response):
+        return response.text if response and response.text else None
 
+    def _finish_ocr(self, model_name, text):
+        if text:
+            print(f"Successfully extracted text using {model_name}")
+            # Cache the working model name for text parsing
+            self._working_model_name = model_name
+            return text
         print("Warning: Could not extract text from image with any available model")
         return None
 
-    def _get_working_model(self):
-        """Get a working model for text generation, reusing the OCR model if available"""
-        # If we already found a working model, reuse it
-        if self._working_model_name:
+    def _extract_text_from_image(self, file_path):
+        """Extract text from image using Gemini Vision API"""
+        image = self._prepare_image(file_path)
+        return self._finish_ocr(*self._try_models(
+            self._vision_model_names(), [OCR_PROMPT, image], self._read_ocr_response))
+
+    async def _aextract_text_from_image(self, file_path):
+        """Async variant of _extract_text_from_image"""
+        image = await asyncio.to_thread(self._prepare_image, file_path)
+        return self._finish_ocr(*await self._atry_models(
+            self._vision_model_names(), [OCR_PROMPT, image], self._read_ocr_response))
+
+    def _prepare_page(self, image):
+        """Preprocess one page image split from a document"""
+        if self.preprocessor:
             try:
-                clean_name = self._working_model_name
-                if clean_name.startswith('models/'):
-                    clean_name = clean_name.replace('models/', '')
-                return genai.GenerativeModel(clean_name)
-            except:
-                pass
-        
-        # Otherwise, find an available model
-        available_models = self._get_available_models()
-        if available_models:
-            # Try preferred models for text generation
-            preferred_models = ['gemini-pro-latest', 'gemini-pro', 'gemini-1.5-flash', 'gemini-1.5-pro']
-            for pref in preferred_models:
-                for avail in available_models:
-                    if pref in avail.lower():
-                        clean_name = avail
-                        if clean_name.startswith('models/'):
-                            clean_name = clean_name.replace('models/', '')
-                        try:
-                            model = genai.GenerativeModel(clean_name)
-                            self._working_model_name = avail
-                            return model
-                        except:
-                            continue
-            
-            # Try any available model
-            for avail in available_models:
-                clean_name = avail
-                if clean_name.startswith('models/'):
-                    clean_name = clean_name.replace('models/', '')
-                try:
-                    model = genai.GenerativeModel(clean_name)
-                    self._working_model_name = avail
-                    return model
-                except:
-                    continue
-        
-        # Fallback: try common model names
-        for model_name in ['gemini-pro-latest', 'gemini-pro', 'gemini-1.5-flash']:
+                return self.preprocessor.process_image(image)['part']
+            except Exception as e:
+                print(f"Page preprocessing failed, sending original: {e}")
+        return image
+
+    def _ocr_page(self, page):
+        """Text of one document page: its text layer, or OCR of the page image"""
+        if page['text'] is not None:
+            return page['text']
+        model_name, text = self._try_models(
+            self._vision_model_names(), [OCR_PROMPT, self._prepare_page(page['image'])],
+            self._read_ocr_response)
+        if text:
+            self._working_model_name = model_name
+        return text
+
+    async def _aocr_page(self, page):
+        """Async variant of _ocr_page"""
+        if page['text'] is not None:
+            return page['text']
+        part = await asyncio.to_thread(self._prepare_page, page['image'])
+        model_name, text = await self._atry_models(
+            self._vision_model_names(), [OCR_PROMPT, part], self._read_ocr_response)
+        if text:
+            self._working_model_name = model_name
+        return text
+
+    def _finish_document(self, page_texts):
+        missing = sum(1 for text in page_texts if not text)
+        if missing:
+            print(f"Warning: Could not read {missing} of {len(page_texts)} pages")
+            self.last_parse_complete = False
+        if missing == len(page_texts):
+            return None
+        print(f"Read {len(page_texts) - missing} pages")
+        return merge_page_texts(page_texts)
+
+    def _extract_text_from_document(self, file_path):
+        """Split a PDF/TIFF into pages, OCR the image pages in parallel and merge the text"""
+        pages = load_receipt_pages(file_path)
+        print(f"Document has {len(pages)} pages")
+        with ThreadPoolExecutor(max_workers=max(1, min(self.page_workers, len(pages)))) as pool:
+            page_texts = list(pool.map(self._ocr_page, pages))
+        return self._finish_document(page_texts)
+
+    async def _aextract_text_from_document(self, file_path):
+        """Async variant of _extract_text_from_document"""
+        pages = await asyncio.to_thread(load_receipt_pages, file_path)
+        print(f"Document has {len(pages)} pages")
+        page_texts = await asyncio.gather(*(self._aocr_page(page) for page in pages))
+        return self._finish_document(page_texts)
+
+    def _validate_items(self, items):
+        """
+        Check model output against RECEIPT_ITEMS_SCHEMA and normalise the values
+
+        Returns:
+            Cleaned list of items, or None if the output does not match the schema
+        """
+        if not isinstance(items, list):
+            return None
+        cleaned = []
+        for item in items:
+            if not isinstance(item, dict):
+                return None
+            raw_name = item.get('raw_name')
+            if not isinstance(raw_name, str) or not raw_name.strip():
+                return None
             try:
-                model = genai.GenerativeModel(model_name)
-                self._working_model_name = model_name
-                return model
-            except:
-                continue
-        
-        raise Exception("No available models found for text generation")
-    
+                price = float(item.get('price'))
+                quantity = item.get('quantity', 1)
+                quantity = float(quantity) if quantity is not None else 1
+            except (TypeError, ValueError):
+                return None
+            if quantity == int(quantity):
+                quantity = int(quantity)
+            entry = {'raw_name': raw_name.strip(), 'price': price, 'quantity': quantity}
+            purchase_date = parse_receipt_date(item['date']) if isinstance(item.get('date'), str) else None
+            if purchase_date:
+                entry['date'] = purchase_date
+            cleaned.append(entry)
+        return cleaned
+
+    def _read_structured_response(self, response):
+        """Validated items; [] is a valid answer (no items), None means the output broke the schema"""
+        if not response or not response.text:
+            return None
+        return self._validate_items(json.loads(response.text))
+
+    def _finish_structured(self, model_name, items):
+        if items is not None:
+            print(f"Successfully extracted {len(items)} items using {model_name}")
+            self._working_model_name = model_name
+        return items
+
+    def _extract_items_from_image(self, file_path):
+        """
+        Extract items straight from the image with one structured-output call
+
+        Returns:
+            Validated list of items, or None if no model produced a valid result
+        """
+        image = self._prepare_image(file_path)
+        return self._finish_structured(*self._try_models(
+            self.registry.candidates(VISION_MODEL_PREFERENCES), [EXTRACT_ITEMS_PROMPT, image],
+            self._read_structured_response, generation_config=STRUCTURED_GENERATION_CONFIG))
+
+    async def _aextract_items_from_image(self, file_path):
+        """Async variant of _extract_items_from_image"""
+        image = await asyncio.to_thread(self._prepare_image, file_path)
+        return self._finish_structured(*await self._atry_models(
+            self.registry.candidates(VISION_MODEL_PREFERENCES), [EXTRACT_ITEMS_PROMPT, image],
+            self._read_structured_response, generation_config=STRUCTURED_GENERATION_CONFIG))
+
+    def _plan_text_parse(self, receipt_text):
+        """
+        Run the local fast path over the receipt text
+
+        Returns:
+            Tuple of (items parsed locally, text still to send to the LLM or None)
+        """
+        if not self.fast_path:
+            return [], receipt_text
+
+        fast = parse_ah_receipt_lines(receipt_text)
+        candidates = fast['candidate_lines']
+        self.last_parse_stats = {
+            'candidate_lines': candidates,
+            'fast_path_lines': fast['fast_path_lines'],
+            'llm_lines': candidates - fast['fast_path_lines'],
+            'hit_rate': fast['fast_path_lines'] / candidates if candidates else 0.0,
+            'discounts': fast['discounts'],
+            'totals': fast['totals'],
+        }
+
+        if not fast['items']:
+            # Not an AH layout we recognise, let the LLM read the whole receipt
+            print("Fast path found no items, sending full receipt to LLM")
+            self.last_parse_stats['hit_rate'] = 0.0
+            return [], receipt_text
+
+        print(f"Fast path parsed {fast['fast_path_lines']}/{candidates} lines "
+              f"(hit rate {self.last_parse_stats['hit_rate']:.0%})")
+        # Same shape as LLM items, so callers and the receipt cache see one schema
+        items = [_as_receipt_item(item) for item in fast['items']]
+        if not fast['unparsed_lines']:
+            return items, None
+        return items, '\n'.join(fast['unparsed_lines'])
+
     def _parse_receipt_text(self, receipt_text):
-        """Parse receipt text into structured items using Gemini"""
+        """Parse receipt text into structured items, locally where the AH grammar allows"""
         if not receipt_text:
             return []
+        items, llm_text = self._plan_text_parse(receipt_text)
+        if llm_text:
+            items = items + self._parse_receipt_text_with_llm(llm_text)
+        return items
 
-        prompt = f"""You are a receipt parser. Extract all items from this receipt text and return them as a JSON array.
-
-Receipt text:
-{receipt_text}
-
-For each item, extract:
-- raw_name: The product name as it appears on the receipt (keep abbreviations like "BAP WIT", "AH BIO MLK")
-- price: The price as a number (float)
-- quantity: The quantity as a number (default to 1 if not specified)
+    async def _aparse_receipt_text(self, receipt_text):
+        """Async variant of _parse_receipt_text"""
+        if not receipt_text:
+            return []
+        items, llm_text = self._plan_text_parse(receipt_text)
+        if llm_text:
+            items = items + await self._aparse_receipt_text_with_llm(llm_text)
+        return items
 
-Return ONLY a valid JSON array, no other text. Example format:
-[
-    {{"raw_name": "BAP WIT", "price": 1.79, "quantity": 1}},
-    {{"raw_name": "AH BIO MLK", "price": 1.35, "quantity": 1}}
-]
+    def _read_items_response(self, response):
+        """Extract the JSON item list from a text-parse response, or None if there is none"""
+        if not response or not response.text:
+            print("Warning: No response from LLM")
+            return None
 
-If you cannot find any items, return an empty array [].
-"""
+        # Extract JSON from response (handle markdown code blocks if present)
+        text = response.text.strip()
+        if text.startswith('```'):
+            # Remove markdown code blocks
+            lines = text.split('\n')
+            text = '\n'.join(lines[1:-1]) if len(lines) > 2 else text
 
         try:
-            # Get a working model (will reuse the one from OCR if available)
-            model = self._get_working_model()
-            response = model.generate_content(prompt)
-
-            if response and response.text:
-                # Extract JSON from response (handle markdown code blocks if present)
-                text = response.text.strip()
-                if text.startswith('```'):
-                    # Remove markdown code blocks
-                    lines = text.split('\n')
-                    text = '\n'.join(lines[1:-1]) if len(lines) > 2 else text
-                elif text.startswith('```json'):
-                    lines = text.split('\n')
-                    text = '\n'.join(lines[1:-1]) if len(lines) > 2 else text
-                
-                # Parse JSON
-                items = json.loads(text)
-                if isinstance(items, list):
-                    return items
-                else:
-                    print(f"Warning: Expected list, got {type(items)}")
-                    return []
-            else:
-                print("Warning: No response from LLM")
-                return []
-                
+            items = json.loads(text)
         except json.JSONDecodeError as e:
             print(f"Error parsing JSON from LLM response: {e}")
-            print(f"Response was: {response.text if response else 'None'}")
+            print(f"Response was: {response.text}")
+            return None
+        if isinstance(items, list):
+            return items
+        print(f"Warning: Expected list, got {type(items)}")
+        return None
+
+    def _finish_text_parse(self, model_name, items):
+        """Items of one parsed chunk, or None if no model could parse it"""
+        if items is None:
+            print("Error parsing receipt text: no model returned a valid item list")
+            return None
+        self._working_model_name = model_name
+        return items
+
+    def _join_chunks(self, parsed):
+        """Items of all chunks in order; chunks no model could parse mark the parse incomplete"""
+        missing = [number for number, items in enumerate(parsed, 1) if items is None]
+        if missing:
+            print(f"Warning: Could not parse chunk(s) {', '.join(map(str, missing))} of {len(parsed)}")
+            self.last_parse_complete = False
+        return [item for items in parsed if items for item in items]
+
+    def _parse_chunk_with_llm(self, receipt_text):
+        """Parse one chunk of receipt text into structured items using Gemini"""
+        prompt = PARSE_PROMPT.format(receipt_text=receipt_text)
+        return self._finish_text_parse(*self._try_models(
+            self._text_model_names(), prompt, self._read_items_response))
+
+    async def _aparse_chunk_with_llm(self, receipt_text):
+        """Async variant of _parse_chunk_with_llm"""
+        prompt = PARSE_PROMPT.format(receipt_text=receipt_text)
+        return self._finish_text_parse(*await self._atry_models(
+            self._text_model_names(), prompt, self._read_items_response))
+
+    def _parse_receipt_text_with_llm(self, receipt_text):
+        """
+        Parse receipt text into structured items using Gemini
+
+        Text longer than parse_chunk_tokens is split on line boundaries and the
+        chunks are parsed in parallel; items come back in receipt order.
+        """
+        if not receipt_text:
             return []
-        except Exception as e:
-            print(f"Error parsing receipt text: {e}")
+        chunks = split_receipt_text(receipt_text, self.parse_chunk_tokens)
+        if len(chunks) == 1:
+            return self._join_chunks([self._parse_chunk_with_llm(chunks[0])])
+        print(f"Parsing receipt text in {len(chunks)} chunks")
+        with ThreadPoolExecutor(max_workers=max(1, min(self.page_workers, len(chunks)))) as pool:
+            return self._join_chunks(list(pool.map(self._parse_chunk_with_llm, chunks)))
+
+    async def _aparse_receipt_text_with_llm(self, receipt_text):
+        """Async variant of _parse_receipt_text_with_llm"""
+        if not receipt_text:
             return []
+        chunks = split_receipt_text(receipt_text, self.parse_chunk_tokens)
+        if len(chunks) > 1:
+            print(f"Parsing receipt text in {len(chunks)} chunks")
+        parsed = await asyncio.gather(*(self._aparse_chunk_with_llm(chunk) for chunk in chunks))
+        return self._join_chunks(parsed)
 
-    def parse(self, file_path):
-        """Parse receipt from file (image or text) using OCR and LLM"""
+    def _start_parse(self, file_path):
+        """Reset per-parse state; returns False if the file does not exist"""
         print(f"Parsing receipt from {file_path}...")
 
         # Check if file exists
         if not os.path.exists(file_path):
             print(f"Error: File not found: {file_path}")
+            return False
+
+        self.last_receipt_text = None
+        self.last_parse_stats = None
+        self.last_image_stats = None
+        self.last_parse_complete = True
+        return True
+
+    def _use_single_call(self, file_path):
+        if self._is_image_file(file_path) and self.mode == SINGLE_CALL_MODE:
+            print("Detected image file, using single-call extraction...")
+            return True
+        return False
+
+    def _set_receipt_text(self, receipt_text):
+        """Record the extracted text; returns False if there is none"""
+        if not receipt_text:
+            print("Warning: Could not extract text from receipt")
+            return False
+        print(f"Extracted text ({len(receipt_text)} characters)")
+        self.last_receipt_text = receipt_text
+        return True
+
+    def parse(self, file_path):
+        """Parse receipt from file (image or text) using OCR and LLM"""
+        if not self._start_parse(file_path):
             return []
 
+        if self._use_single_call(file_path):
+            items = self._extract_items_from_image(file_path)
+            if items is not None:
+                print(f"Parsed {len(items)} items from receipt")
+                return items
+            print("Single-call extraction failed, falling back to OCR + parse")
+
         # Extract text based on file type
-        if self._is_image_file(file_path):
+        if self._is_document_file(file_path):
+            print("Detected multi-page document, reading pages...")
+            receipt_text = self._extract_text_from_document(file_path)
+        elif self._is_image_file(file_path):
             print("Detected image file, using OCR...")
             receipt_text = self._extract_text_from_image(file_path)
         else:
             print("Detected text file, reading directly...")
             receipt_text = self._read_text_file(file_path)
 
-        if not receipt_text:
-            print("Warning: Could not extract text from receipt")
+        if not self._set_receipt_text(receipt_text):
             return []
 
-        print(f"Extracted text ({len(receipt_text)} characters)")
-
         # Parse text into structured items
         items = self._parse_receipt_text(receipt_text)
 
         print(f"Parsed {len(items)} items from receipt")
         return items
+
+    async def aparse(self, file_path):
+        """
+        Async variant of parse()
+
+        LLM calls use the SDK's async generate, so one event loop can parse many
+        receipts concurrently. Use a separate parser per concurrent receipt (or
+        copy.copy(parser)) so the last_* attributes don't interleave.
+        """
+        if not self._start_parse(file_path):
+            return []
+
+        if self._use_single_call(file_path):
+            items = await self._aextract_items_from_image(file_path)
+            if items is not None:
+                print(f"Parsed {len(items)} items from receipt")
+                return items
+            print("Single-call extraction failed, falling back to OCR + parse")
+
+        if self._is_document_file(file_path):
+            print("Detected multi-page document, reading pages...")
+            receipt_text = await self._aextract_text_from_document(file_path)
+        elif self._is_image_file(file_path):
+            print("Detected image file, using OCR...")
+            receipt_text = await self._aextract_text_from_image(file_path)
+        else:
+            print("Detected text file, reading directly...")
+            receipt_text = await asyncio.to_thread(self._read_text_file, file_path)
+
+        if not self._set_receipt_text(receipt_text):
+            return []
+
+        items = await self._aparse_receipt_text(receipt_text)
+
+        print(f"Parsed {len(items)} items from receipt")
+        return items
+
+    def _stream_items(self, model_names, contents, generation_config=None):
+        """
+        Stream a JSON item list from the first model that answers, yielding valid items as they close
+
+        Falls through to the next model only while nothing has been yielded; once
+        items have been handed out a failing stream ends the parse, since
+        retrying would repeat them. Either way, a stream that does not finish
+        sets last_parse_complete to False so the items are not cached.
+
+        The response is read on a worker thread that holds the model's throttle
+        slot only until the stream is drained, so a slow consumer does not keep
+        the slot from other callers.
+        """
+        kwargs = {'generation_config': generation_config} if generation_config else {}
+        for model_name in model_names:
+            yielded = 0
+            try:
+                print(f"Streaming from model: {model_name}")
+                model = self.registry.get_model(model_name)
+                received = queue.Queue()
+                threading.Thread(target=self._drain_stream, args=(model_name, model, contents, kwargs, received),
+                                 daemon=True).start()
+                while True:
+                    raw_item, error = received.get()
+                    if error is not None:
+                        raise error
+                    if raw_item is None:
+                        break
+                    item = self._validate_items([raw_item])
+                    if item:
+                        yielded += 1
+                        yield item[0]
+                self.registry.record_success(model_name)
+                self._working_model_name = model_name
+                return
+            except Exception as e:
+                print(f"Model {model_name} failed: {str(e)[:100]}")
+                self.registry.record_failure(model_name, e)
+                if yielded:
+                    print(f"Stream from {model_name} ended early after {yielded} items")
+                    self.last_parse_complete = False
+                    return
+        print("Error parsing receipt: no model could stream an item list")
+        self.last_parse_complete = False
+
+    def _drain_stream(self, model_name, model, contents, kwargs, received):
+        """
+        Read a streamed item list into a queue, holding the throttle slot until the response ends
+
+        Puts (item, None) per object, then (None, None) at the end or (None, error) on failure.
+        """
+        try:
+            with self.registry.throttle(model_name):
+                response = model.generate_content(contents, stream=True, **kwargs)
+                for raw_item in iter_json_array_items(_iter_response_text(response)):
+                    received.put((raw_item, None))
+            received.put((None, None))
+        except Exception as e:
+            received.put((None, e))
+
+    def iter_items(self, file_path):
+        """
+        Parse a receipt, yielding each item as soon as it is known
+
+        Items found by the AH fast path come first; the rest are streamed from the
+        model and yielded as each JSON object closes, so a UI can show the first
+        rows long before the full response arrives. last_receipt_text and
+        last_parse_stats are set as in parse(); last_parse_complete is False once
+        the generator is exhausted if a stream broke off or a chunk was lost.
+        """
+        if not self._start_parse(file_path):
+            return
+
+        count = 0
+        if self._use_single_call(file_path):
+            image = self._prepare_image(file_path)
+            for item in self._stream_items(self.registry.candidates(VISION_MODEL_PREFERENCES),
+                                           [EXTRACT_ITEMS_PROMPT, image], STRUCTURED_GENERATION_CONFIG):
+                count += 1
+                yield item
+            # A finished stream is a valid answer even when it held no items
+            if count or self.last_parse_complete:
+                print(f"Parsed {count} items from receipt")
+                return
+            print("Single-call extraction failed, falling back to OCR + parse")
+            self.last_parse_complete = True
+
+        if self._is_document_file(file_path):
+            print("Detected multi-page document, reading pages...")
+            receipt_text = self._extract_text_from_document(file_path)
+        elif self._is_image_file(file_path):
+            print("Detected image file, using OCR...")
+            receipt_text = self._extract_text_from_image(file_path)
+        else:
+            print("Detected text file, reading directly...")
+            receipt_text = self._read_text_file(file_path)
+
+        if not self._set_receipt_text(receipt_text):
+            return
+
+        items, llm_text = self._plan_text_parse(receipt_text)
+        for item in items:
+            count += 1
+            yield item
+        if llm_text:
+            # Chunks are streamed one after another so items keep receipt order
+            for chunk in split_receipt_text(llm_text, self.parse_chunk_tokens):
+                for item in self._stream_items(self._text_model_names(),
+                                               PARSE_PROMPT.format(receipt_text=chunk)):
+                    count += 1
+                    yield item
+
+        print(f"Parsed {count} items from receipt")
+
+    def parse_many(self, file_paths, max_workers=4):
+        """
+        Parse many receipts concurrently
+
+        LLM calls overlap across a thread pool; the model registry caps in-flight
+        calls per model and applies the shared rate limit.
+
+        Args:
+            file_paths: Receipt files to parse
+            max_workers: Size of the thread pool
+
+        Returns:
+            List of dicts in input order with 'file_path', 'items', 'receipt_text',
+            'parse_stats', 'complete' (False if pages or chunks could not be read)
+            and 'error' (None unless that receipt failed)
+        """
+        def parse_one(file_path):
+            # Each receipt gets its own copy so the last_* attributes don't interleave
+            worker = copy.copy(self)
+            try:
+                items = worker.parse(file_path)
+                return {
+                    'file_path': file_path,
+                    'items': items,
+                    'receipt_text': worker.last_receipt_text,
+                    'parse_stats': worker.last_parse_stats,
+                    'complete': worker.last_parse_complete,
+                    'error': None,
+                }
+            except Exception as e:
+                print(f"Error parsing {file_path}: {e}")
+                return {'file_path': file_path, 'items': [], 'receipt_text': None,
+                        'parse_stats': None, 'complete': False, 'error': str(e)}
+
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+            return list(pool.map(parse_one, file_paths))
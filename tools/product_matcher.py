@@ -0,0 +1,179 @@
+"""
+Embedding-based matching of receipt lines to catalogue products.
+
+Product names are embedded once into a contiguous float32 matrix of unit
+vectors; a batch of receipt lines is embedded the same way and scored
+against the whole catalogue with one matrix multiply (cosine similarity),
+then the top k per line are picked with argpartition.
+
+Embedders are pluggable: anything with a ``dim`` attribute and an
+``embed(texts)`` method returning an (n, dim) float32 array of unit rows.
+The default HashingEmbedder hashes character n-grams locally, so matching
+needs no network. A matcher can be saved and loaded back with the vectors
+memory-mapped, so a large catalogue is not read into memory up front.
+"""
+import json
+import os
+import zlib
+from pathlib import Path
+
+import numpy as np
+
+from tools.fuzzy_matcher import normalize_name
+
+
+DEFAULT_THRESHOLD = 0.6
+DEFAULT_DIM = 1024
+# Query rows scored per matrix multiply; bounds the (rows x products) score block
+QUERY_BATCH = 256
+
+
+class HashingEmbedder:
+    """Character n-gram counts hashed into a fixed number of signed buckets"""
+
+    def __init__(self, dim=DEFAULT_DIM, ngram_range=(2, 4)):
+        """
+        Args:
+            dim: Vector length
+            ngram_range: Shortest and longest character n-gram, taken per word with
+                         the word padded by spaces
+        """
+        self.dim = dim
+        self.ngram_range = ngram_range
+        self._buckets = {}  # n-gram -> (bucket, sign), n-grams repeat a lot across names
+
+    def config_key(self):
+        return f"hashing:{self.dim}:{self.ngram_range[0]}-{self.ngram_range[1]}"
+
+    def _bucket(self, ngram):
+        bucket = self._buckets.get(ngram)
+        if bucket is None:
+            # crc32 is stable across processes, unlike hash() on str
+            value = zlib.crc32(ngram.encode('utf-8'))
+            bucket = self._buckets[ngram] = (value % self.dim, 1.0 if value & 0x80000000 else -1.0)
+        return bucket
+
+    def embed(self, texts):
+        """Unit-length float32 vectors, one row per text (all-zero rows for empty texts)"""
+        low, high = self.ngram_range
+        rows, columns, values = [], [], []
+        for row, text in enumerate(texts):
+            for word in normalize_name(text).split():
+                padded = f" {word} "
+                for n in range(low, high + 1):
+                    for i in range(len(padded) - n + 1):
+                        bucket, sign = self._bucket(padded[i:i + n])
+                        rows.append(row)
+                        columns.append(bucket)
+                        values.append(sign)
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        np.add.at(vectors, (np.array(rows, dtype=np.intp), np.array(columns, dtype=np.intp)),
+                  np.array(values, dtype=np.float32))
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        np.divide(vectors, norms, out=vectors, where=norms > 0)
+        return vectors
+
+
+class ProductMatcher:
+    """Cosine top-k over a float32 matrix of catalogue embeddings"""
+
+    def __init__(self, entries=(), embedder=None, threshold=None):
+        """
+        Args:
+            entries: Iterable of (name, product) pairs; product is returned on a match
+            embedder: Object with ``dim`` and ``embed(texts)`` (default: HashingEmbedder())
+            threshold: Lowest cosine similarity accepted as a match
+                       (default: PRODUCT_MATCH_THRESHOLD or 0.6)
+        """
+        self.embedder = embedder or HashingEmbedder()
+        self.threshold = threshold if threshold is not None else float(
+            os.getenv('PRODUCT_MATCH_THRESHOLD', DEFAULT_THRESHOLD))
+        entries = list(entries)
+        self.names = [name for name, _ in entries]
+        self.products = [product for _, product in entries]
+        self.vectors = np.ascontiguousarray(self.embedder.embed(self.names), dtype=np.float32)
+
+    def __len__(self):
+        return len(self.products)
+
+    def save(self, path):
+        """
+        Write the vectors to <path>.npy and the names and products to <path>.json
+
+        The products must be JSON-serialisable.
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        np.save(path.with_suffix('.npy'), self.vectors)
+        meta = {'embedder': getattr(self.embedder, 'config_key', lambda: None)(),
+                'names': self.names, 'products': self.products}
+        path.with_suffix('.json').write_text(json.dumps(meta, ensure_ascii=False), encoding='utf-8')
+
+    @classmethod
+    def load(cls, path, embedder=None, threshold=None, mmap=True):
+        """
+        Load a saved matcher; with mmap the vectors stay on disk and are paged in on use
+
+        The embedder must be configured as when the matcher was saved.
+        """
+        path = Path(path)
+        meta = json.loads(path.with_suffix('.json').read_text(encoding='utf-8'))
+        matcher = cls(embedder=embedder, threshold=threshold)
+        expected = getattr(matcher.embedder, 'config_key', lambda: None)()
+        if meta['embedder'] != expected:
+            raise ValueError(f"Saved vectors were built with {meta['embedder']}, not {expected}")
+        matcher.names = meta['names']
+        matcher.products = meta['products']
+        matcher.vectors = np.load(path.with_suffix('.npy'), mmap_mode='r' if mmap else None)
+        return matcher
+
+    def top_k(self, raw_names, k=1):
+        """
+        Cosine top-k for a batch of names
+
+        Returns:
+            Tuple of (indices, scores), each (len(raw_names), k) arrays sorted best first
+        """
+        k = max(1, min(k, len(self.products)))
+        queries = self.embedder.embed(list(raw_names))
+        indices = np.empty((len(queries), k), dtype=np.intp)
+        scores = np.empty((len(queries), k), dtype=np.float32)
+        for start in range(0, len(queries), QUERY_BATCH):
+            block = queries[start:start + QUERY_BATCH] @ self.vectors.T
+            top = np.argpartition(-block, k - 1, axis=1)[:, :k] if k < block.shape[1] else \
+                np.tile(np.arange(block.shape[1]), (len(block), 1))
+            top_scores = np.take_along_axis(block, top, axis=1)
+            order = np.argsort(-top_scores, axis=1, kind='stable')
+            indices[start:start + len(block)] = np.take_along_axis(top, order, axis=1)
+            scores[start:start + len(block)] = np.take_along_axis(top_scores, order, axis=1)
+        return indices, scores
+
+    def match_many(self, raw_names, threshold=None, k=1):
+        """
+        Match a batch of names with one matrix multiply; repeated names are embedded once
+
+        Returns:
+            One dict per name, in input order, with 'raw_name', 'normalized',
+            'product' (None below the threshold), 'score' and 'candidates'
+            (the top k as (product, score) pairs)
+        """
+        threshold = self.threshold if threshold is None else threshold
+        raw_names = list(raw_names)
+        unique = list(dict.fromkeys(raw_names))
+        if not unique or not self.products:
+            return [{'raw_name': raw_name, 'normalized': normalize_name(raw_name), 'product': None,
+                     'score': 0.0, 'candidates': []} for raw_name in raw_names]
+
+        indices, scores = self.top_k(unique, k)
+        results = {}
+        for raw_name, row, row_scores in zip(unique, indices, scores):
+            candidates = [(self.products[i], round(float(s), 4)) for i, s in zip(row, row_scores)]
+            best, best_score = candidates[0]
+            results[raw_name] = {'raw_name': raw_name, 'normalized': normalize_name(raw_name),
+                                 'product': best if best_score >= threshold else None,
+                                 'score': best_score, 'candidates': candidates}
+        return [dict(results[raw_name]) for raw_name in raw_names]
+
+    def match(self, raw_name, threshold=None, k=1):
+        """Best match for one name (see match_many())"""
+        return self.match_many([raw_name], threshold, k)[0]
@@ -0,0 +1,147 @@
+"""
+Content-addressed cache for parsed receipts.
+
+Entries are keyed by a hash of the receipt file bytes plus the parser
+fingerprint (prompts, parser version and model choice), so re-uploading the
+same receipt skips OCR and the LLM while any prompt or model change misses.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+
+DEFAULT_CACHE_PATH = Path(__file__).resolve().parent.parent / '.cache' / 'receipt_cache.sqlite3'
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+class ReceiptCache:
+    """SQLite-backed receipt cache with size-based LRU eviction"""
+
+    def __init__(self, path=None, max_bytes=None):
+        """
+        Args:
+            path: SQLite file (default: RECEIPT_CACHE_PATH or .cache/receipt_cache.sqlite3),
+                  or ':memory:' for a throwaway cache
+            max_bytes: Total payload size kept before the least recently used entries are evicted
+        """
+        self.path = str(path or os.getenv('RECEIPT_CACHE_PATH', DEFAULT_CACHE_PATH))
+        if max_bytes is None:
+            max_bytes = int(os.getenv('RECEIPT_CACHE_MAX_BYTES', DEFAULT_MAX_BYTES))
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        if self.path != ':memory:':
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS receipts (
+                key TEXT PRIMARY KEY,
+                receipt_text TEXT,
+                items TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_receipts_last_access ON receipts (last_access)")
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(file_bytes, fingerprint):
+        """Build the cache key from the receipt bytes and the parser fingerprint"""
+        digest = hashlib.sha256(file_bytes)
+        digest.update(b'\x00')
+        digest.update(fingerprint.encode('utf-8'))
+        return digest.hexdigest()
+
+    def key_for_file(self, file_path, fingerprint):
+        """Build the cache key for a receipt file, or None if it cannot be read"""
+        try:
+            with open(file_path, 'rb') as f:
+                return self.make_key(f.read(), fingerprint)
+        except OSError as e:
+            print(f"Receipt cache could not read {file_path}: {e}")
+            return None
+
+    def get(self, key):
+        """
+        Look up a cached receipt
+
+        Returns:
+            Dict with 'receipt_text' and 'items', or None on a miss
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT receipt_text, items FROM receipts WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute(
+                "UPDATE receipts SET last_access = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+            self.hits += 1
+        return {'receipt_text': row[0], 'items': json.loads(row[1])}
+
+    def put(self, key, receipt_text, items):
+        """Store the OCR text and parsed items for a receipt"""
+        payload = json.dumps(items)
+        size = len(payload) + len(receipt_text or '')
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO receipts (key, receipt_text, items, size, created_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, receipt_text, payload, size, now, now))
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        """Drop least recently used entries until the cache fits in max_bytes"""
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM receipts").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self._conn.execute("SELECT key, size FROM receipts ORDER BY last_access ASC").fetchall()
+        evicted = []
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            evicted.append((key,))
+            total -= size
+        self._conn.executemany("DELETE FROM receipts WHERE key = ?", evicted)
+
+    def invalidate(self, key):
+        """Remove one entry"""
+        with self._lock:
+            self._conn.execute("DELETE FROM receipts WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def clear(self):
+        """Remove every entry"""
+        with self._lock:
+            self._conn.execute("DELETE FROM receipts")
+            self._conn.commit()
+
+    def stats(self):
+        """Entry count, payload size and hit/miss counters"""
+        with self._lock:
+            count, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM receipts").fetchone()
+        return {'entries': count, 'bytes': size, 'hits': self.hits, 'misses': self.misses}
+
+
+# Global instance
+_receipt_cache = None
+
+
+def get_receipt_cache():
+    """Get or create the global receipt cache instance"""
+    global _receipt_cache
+    if _receipt_cache is None:
+        _receipt_cache = ReceiptCache()
+    return _receipt_cache
@@ -1,13 +1,179 @@
+import asyncio
 import requests
-from bs4 import BeautifulSoup
-import re
 from config.llm_config import get_llm_config
+from config.model_registry import get_model_registry, SCRAPER_MODEL_PREFERENCES
+from tools.http_client import get_http_client
+from tools.ah_extractor import get_product_extractor
+from tools.catalogue_store import get_catalogue_store
+from tools.category_classifier import get_category_classifier
+from tools.fuzzy_matcher import FuzzyMatcher
+from tools.product_matcher import ProductMatcher
+from tools.search_cache import SearchCache, get_search_cache
+from tools.translation_cache import get_translation_cache
+from tools import grocery_lexicon
 import json
-import google.generativeai as genai
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 
 
-class CatalogueScraper:
+class InFlightSearches:
+    """Coalesces identical searches that run at the same time into one scrape"""
+
     def __init__(self):
+        self._futures = {}
+        self._lock = threading.Lock()
+
+    def run(self, key, search):
+        """Run search() for key, or wait for the caller already running it and share its result"""
+        with self._lock:
+            future = self._futures.get(key)
+            owner = future is None
+            if owner:
+                future = self._futures[key] = Future()
+        if not owner:
+            return future.result()
+
+        try:
+            result = search()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._futures[key]
+
+    async def arun(self, key, search):
+        """Async variant of run; search() returns an awaitable. Threads and coroutines share keys."""
+        with self._lock:
+            future = self._futures.get(key)
+            owner = future is None
+            if owner:
+                future = self._futures[key] = Future()
+        if not owner:
+            return await asyncio.wrap_future(future)
+
+        try:
+            result = await search()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._futures[key]
+
+
+class SpeculativeSearches:
+    """
+    Scrape and Gemini top-up of a deadline-bound search, started side by side
+
+    Both run on a shared pool, so they keep going after the caller's deadline.
+    Callers with the same key share the running work; once all of it has
+    finished, on time or late, the results are handed to store() and the key
+    is released.
+    """
+
+    def __init__(self):
+        self._searches = {}
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def start(self, key, scrape, enhance, store):
+        """
+        Start scrape() and enhance() for key, or join the ones already running
+
+        Args:
+            key: Search cache key
+            scrape: Callable returning scraped products
+            enhance: Callable returning Gemini suggestions, or None to skip them
+            store: Called with (scrape future, enhance future or None) when both are done
+
+        Returns:
+            Tuple of (scrape future, enhance future or None)
+        """
+        with self._lock:
+            running = self._searches.get(key)
+            if running is not None:
+                return running
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(
+                    max_workers=int(os.getenv('SEARCH_DEADLINE_WORKERS', '8')), thread_name_prefix='search')
+            futures = (self._pool.submit(scrape), self._pool.submit(enhance) if enhance else None)
+            self._searches[key] = futures
+
+        pending = [future for future in futures if future is not None]
+        remaining = [len(pending)]
+
+        def finished(_):
+            with self._lock:
+                remaining[0] -= 1
+                if remaining[0]:
+                    return
+                del self._searches[key]
+            try:
+                store(*futures)
+            except Exception as e:
+                print(f"Storing a late search result failed: {e}")
+
+        for future in pending:
+            future.add_done_callback(finished)
+        return futures
+
+
+def _products_of(future):
+    """Products of a finished search task; [] if it is missing, still running, cancelled or failed"""
+    if future is None or not future.done() or future.cancelled() or future.exception() is not None:
+        return []
+    return future.result() or []
+
+
+def _scrape_failed(future):
+    """Whether a finished scrape task could not fetch the page (as opposed to finding nothing)"""
+    return future.cancelled() or future.exception() is not None or future.result() is None
+
+
+def _merge_products(scraped, enhanced, max_results):
+    """Scraped products topped up with suggestions not already among them"""
+    seen = {p.get('name', '').strip().lower() for p in scraped}
+    extra = []
+    for product in enhanced:
+        name = product.get('name', '').strip().lower()
+        if name and name not in seen:
+            seen.add(name)
+            extra.append(product)
+    return scraped[:max_results], extra[:max(0, max_results - len(scraped))]
+
+
+# Shared by every scraper in the process (Streamlit sessions, batch jobs)
+_in_flight_searches = InFlightSearches()
+_speculative_searches = SpeculativeSearches()
+
+# Receipt line matchers by CATALOGUE_MATCHER name
+MATCHERS = {'trigram': FuzzyMatcher, 'embedding': ProductMatcher}
+
+
+class CatalogueScraper:
+    def __init__(self, http_client=None, search_cache=None, translation_cache=None, extractor=None,
+                 catalogue=None, matcher=None):
+        """
+        Args:
+            http_client: HttpClient used for ah.nl requests (default: the shared pooled client)
+            search_cache: SearchCache for search results; pass False to disable (default: the shared cache)
+            translation_cache: TranslationCache memo for LLM translations; pass False to disable
+                               (default: the shared cache)
+            extractor: ProductExtractor for search result pages (default: the shared extractor)
+            catalogue: CatalogueStore snapshot searched before ah.nl; pass False to disable
+                       (default: the shared snapshot)
+            matcher: How receipt lines are matched to products: 'trigram' (FuzzyMatcher) or
+                     'embedding' (ProductMatcher) (default: CATALOGUE_MATCHER or 'trigram')
+        """
         # Mock database of AH products (fallback)
         self.mock_catalogue = {
             "BAP WIT": {"name": "Bananas White (Fairtrade)", "category": "Fruit", "price": 1.79, "is_bonus": False},
@@ -15,142 +181,395 @@ class CatalogueScraper:
             "BB ROERBAK ITAL": {"name": "Bellella Italian Stir Fry Mix", "category": "Vegetables", "price": 2.49, "is_bonus": True},
             "COMMANDEUR": {"name": "Gulpener Commandeur Beer", "category": "Alcohol", "price": 3.99, "is_bonus": False}
         }
+        self.http = http_client or get_http_client()
+        self.extractor = extractor or get_product_extractor()
+        self.classifier = get_category_classifier()
+        # The shared caches and snapshot are opened on first use, so building a scraper touches no files
+        self._search_cache = search_cache
+        self._translation_cache = translation_cache
+        self._catalogue = catalogue
+        self.matcher_kind = matcher or os.getenv('CATALOGUE_MATCHER', 'trigram')
+        if self.matcher_kind not in MATCHERS:
+            raise ValueError(f"Unknown matcher {self.matcher_kind!r}, expected one of {sorted(MATCHERS)}")
+        self._matcher = None
+        self._matcher_version = None
+        self._matcher_lock = threading.Lock()
+        # Overridable so the scraper can be pointed at a local stand-in
+        self.base_url = os.getenv('AH_BASE_URL', 'https://www.ah.nl').rstrip('/')
+        # The model is acquired on first use, so building a scraper does no network I/O
         self.llm_config = None
-        self._working_model = None
-        try:
-            self.llm_config = get_llm_config()
-            self._working_model = self._get_working_model()
-        except Exception as e:
-            print(f"Warning: LLM not configured: {e}")
-            pass  # Fallback to mock if LLM not configured
+        self.registry = get_model_registry()
+        self._model_override = None
+        self._llm_unavailable = False
+        self._working_model_name = None
+
+    @property
+    def search_cache(self):
+        """SearchCache for search results, or None if disabled"""
+        if self._search_cache is None:
+            self._search_cache = get_search_cache()
+        return self._search_cache or None
+
+    @search_cache.setter
+    def search_cache(self, cache):
+        self._search_cache = cache if cache is not None else False
+
+    @property
+    def translation_cache(self):
+        """TranslationCache memo for LLM translations, or None if disabled"""
+        if self._translation_cache is None:
+            self._translation_cache = get_translation_cache()
+        return self._translation_cache or None
+
+    @translation_cache.setter
+    def translation_cache(self, cache):
+        self._translation_cache = cache if cache is not None else False
+
+    @property
+    def catalogue(self):
+        """CatalogueStore snapshot searched before ah.nl, or None if disabled"""
+        if self._catalogue is None:
+            self._catalogue = get_catalogue_store()
+        return self._catalogue or None
+
+    @catalogue.setter
+    def catalogue(self, catalogue):
+        self._catalogue = catalogue if catalogue is not None else False
+
+    @property
+    def _working_model(self):
+        """Model for translation and suggestions, or None if the LLM is not configured"""
+        if self._model_override is not None:
+            return self._model_override
+        if self._llm_unavailable:
+            return None
+        return self._get_working_model()
+
+    @_working_model.setter
+    def _working_model(self, model):
+        self._model_override = model
 
     def _get_available_models(self):
-        """List available models from the API"""
-        try:
-            models = genai.list_models()
-            available = []
-            for model in models:
-                # Check if model supports generateContent
-                if 'generateContent' in model.supported_generation_methods:
-                    available.append(model.name)
-            return available
-        except Exception as e:
-            print(f"Error listing models: {e}")
-            return []
+        """List available models (discovery is cached by the shared model registry)"""
+        return self.registry.available_models()
 
     def _get_working_model(self):
-        """Get a working model for text generation"""
-        if not self.llm_config:
-            return None
+        """Get the working model shared by all scrapers, picking it on first use"""
+        if self.llm_config is None:
+            try:
+                self.llm_config = get_llm_config()
+            except Exception as e:
+                print(f"Warning: LLM not configured: {e}")
+                self._llm_unavailable = True  # Fallback to mock if LLM not configured
+                return None
 
         try:
-            # First, try to list available models
-            available_models = self._get_available_models()
-            if available_models:
-                # Try preferred models in order
-                preferred_models = [
-                    'gemini-1.5-flash', 'gemini-pro', 'gemini-1.5-pro', 'gemini-pro-latest']
-                for pref in preferred_models:
-                    for avail in available_models:
-                        if pref in avail.lower():
-                            clean_name = avail
-                            # Remove 'models/' prefix if present
-                            if clean_name.startswith('models/'):
-                                clean_name = clean_name.replace('models/', '')
-                            try:
-                                model = genai.GenerativeModel(clean_name)
-                                print(f"Using model: {clean_name}")
-                                return model
-                            except Exception as e:
-                                print(f"Failed to use model {clean_name}: {e}")
-                                continue
-
-                # Try any available model
-                for avail in available_models:
-                    clean_name = avail
-                    if clean_name.startswith('models/'):
-                        clean_name = clean_name.replace('models/', '')
-                    try:
-                        model = genai.GenerativeModel(clean_name)
-                        print(f"Using available model: {clean_name}")
-                        return model
-                    except Exception as e:
-                        print(f"Failed to use model {clean_name}: {e}")
-                        continue
-
-            # Fallback: try common model names directly
-            fallback_models = ['gemini-1.5-flash',
-                               'gemini-pro', 'gemini-1.5-pro']
-            for model_name in fallback_models:
-                try:
-                    model = genai.GenerativeModel(model_name)
-                    print(f"Using fallback model: {model_name}")
-                    return model
-                except Exception as e:
-                    print(f"Fallback model {model_name} failed: {e}")
-                    continue
+            model_name, model = self.registry.shared_working_model(SCRAPER_MODEL_PREFERENCES)
+            if model is not None:
+                if model_name != self._working_model_name:
+                    print(f"Using model: {model_name}")
+                self._working_model_name = model_name
+                return model
         except Exception as e:
             print(f"Error getting working model: {e}")
 
         return None
 
+    def _generate_content(self, prompt):
+        """Call the working model and report the outcome to the model registry"""
+        model = self._working_model  # Picks the model on first use, setting its name
+        model_name = self._working_model_name
+        try:
+            with self.registry.throttle(model_name):
+                response = model.generate_content(prompt)
+        except Exception as e:
+            self.registry.record_failure(model_name, e)
+            raise
+        self.registry.record_success(model_name)
+        return response
+
+    async def _agenerate_content(self, prompt):
+        """Async variant of _generate_content"""
+        model = self._working_model
+        model_name = self._working_model_name
+        try:
+            async with self.registry.athrottle(model_name):
+                response = await model.generate_content_async(prompt)
+        except Exception as e:
+            self.registry.record_failure(model_name, e)
+            raise
+        self.registry.record_success(model_name)
+        return response
+
     def find_product(self, query):
-        """Find product in catalogue - uses mock for now, can be enhanced with real scraping"""
+        """
+        Find a product for a receipt line: the curated entries first, then the local catalogue snapshot
+
+        Never goes to the network; returns a dict with name, category, price and
+        is_bonus, or None.
+        """
         print(f"Scraping catalogue for: {query}")
-        return self.mock_catalogue.get(query)
+        match = self.mock_catalogue.get(query)
+        if match is not None or not self.catalogue:
+            return match
+        product = self.catalogue.find(query)
+        return self._as_match(product) if product is not None else None
+
+    @staticmethod
+    def _as_match(product):
+        """Catalogue product in the shape find_product returns"""
+        return {"name": product["name"], "category": product["category"],
+                "price": product["price_without_membership"], "is_bonus": product["is_bonus"]}
+
+    def _matcher_entries(self):
+        """(name, product) pairs to match against; curated entries come first so they win ties"""
+        yield from self.mock_catalogue.items()
+        if self.catalogue:
+            for product in self.catalogue.iter_products():
+                yield product["name"], self._as_match(product)
+
+    def _product_matcher(self):
+        """Matcher over the curated entries and the snapshot, rebuilt when the snapshot changes"""
+        version = self.catalogue.version if self.catalogue else None
+        with self._matcher_lock:
+            if self._matcher is None or version != self._matcher_version:
+                self._matcher = MATCHERS[self.matcher_kind](self._matcher_entries())
+                self._matcher_version = version
+            return self._matcher
+
+    def match_products(self, raw_names, threshold=None):
+        """
+        Fuzzy-match receipt lines (e.g. "BAP WIT 2ST", "AH HALFV MELK") to products
 
-    def _translate_to_dutch(self, query):
-        """Translate English query to Dutch for better search results on ah.nl"""
-        if not self._working_model:
-            return query
+        Args:
+            raw_names: Receipt item names; repeats are looked up once
+            threshold: Lowest similarity accepted, trigram Dice or cosine depending on
+                       the matcher (default: the matcher's threshold)
 
-        try:
-            # Check if query contains English words (simple heuristic)
-            common_english_words = ['milk', 'bread', 'bananas', 'chicken', 'beef', 'cheese',
-                                    'yogurt', 'butter', 'eggs', 'tomatoes', 'potatoes', 'onions',
-                                    'apples', 'oranges', 'strawberries', 'grapes', 'water',
-                                    'juice', 'coffee', 'tea', 'sugar', 'salt', 'pepper']
-
-            query_lower = query.lower()
-            has_english = any(
-                word in query_lower for word in common_english_words)
-
-            if not has_english:
-                # Might already be Dutch, return as is
-                return query
-
-            # Translate to Dutch
-            translate_prompt = f"""Translate the following English product name or category to Dutch. 
+        Returns:
+            One dict per name, in input order, with 'raw_name', 'normalized',
+            'product' (shaped like find_product's result, or None) and 'score'
+        """
+        return self._product_matcher().match_many(raw_names, threshold)
+
+    def _local_translation(self, query):
+        """Translate from the bundled lexicon or the memo of earlier LLM answers, or None"""
+        dutch_query = grocery_lexicon.translate_to_dutch(query)
+        if dutch_query is None and self.translation_cache:
+            dutch_query = self.translation_cache.get(query)
+        return dutch_query
+
+    def _needs_llm_translation(self, query):
+        """Only English queries the lexicon could not handle go to the model"""
+        return grocery_lexicon.has_english_words(query) and bool(self._working_model)
+
+    def _translation_prompt(self, query):
+        return f"""Translate the following English product name or category to Dutch. 
 Return ONLY the Dutch translation, no explanation, no additional text.
 
 English: "{query}"
 Dutch:"""
 
-            response = self._working_model.generate_content(translate_prompt)
-            dutch_query = response.text.strip()
+    def _read_translation(self, query, response):
+        dutch_query = response.text.strip()
 
-            # Clean up response (remove quotes if present)
-            dutch_query = dutch_query.strip('"').strip("'").strip()
+        # Clean up response (remove quotes if present)
+        dutch_query = dutch_query.strip('"').strip("'").strip()
+
+        print(f"Translated '{query}' to '{dutch_query}'")
+        if self.translation_cache and dutch_query:
+            self.translation_cache.put(query, dutch_query)
+        return dutch_query or query
+
+    def _translate_to_dutch(self, query):
+        """Translate English query to Dutch for better search results on ah.nl"""
+        dutch_query = self._local_translation(query)
+        if dutch_query is not None:
+            return dutch_query
+        if not self._needs_llm_translation(query):
+            # Might already be Dutch, return as is
+            return query
+
+        try:
+            return self._read_translation(query, self._generate_content(self._translation_prompt(query)))
+
+        except Exception as e:
+            print(f"Translation failed, using original query: {e}")
+            return query
 
-            print(f"Translated '{query}' to '{dutch_query}'")
+    async def _atranslate_to_dutch(self, query):
+        """Async variant of _translate_to_dutch"""
+        dutch_query = self._local_translation(query)
+        if dutch_query is not None:
             return dutch_query
+        if not self._needs_llm_translation(query):
+            return query
+
+        try:
+            return self._read_translation(
+                query, await self._agenerate_content(self._translation_prompt(query)))
 
         except Exception as e:
             print(f"Translation failed, using original query: {e}")
             return query
 
-    def search_products_google(self, search_query, max_results=10):
+    def _plan_translations(self, queries):
+        """Translate what can be done locally; return (results, queries left for the model)"""
+        results = []
+        pending = []
+        for query in queries:
+            dutch_query = self._local_translation(query)
+            if dutch_query is None:
+                dutch_query = query
+                if self._needs_llm_translation(query) and query not in pending:
+                    pending.append(query)
+            results.append(dutch_query)
+        return results, pending
+
+    def _batch_translation_prompt(self, queries):
+        return f"""Translate each of the following English product names or categories to Dutch.
+Return ONLY a JSON array of the Dutch translations as strings, in the same order, no explanation.
+
+English: {json.dumps(queries, ensure_ascii=False)}
+Dutch:"""
+
+    def _read_batch_translation(self, queries, pending, results, response):
+        """Fill results with the model's translations of the pending queries"""
+        response_text = response.text.strip()
+        if response_text.startswith("```json"):
+            response_text = response_text[7:]
+        if response_text.startswith("```"):
+            response_text = response_text[3:]
+        if response_text.endswith("```"):
+            response_text = response_text[:-3]
+
+        translations = json.loads(response_text.strip())
+        if not isinstance(translations, list) or len(translations) != len(pending):
+            raise ValueError(f"expected {len(pending)} translations, got {translations!r}")
+
+        translated = {}
+        for query, dutch_query in zip(pending, translations):
+            dutch_query = str(dutch_query).strip().strip('"').strip("'").strip()
+            if dutch_query:
+                translated[query] = dutch_query
+        if self.translation_cache and translated:
+            self.translation_cache.put_many(translated)
+        print(f"Translated {len(translated)} queries in one call")
+        return [translated.get(query, result) for query, result in zip(queries, results)]
+
+    def translate_many(self, queries):
+        """
+        Translate many queries to Dutch with at most one model call
+
+        Lexicon and memo hits are resolved locally; the remaining English
+        queries are translated together in a single prompt.
+
+        Returns:
+            Dutch queries in input order (a query that could not be translated is returned as is)
+        """
+        queries = list(queries)
+        results, pending = self._plan_translations(queries)
+        if not pending:
+            return results
+        try:
+            response = self._generate_content(self._batch_translation_prompt(pending))
+            return self._read_batch_translation(queries, pending, results, response)
+        except Exception as e:
+            print(f"Batch translation failed, using original queries: {e}")
+            return results
+
+    async def atranslate_many(self, queries):
+        """Async variant of translate_many"""
+        queries = list(queries)
+        results, pending = self._plan_translations(queries)
+        if not pending:
+            return results
+        try:
+            response = await self._agenerate_content(self._batch_translation_prompt(pending))
+            return self._read_batch_translation(queries, pending, results, response)
+        except Exception as e:
+            print(f"Batch translation failed, using original queries: {e}")
+            return results
+
+    def search_products_google(self, search_query, max_results=10, deadline_ms=None):
         """
         Search for products on Albert Heijn using web scraping (primary) and Gemini (for structuring)
         Returns list of products with prices
+
+        Results are cached per Dutch query and max_results; a stale entry is
+        returned at once and refreshed in the background. On a cache miss the
+        local catalogue snapshot is searched before ah.nl.
+
+        With deadline_ms, the scrape and the Gemini top-up start together and
+        whatever has arrived when the deadline passes is returned; work still
+        running finishes in the background and is cached for the next search.
+        The deadline counts from this call, translation included.
         """
+        deadline = time.monotonic() + deadline_ms / 1000 if deadline_ms else None
         # Translate English to Dutch for better search results
         dutch_query = self._translate_to_dutch(search_query)
+        return self._search_translated(dutch_query, max_results, deadline)
+
+    def _search_translated(self, dutch_query, max_results, deadline=None):
+        """Serve a Dutch query from the cache or the snapshot, or scrape it once however many callers ask"""
+        cached = self._cached_search(dutch_query, max_results)
+        if cached is not None:
+            return cached
+        local = self._snapshot_search(dutch_query, max_results)
+        if local:
+            return local
+        if deadline is not None:
+            return self._search_with_deadline(dutch_query, max_results, deadline)
+
+        scraped, enhanced = _in_flight_searches.run(
+            SearchCache.make_key(dutch_query, max_results),
+            lambda: self._search_uncached(dutch_query, max_results))
+        return (scraped + enhanced)[:max_results]
+
+    def search_many(self, queries, max_results=10, max_workers=None):
+        """
+        Search for many products at once, e.g. a whole shopping list
+
+        Queries are translated together (at most one model call), then searched
+        on a bounded thread pool. Repeated queries and queries that translate to
+        the same Dutch search are scraped once; the HTTP client caps requests per host.
 
+        Args:
+            queries: Product names or categories, English or Dutch
+            max_results: Products per query
+            max_workers: Size of the thread pool (default: SEARCH_MANY_WORKERS or 8)
+
+        Returns:
+            Dict of query -> list of products, in input order
+        """
+        queries = list(dict.fromkeys(queries))
+        if not queries:
+            return {}
+        max_workers = max_workers or int(os.getenv('SEARCH_MANY_WORKERS', '8'))
+        dutch_queries = self.translate_many(queries)
+        unique_dutch = list(dict.fromkeys(dutch_queries))
+
+        def search_one(dutch_query):
+            try:
+                return self._search_translated(dutch_query, max_results)
+            except Exception as e:
+                print(f"Search for '{dutch_query}' failed: {e}")
+                return []
+
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(unique_dutch)))) as pool:
+            results = dict(zip(unique_dutch, pool.map(search_one, unique_dutch)))
+        # Queries sharing a Dutch search get their own copies
+        return {query: [dict(p) for p in results[dutch_query]]
+                for query, dutch_query in zip(queries, dutch_queries)}
+
+    def _search_uncached(self, dutch_query, max_results):
+        """Scrape ah.nl, top up with Gemini suggestions and cache the result"""
         # Primary method: Web scraping to get actual products from ah.nl
         print(f"Searching Albert Heijn for: {dutch_query}")
-        products = self.search_products_web_scrape(dutch_query, max_results)
+        scraped = self._scrape_products(dutch_query, max_results)
+        products = scraped or []
 
+        enhanced_products = []
         # If web scraping didn't return enough results, try to enhance with Gemini
         if len(products) < max_results and self._working_model:
             print(
@@ -159,21 +578,137 @@ Dutch:"""
                 # Use Gemini to structure and enhance the scraped data
                 enhanced_products = self._enhance_products_with_gemini(
                     products, dutch_query, max_results - len(products))
-                products.extend(enhanced_products)
             except Exception as e:
                 print(f"Gemini enhancement failed: {e}")
 
-        return products[:max_results]
+        self._store_search(dutch_query, max_results, scraped, enhanced_products)
+        return products, enhanced_products
+
+    def _search_with_deadline(self, dutch_query, max_results, deadline):
+        """Scrape and ask Gemini in parallel; return what is ready by the deadline (time.monotonic())"""
+        print(f"Searching Albert Heijn for: {dutch_query} (deadline mode)")
+        enhance = None
+        if self._working_model:
+            # Speculative: asked before the scrape is known to come back short
+            enhance = lambda: self._enhance_products_with_gemini([], dutch_query, max_results)
+
+        def store(scrape, enhancement):
+            scraped, enhanced = _merge_products(_products_of(scrape), _products_of(enhancement), max_results)
+            self._store_search(dutch_query, max_results, None if _scrape_failed(scrape) else scraped, enhanced)
+
+        scrape, enhancement = _speculative_searches.start(
+            SearchCache.make_key(dutch_query, max_results),
+            lambda: self._scrape_products(dutch_query, max_results), enhance, store)
+        if enhancement is not None:
+            def drop_enhancement(future):
+                # A full scrape makes the suggestions unnecessary; drop them if they have not started
+                if len(_products_of(future)) >= max_results:
+                    enhancement.cancel()
+            scrape.add_done_callback(drop_enhancement)
+
+        pending = {future for future in (scrape, enhancement) if future is not None}
+        while pending and not (scrape.done() and len(_products_of(scrape)) >= max_results):
+            done, pending = wait(pending, timeout=max(0.0, deadline - time.monotonic()),
+                                 return_when=FIRST_COMPLETED)
+            if not done:
+                break
+        late = [name for name, future in (('scrape', scrape), ('Gemini', enhancement))
+                if future is not None and not future.done()]
+        if late:
+            print(f"Deadline passed with {' and '.join(late)} still running; results will be cached")
+
+        scraped, enhanced = _merge_products(_products_of(scrape), _products_of(enhancement), max_results)
+        return scraped + enhanced
+
+    async def asearch_products_google(self, search_query, max_results=10, deadline_ms=None):
+        """
+        Async variant of search_products_google
 
-    def _enhance_products_with_gemini(self, existing_products, query, additional_needed):
-        """Use Gemini to generate additional product suggestions based on the query"""
-        if not self._working_model or additional_needed <= 0:
-            return []
+        The Gemini calls use the SDK's async client; the page fetch and parse run
+        in a worker thread, so many searches can share one event loop.
+        """
+        deadline = time.monotonic() + deadline_ms / 1000 if deadline_ms else None
+        dutch_query = await self._atranslate_to_dutch(search_query)
+
+        cached = self._cached_search(dutch_query, max_results)
+        if cached is not None:
+            return cached
+        local = self._snapshot_search(dutch_query, max_results)
+        if local:
+            return local
+        if deadline is not None:
+            return await asyncio.to_thread(self._search_with_deadline, dutch_query, max_results, deadline)
+
+        scraped, enhanced = await _in_flight_searches.arun(
+            SearchCache.make_key(dutch_query, max_results),
+            lambda: self._asearch_uncached(dutch_query, max_results))
+        return (scraped + enhanced)[:max_results]
+
+    async def _asearch_uncached(self, dutch_query, max_results):
+        """Async variant of _search_uncached"""
+        print(f"Searching Albert Heijn for: {dutch_query}")
+        scraped = await asyncio.to_thread(self._scrape_products, dutch_query, max_results)
+        products = scraped or []
 
+        enhanced_products = []
+        if len(products) < max_results and self._working_model:
+            print(
+                f"Web scraping returned {len(products)} products, trying to enhance with Gemini...")
+            try:
+                enhanced_products = await self._aenhance_products_with_gemini(
+                    products, dutch_query, max_results - len(products))
+            except Exception as e:
+                print(f"Gemini enhancement failed: {e}")
+
+        self._store_search(dutch_query, max_results, scraped, enhanced_products)
+        return products, enhanced_products
+
+    def _cached_search(self, dutch_query, max_results):
+        """Return cached products for a search, refreshing a stale entry in the background"""
+        if not self.search_cache:
+            return None
+        key = SearchCache.make_key(dutch_query, max_results)
+        cached = self.search_cache.get(key)
+        if cached is None:
+            return None
+        if cached['stale'] and self.search_cache.begin_refresh(key):
+            print(f"Serving stale results for '{dutch_query}' while refreshing")
+            threading.Thread(target=self._refresh_search, args=(key, dutch_query, max_results),
+                             daemon=True).start()
+        return (cached['scraped'] + cached['enhanced'])[:max_results]
+
+    def _refresh_search(self, key, dutch_query, max_results):
         try:
-            existing_names = [p.get('name', '') for p in existing_products]
+            _in_flight_searches.run(key, lambda: self._search_uncached(dutch_query, max_results))
+        except Exception as e:
+            print(f"Background search refresh failed: {e}")
+        finally:
+            self.search_cache.end_refresh(key)
 
-            prompt = f"""Based on the search query "{query}" for Albert Heijn products, suggest {additional_needed} additional different products that would be available.
+    def _snapshot_search(self, dutch_query, max_results):
+        """Products for a search from the local catalogue snapshot, or [] on a miss"""
+        if not self.catalogue:
+            return []
+        products = self.catalogue.search(dutch_query, max_results)
+        if products:
+            print(f"Found {len(products)} products for '{dutch_query}' in the catalogue snapshot")
+        return products
+
+    def _store_search(self, dutch_query, max_results, scraped, enhanced):
+        """Cache a search; scraped is None when ah.nl could not be fetched, and then nothing is stored"""
+        if scraped is None:
+            return
+        # The cache gives the scraped products and the Gemini suggestions their own TTLs
+        if self.search_cache:
+            self.search_cache.put(SearchCache.make_key(dutch_query, max_results), scraped, enhanced)
+        # Scraped products (never Gemini suggestions) grow the snapshot
+        if self.catalogue and scraped:
+            self.catalogue.add_products(scraped)
+
+    def _enhancement_prompt(self, existing_products, query, additional_needed):
+        existing_names = [p.get('name', '') for p in existing_products]
+
+        return f"""Based on the search query "{query}" for Albert Heijn products, suggest {additional_needed} additional different products that would be available.
 
 Already found products: {', '.join(existing_names[:5])}
 
@@ -194,23 +729,53 @@ Provide a JSON array with {additional_needed} different products (different bran
 
 Return only valid JSON array."""
 
-            response = self._working_model.generate_content(prompt)
-            response_text = response.text.strip()
-
-            # Clean JSON response
-            if response_text.startswith("```json"):
-                response_text = response_text[7:]
-            if response_text.startswith("```"):
-                response_text = response_text[3:]
-            if response_text.endswith("```"):
-                response_text = response_text[:-3]
-            response_text = response_text.strip()
-
-            additional_products = json.loads(response_text)
-            if isinstance(additional_products, list):
-                return additional_products[:additional_needed]
+    def _read_enhanced_products(self, response, additional_needed):
+        response_text = response.text.strip()
+
+        # Clean JSON response
+        if response_text.startswith("```json"):
+            response_text = response_text[7:]
+        if response_text.startswith("```"):
+            response_text = response_text[3:]
+        if response_text.endswith("```"):
+            response_text = response_text[:-3]
+        response_text = response_text.strip()
+
+        additional_products = json.loads(response_text)
+        if not isinstance(additional_products, list):
+            return []
+        additional_products = [p for p in additional_products if isinstance(p, dict)][:additional_needed]
+        # File suggestions under the same categories as scraped products
+        categories = self.classifier.classify_many([p.get('name', '') for p in additional_products])
+        for product, category in zip(additional_products, categories):
+            if product.get('category') not in self.classifier.categories:
+                product['category'] = category
+        return additional_products
+
+    def _enhance_products_with_gemini(self, existing_products, query, additional_needed):
+        """Use Gemini to generate additional product suggestions based on the query"""
+        if not self._working_model or additional_needed <= 0:
+            return []
+
+        try:
+            prompt = self._enhancement_prompt(existing_products, query, additional_needed)
+            response = self._generate_content(prompt)
+            return self._read_enhanced_products(response, additional_needed)
+
+        except Exception as e:
+            print(f"Error enhancing with Gemini: {e}")
+            return []
+
+    async def _aenhance_products_with_gemini(self, existing_products, query, additional_needed):
+        """Async variant of _enhance_products_with_gemini"""
+        if not self._working_model or additional_needed <= 0:
             return []
 
+        try:
+            prompt = self._enhancement_prompt(existing_products, query, additional_needed)
+            response = await self._agenerate_content(prompt)
+            return self._read_enhanced_products(response, additional_needed)
+
         except Exception as e:
             print(f"Error enhancing with Gemini: {e}")
             return []
@@ -220,209 +785,36 @@ Return only valid JSON array."""
         Scrape Albert Heijn website directly to get real product data
         This is the primary method for getting actual products
         """
+        return self._scrape_products(search_query, max_results) or []
+
+    def _scrape_products(self, search_query, max_results):
+        """Products scraped from ah.nl, or None when the page could not be fetched or read"""
         try:
             # Search URL for Albert Heijn
-            search_url = f"https://www.ah.nl/zoeken?query={search_query.replace(' ', '+')}"
+            search_url = f"{self.base_url}/zoeken?query={search_query.replace(' ', '+')}"
 
             headers = {
                 'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
                 'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
                 'Accept-Language': 'nl-NL,nl;q=0.9,en;q=0.8',
-                'Accept-Encoding': 'gzip, deflate, br',
-                'Connection': 'keep-alive',
                 'Upgrade-Insecure-Requests': '1'
             }
 
             print(f"Fetching: {search_url}")
-            response = requests.get(search_url, headers=headers, timeout=15)
-            response.raise_for_status()
-
-            soup = BeautifulSoup(response.content, 'html.parser')
-            products = []
-
-            # Albert Heijn uses specific data attributes and classes
-            # Try multiple selectors to find products
-            selectors = [
-                ('article', {'class': re.compile(r'product|card', re.I)}),
-                ('div', {'data-testid': re.compile(r'product', re.I)}),
-                ('div', {'class': re.compile(
-                    r'product-tile|product-card|product-item', re.I)}),
-                ('li', {'class': re.compile(r'product', re.I)}),
-            ]
-
-            product_elements = []
-            for tag, attrs in selectors:
-                found = soup.find_all(tag, attrs)
-                if found:
-                    # Get more to filter
-                    product_elements = found[:max_results * 2]
-                    print(f"Found {len(found)} elements using {tag} selector")
-                    break
-
-            if not product_elements:
-                # Fallback: search for any element with product-related text
-                product_elements = soup.find_all(['div', 'article', 'li'],
-                                                 string=re.compile(r'€|\d+[,.]\d{2}', re.I))[:max_results * 2]
+            response = self.http.get(search_url, headers=headers, timeout=15)
+            if response.revalidated:
+                print("Page unchanged since last fetch, using stored copy")
 
-            print(
-                f"Processing {len(product_elements)} potential product elements")
-
-            for element in product_elements[:max_results * 2]:
-                try:
-                    # Find product name
-                    name = ""
-                    name_selectors = [
-                        ('h3', {}),
-                        ('h2', {}),
-                        ('a', {'class': re.compile(r'link|title|name', re.I)}),
-                        ('span', {'class': re.compile(
-                            r'title|name|product-name', re.I)}),
-                    ]
-
-                    for tag, attrs in name_selectors:
-                        name_elem = element.find(tag, attrs)
-                        if name_elem:
-                            name = name_elem.get_text(strip=True)
-                            if name and len(name) > 3:
-                                break
-
-                    if not name:
-                        continue
-
-                    # Find price
-                    price = None
-                    price_text = ""
-                    price_selectors = [
-                        ('span', {'class': re.compile(r'price|amount', re.I)}),
-                        ('div', {'class': re.compile(r'price', re.I)}),
-                        ('span', {'data-testid': re.compile(r'price', re.I)}),
-                    ]
-
-                    for tag, attrs in price_selectors:
-                        price_elem = element.find(tag, attrs)
-                        if price_elem:
-                            price_text = price_elem.get_text(strip=True)
-                            # Extract price (look for euro amounts)
-                            price_match = re.search(
-                                r'€?\s*(\d+[,.]?\d*)', price_text)
-                            if price_match:
-                                price = float(price_match.group(
-                                    1).replace(',', '.'))
-                                break
-
-                    # Also search in element text if not found
-                    if price is None:
-                        element_text = element.get_text()
-                        price_match = re.search(
-                            r'€?\s*(\d+[,.]?\d{2})', element_text)
-                        if price_match:
-                            price = float(price_match.group(
-                                1).replace(',', '.'))
-
-                    if price is None:
-                        continue
-
-                    # Find product URL/link
-                    product_url = ""
-                    link_elem = element.find('a', href=True)
-                    if link_elem:
-                        product_url = link_elem.get('href', '')
-                        if product_url:
-                            if product_url.startswith('//'):
-                                product_url = 'https:' + product_url
-                            elif product_url.startswith('/'):
-                                product_url = f"https://www.ah.nl{product_url}"
-                            elif not product_url.startswith('http'):
-                                product_url = f"https://www.ah.nl/{product_url}"
-                    
-                    # Also try to find URL in data attributes
-                    if not product_url:
-                        product_url = element.get('href', '') or element.get('data-href', '') or element.get('data-url', '')
-                        if product_url and not product_url.startswith('http'):
-                            if product_url.startswith('/'):
-                                product_url = f"https://www.ah.nl{product_url}"
-                            else:
-                                product_url = f"https://www.ah.nl/{product_url}"
-
-                    # Find product image
-                    image_url = ""
-                    img_elem = element.find('img')
-                    if img_elem:
-                        image_url = img_elem.get('src', '') or img_elem.get(
-                            'data-src', '') or img_elem.get('data-lazy-src', '')
-                        if image_url:
-                            if image_url.startswith('//'):
-                                image_url = 'https:' + image_url
-                            elif image_url.startswith('/'):
-                                image_url = f"https://www.ah.nl{image_url}"
-                            elif not image_url.startswith('http'):
-                                image_url = f"https://www.ah.nl/{image_url}"
-
-                    # Find discount/bonus info
-                    discount_offer = ""
-                    is_bonus = False
-                    bonus_text = element.get_text()
-                    if re.search(r'bonus|actie|korting|aanbieding', bonus_text, re.I):
-                        is_bonus = True
-                        # Try to extract bonus text
-                        bonus_match = re.search(
-                            r'(bonus|actie|korting|aanbieding)[\s:]*([^\n]*)', bonus_text, re.I)
-                        if bonus_match:
-                            discount_offer = bonus_match.group(
-                                0)[:50]  # Limit length
-                        else:
-                            discount_offer = "BONUS"
-
-                    # Find unit/volume
-                    unit = ""
-                    unit_match = re.search(
-                        r'(\d+[.,]?\d*\s*(kg|g|L|l|ml|st|stuks?|x))', element.get_text(), re.I)
-                    if unit_match:
-                        unit = unit_match.group(1)
-
-                    # Determine category (simple heuristic)
-                    category = "Other"
-                    name_lower = name.lower()
-                    if any(word in name_lower for word in ['melk', 'kaas', 'yoghurt', 'boter', 'eieren']):
-                        category = "Dairy"
-                    elif any(word in name_lower for word in ['brood', 'bagel', 'croissant', 'krentenbol']):
-                        category = "Bakery"
-                    elif any(word in name_lower for word in ['banaan', 'appel', 'sinaasappel', 'aardbei']):
-                        category = "Fruit"
-                    elif any(word in name_lower for word in ['tomaat', 'komkommer', 'sla', 'wortel']):
-                        category = "Vegetables"
-                    elif any(word in name_lower for word in ['vlees', 'kip', 'rundvlees', 'worst']):
-                        category = "Meat"
-                    elif any(word in name_lower for word in ['bier', 'wijn', 'drank']):
-                        category = "Beverages"
-
-                    products.append({
-                        "name": name,
-                        "image_url": image_url,
-                        "price_without_membership": price,
-                        "price_with_membership": price,  # Default to same if not found
-                        "discount_offer": discount_offer,
-                        "url": product_url,
-                        "category": category,
-                        "is_bonus": is_bonus,
-                        "unit": unit
-                    })
-
-                    if len(products) >= max_results:
-                        break
-
-                except Exception as e:
-                    print(f"Error processing product element: {e}")
-                    continue
+            products = self.extractor.extract(response.content, max_results)
 
             print(f"Successfully scraped {len(products)} products")
             return products
 
         except requests.exceptions.RequestException as e:
             print(f"Network error scraping Albert Heijn: {str(e)}")
-            return []
+            return None
         except Exception as e:
             print(f"Error web scraping: {str(e)}")
             import traceback
             traceback.print_exc()
-            return []
+            return None
@@ -0,0 +1,224 @@
+"""
+Two-tier cache for Price Checker search results.
+
+Entries are keyed by the normalized Dutch query and max_results. Hits are
+served from an in-memory LRU first and from SQLite after a restart. Scraped
+products and Gemini-generated suggestions expire on separate TTLs; an expired
+entry is still served for a stale window while one background refresh runs.
+"""
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+
+DEFAULT_CACHE_PATH = Path(__file__).resolve().parent.parent / '.cache' / 'search_cache.sqlite3'
+DEFAULT_MAX_BYTES = 16 * 1024 * 1024
+DEFAULT_MEMORY_ENTRIES = 256
+DEFAULT_SCRAPE_TTL = 6 * 60 * 60
+DEFAULT_LLM_TTL = 60 * 60
+DEFAULT_STALE_TTL = 24 * 60 * 60
+
+
+class SearchCache:
+    """In-memory LRU over a SQLite tier, with stale-while-revalidate"""
+
+    def __init__(self, path=None, max_bytes=None, memory_entries=None, scrape_ttl=None, llm_ttl=None,
+                 stale_ttl=None, clock=time.time):
+        """
+        Args:
+            path: SQLite file (default: SEARCH_CACHE_PATH or .cache/search_cache.sqlite3),
+                  or ':memory:' for a throwaway cache
+            max_bytes: Total payload size kept on disk before LRU eviction
+            memory_entries: Entries kept in the in-memory tier (default: SEARCH_CACHE_MEMORY_ENTRIES or 256)
+            scrape_ttl: Seconds scraped products stay fresh (default: SEARCH_CACHE_SCRAPE_TTL or 6 h)
+            llm_ttl: Seconds Gemini-generated products stay fresh (default: SEARCH_CACHE_LLM_TTL or 1 h)
+            stale_ttl: Seconds past expiry an entry is still served while it is refreshed
+                       (default: SEARCH_CACHE_STALE_TTL or 24 h)
+            clock: Time source, overridable for tests
+        """
+        self.path = str(path or os.getenv('SEARCH_CACHE_PATH', DEFAULT_CACHE_PATH))
+        self.max_bytes = max_bytes if max_bytes is not None else int(
+            os.getenv('SEARCH_CACHE_MAX_BYTES', DEFAULT_MAX_BYTES))
+        self.memory_entries = memory_entries if memory_entries is not None else int(
+            os.getenv('SEARCH_CACHE_MEMORY_ENTRIES', DEFAULT_MEMORY_ENTRIES))
+        self.scrape_ttl = scrape_ttl if scrape_ttl is not None else float(
+            os.getenv('SEARCH_CACHE_SCRAPE_TTL', DEFAULT_SCRAPE_TTL))
+        self.llm_ttl = llm_ttl if llm_ttl is not None else float(
+            os.getenv('SEARCH_CACHE_LLM_TTL', DEFAULT_LLM_TTL))
+        self.stale_ttl = stale_ttl if stale_ttl is not None else float(
+            os.getenv('SEARCH_CACHE_STALE_TTL', DEFAULT_STALE_TTL))
+        self.clock = clock
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        self._refreshing = set()
+        self._lock = threading.Lock()
+
+        if self.path != ':memory:':
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS searches (
+                key TEXT PRIMARY KEY,
+                payload TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                expires_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_searches_last_access ON searches (last_access)")
+        self._conn.commit()
+
+    @staticmethod
+    def normalize_query(query):
+        """Lowercase and collapse whitespace so trivially different queries share an entry"""
+        return re.sub(r'\s+', ' ', (query or '').strip().lower())
+
+    @classmethod
+    def make_key(cls, dutch_query, max_results):
+        """Build the cache key from the Dutch query and the requested result count"""
+        return f"{cls.normalize_query(dutch_query)}\x00{int(max_results)}"
+
+    def get(self, key):
+        """
+        Look up a search
+
+        The scraped and enhanced parts expire separately. The entry is stale once
+        either part is past its TTL; suggestions past their stale window are left
+        out while the scraped products are still served.
+
+        Returns:
+            Dict with 'scraped', 'enhanced' and 'stale', or None on a miss or once the
+            scraped part's stale window has passed
+        """
+        now = self.clock()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+            else:
+                row = self._conn.execute(
+                    "SELECT payload, expires_at FROM searches WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    entry = dict(json.loads(row[0]), expires_at=row[1])
+                    # Rows written before the parts had their own expiry share the entry's
+                    entry.setdefault('enhanced_expires_at', row[1])
+                    self._conn.execute("UPDATE searches SET last_access = ? WHERE key = ?", (now, key))
+                    self._conn.commit()
+                    self._remember(key, entry)
+
+            if entry is None or now > entry['expires_at'] + self.stale_ttl:
+                self.misses += 1
+                return None
+            enhanced = entry['enhanced']
+            if enhanced and now > entry['enhanced_expires_at'] + self.stale_ttl:
+                # Suggestions past their stale window are dropped; the scraped part is still good
+                enhanced = []
+            stale = now > entry['expires_at'] or (bool(entry['enhanced']) and now > entry['enhanced_expires_at'])
+            if stale:
+                self.stale_hits += 1
+            else:
+                self.hits += 1
+        # Copies, so callers can annotate products without touching the memory tier
+        return {'scraped': [dict(p) for p in entry['scraped']],
+                'enhanced': [dict(p) for p in enhanced], 'stale': stale}
+
+    def put(self, key, scraped, enhanced=()):
+        """
+        Store scraped products and Gemini-generated suggestions for a search
+
+        Scraped products expire on the scrape TTL and suggestions on the LLM TTL.
+        A search with suggestions but no scraped products lives on the LLM TTL only.
+        """
+        now = self.clock()
+        scrape_ttl = self.scrape_ttl if scraped or not enhanced else self.llm_ttl
+        # Copies, so later changes to the caller's dicts don't leak into the memory tier
+        entry = {'scraped': [dict(p) for p in scraped], 'enhanced': [dict(p) for p in enhanced],
+                 'expires_at': now + scrape_ttl, 'enhanced_expires_at': now + self.llm_ttl}
+        payload = json.dumps({'scraped': entry['scraped'], 'enhanced': entry['enhanced'],
+                              'enhanced_expires_at': entry['enhanced_expires_at']})
+        with self._lock:
+            self._remember(key, entry)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO searches (key, payload, size, expires_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, payload, len(payload), entry['expires_at'], now))
+            self._evict()
+            self._conn.commit()
+
+    def _remember(self, key, entry):
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _evict(self):
+        """Drop least recently used rows until the disk tier fits in max_bytes"""
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM searches").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self._conn.execute("SELECT key, size FROM searches ORDER BY last_access ASC").fetchall()
+        evicted = []
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            evicted.append((key,))
+            total -= size
+        self._conn.executemany("DELETE FROM searches WHERE key = ?", evicted)
+
+    def begin_refresh(self, key):
+        """Claim the background refresh of a stale entry; False if one is already running"""
+        with self._lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+            return True
+
+    def end_refresh(self, key):
+        with self._lock:
+            self._refreshing.discard(key)
+
+    def invalidate(self, key):
+        """Remove one entry from both tiers"""
+        with self._lock:
+            self._memory.pop(key, None)
+            self._conn.execute("DELETE FROM searches WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def clear(self):
+        """Remove every entry"""
+        with self._lock:
+            self._memory.clear()
+            self._conn.execute("DELETE FROM searches")
+            self._conn.commit()
+
+    def stats(self):
+        """Entry counts, disk payload size and hit/miss counters"""
+        with self._lock:
+            count, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM searches").fetchone()
+            return {'entries': count, 'memory_entries': len(self._memory), 'bytes': size,
+                    'hits': self.hits, 'stale_hits': self.stale_hits, 'misses': self.misses}
+
+
+# Global instance
+_search_cache = None
+_search_cache_lock = threading.Lock()
+
+
+def get_search_cache():
+    """Get or create the global search cache instance"""
+    global _search_cache
+    if _search_cache is None:
+        with _search_cache_lock:
+            if _search_cache is None:
+                _search_cache = SearchCache()
+    return _search_cache
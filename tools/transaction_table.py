@@ -0,0 +1,320 @@
+"""
+Columnar table of spending transactions.
+
+Each column is one typed NumPy array: price (float64), quantity (float32),
+purchase date (int32 days since 1970-01-01), bonus flag (bool), and int16/int32
+codes into two string dictionaries, one for categories and one for product
+and receipt names. A transaction costs about 27 bytes plus its share of the
+dictionaries, instead of a dict of Python objects, and filters and group-bys
+run as vectorized array operations.
+
+Arrow conversion copies only the bonus flags: names and categories become
+dictionary arrays over the codes. pandas shares the price, quantity and bonus arrays
+and turns names and categories into categoricals. Tables round-trip
+through Parquet. Arrow and Parquet need pyarrow.
+"""
+import numpy as np
+import pandas as pd
+
+from tools.mcp_server import GRANULARITIES, UNCATEGORIZED, as_date, transaction_date
+
+EPOCH = np.datetime64('1970-01-01', 'D')
+# Columns in the order to_pandas, to_arrow and Parquet files use
+COLUMNS = ('date', 'category', 'raw_name', 'product_name', 'price', 'quantity', 'is_bonus')
+_DTYPES = {'price': np.float64, 'quantity': np.float32, 'days': np.int32, 'is_bonus': np.bool_,
+           'category_codes': np.int16, 'raw_name_codes': np.int32, 'product_name_codes': np.int32}
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError("Arrow and Parquet export need pyarrow: pip install pyarrow")
+    return pyarrow
+
+
+def _dates(days):
+    """datetime64[D] values of day numbers"""
+    return EPOCH + np.asarray(days).astype('timedelta64[D]')
+
+
+def _day_number(value):
+    """Days since 1970-01-01 of a date, datetime or ISO string"""
+    return int((np.datetime64(as_date(value), 'D') - EPOCH).astype(np.int64))
+
+
+class StringDictionary:
+    """Strings stored once, referred to by integer codes in order of first appearance"""
+
+    def __init__(self, values=()):
+        self.values = []
+        self._codes = {}
+        for value in values:
+            self.code(value)
+
+    def code(self, value):
+        """Code of a string, added to the dictionary if new"""
+        code = self._codes.get(value)
+        if code is None:
+            code = self._codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def lookup(self, value):
+        """Code of a string, or -1 if it is not in the dictionary"""
+        return self._codes.get(value, -1)
+
+    def __len__(self):
+        return len(self.values)
+
+
+def _column(key):
+    """Read-only attribute giving the filled part of a column array (a view, not a copy)"""
+    return property(lambda self: self._columns[key][:self._size])
+
+
+class TransactionTable:
+    """Append-only columnar transactions with vectorized filter and group-by"""
+
+    def __init__(self, capacity=1024, categories=None, names=None):
+        """
+        Args:
+            capacity: Rows allocated up front; the arrays double when full
+            categories: StringDictionary for categories, to share codes with another table
+            names: StringDictionary for product and receipt names
+        """
+        self.categories = categories if categories is not None else StringDictionary()
+        self.names = names if names is not None else StringDictionary()
+        self._size = 0
+        self._columns = {key: np.empty(max(capacity, 1), dtype) for key, dtype in _DTYPES.items()}
+
+    @classmethod
+    def from_records(cls, items):
+        """Table of transaction dicts (raw_name, product_name, category, price, quantity, is_bonus, date)"""
+        table = cls(capacity=len(items))
+        table.append(items)
+        return table
+
+    def __len__(self):
+        return self._size
+
+    price = _column('price')
+    quantity = _column('quantity')
+    days = _column('days')
+    is_bonus = _column('is_bonus')
+    category_codes = _column('category_codes')
+    raw_name_codes = _column('raw_name_codes')
+    product_name_codes = _column('product_name_codes')
+
+    def _reserve(self, rows):
+        capacity = len(self._columns['price'])
+        if self._size + rows <= capacity:
+            return
+        capacity = max(capacity * 2, self._size + rows)
+        for key, column in self._columns.items():
+            grown = np.empty(capacity, column.dtype)
+            grown[:self._size] = column[:self._size]
+            self._columns[key] = grown
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Table of tuples in COLUMNS order, e.g. rows read from the spending memory"""
+        table = cls(capacity=len(rows))
+        if rows:
+            table._append_columns(*zip(*rows))
+        return table
+
+    def append(self, items):
+        """Add transaction dicts; undated items are dated today, as in the spending memory"""
+        if items:
+            self._append_columns(
+                [transaction_date(item) for item in items],
+                [item.get('category') or UNCATEGORIZED for item in items],
+                [item.get('raw_name') or '' for item in items],
+                [item.get('product_name') or item.get('raw_name') or '' for item in items],
+                [item.get('price') or 0.0 for item in items],
+                [item.get('quantity') or 1 for item in items],
+                [bool(item.get('is_bonus')) for item in items])
+
+    def _append_columns(self, dates, categories, raw_names, product_names, prices, quantities, is_bonus):
+        """Add rows given as one sequence per column, dates as ISO strings"""
+        rows = len(prices)
+        self._reserve(rows)
+        new = slice(self._size, self._size + rows)
+        columns = self._columns
+        columns['days'][new] = (np.array(dates, 'datetime64[D]') - EPOCH).astype(np.int32)
+        columns['price'][new] = prices
+        columns['quantity'][new] = quantities
+        columns['is_bonus'][new] = is_bonus
+        code = self.categories.code
+        columns['category_codes'][new] = [code(category) for category in categories]
+        if len(self.categories) > np.iinfo(np.int16).max:
+            raise ValueError(f"More than {np.iinfo(np.int16).max} categories")
+        code = self.names.code
+        columns['raw_name_codes'][new] = [code(name) for name in raw_names]
+        columns['product_name_codes'][new] = [code(name) for name in product_names]
+        self._size += rows
+
+    def _take(self, selection):
+        """New table with the selected rows (boolean mask or indices), sharing this table's dictionaries"""
+        rows = {key: column[:self._size][selection] for key, column in self._columns.items()}
+        table = TransactionTable(capacity=len(rows['price']), categories=self.categories, names=self.names)
+        for key, values in rows.items():
+            table._columns[key][:len(values)] = values
+        table._size = len(rows['price'])
+        return table
+
+    def mask(self, category=None, start=None, end=None):
+        """
+        Boolean row mask for a category and/or purchase date range
+
+        Args:
+            category: Category name, or None for every category
+            start: First purchase date included (date or ISO string), or None
+            end: Last purchase date included (date or ISO string), or None
+        """
+        mask = np.ones(self._size, np.bool_)
+        if category is not None:
+            mask &= self.category_codes == self.categories.lookup(category)
+        if start is not None:
+            mask &= self.days >= _day_number(start)
+        if end is not None:
+            mask &= self.days <= _day_number(end)
+        return mask
+
+    def filter(self, category=None, start=None, end=None):
+        """Rows of a category and/or purchase date range, as a new table; see mask()"""
+        return self._take(self.mask(category, start, end))
+
+    def bucket_days(self, granularity):
+        """Day number of each row's day, week (Monday) or month bucket"""
+        if granularity == 'day':
+            return self.days
+        if granularity == 'week':
+            return self.days - (self.days + 3) % 7  # 1970-01-01 was a Thursday
+        if granularity == 'month':
+            if not self._size:
+                return self.days
+            # Convert each distinct day once, then look rows up; cheaper than converting every row
+            first = int(self.days.min())
+            span = _dates(np.arange(first, int(self.days.max()) + 1))
+            months = (span.astype('datetime64[M]').astype('datetime64[D]') - EPOCH).astype(np.int32)
+            return months[self.days - first]
+        raise ValueError(f"Unknown granularity {granularity!r}; expected one of {', '.join(GRANULARITIES)}")
+
+    def group_by(self, by='category', value='price'):
+        """
+        Sum a column per group
+
+        Args:
+            by: 'category', 'product_name', 'raw_name', or 'day', 'week' or 'month'
+                (grouped on the bucket's first day)
+            value: 'price' or 'quantity' to sum, or None to count rows
+
+        Returns:
+            Dict of group (category, name or ISO date) -> sum, for groups with rows
+        """
+        weights = getattr(self, value) if value is not None else None
+        if by in GRANULARITIES:
+            # Buckets of a household history span a few thousand days at most, so count by offset
+            buckets = self.bucket_days(by)
+            first = int(buckets.min()) if len(buckets) else 0
+            codes = buckets - first
+            label = lambda code: str(_dates(first + code))
+        elif by in ('category', 'product_name', 'raw_name'):
+            codes = getattr(self, f'{by}_codes')
+            label = (self.categories if by == 'category' else self.names).values.__getitem__
+        else:
+            raise ValueError(f"Cannot group by {by!r}")
+        counts = np.bincount(codes)
+        sums = counts if weights is None else np.bincount(codes, weights=weights)
+        return {label(code): sums[code].item() for code in np.flatnonzero(counts).tolist()}
+
+    def to_records(self):
+        """Transactions as dicts, for code that expects the item format"""
+        names, categories = self.names.values, self.categories.values
+        dates = _dates(self.days).astype(str)
+        return [{'raw_name': names[raw], 'product_name': names[product], 'category': categories[category],
+                 'price': price, 'quantity': quantity, 'is_bonus': is_bonus, 'date': day}
+                for raw, product, category, price, quantity, is_bonus, day in zip(
+                    self.raw_name_codes.tolist(), self.product_name_codes.tolist(), self.category_codes.tolist(),
+                    self.price.tolist(), self.quantity.tolist(), self.is_bonus.tolist(), dates.tolist())]
+
+    def to_pandas(self):
+        """
+        DataFrame over the columns; prices, quantities and bonus flags are not copied
+
+        Names and categories become categoricals over the dictionaries (pandas
+        narrows their codes to the smallest integer type, which copies them),
+        and the date column is a datetime64[s] computed from the day numbers.
+        """
+        def categorical(codes, dictionary):
+            return pd.Categorical.from_codes(codes, categories=pd.Index(dictionary.values, dtype=object),
+                                             validate=False)
+
+        return pd.DataFrame({
+            'date': _dates(self.days).astype('datetime64[s]'),
+            'category': categorical(self.category_codes, self.categories),
+            'raw_name': categorical(self.raw_name_codes, self.names),
+            'product_name': categorical(self.product_name_codes, self.names),
+            'price': self.price,
+            'quantity': self.quantity,
+            'is_bonus': self.is_bonus,
+        }, columns=list(COLUMNS), copy=False)
+
+    def to_arrow(self):
+        """
+        Arrow table over the columns; names and categories are dictionary arrays over the codes
+
+        Only the bonus flags are copied, since Arrow packs booleans into bits.
+        """
+        pa = _pyarrow()
+        names = pa.array(self.names.values, pa.string())
+        return pa.table({
+            'date': pa.array(self.days).view(pa.date32()),
+            'category': pa.DictionaryArray.from_arrays(pa.array(self.category_codes),
+                                                       pa.array(self.categories.values, pa.string())),
+            'raw_name': pa.DictionaryArray.from_arrays(pa.array(self.raw_name_codes), names),
+            'product_name': pa.DictionaryArray.from_arrays(pa.array(self.product_name_codes), names),
+            'price': pa.array(self.price),
+            'quantity': pa.array(self.quantity),
+            'is_bonus': pa.array(self.is_bonus),
+        })
+
+    @classmethod
+    def from_arrow(cls, arrow_table):
+        """Table from an Arrow table with the to_arrow() columns"""
+        pa = _pyarrow()
+        n = arrow_table.num_rows
+        table = cls(capacity=n)
+        if not n:
+            return table
+        arrow_table = arrow_table.combine_chunks()
+
+        def codes(name, dictionary):
+            """Codes of a string column in this table's dictionary"""
+            column = arrow_table.column(name).chunk(0)
+            if not pa.types.is_dictionary(column.type):
+                column = column.dictionary_encode()
+            remap = np.array([dictionary.code(value) for value in column.dictionary.to_pylist()], np.int32)
+            return remap[column.indices.to_numpy(zero_copy_only=False)]
+
+        table._columns['category_codes'][:n] = codes('category', table.categories)
+        table._columns['raw_name_codes'][:n] = codes('raw_name', table.names)
+        table._columns['product_name_codes'][:n] = codes('product_name', table.names)
+        table._columns['days'][:n] = arrow_table.column('date').cast(pa.date32()).cast(pa.int32()).to_numpy()
+        table._columns['price'][:n] = arrow_table.column('price').to_numpy()
+        table._columns['quantity'][:n] = arrow_table.column('quantity').to_numpy()
+        table._columns['is_bonus'][:n] = arrow_table.column('is_bonus').to_numpy()
+        table._size = n
+        return table
+
+    def write_parquet(self, path):
+        """Write the table to a Parquet file (or writable binary file object)"""
+        _pyarrow().parquet.write_table(self.to_arrow(), path)
+
+    @classmethod
+    def read_parquet(cls, path):
+        """Table from a Parquet file written by write_parquet"""
+        return cls.from_arrow(_pyarrow().parquet.read_table(path))
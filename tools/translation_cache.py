@@ -0,0 +1,104 @@
+"""
+Persistent memo of LLM query translations.
+
+Queries the grocery lexicon cannot translate go to Gemini once; the answer is
+kept in memory and in SQLite, keyed by the normalized query, so the same
+query never needs another LLM call.
+"""
+import os
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+
+DEFAULT_CACHE_PATH = Path(__file__).resolve().parent.parent / '.cache' / 'translations.sqlite3'
+
+
+class TranslationCache:
+    """SQLite-backed query -> Dutch translation memo with an in-memory front"""
+
+    def __init__(self, path=None):
+        """
+        Args:
+            path: SQLite file (default: TRANSLATION_CACHE_PATH or .cache/translations.sqlite3),
+                  or ':memory:' for a throwaway cache
+        """
+        self.path = str(path or os.getenv('TRANSLATION_CACHE_PATH', DEFAULT_CACHE_PATH))
+        self.hits = 0
+        self.misses = 0
+        self._memory = {}
+        self._lock = threading.Lock()
+
+        if self.path != ':memory:':
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS translations (
+                query TEXT PRIMARY KEY,
+                translation TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+        """)
+        self._conn.commit()
+        # Translations are small; load them all so lookups never touch disk
+        self._memory.update(self._conn.execute("SELECT query, translation FROM translations").fetchall())
+
+    @staticmethod
+    def normalize_query(query):
+        return re.sub(r'\s+', ' ', (query or '').strip().lower())
+
+    def get(self, query):
+        """Return the stored translation for a query, or None"""
+        key = self.normalize_query(query)
+        with self._lock:
+            translation = self._memory.get(key)
+            if translation is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return translation
+
+    def put(self, query, translation):
+        """Store the translation for a query"""
+        self.put_many({query: translation})
+
+    def put_many(self, translations):
+        """Store {query: translation} pairs in one transaction"""
+        now = time.time()
+        rows = [(self.normalize_query(query), translation, now) for query, translation in translations.items()]
+        with self._lock:
+            self._memory.update((query, translation) for query, translation, _ in rows)
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO translations (query, translation, created_at) VALUES (?, ?, ?)", rows)
+            self._conn.commit()
+
+    def clear(self):
+        """Remove every entry"""
+        with self._lock:
+            self._memory.clear()
+            self._conn.execute("DELETE FROM translations")
+            self._conn.commit()
+
+    def stats(self):
+        """Entry count and hit/miss counters"""
+        with self._lock:
+            return {'entries': len(self._memory), 'hits': self.hits, 'misses': self.misses}
+
+
+# Global instance
+_translation_cache = None
+_translation_cache_lock = threading.Lock()
+
+
+def get_translation_cache():
+    """Get or create the global translation cache instance"""
+    global _translation_cache
+    if _translation_cache is None:
+        with _translation_cache_lock:
+            if _translation_cache is None:
+                _translation_cache = TranslationCache()
+    return _translation_cache